@@ -0,0 +1,388 @@
+"""
+FEMS ASGI Benchmark
+Compares thread-per-request serving (gunicorn, backend/serve.py) with the async
+customer reads (uvicorn, backend/asgi.py) when many clients are connected at once
+
+Both servers run ONE worker process. For each concurrency level, that many
+connections are opened with asyncio (keep-alive, one customer token per connection)
+and each loops for --duration seconds over a read-only mix:
+    75%  GET /api/customer/vendors/<id>/menu
+    15%  GET /api/customer/vendors
+    10%  GET /api/customer/orders?limit=10
+--send-delay-ms makes every client a slow mobile link: the request head is sent in
+two halves with that pause in between, so the server holds the request while it
+trickles in. Reported per server and level: requests/s, p50 / p99 latency, errors
+(non-2xx, timeouts, resets) and the peak resident memory of the server processes.
+
+Run it against a scratch database: it seeds a vendor with a menu and the customers,
+and deletes them afterwards. Linux only (memory is read from /proc).
+
+Usage (from FEMS_project/):
+    python asgi_benchmark.py --levels 50,200,1000 --duration 20 --threads 8 --send-delay-ms 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import requests
+
+GREEN = "\033[92m"
+RED = "\033[91m"
+BLUE = "\033[94m"
+CYAN = "\033[96m"
+RESET = "\033[0m"
+
+MIX = (
+    ("menu", 75),
+    ("vendors", 15),
+    ("history", 10),
+)
+WARMUP_SECONDS = 3
+STARTUP_TIMEOUT = 60
+REQUEST_TIMEOUT = 30
+
+
+def print_section(title, color=BLUE):
+    print(f"\n{color}{'='*80}")
+    print(f"  {title}")
+    print(f"{'='*80}{RESET}\n")
+
+
+def print_success(msg):
+    print(f"{GREEN}✓ {msg}{RESET}")
+
+
+def print_error(msg):
+    print(f"{RED}✗ {msg}{RESET}")
+
+
+def print_info(msg):
+    print(f"{CYAN}➤ {msg}{RESET}")
+
+
+# ============================================================================ #
+# SEEDING
+# ============================================================================ #
+
+def seed(db, customers, items):
+    """Vendor with a menu of `items` items and `customers` customers; returns (vendor_id, user_ids, customer_ids)"""
+    tag = uuid.uuid4().hex[:8]
+
+    vendor_user_id = db.session.execute(db.text("""
+        INSERT INTO users (email, password_hash, role, full_name, is_email_verified)
+        VALUES ('bench-vendor-' || :tag || '@example.com', 'x', 'vendor', 'Bench Vendor', TRUE)
+        RETURNING id;
+    """), {"tag": tag}).scalar()
+    vendor_id = db.session.execute(db.text("""
+        INSERT INTO vendors (user_id, vendor_name, location)
+        VALUES (:user_id, 'Bench Vendor ' || :tag, 'Bench Hall')
+        RETURNING id;
+    """), {"tag": tag, "user_id": vendor_user_id}).scalar()
+    menu_id = db.session.execute(db.text("""
+        INSERT INTO menus (vendor_id, title) VALUES (:vendor_id, 'Bench Menu') RETURNING id;
+    """), {"vendor_id": vendor_id}).scalar()
+    db.session.execute(db.text("""
+        INSERT INTO menu_items (menu_id, vendor_id, name, description, price, preparation_time_minutes)
+        SELECT :menu_id, :vendor_id, 'Bench Item ' || i, 'Benchmark item number ' || i, 100 + i, 5
+        FROM generate_series(1, :n) i;
+    """), {"menu_id": menu_id, "vendor_id": vendor_id, "n": items})
+
+    customer_ids = db.session.execute(db.text("""
+        INSERT INTO users (email, password_hash, role, full_name, is_email_verified)
+        SELECT 'bench-customer-' || :tag || '-' || i || '@example.com', 'x', 'customer', 'Bench Customer ' || i, TRUE
+        FROM generate_series(1, :n) i
+        RETURNING id;
+    """), {"tag": tag, "n": customers}).scalars().all()
+    db.session.commit()
+
+    return vendor_id, [vendor_user_id, *customer_ids], customer_ids
+
+
+def cleanup(db, user_ids):
+    db.session.execute(db.text("DELETE FROM users WHERE id = ANY(:ids);"), {"ids": list(user_ids)})
+    db.session.commit()
+
+
+# ============================================================================ #
+# SERVERS
+# ============================================================================ #
+
+def start_server(mode, port, threads):
+    if mode == "gunicorn":
+        command = [
+            sys.executable, "-m", "backend.serve", "--bind", f"127.0.0.1:{port}",
+            "--workers", "1", "--threads", str(threads),
+        ]
+    else:
+        command = [
+            sys.executable, "-m", "uvicorn", "backend.asgi:app",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", "1",
+            "--no-access-log", "--backlog", "4096",
+        ]
+    proc = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{mode} server exited with code {proc.returncode}: {' '.join(command)}")
+        try:
+            if requests.get(f"{base_url}/api/customer/health", timeout=1).status_code == 200:
+                return proc
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+
+    proc.terminate()
+    raise SystemExit(f"{mode} server did not become healthy within {STARTUP_TIMEOUT}s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of pid and its descendants (gunicorn master + worker), in MB"""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total_kb / 1024
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(0.5):
+            self.peak = max(self.peak, process_tree_rss_mb(self.pid))
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+# ============================================================================ #
+# LOAD
+# ============================================================================ #
+
+async def http_get(reader, writer, port, path, token, send_delay):
+    head = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: 127.0.0.1:{port}\r\n"
+        f"Authorization: Bearer {token}\r\n"
+        f"Connection: keep-alive\r\n\r\n"
+    ).encode()
+    if send_delay:
+        half = len(head) // 2
+        writer.write(head[:half])
+        await writer.drain()
+        await asyncio.sleep(send_delay)
+        head = head[half:]
+    writer.write(head)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("server closed the connection")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    body = await reader.readexactly(length)
+    return status, body
+
+
+async def client(port, token, vendor_id, stop_at, record_from, samples, send_delay, seed_value):
+    rng = random.Random(seed_value)
+    operations = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    paths = {
+        "menu": f"/api/customer/vendors/{vendor_id}/menu",
+        "vendors": "/api/customer/vendors",
+        "history": "/api/customer/orders?limit=10",
+    }
+    reader = writer = None
+
+    while True:
+        started = time.perf_counter()
+        if started >= stop_at:
+            break
+        operation = rng.choices(operations, weights)[0]
+
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection("127.0.0.1", port), REQUEST_TIMEOUT
+                )
+            status, body = await asyncio.wait_for(
+                http_get(reader, writer, port, paths[operation], token, send_delay), REQUEST_TIMEOUT
+            )
+            ok = status < 400
+            if ok:
+                json.loads(body)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+            ok = False
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+
+        finished = time.perf_counter()
+        if started >= record_from:
+            samples.append((operation, ok, finished - started))
+
+    if writer is not None:
+        writer.close()
+
+
+async def run_level(port, tokens, vendor_id, duration, send_delay):
+    """Warm up, then measure for `duration` seconds with one connection per token"""
+    samples = []
+    record_from = time.perf_counter() + WARMUP_SECONDS
+    stop_at = record_from + duration
+    await asyncio.gather(*(
+        client(port, token, vendor_id, stop_at, record_from, samples, send_delay, index)
+        for index, token in enumerate(tokens)
+    ))
+    return samples
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def summarize(samples, seconds):
+    latencies = sorted(latency for _, ok, latency in samples if ok)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, ok, _ in samples if not ok),
+        "rps": sum(1 for _, ok, _ in samples if ok) / seconds,
+        "p50": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def raise_open_files_limit(wanted):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < wanted:
+        target = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        soft = target
+    return soft
+
+
+# ============================================================================ #
+# MAIN
+# ============================================================================ #
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare gunicorn threads with the async customer reads")
+    parser.add_argument("--modes", default="gunicorn,uvicorn", help="Comma-separated: gunicorn, uvicorn")
+    parser.add_argument("--levels", default="50,200,1000", help="Comma-separated concurrent connections")
+    parser.add_argument("--duration", type=int, default=20, help="Measured seconds per server and level")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads (one worker)")
+    parser.add_argument("--send-delay-ms", type=int, default=0, help="Pause inside each request head (slow clients)")
+    parser.add_argument("--items", type=int, default=30, help="Menu items to seed")
+    parser.add_argument("--port-base", type=int, default=5200)
+    parser.add_argument("--keep", action="store_true", help="keep seeded rows")
+    args = parser.parse_args()
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    send_delay = args.send_delay_ms / 1000
+
+    for mode in modes:
+        if mode not in ("gunicorn", "uvicorn"):
+            raise SystemExit(f"Unknown mode: {mode}")
+
+    # every connection is a socket here and in the server (which inherits the limit)
+    limit = raise_open_files_limit(2 * max(levels) + 256)
+    if limit < 2 * max(levels):
+        print_error(f"Open files limit is {limit}; the highest levels will fail to connect")
+
+    from backend.app import create_app
+    from backend.extensions import db
+    from backend.utils import create_token
+
+    app = create_app()
+    print_section(f"⚡ ASGI BENCHMARK (levels {args.levels}, {args.duration}s each, "
+                  f"send delay {args.send_delay_ms} ms)")
+
+    with app.app_context():
+        print_info("Seeding vendor, menu and customers...")
+        vendor_id, user_ids, customer_ids = seed(db, max(levels), args.items)
+        tokens = [create_token(customer_id, "customer") for customer_id in customer_ids]
+
+    results = []
+    try:
+        for index, mode in enumerate(modes):
+            label = f"gunicorn 1x{args.threads}" if mode == "gunicorn" else "uvicorn async"
+            port = args.port_base + index
+            print_info(f"Starting {label} server...")
+            proc = start_server(mode, port, args.threads)
+            try:
+                for level in levels:
+                    print_info(f"{label}: {level} connections ({WARMUP_SECONDS}s warm-up + {args.duration}s)...")
+                    sampler = RssSampler(proc.pid)
+                    sampler.start()
+                    samples = asyncio.run(run_level(port, tokens[:level], vendor_id, args.duration, send_delay))
+                    stats = summarize(samples, args.duration)
+                    stats["rss"] = sampler.stop()
+                    results.append((label, level, stats))
+                    print_success(f"{label} @ {level}: {stats['rps']:,.0f} requests/s, {stats['errors']} errors")
+            finally:
+                stop_server(proc)
+    finally:
+        if not args.keep:
+            with app.app_context():
+                cleanup(db, user_ids)
+
+    print_section("RESULTS")
+    print(f"  {'server':<18}{'conns':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>10}{'RSS MB':>10}")
+    for label, level, stats in results:
+        print(f"  {label:<18}{level:>8}{stats['rps']:>10,.0f}{stats['p50']:>10.1f}"
+              f"{stats['p99']:>10.1f}{stats['errors']:>10}{stats['rss']:>10.0f}")
+    print()
+
+    if any(stats["errors"] for _, _, stats in results):
+        print_error("Some requests failed (see the errors column); check the server logs")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
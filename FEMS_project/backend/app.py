@@ -1,37 +1,67 @@
+import time
+_imports_started = time.perf_counter()
+
+from .startup import startup_timer, prepare_schema
 from flask import Flask, jsonify
 from flask_cors import CORS
-from .config import Config
+from .config import load_config
 from .extensions import db
 from .auth import bp as auth_bp
 from .vendors import bp as vendors_bp
 from .customer_routes import bp as customer_bp
+from .commands import register_commands
+from .eta import eta_engine
+from .scheduler import release_scheduler
+from .coalesce import coalescer
+from .cache import cache_bus
+from .query_cache import query_cache
+from .snapshot import catalog_snapshot
+
+startup_timer.record("imports", _imports_started)
+
+# shared with the async reads in backend/asgi.py
+CORS_OPTIONS = {
+    "origins": [
+        "http://localhost:5173",  # Vite dev server
+        "http://localhost:3000",  # Alternative port
+        "http://127.0.0.1:5173",
+        "http://127.0.0.1:3000",
+    ],
+    "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+    "allow_headers": ["Content-Type", "Authorization"],
+    "supports_credentials": True,
+    "max_age": 3600
+}
 
 def create_app():
-    app = Flask(__name__, static_folder="static", template_folder="templates")
-    app.config.from_object(Config)
-    db.init_app(app)
+    with startup_timer.phase("config"):
+        app = Flask(__name__, static_folder="static", template_folder="templates")
+        app.config.from_mapping(load_config())
 
-    # ============ CORS CONFIGURATION ============
-    # This allows frontend on different port to call backend API
-    CORS(app, resources={
-        r"/*": {
-            "origins": [
-                "http://localhost:5173",  # Vite dev server
-                "http://localhost:3000",  # Alternative port
-                "http://127.0.0.1:5173",
-                "http://127.0.0.1:3000",
-            ],
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"],
-            "supports_credentials": True,
-            "max_age": 3600
-        }
-    })
+    # nothing here touches the database; the ETA engine, the release scheduler and the
+    # cache bus listener start on first use, in the process that serves the request
+    with startup_timer.phase("extensions"):
+        db.init_app(app)
+        eta_engine.init_app(app)
+        release_scheduler.init_app(app)
+        coalescer.init_app(app)
+        cache_bus.init_app(app)
+        query_cache.init_app(app)
+        catalog_snapshot.init_app(app)
+        startup_timer.init_app(app)
+
+        # ============ CORS CONFIGURATION ============
+        # This allows frontend on different port to call backend API
+        CORS(app, resources={r"/*": CORS_OPTIONS})
 
     # register blueprints
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(vendors_bp)
-    app.register_blueprint(customer_bp)
+    with startup_timer.phase("blueprints"):
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(vendors_bp)
+        app.register_blueprint(customer_bp)
+
+        # maintenance commands (flask --app backend.app <command>)
+        register_commands(app)
 
     @app.route("/")
     def home():
@@ -81,8 +111,8 @@ def create_app():
 
 if __name__ == "__main__":
     app = create_app()
-    with app.app_context():
-        db.create_all()
+    # dev server: create_all unless SCHEMA_STARTUP says otherwise
+    if prepare_schema(app, default_mode="create_all") == "create_all":
         print("✅ Database tables created successfully!")
 
     app.run(debug=True, port=5000, host='0.0.0.0')
@@ -0,0 +1,299 @@
+# backend/asgi.py
+"""
+ASGI entry point: async customer reads, everything else through the Flask app
+
+    uvicorn backend.asgi:app --host 0.0.0.0 --port 5000
+
+These GET endpoints run as coroutines on async SQLAlchemy (asyncpg):
+    /api/customer/vendors
+    /api/customer/vendors/<id>/menu
+    /api/customer/orders                (history)
+    /api/customer/orders/<id>           (details)
+A request waiting on the database or on a slow client network holds no thread, so
+one process can keep thousands of mobile clients in flight on a small pool
+(ASYNC_DB_POOL_SIZE connections). Every other path and method (order placement,
+cancel, vendors, auth, CORS preflight) falls through to the unchanged Flask app.
+
+The async endpoints run the same SQL (from customer_routes) and the same JWT check
+(utils.decode_token + user lookup + customer role) as the Flask routes, and return
+the same JSON. One difference: "eta" is the stored estimated_ready_at, because the
+in-memory ETA engine lives in the Flask side of each process. They also share the
+process's principal and menu caches (backend/cache.py) and its query cache
+(backend/query_cache.py).
+"""
+
+from contextlib import asynccontextmanager
+from functools import wraps
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.applications import Starlette
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route, request_response
+
+from .app import create_app, CORS_OPTIONS
+from .customer_routes import (
+    row_to_dict, VENDOR_SORTS, vendor_directory_sql, VENDOR_SQL, MENU_SQL, shape_menu,
+    order_details_sql, order_detail_items_sql, history_filters, order_history_sql,
+    order_history_items_sql, VENDOR_DIRECTORY_TABLES,
+)
+from .cache import (
+    MISS, cache_bus, principal_cache, menu_cache,
+    PRINCIPAL_SQL, CACHE_VERSION_SQL, principal_from_row,
+)
+from .query_cache import query_cache
+from .snapshot import catalog_snapshot, db_unreachable
+from .startup import prepare_schema
+from .utils import decode_token, order_tables
+
+flask_app = create_app()
+prepare_schema(flask_app)
+
+def async_database_url(url):
+    """postgresql://... (as used by Flask-SQLAlchemy) -> (postgresql+asyncpg://..., connect_args)"""
+    url = make_url(url)
+    query = dict(url.query)
+    connect_args = {"statement_cache_size": flask_app.config.get("ASYNC_DB_STATEMENT_CACHE_SIZE", 100)}
+    # libpq's sslmode is asyncpg's ssl (same values: disable, prefer, require, verify-full...)
+    sslmode = query.pop("sslmode", None)
+    if sslmode:
+        connect_args["ssl"] = sslmode
+    return url.set(drivername="postgresql+asyncpg", query=query), connect_args
+
+
+_url, _connect_args = async_database_url(flask_app.config["SQLALCHEMY_DATABASE_URI"])
+engine = create_async_engine(
+    _url,
+    pool_size=flask_app.config.get("ASYNC_DB_POOL_SIZE", 20),
+    max_overflow=flask_app.config.get("ASYNC_DB_MAX_OVERFLOW", 10),
+    pool_pre_ping=True,
+    connect_args=_connect_args,
+)
+
+
+async def cached(cache, key, load):
+    """cache_bus.cached() for coroutines: await load() -> (version, value) on a miss"""
+    if not cache_bus.healthy:
+        return (await load())[1]
+    value = cache.get(key)
+    if value is not MISS:
+        return value
+    token = cache.begin()
+    version, value = await load()
+    if value is not None:
+        cache.put(key, version, value, token)
+    return value
+
+
+async def cached_query(conn, sql, params=None, tables=(), max_age=None):
+    """query_cache.fetch() on the async connection (shares the process's cached rows)"""
+    params = params or {}
+    if not query_cache.usable(tables):
+        return (await conn.execute(text(sql), params)).all()
+    key = query_cache.key(sql, params)
+    rows = query_cache.get(key, max_age)
+    if rows is not MISS:
+        return rows
+    token = query_cache.begin(tables)
+    rows = (await conn.execute(text(sql), params)).all()
+    query_cache.put(key, tables, rows, token)
+    return rows
+
+
+async def read_cache_version(conn, cache, key):
+    return (await conn.execute(text(CACHE_VERSION_SQL), {"cache": cache, "key": str(key)})).scalar()
+
+
+def customer_read(handler=None, snapshot=None):
+    """
+    token_required + require_customer for coroutines: handler(request, conn, user)
+    returns (body, status). The connection goes back to the pool before the response
+    is written, so slow clients never hold one. snapshot(request) -> (body, status) or
+    None answers instead while the database is unreachable (backend/snapshot.py).
+    """
+    if handler is None:
+        return lambda handler: customer_read(handler, snapshot)
+
+    @wraps(handler)
+    async def endpoint(request):
+        auth_header = request.headers.get("Authorization", "")
+        if not auth_header.startswith("Bearer "):
+            return JSONResponse({"error": "Authorization header required"}, 401)
+        token = auth_header.split(" ", 1)[1]
+        try:
+            data = decode_token(token, flask_app.config)
+        except Exception as e:
+            # jwt.ExpiredSignatureError or jwt.InvalidTokenError
+            return JSONResponse({"error": str(e)}, 401)
+
+        async def load_principal():
+            row = (await conn.execute(text(PRINCIPAL_SQL), {"user_id": data.get("user_id")})).first()
+            return principal_from_row(row)
+
+        try:
+            async with engine.connect() as conn:
+                user = await cached(principal_cache, data.get("user_id"), load_principal)
+                if not user:
+                    body, status = {"error": "User not found"}, 401
+                elif user.role != 'customer':
+                    body, status = {"error": "Customer access only"}, 403
+                else:
+                    body, status = await handler(request, conn, user)
+        except Exception as e:
+            fallback = snapshot(request) if snapshot is not None and db_unreachable(e) else None
+            if fallback and data.get("role") != "customer":
+                # the user can't be loaded: the token's own claims decide
+                fallback = {"error": "Customer access only"}, 403
+            body, status = fallback or ({"error": f"Database error: {str(e)}"}, 500)
+
+        return JSONResponse(body, status)
+    return endpoint
+
+
+# ============================================
+# ASYNC CUSTOMER READS
+# ============================================
+
+@customer_read(snapshot=lambda request: catalog_snapshot.degraded_directory(
+    request.query_params.get("sort", "name")
+))
+async def get_all_vendors(request, conn, current_user):
+    sort = request.query_params.get("sort", "name")
+    if sort not in VENDOR_SORTS:
+        return {"error": f"Invalid sort. Must be one of: {', '.join(VENDOR_SORTS)}"}, 400
+
+    result = await cached_query(
+        conn, vendor_directory_sql(sort), tables=VENDOR_DIRECTORY_TABLES,
+        max_age=flask_app.config.get("DIRECTORY_CACHE_SECONDS")
+    )
+    vendors = [row_to_dict(row) for row in result]
+    return {
+        "vendors": vendors,
+        "total": len(vendors),
+        "sort": sort,
+        "message": "Vendors retrieved successfully"
+    }, 200
+
+
+@customer_read(snapshot=lambda request: catalog_snapshot.degraded_menu(request.path_params["vendor_id"]))
+async def get_vendor_menu(request, conn, current_user):
+    vendor_id = request.path_params["vendor_id"]
+
+    async def load():
+        version = await read_cache_version(conn, "menu", vendor_id)
+        vendor_result = (await conn.execute(text(VENDOR_SQL), {"vendor_id": vendor_id})).first()
+        if not vendor_result:
+            return version, None
+        menu_result = await conn.execute(text(MENU_SQL), {"vendor_id": vendor_id})
+        return version, (row_to_dict(vendor_result), shape_menu(menu_result))
+
+    found = await cached(menu_cache, vendor_id, load)
+    if not found:
+        return {"error": "Vendor not found"}, 404
+    vendor, menu = found
+    return {
+        "vendor": vendor,
+        "menu": menu
+    }, 200
+
+
+@customer_read
+async def get_order_details(request, conn, current_user):
+    order_id = request.path_params["order_id"]
+    include_archived = request.query_params.get("include_archived", "false").lower() == "true"
+    orders_table, items_table = order_tables(include_archived)
+
+    result = (await conn.execute(
+        text(order_details_sql(orders_table, items_table)),
+        {"order_id": order_id, "customer_id": current_user.id}
+    )).first()
+    if not result:
+        return {"error": "Order not found"}, 404
+
+    items_result = await conn.execute(
+        text(order_detail_items_sql(items_table)),
+        {"order_id": order_id, "placed_at": result.placed_at}
+    )
+
+    order = row_to_dict(result)
+    order["eta"] = order["estimated_ready_at"]
+    return {
+        "order": order,
+        "items": [row_to_dict(row) for row in items_result]
+    }, 200
+
+
+@customer_read
+async def get_order_history(request, conn, current_user):
+    filters, error = history_filters(request.query_params)
+    if error:
+        return {"error": error}, 400
+    orders_table, items_table = order_tables(filters["include_archived"])
+
+    params = {"customer_id": current_user.id, "limit": filters["limit"]}
+    if filters["status"]:
+        params["status"] = filters["status"]
+
+    rows = (await conn.execute(
+        text(order_history_sql(orders_table, with_status=bool(filters["status"]))),
+        params
+    )).all()
+
+    orders = []
+    items_sql = text(order_history_items_sql(items_table))
+    for row in rows:
+        order = row_to_dict(row)
+        # asyncpg wants the datetime itself, not row_to_dict's ISO string
+        items_result = await conn.execute(items_sql, {"order_id": row.order_id, "placed_at": row.placed_at})
+        order["items"] = [row_to_dict(item) for item in items_result]
+        order["eta"] = order["estimated_ready_at"]
+        orders.append(order)
+
+    return {
+        "orders": orders,
+        "total": len(orders),
+        "showing": len(orders),
+        "include_archived": filters["include_archived"]
+    }, 200
+
+
+def with_cors(endpoint):
+    # preflight (OPTIONS) doesn't match these GET routes and is answered by Flask-CORS
+    return CORSMiddleware(
+        endpoint,
+        allow_origins=CORS_OPTIONS["origins"],
+        allow_methods=CORS_OPTIONS["methods"],
+        allow_headers=CORS_OPTIONS["allow_headers"],
+        allow_credentials=CORS_OPTIONS["supports_credentials"],
+        max_age=CORS_OPTIONS["max_age"],
+    )
+
+
+def _route(path, endpoint):
+    return Route(path, with_cors(request_response(endpoint)), methods=["GET"])
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # the Flask app starts the cache bus listener on its first request; the async reads
+    # may come first, so start it with the server
+    cache_bus.ensure_started()
+    catalog_snapshot.ensure_started()
+    yield
+    await engine.dispose()
+
+
+app = Starlette(
+    routes=[
+        _route("/api/customer/vendors", get_all_vendors),
+        _route("/api/customer/vendors/{vendor_id:int}/menu", get_vendor_menu),
+        _route("/api/customer/orders", get_order_history),
+        _route("/api/customer/orders/{order_id:int}", get_order_details),
+        # everything else, including POST /api/customer/orders, is the Flask app
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ],
+    lifespan=lifespan,
+)
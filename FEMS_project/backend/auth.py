@@ -3,6 +3,8 @@ from flask import Blueprint, request, jsonify, current_app
 from .extensions import db
 from .models import User, EmailVerification, Vendor  #import any models you need
 from .utils import hash_password, check_password, create_token, decode_token, generate_verification_code
+from .cache import cache_bus, principal_cache, load_principal, Principal
+from .snapshot import db_unreachable
 from datetime import datetime, timedelta
 from functools import wraps
 
@@ -17,7 +19,14 @@ def token_required(f):
         token = auth_header.split(" ", 1)[1]
         try:
             data = decode_token(token)
-            user = User.query.get(data.get("user_id"))
+            # Principal(id, role), from this worker's cache when the bus is listening
+            try:
+                user = cache_bus.cached(principal_cache, data.get("user_id"), lambda: load_principal(data.get("user_id")))
+            except Exception as e:
+                # database unreachable: catalog snapshot reads go on with the token's own claims
+                if not (getattr(f, "serves_snapshot", False) and db_unreachable(e)):
+                    raise
+                user = Principal(data.get("user_id"), data.get("role"))
             if not user:
                 return jsonify({"error": "User not found"}), 401
             return f(user, *args, **kwargs)
@@ -201,7 +210,10 @@ def login():
 
 @bp.route("/profile", methods=["GET"])
 @token_required
-def profile(current_user):
+def profile(principal):
+    current_user = User.query.get(principal.id)
+    if not current_user:
+        return jsonify({"error": "User not found"}), 401
     user_data = current_user.to_dict()
 
     # Include vendor_id if user is a vendor
@@ -216,8 +228,11 @@ def profile(current_user):
 
 @bp.route("/complete-profile", methods=["POST"])
 @token_required
-def complete_profile(current_user):
-    # current_user is an instance of User returned by decorator
+def complete_profile(principal):
+    # the decorator only gives id and role; this route needs the full User row
+    current_user = User.query.get(principal.id)
+    if not current_user:
+        return jsonify({"error": "User not found"}), 401
     data = request.get_json() or {}
     full_name = data.get("full_name", "").strip()
     phone = data.get("phone", "").strip()
@@ -252,6 +267,11 @@ def complete_profile(current_user):
                 vendor.location = data.get("location", vendor.location)
                 vendor_data = vendor.to_dict()
 
+        # role and vendor name / location are cached by every worker: drop them on commit
+        cache_bus.publish("principal", current_user.id)
+        if role == "vendor":
+            cache_bus.publish("menu", vendor_data["id"])
+
         db.session.commit()
 
         # Include vendor_id in user data for vendors
@@ -0,0 +1,297 @@
+# backend/cache.py
+"""
+In-process caches kept correct across workers with Postgres LISTEN/NOTIFY
+
+Caches (one copy per worker process):
+- principal: user id -> (id, role) for token_required
+- menu: vendor id -> (vendor, menu) for the customer menu (MENU_CACHE_SECONDS cap,
+  because stock counts change with every order without an invalidation)
+- query results (backend/query_cache.py) ride on the same listener: they are
+  invalidated per table by notifications on fems_tables instead
+
+Invalidation:
+- a write calls cache_bus.publish(cache, key) in its own transaction. That runs
+  publish_cache_invalidation() (sql/customer_routes.sql): it bumps the key's row in
+  cache_versions and pg_notify()s (cache, key, version) on fems_cache, which Postgres
+  only delivers if the write commits
+- a listener thread in every worker applies the messages: entries older than the
+  message's version are dropped, and the version is remembered as the key's floor
+- a miss reads the key's version BEFORE the data and stores the entry under it; an
+  entry under the floor is refused. So a message that arrives late, twice, or before
+  the reader that fetched pre-write data finishes can't leave stale data behind
+- while the listener is down, caches are bypassed; on every (re)connect all caches are
+  flushed and bumped to a new epoch, so loads begun before the gap are refused too
+
+LISTEN needs a session connection: behind a transaction pooler (pgbouncer, Supabase's
+pooler port) set CACHE_BUS_DATABASE_URL to a direct connection.
+"""
+
+import json
+import os
+import select
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from .extensions import db
+
+CHANNEL = "fems_cache"
+RETRY_SECONDS = 5
+KEEPALIVE_SECONDS = 30
+MISS = object()
+
+Principal = namedtuple("Principal", ["id", "role"])
+
+
+class LocalCache:
+    """LRU of key -> (version, value), with per-version-key floors"""
+
+    def __init__(self, name, max_entries=1000, ttl_config=None, version_key=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_config = ttl_config
+        self.ttl = None
+        self._version_key = version_key or str
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (version, value, stored_at)
+        self._floors = {}               # version key -> highest invalidated version
+        self._epoch = 0
+        self.hits = self.misses = self.invalidations = self.refused = 0
+
+    def version_key(self, key):
+        return self._version_key(key)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl is not None and time.monotonic() - entry[2] > self.ttl):
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def begin(self):
+        """Token for a load about to start; put() refuses it if a flush happens meanwhile"""
+        return self._epoch
+
+    def put(self, key, version, value, token, age=0):
+        """Store a load's value; age: seconds the value had already been around (counts toward the TTL)"""
+        with self._lock:
+            if token != self._epoch or version < self._floors.get(self.version_key(key), 0):
+                self.refused += 1
+                return False
+            self._entries[key] = (version, value, time.monotonic() - age)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, version_key, version):
+        with self._lock:
+            self.invalidations += 1
+            if version > self._floors.get(version_key, 0):
+                self._floors[version_key] = version
+            for key in [k for k, entry in self._entries.items()
+                        if self.version_key(k) == version_key and entry[0] < version]:
+                del self._entries[key]
+
+    def flush(self):
+        with self._lock:
+            self._entries.clear()
+            self._floors.clear()
+            self._epoch += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "refused": self.refused,
+            }
+
+
+class CacheBus:
+    def __init__(self, app=None):
+        self._caches = {}
+        self._channels = {CHANNEL: self._apply}
+        self._on_connect = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._listening_pid = None
+        self._app = None
+        self._dsn = None
+        self.enabled = True
+        self.reconnects = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from sqlalchemy.engine import make_url
+
+        self._app = app
+        self.enabled = app.config.get("CACHE_BUS_ENABLED", True)
+        url = make_url(app.config.get("CACHE_BUS_DATABASE_URL") or app.config["SQLALCHEMY_DATABASE_URI"])
+        # libpq wants postgresql://, not SQLAlchemy's postgresql+driver://
+        self._dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        for cache in self._caches.values():
+            if getattr(cache, "ttl_config", None):
+                cache.ttl = app.config.get(cache.ttl_config)
+        app.extensions["cache_bus"] = self
+        app.before_request(self.ensure_started)
+
+    def register(self, cache):
+        self._caches[cache.name] = cache
+        return cache
+
+    def subscribe(self, channel, handler):
+        """Also LISTEN on channel; handler(payload) runs on the listener thread"""
+        self._channels[channel] = handler
+
+    def on_connect(self, hook):
+        """hook(conn) runs on the listener thread after every (re)connect, once the caches are flushed"""
+        self._on_connect.append(hook)
+
+    @property
+    def healthy(self):
+        """Caches may be used only while this process's listener is connected"""
+        return self.enabled and self._listening_pid == os.getpid()
+
+    def publish(self, cache, key):
+        """Invalidate cache/key in every worker once the current db.session transaction commits"""
+        return db.session.execute(
+            db.text("SELECT publish_cache_invalidation(:cache, :key);"),
+            {"cache": cache, "key": str(key)}
+        ).scalar()
+
+    def cached(self, cache, key, load):
+        """cache[key], or load() -> (version, value) on a miss (None values aren't stored)"""
+        if not self.healthy:
+            return load()[1]
+        value = cache.get(key)
+        if value is not MISS:
+            return value
+        token = cache.begin()
+        version, value = load()
+        if value is not None:
+            cache.put(key, version, value, token)
+        return value
+
+    def stats(self):
+        return {
+            "listening": self.healthy,
+            "reconnects": self.reconnects,
+            "caches": {name: cache.stats() for name, cache in self._caches.items()},
+        }
+
+    # ============================================
+    # LISTENER THREAD
+    # ============================================
+
+    def ensure_started(self):
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # a forked worker inherits the parent's caches but not its listener
+            self._listening_pid = None
+            self._flush_all()
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="cache-bus", daemon=True).start()
+
+    def _flush_all(self):
+        for cache in self._caches.values():
+            cache.flush()
+
+    def _apply(self, payload):
+        message = json.loads(payload)
+        cache = self._caches.get(message.get("cache"))
+        if cache is not None:
+            cache.invalidate(message["key"], int(message["version"]))
+
+    def _run(self):
+        import psycopg2
+
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(self._dsn)
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    for channel in self._channels:
+                        cursor.execute(f"LISTEN {channel};")
+                # anything published while we weren't listening is lost: start from empty
+                self._flush_all()
+                for hook in self._on_connect:
+                    try:
+                        hook(conn)
+                    except Exception:
+                        if self._app is not None:
+                            self._app.logger.exception("Cache bus connect hook failed")
+                self._listening_pid = os.getpid()
+
+                while True:
+                    if select.select([conn], [], [], KEEPALIVE_SECONDS) == ([], [], []):
+                        # quiet: make sure the connection is still alive
+                        with conn.cursor() as cursor:
+                            cursor.execute("SELECT 1;")
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self._channels[notify.channel](notify.payload)
+            except Exception:
+                if self._listening_pid == os.getpid():
+                    self.reconnects += 1
+                self._listening_pid = None
+                self._flush_all()
+                if self._app is not None:
+                    self._app.logger.exception("Cache bus listener failed; caches bypassed until it reconnects")
+                time.sleep(RETRY_SECONDS)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+cache_bus = CacheBus()
+
+principal_cache = cache_bus.register(LocalCache("principal", max_entries=10000))
+menu_cache = cache_bus.register(LocalCache("menu", ttl_config="MENU_CACHE_SECONDS"))
+
+
+# version and row from the same snapshot (shared with the async reads in backend/asgi.py)
+PRINCIPAL_SQL = """
+    SELECT
+        COALESCE(cv.version, 0) AS cache_version,
+        u.id,
+        u.role
+    FROM (SELECT CAST(:user_id AS INTEGER) AS user_id) req
+    LEFT JOIN users u ON u.id = req.user_id
+    LEFT JOIN cache_versions cv
+        ON cv.cache_name = 'principal' AND cv.cache_key = CAST(req.user_id AS TEXT);
+"""
+
+CACHE_VERSION_SQL = """
+    SELECT COALESCE((
+        SELECT version FROM cache_versions WHERE cache_name = :cache AND cache_key = :key
+    ), 0);
+"""
+
+
+def principal_from_row(row):
+    """PRINCIPAL_SQL row -> (version, Principal or None)"""
+    return row.cache_version, (Principal(row.id, row.role) if row.id is not None else None)
+
+
+def load_principal(user_id):
+    return principal_from_row(db.session.execute(db.text(PRINCIPAL_SQL), {"user_id": user_id}).first())
+
+
+def cache_version(cache, key):
+    """Current version of cache/key (0 before its first invalidation); read BEFORE the data"""
+    return db.session.execute(db.text(CACHE_VERSION_SQL), {"cache": cache, "key": str(key)}).scalar()
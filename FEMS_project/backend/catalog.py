@@ -0,0 +1,143 @@
+# backend/catalog.py
+"""
+Campus catalog bundle: every vendor with its active menu's available items, as one
+gzip-compressed JSON document (GET /api/customer/catalog)
+
+Replaces the home screen's 1 + N requests (directory, then each vendor's menu).
+
+- versioned by the menu versions in cache_versions, which every menu, item and vendor
+  profile write already bumps through cache_bus.publish("menu", ...) (sold-out items
+  too), plus the vendor count. One indexed query per request reads that fingerprint.
+  It is the ETag, the same in every worker
+- each worker keeps the last bundle it built and rebuilds only when the fingerprint
+  moves; concurrent rebuilds of the same fingerprint share one build (coalescer)
+- items carry no stock counts: those change with every order without a version bump,
+  so the bundle only lists which items are available
+- If-None-Match with the current ETag gets a 304, so an unchanged catalog costs one
+  small response
+"""
+
+import gzip
+import json
+import threading
+from datetime import datetime, timezone
+
+from .extensions import db
+from .coalesce import coalescer
+
+GZIP_LEVEL = 6
+
+FINGERPRINT_SQL = """
+    SELECT md5(COALESCE(string_agg(cache_key || ':' || version, ',' ORDER BY cache_key), ''))
+        || '-' || (SELECT COUNT(*) FROM vendors)
+    FROM cache_versions
+    WHERE cache_name = 'menu';
+"""
+
+# every vendor, its active menu and that menu's available items (one row per item)
+CATALOG_SQL = """
+    SELECT
+        v.id AS vendor_id,
+        v.vendor_name,
+        v.location,
+        v.pickup_available,
+        v.delivery_available,
+        m.id AS menu_id,
+        m.title AS menu_title,
+        mi.id AS item_id,
+        mi.name AS item_name,
+        mi.description,
+        mi.price,
+        mi.preparation_time_minutes,
+        mi.image_url
+    FROM vendors v
+    LEFT JOIN menus m ON m.vendor_id = v.id AND m.is_active = TRUE
+    LEFT JOIN menu_items mi ON mi.menu_id = m.id AND mi.available = TRUE
+    ORDER BY v.vendor_name, v.id, m.id, mi.name;
+"""
+
+
+class Bundle:
+    __slots__ = ("etag", "body", "gzipped")
+
+    def __init__(self, etag, body):
+        self.etag = etag
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def shape_catalog(rows):
+    """CATALOG_SQL rows -> vendor list, each with "menu" (None without an active menu)"""
+    vendors = []
+    by_id = {}
+    for row in rows:
+        vendor = by_id.get(row.vendor_id)
+        if vendor is None:
+            vendor = by_id[row.vendor_id] = {
+                "id": row.vendor_id,
+                "vendor_name": row.vendor_name,
+                "location": row.location,
+                "pickup_available": row.pickup_available,
+                "delivery_available": row.delivery_available,
+                "menu": None,
+            }
+            vendors.append(vendor)
+        # like the menu endpoint: the first active menu, with the items of all of them
+        if row.menu_id and vendor["menu"] is None:
+            vendor["menu"] = {"id": row.menu_id, "title": row.menu_title, "items": []}
+        if row.item_id:
+            vendor["menu"]["items"].append({
+                "id": row.item_id,
+                "name": row.item_name,
+                "description": row.description,
+                "price": float(row.price) if row.price else 0.0,
+                "preparation_time_minutes": row.preparation_time_minutes,
+                "image_url": row.image_url,
+            })
+    return vendors
+
+
+class CampusCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bundle = None
+        self.builds = 0
+
+    def fingerprint(self):
+        return db.session.execute(db.text(FINGERPRINT_SQL)).scalar()
+
+    def current(self):
+        """Bundle for the catalog as of now (rebuilt only when the fingerprint changed)"""
+        etag = self.fingerprint()
+        bundle = self._bundle
+        if bundle is not None and bundle.etag == etag:
+            return bundle
+        return coalescer.do("catalog", etag, lambda: self._build(etag))
+
+    def _build(self, etag):
+        # the fingerprint was read before the data: a change in between only means
+        # the next request rebuilds again
+        vendors = shape_catalog(db.session.execute(db.text(CATALOG_SQL)))
+        body = json.dumps({
+            "vendors": vendors,
+            "total": len(vendors),
+            "version": etag,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        }, separators=(",", ":")).encode()
+        bundle = Bundle(etag, body)
+        with self._lock:
+            self._bundle = bundle
+            self.builds += 1
+        return bundle
+
+    def stats(self):
+        bundle = self._bundle
+        return {
+            "version": bundle.etag if bundle else None,
+            "bytes": len(bundle.body) if bundle else 0,
+            "gzip_bytes": len(bundle.gzipped) if bundle else 0,
+            "builds": self.builds,
+        }
+
+
+campus_catalog = CampusCatalog()
@@ -0,0 +1,115 @@
+# backend/coalesce.py
+"""
+Single-flight coalescing of identical concurrent reads
+
+At 12:00 hundreds of customers open the vendor directory and the same popular
+menu within a few milliseconds. Those payloads don't depend on who asks, so the
+first request for a key (route + params) runs the queries and every identical
+request that arrives while it is in flight waits for that result instead of
+running its own.
+
+- only for authorization-independent payloads: each request still passes its own
+  token check first, only the shared computation is coalesced
+- a follower waits at most the route's timeout (COALESCE_TIMEOUT_SECONDS by default),
+  then computes on its own, so a stuck leader never stalls everyone behind it
+- a leader's exception is raised in its followers too (they would have hit it)
+- per process and per in-flight call only: nothing is kept once the leader returns
+
+Metrics per route (stats(), shown by GET /api/customer/health): calls, leaders
+(computations run), shared (requests served from another's computation), timeouts,
+and queries_saved (shared x queries per computation).
+"""
+
+import threading
+
+DEFAULT_TIMEOUT_SECONDS = 5.0
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Coalescer:
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._calls = {}        # (route, params) -> _Call in flight
+        self._stats = {}        # route -> counters
+        self.enabled = True
+        self.timeout = DEFAULT_TIMEOUT_SECONDS
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("COALESCE_ENABLED", True)
+        self.timeout = app.config.get("COALESCE_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS)
+        app.extensions["coalescer"] = self
+
+    def do(self, route, params, fn, queries=1, timeout=None):
+        """
+        fn() once for all concurrent calls with the same route and params; returns its
+        result (shared between callers: treat it as read-only)
+        """
+        if not self.enabled:
+            return fn()
+
+        key = (route, params)
+        with self._lock:
+            counters = self._counters(route, queries)
+            counters["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                counters["leaders"] += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    counters["errors"] += 1
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(self.timeout if timeout is None else timeout):
+            with self._lock:
+                counters["timeouts"] += 1
+            return fn()
+
+        with self._lock:
+            counters["shared"] += 1
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _counters(self, route, queries):
+        counters = self._stats.get(route)
+        if counters is None:
+            counters = self._stats[route] = {
+                "calls": 0, "leaders": 0, "shared": 0, "timeouts": 0, "errors": 0, "queries": queries,
+            }
+        return counters
+
+    def stats(self):
+        with self._lock:
+            return {
+                route: {
+                    **{name: value for name, value in counters.items() if name != "queries"},
+                    "in_flight": sum(1 for key in self._calls if key[0] == route),
+                    "queries_saved": counters["shared"] * counters["queries"],
+                }
+                for route, counters in self._stats.items()
+            }
+
+
+coalescer = Coalescer()
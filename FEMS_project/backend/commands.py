@@ -0,0 +1,190 @@
+# backend/commands.py
+"""
+Maintenance commands for FEMS (run with the flask CLI)
+
+Usage:
+    flask --app backend.app rebuild-customer-stats [--customer-id N]
+    flask --app backend.app check-customer-stats
+    flask --app backend.app rebuild-menu-item-stats [--vendor-id N]
+    flask --app backend.app ensure-order-partitions [--months-ahead N]
+    flask --app backend.app archive-orders [--keep-months N]
+    flask --app backend.app rebuild-slot-usage [--vendor-id N]
+    flask --app backend.app rebuild-vendor-load [--vendor-id N]
+    flask --app backend.app rebuild-kitchen-queue [--vendor-id N]
+    flask --app backend.app sweep [--job NAME] [--dry-run] [--every SECONDS]
+    flask --app backend.app db-migrate [--target N]
+    flask --app backend.app db-status
+    flask --app backend.app db-check-indexes
+"""
+
+import click
+from .extensions import db
+from .sweeper import JOBS, DEFAULT_BATCH_SIZE, DEFAULT_MAX_BATCHES, DEFAULT_GRACE_MINUTES
+
+
+def register_commands(app):
+    """Attach maintenance commands to the app's CLI"""
+
+    @app.cli.command("rebuild-customer-stats")
+    @click.option("--customer-id", type=int, default=None, help="Only rebuild this customer")
+    def rebuild_customer_stats(customer_id):
+        """Backfill customer_stats from the raw orders table"""
+        rows = db.session.execute(
+            db.text("SELECT rebuild_customer_stats(:customer_id) AS rows;"),
+            {"customer_id": customer_id}
+        ).scalar()
+        db.session.commit()
+        click.echo(f"Rebuilt customer_stats for {rows} customer(s)")
+
+    @app.cli.command("check-customer-stats")
+    def check_customer_stats():
+        """Compare customer_stats against the raw orders table"""
+        mismatches = db.session.execute(
+            db.text("SELECT * FROM check_customer_stats();")
+        ).all()
+
+        if not mismatches:
+            click.echo("customer_stats is consistent with orders")
+            return
+
+        for row in mismatches:
+            click.echo(f"customer {row.customer_id}: expected={row.expected} actual={row.actual}")
+        raise SystemExit(f"{len(mismatches)} customer(s) out of sync; run rebuild-customer-stats")
+
+    @app.cli.command("rebuild-menu-item-stats")
+    @click.option("--vendor-id", type=int, default=None, help="Only rebuild this vendor's items")
+    def rebuild_menu_item_stats(vendor_id):
+        """Backfill menu_item_stats from order history"""
+        rows = db.session.execute(
+            db.text("SELECT rebuild_menu_item_stats(:vendor_id) AS rows;"),
+            {"vendor_id": vendor_id}
+        ).scalar()
+        db.session.commit()
+        click.echo(f"Rebuilt menu_item_stats for {rows} menu item(s)")
+
+    @app.cli.command("ensure-order-partitions")
+    @click.option("--months-ahead", type=int, default=3, show_default=True)
+    def ensure_order_partitions(months_ahead):
+        """Create monthly orders/order_items partitions ahead of time (run daily)"""
+        months = db.session.execute(
+            db.text("SELECT ensure_order_partitions(:months_ahead);"),
+            {"months_ahead": months_ahead}
+        ).scalar()
+        db.session.commit()
+        click.echo(f"Partitions present for {months} month(s)")
+
+    @app.cli.command("archive-orders")
+    @click.option("--keep-months", type=int, default=6, show_default=True,
+                  help="Months of history to keep in the hot tables")
+    def archive_orders(keep_months):
+        """Move closed months of orders and order_items to the archive schema"""
+        archived = db.session.execute(
+            db.text("SELECT * FROM archive_order_partitions(:keep_months);"),
+            {"keep_months": keep_months}
+        ).all()
+        db.session.commit()
+
+        for row in archived:
+            click.echo(f"Archived {row.archived_partition} ({row.orders_archived} orders)")
+        click.echo(f"{len(archived)} partition(s) archived")
+
+    @app.cli.command("rebuild-slot-usage")
+    @click.option("--vendor-id", type=int, default=None, help="Only rebuild this vendor")
+    def rebuild_slot_usage(vendor_id):
+        """Re-bucket upcoming orders and rebuild vendor_slot_usage from them"""
+        rows = db.session.execute(
+            db.text("SELECT rebuild_vendor_slot_usage(:vendor_id);"),
+            {"vendor_id": vendor_id}
+        ).scalar()
+        db.session.commit()
+        click.echo(f"Rebuilt {rows} slot usage row(s)")
+
+    @app.cli.command("rebuild-vendor-load")
+    @click.option("--vendor-id", type=int, default=None, help="Only rebuild this vendor")
+    def rebuild_vendor_load(vendor_id):
+        """Rebuild the vendor_load queue counters from open orders"""
+        rows = db.session.execute(
+            db.text("SELECT rebuild_vendor_load(:vendor_id);"),
+            {"vendor_id": vendor_id}
+        ).scalar()
+        db.session.commit()
+        click.echo(f"Rebuilt vendor_load for {rows} vendor(s)")
+
+    @app.cli.command("rebuild-kitchen-queue")
+    @click.option("--vendor-id", type=int, default=None, help="Only rebuild this vendor")
+    def rebuild_kitchen_queue(vendor_id):
+        """Rebuild the kitchen queue lines and totals from accepted / preparing orders"""
+        rows = db.session.execute(
+            db.text("SELECT rebuild_kitchen_queue(:vendor_id);"),
+            {"vendor_id": vendor_id}
+        ).scalar()
+        db.session.commit()
+        click.echo(f"Rebuilt {rows} kitchen queue total(s)")
+
+    @app.cli.command("sweep")
+    @click.option("--job", "jobs", multiple=True, type=click.Choice(list(JOBS)),
+                  help="Only run this job (repeatable; default all)")
+    @click.option("--dry-run", is_flag=True, help="Count what would be swept without changing anything")
+    @click.option("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, show_default=True)
+    @click.option("--max-batches", type=int, default=DEFAULT_MAX_BATCHES, show_default=True, help="Per job, per run")
+    @click.option("--grace-minutes", type=int, default=DEFAULT_GRACE_MINUTES, show_default=True,
+                  help="How long past scheduled_for a pending order may stay pending")
+    @click.option("--every", type=int, default=None, help="Keep running, sweeping every N seconds")
+    def sweep(jobs, dry_run, batch_size, max_batches, grace_minutes, every):
+        """Reject stale pending orders and prune expired verification codes in small batches"""
+        import time
+        from .sweeper import run_sweep
+
+        while True:
+            for metrics in run_sweep(jobs, batch_size, max_batches, grace_minutes, dry_run):
+                verb = "would sweep" if dry_run else "swept"
+                click.echo(
+                    f"{metrics['job']}: {verb} {metrics['rows']} row(s) in {metrics['batches']} batch(es), "
+                    f"{metrics['duration_ms']} ms {metrics['details'] or ''}".rstrip()
+                )
+            if every is None:
+                return
+            time.sleep(every)
+
+    @app.cli.command("db-migrate")
+    @click.option("--target", type=int, default=None, help="Stop after this version")
+    def db_migrate(target):
+        """Apply pending schema migrations, each recorded once its EXPLAIN checks pass"""
+        from . import migrations
+
+        try:
+            applied = migrations.migrate(db.engine, target=target, log=click.echo)
+        except migrations.MigrationCheckFailed as e:
+            raise SystemExit(str(e))
+        if not applied:
+            click.echo("Schema is up to date")
+
+    @app.cli.command("db-status")
+    def db_status():
+        """List applied and pending schema migrations"""
+        from . import migrations
+        from .migrations.versions import MIGRATIONS
+
+        with db.engine.connect() as conn:
+            migrations.ensure_migrations_table(conn)
+            conn.commit()
+            done = migrations.applied_versions(conn)
+
+        for migration in MIGRATIONS:
+            state = "applied" if migration.version in done else "pending"
+            click.echo(f"{migration.version:04d} [{state}] {migration.description}")
+
+    @app.cli.command("db-check-indexes")
+    def db_check_indexes():
+        """EXPLAIN each applied migration's target query and confirm it uses the index"""
+        from . import migrations
+        from .migrations.versions import MIGRATIONS
+
+        with db.engine.connect() as conn:
+            migrations.ensure_migrations_table(conn)
+            conn.commit()
+            done = migrations.applied_versions(conn)
+
+        applied = [m for m in MIGRATIONS if m.version in done]
+        if migrations.run_checks(db.engine, applied, log=click.echo):
+            raise SystemExit("Some indexes are not used by the queries they were added for")
@@ -1,24 +1,74 @@
 from dotenv import load_dotenv
 import os
 
-load_dotenv()
 
-class Config:
-    """Flask configuration"""
-    # PostgreSQL is REQUIRED 
-    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
-    if not SQLALCHEMY_DATABASE_URI:
+def load_config():
+    """
+    Flask configuration, read from the environment (and .env) when an app is created,
+    not when this module is imported
+    """
+    load_dotenv()
+
+    # PostgreSQL is REQUIRED
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
         raise ValueError("DATABASE_URL environment variable is required. Please set it in your .env file.")
 
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
-    
-    # JWT Configuration
-    JWT_ALGORITHM = "HS256"
-    JWT_EXPIRES_DAYS = int(os.getenv("JWT_EXPIRES_DAYS", 7))
-    
-    # Email Verification
-    VERIFICATION_CODE_EXPIRES_MINUTES = int(os.getenv("VERIFICATION_CODE_EXPIRES_MINUTES", 10))
-    
-    # CORS
-    CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
\ No newline at end of file
+    return {
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        "SECRET_KEY": os.getenv("SECRET_KEY", "dev-secret-key-change-in-production"),
+
+        # JWT Configuration
+        "JWT_ALGORITHM": "HS256",
+        "JWT_EXPIRES_DAYS": int(os.getenv("JWT_EXPIRES_DAYS", 7)),
+
+        # Email Verification
+        "VERIFICATION_CODE_EXPIRES_MINUTES": int(os.getenv("VERIFICATION_CODE_EXPIRES_MINUTES", 10)),
+
+        # ETA engine: rebuild the in-memory kitchen queues from the database this often
+        "ETA_REBUILD_SECONDS": int(os.getenv("ETA_REBUILD_SECONDS", 300)),
+
+        # Scheduled release: hold future orders until scheduled_for minus their kitchen minutes
+        "RELEASE_SCHEDULER_ENABLED": os.getenv("RELEASE_SCHEDULER_ENABLED", "true").lower() == "true",
+        "RELEASE_RESYNC_SECONDS": int(os.getenv("RELEASE_RESYNC_SECONDS", 300)),
+
+        # Single-flight: identical concurrent directory / menu reads share one query;
+        # a follower waits at most this long before querying on its own
+        "COALESCE_ENABLED": os.getenv("COALESCE_ENABLED", "true").lower() == "true",
+        "COALESCE_TIMEOUT_SECONDS": float(os.getenv("COALESCE_TIMEOUT_SECONDS", 5)),
+
+        # In-process caches, invalidated across workers over LISTEN/NOTIFY (backend/cache.py);
+        # LISTEN needs a direct (session) connection, not a transaction pooler
+        "CACHE_BUS_ENABLED": os.getenv("CACHE_BUS_ENABLED", "true").lower() == "true",
+        "CACHE_BUS_DATABASE_URL": os.getenv("CACHE_BUS_DATABASE_URL"),
+        "MENU_CACHE_SECONDS": int(os.getenv("MENU_CACHE_SECONDS", 30)),
+        "DIRECTORY_CACHE_SECONDS": int(os.getenv("DIRECTORY_CACHE_SECONDS", 5)),
+
+        # Query result cache (backend/query_cache.py): invalidated per table, bounded by
+        # entries and approximate size
+        "QUERY_CACHE_ENABLED": os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true",
+        "QUERY_CACHE_MAX_ENTRIES": int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 5000)),
+        "QUERY_CACHE_MAX_MB": float(os.getenv("QUERY_CACHE_MAX_MB", 64)),
+
+        # Catalog snapshot (backend/snapshot.py): directory + menus on disk every
+        # SNAPSHOT_SECONDS, for warm starts and degraded reads while the database is down
+        "SNAPSHOT_ENABLED": os.getenv("SNAPSHOT_ENABLED", "true").lower() == "true",
+        "SNAPSHOT_PATH": os.getenv("SNAPSHOT_PATH"),
+        "SNAPSHOT_SECONDS": int(os.getenv("SNAPSHOT_SECONDS", 15)),
+
+        # Async customer reads (backend/asgi.py): asyncpg pool per process; set the
+        # statement cache to 0 behind pgbouncer / a transaction pooler
+        "ASYNC_DB_POOL_SIZE": int(os.getenv("ASYNC_DB_POOL_SIZE", 20)),
+        "ASYNC_DB_MAX_OVERFLOW": int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 10)),
+        "ASYNC_DB_STATEMENT_CACHE_SIZE": int(os.getenv("ASYNC_DB_STATEMENT_CACHE_SIZE", 100)),
+
+        # Startup: how the entry points treat the schema (check | create_all | skip; unset =
+        # check for the production servers, create_all for the dev server) and the target
+        # for the first request a fresh worker serves
+        "SCHEMA_STARTUP": os.getenv("SCHEMA_STARTUP"),
+        "STARTUP_BUDGET_MS": int(os.getenv("STARTUP_BUDGET_MS", 500)),
+
+        # CORS
+        "CORS_ORIGINS": os.getenv("CORS_ORIGINS", "http://localhost:5173").split(","),
+    }
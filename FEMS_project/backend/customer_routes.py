@@ -9,25 +9,35 @@ Features:
 5. View order history
 6. Cancel orders
 7. Get customer statistics
+8. Pickup slot availability
+9. Whole campus catalog in one cacheable document
 """
 
 #blueprint for creating group of related routes
 #request used to access incoming http requests
 #jsonify converts python objects to json format
-from flask import Blueprint, request, jsonify 
+from flask import Blueprint, request, jsonify, current_app, Response
 from sqlalchemy import text
 from .extensions import db
 from .models import Vendor, Menu, MenuItem, Order, OrderItem, User
 #token_required decorator to check if user is authenticated
 from .auth import token_required
-from datetime import datetime
+from .utils import order_tables
+from .order_status import ORDER_STATUSES
+from .eta import eta_engine, iso_eta
+from .scheduler import release_scheduler
+from .coalesce import coalescer
+from .cache import cache_bus, menu_cache, cache_version
+from .query_cache import query_cache
+from .snapshot import catalog_snapshot, db_unreachable, serves_snapshot
+from .catalog import campus_catalog
+from datetime import datetime, timedelta
 from decimal import Decimal 
 import json #to convert python objs to json format for stored preocedures
 
 #blueprint for customer routes which will be used to get all customer related routes
 bp = Blueprint("customer", __name__, url_prefix="/api/customer")
 
-
 def require_customer(f):
     """Decorator to ensure user is a customer"""
     from functools import wraps
@@ -60,40 +70,82 @@ def row_to_dict(row):
 # 1. BROWSE VENDORS
 # ============================================
 
+# ?sort= value -> ORDER BY clause (whitelisted, never interpolated from the request)
+VENDOR_SORTS = {
+    "name": "v.vendor_name",
+    "wait": "expected_wait_minutes, queue_depth, v.vendor_name",
+}
+
+
+def vendor_directory_sql(sort):
+    """Directory query for a validated sort (shared with the async reads in backend/asgi.py)"""
+    # Expected wait: queued kitchen minutes over the vendor's kitchen minutes per
+    # minute (slot capacity / slot length), one cook when it has no slot settings
+    return f"""
+        SELECT 
+            v.id,
+            v.vendor_name,
+            v.location,
+            v.pickup_available,
+            v.delivery_available,
+            v.created_at,
+            u.full_name AS owner_name,
+            u.email AS owner_email,
+            COALESCE(l.queued_orders, 0) AS queue_depth,
+            CEIL(
+                COALESCE(l.queued_minutes, 0)
+                / COALESCE(s.capacity_minutes::NUMERIC / s.slot_minutes, 1)
+            )::INTEGER AS expected_wait_minutes
+        FROM vendors v
+        INNER JOIN users u ON v.user_id = u.id
+        LEFT JOIN vendor_load l ON l.vendor_id = v.id
+        LEFT JOIN vendor_slot_settings s ON s.vendor_id = v.id
+        ORDER BY {VENDOR_SORTS[sort]};
+    """
+
+
+# what the directory reads, for the query cache; the vendor_load counters change with every
+# order and aren't watched, so cached queue columns are capped at DIRECTORY_CACHE_SECONDS
+VENDOR_DIRECTORY_TABLES = ("vendors", "users", "vendor_slot_settings")
+
+
 @bp.route("/vendors", methods=["GET"])
 @token_required #verifies customer token to inject current user parameter into func
 @require_customer #this decorator runs to validate customer then continues to function if customer
+@serves_snapshot
 def get_all_vendors(current_user):
     """
-    Gets all available vendors on campus
-    SQL: INNER JOIN between vendors and users
+    Gets all available vendors on campus with their live queue
+    (?sort=wait puts the shortest expected wait first; default is by name)
+    SQL: INNER JOIN between vendors and users, LEFT JOIN to the vendor_load counters
+    (kept current by trigger on orders) - no per-vendor aggregate over orders
     """
+    sort = request.args.get("sort", "name")
+    if sort not in VENDOR_SORTS:
+        return jsonify({"error": f"Invalid sort. Must be one of: {', '.join(VENDOR_SORTS)}"}), 400
+    
     try:
-        sql = """
-            SELECT 
-                v.id,
-                v.vendor_name,
-                v.location,
-                v.pickup_available,
-                v.delivery_available,
-                v.created_at,
-                u.full_name AS owner_name,
-                u.email AS owner_email
-            FROM vendors v
-            INNER JOIN users u ON v.user_id = u.id
-            ORDER BY v.vendor_name;
-        """
         
-        result = db.session.execute(db.text(sql)) #sql query string sent
+        # the directory is the same for every customer: this worker's query cache, and on
+        # a miss identical concurrent requests share one query
+        result = query_cache.fetch(
+            vendor_directory_sql(sort), tables=VENDOR_DIRECTORY_TABLES,
+            max_age=current_app.config.get("DIRECTORY_CACHE_SECONDS"), coalesce="vendors"
+        )
         vendors = [row_to_dict(row) for row in result] #sql row to python dict
         
         return jsonify({
             "vendors": vendors,
             "total": len(vendors),
+            "sort": sort,
             "message": "Vendors retrieved successfully"
         }), 200
         
     except Exception as e:
+        # database down: serve the last catalog snapshot, flagged degraded
+        fallback = catalog_snapshot.degraded_directory(sort) if db_unreachable(e) else None
+        if fallback:
+            return jsonify(fallback[0]), fallback[1]
         return jsonify({"error": f"Database error: {str(e)}"}), 500
 
 
@@ -101,89 +153,217 @@ def get_all_vendors(current_user):
 # 2. VIEW VENDOR MENU
 # ============================================
 
+#gets vendor info 
+VENDOR_SQL = """
+    SELECT 
+        id, 
+        vendor_name, 
+        location, 
+        pickup_available, 
+        delivery_available
+    FROM vendors 
+    WHERE id = :vendor_id;
+"""
+
+#get menu with items - continued query if vendor found
+#left join will ensure menu returned even if no items to display
+MENU_SQL = """
+    SELECT 
+        m.id AS menu_id,
+        m.title AS menu_title,
+        m.is_active,
+        mi.id AS item_id,
+        mi.name AS item_name,
+        mi.description,
+        mi.price,
+        mi.available,
+        mi.stock,
+        mi.preparation_time_minutes,
+        mi.image_url
+    FROM menus m
+    LEFT JOIN menu_items mi ON m.id = mi.menu_id
+    WHERE m.vendor_id = :vendor_id AND m.is_active = TRUE
+    ORDER BY mi.name;
+"""
+
+
+def shape_menu_item(row):
+    """Item dict as the menu endpoints return it (MENU_SQL / MENU_ITEMS_SQL columns)"""
+    return {
+        "id": row.item_id,
+        "name": row.item_name,
+        "description": row.description,
+        "price": float(row.price) if row.price else 0.0,
+        "available": row.available,
+        "stock": row.stock,
+        "preparation_time_minutes": row.preparation_time_minutes,
+        "image_url": row.image_url
+    }
+
+
+def shape_menu(menu_rows):
+    """MENU_SQL rows -> menu dict with its items (None when the vendor has no active menu)"""
+    menu_info = None
+    items = []
+    
+    for row in menu_rows:
+        if menu_info is None and row.menu_id:
+            menu_info = {
+                "id": row.menu_id,
+                "title": row.menu_title,
+                "is_active": row.is_active
+            }
+        
+        if row.item_id:
+            items.append(shape_menu_item(row))
+    
+    if menu_info:
+        menu_info["items"] = items
+    return menu_info
+
+
+def fetch_vendor_menu(vendor_id):
+    """(cache version, (vendor dict, menu)), or (cache version, None) when the vendor doesn't exist"""
+    version = cache_version("menu", vendor_id)
+    vendor_result = db.session.execute(
+        db.text(VENDOR_SQL), 
+        {"vendor_id": vendor_id}
+    ).first()
+    
+    if not vendor_result:
+        return version, None
+    
+    menu_result = db.session.execute(
+        db.text(MENU_SQL), 
+        {"vendor_id": vendor_id}
+    )
+    return version, (row_to_dict(vendor_result), shape_menu(menu_result))
+
+
 @bp.route("/vendors/<int:vendor_id>/menu", methods=["GET"])
 @token_required
 @require_customer
+@serves_snapshot
 def get_vendor_menu(current_user, vendor_id):
     """
     Gets vendor's menu with all items
     SQL: Multiple LEFT JOINs
     """
     try:
-        #gets vendor info 
-        vendor_sql = """
-            SELECT 
-                id, 
-                vendor_name, 
-                location, 
-                pickup_available, 
-                delivery_available
-            FROM vendors 
-            WHERE id = :vendor_id;
-        """
-        
-        vendor_result = db.session.execute(
-            db.text(vendor_sql), 
-            {"vendor_id": vendor_id}
-        ).first()
+        # a popular menu is requested by many customers at once: this worker's cache, and
+        # on a miss they share one fetch
+        found = cache_bus.cached(
+            menu_cache, vendor_id,
+            lambda: coalescer.do("vendor_menu", vendor_id, lambda: fetch_vendor_menu(vendor_id), queries=3)
+        )
         
-        if not vendor_result:
+        if not found:
             return jsonify({"error": "Vendor not found"}), 404
+        vendor, menu = found
         
-        #get menu with items - continued query if vendor found
-        menu_sql = """
-            SELECT 
-                m.id AS menu_id,
-                m.title AS menu_title,
-                m.is_active,
-                mi.id AS item_id,
-                mi.name AS item_name,
-                mi.description,
-                mi.price,
-                mi.available,
-                mi.preparation_time_minutes,
-                mi.image_url
-            FROM menus m
-            LEFT JOIN menu_items mi ON m.id = mi.menu_id
-            WHERE m.vendor_id = :vendor_id AND m.is_active = TRUE
-            ORDER BY mi.name;
-        """
-        #left join will ensure menu returned even if no items to display
-        
-        menu_result = db.session.execute(
-            db.text(menu_sql), 
-            {"vendor_id": vendor_id}
-        )
+        return jsonify({
+            "vendor": vendor,
+            "menu": menu
+        }), 200
         
-        #processing results
-        menu_info = None
-        items = []
+    except Exception as e:
+        fallback = catalog_snapshot.degraded_menu(vendor_id) if db_unreachable(e) else None
+        if fallback:
+            return jsonify(fallback[0]), fallback[1]
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+# head version and what changed after :since, from one snapshot (the sweeper deletes old
+# rows and raises compacted_through in one transaction)
+MENU_CHANGES_SQL = """
+    SELECT
+        h.version,
+        h.compacted_through,
+        COALESCE(
+            array_agg(DISTINCT c.menu_item_id) FILTER (WHERE c.menu_item_id IS NOT NULL), '{}'
+        ) AS item_ids,
+        COALESCE(bool_or(c.op = 'menu'), FALSE) AS menu_changed
+    FROM menu_change_heads h
+    LEFT JOIN menu_item_changes c ON c.vendor_id = h.vendor_id AND c.version > :since
+    WHERE h.vendor_id = :vendor_id
+    GROUP BY h.version, h.compacted_through;
+"""
+
+# current state of the given items on the vendor's active menus (missing ones are gone)
+MENU_ITEMS_SQL = """
+    SELECT 
+        mi.id AS item_id,
+        mi.name AS item_name,
+        mi.description,
+        mi.price,
+        mi.available,
+        mi.stock,
+        mi.preparation_time_minutes,
+        mi.image_url
+    FROM menus m
+    JOIN menu_items mi ON m.id = mi.menu_id
+    WHERE m.vendor_id = :vendor_id AND m.is_active = TRUE
+    AND mi.id = ANY(:item_ids)
+    ORDER BY mi.name;
+"""
+
+
+@bp.route("/vendors/<int:vendor_id>/menu/changes", methods=["GET"])
+@token_required
+@require_customer
+def get_menu_changes(current_user, vendor_id):
+    """
+    Menu items changed or deleted after ?since=<version>, for a client holding a cached menu
+    Returns the full menu instead ("full": true) without since, when the change log was
+    compacted past it, or when the menu itself changed (activated, retitled, replaced)
+    SQL: one aggregate over menu_change_heads and the per-vendor menu_item_changes log
+    (kept by triggers on menu_items and menus), then the changed items by id
+    """
+    since = request.args.get("since", type=int)
+    if ("since" in request.args and since is None) or (since is not None and since < 0):
+        return jsonify({"error": "since must be a non-negative integer"}), 400
+    
+    try:
+        head = db.session.execute(
+            db.text(MENU_CHANGES_SQL),
+            {"vendor_id": vendor_id, "since": since or 0}
+        ).first()
+        version = head.version if head else 0
+        
+        # applying these changes to the client's copy must give the current menu; when
+        # that can't be guaranteed, send the whole menu (read after the version, so at
+        # worst it is newer than the version it is labelled with)
+        if (not since or head is None or since < head.compacted_through
+                or since > head.version or head.menu_changed):
+            _, found = fetch_vendor_menu(vendor_id)
+            if not found:
+                return jsonify({"error": "Vendor not found"}), 404
+            vendor, menu = found
+            return jsonify({
+                "vendor_id": vendor_id,
+                "version": version,
+                "full": True,
+                "vendor": vendor,
+                "menu": menu
+            }), 200
         
-        for row in menu_result:
-            if menu_info is None and row.menu_id:
-                menu_info = {
-                    "id": row.menu_id,
-                    "title": row.menu_title,
-                    "is_active": row.is_active
-                }
-            
-            if row.item_id:
-                items.append({
-                    "id": row.item_id,
-                    "name": row.item_name,
-                    "description": row.description,
-                    "price": float(row.price) if row.price else 0.0,
-                    "available": row.available,
-                    "preparation_time_minutes": row.preparation_time_minutes,
-                    "image_url": row.image_url
-                })
-        
-        if menu_info:
-            menu_info["items"] = items
+        item_ids = list(head.item_ids)
+        changed = []
+        if item_ids:
+            result = db.session.execute(
+                db.text(MENU_ITEMS_SQL),
+                {"vendor_id": vendor_id, "item_ids": item_ids}
+            )
+            changed = [shape_menu_item(row) for row in result]
+        present = {item["id"] for item in changed}
         
         return jsonify({
-            "vendor": row_to_dict(vendor_result),
-            "menu": menu_info
+            "vendor_id": vendor_id,
+            "version": version,
+            "since": since,
+            "full": False,
+            "changed": changed,
+            "deleted": [item_id for item_id in item_ids if item_id not in present]
         }), 200
         
     except Exception as e:
@@ -194,6 +374,16 @@ def get_vendor_menu(current_user, vendor_id):
 # 3. PLACE ORDER (Stored Procedure) 
 # ============================================
 
+# place_customer_order() raises these instead of returning an ERROR row: nothing was
+# committed, so the whole call can simply run again
+RETRY_SQLSTATES = {"40P01", "40001"}   # deadlock_detected, serialization_failure
+PLACE_ORDER_ATTEMPTS = 3
+
+
+def retryable(error):
+    return getattr(getattr(error, "orig", None), "pgcode", None) in RETRY_SQLSTATES
+
+
 @bp.route("/orders", methods=["POST"])
 @token_required
 @require_customer
@@ -224,6 +414,12 @@ def place_order(current_user):
             if not isinstance(item["quantity"], int) or item["quantity"] < 1:
                 return jsonify({"error": f"Item {idx}: quantity must be positive integer"}), 400
         
+        # the ETA engine keys its queues by vendor id, so "3" and 3 must be the same vendor
+        try:
+            vendor_id = int(data["vendor_id"])
+        except (TypeError, ValueError):
+            return jsonify({"error": "vendor_id must be an integer"}), 400
+        
         #parse pickup time
         try:
             pickup_time = datetime.fromisoformat(data["pickup_time"].replace("Z", ""))
@@ -249,51 +445,102 @@ def place_order(current_user):
             );
         """
         
-        result = db.session.execute(
-            db.text(sql),
-            {
-                "customer_id": current_user.id,
-                "vendor_id": data["vendor_id"],
-                "scheduled_for": pickup_time,
-                "pickup_or_delivery": data.get("pickup_or_delivery", "pickup"),
-                "notes": data.get("order_notes", ""),
-                "items": items_json
-            }
-        ).first()
-        
-        db.session.commit()
+        params = {
+            "customer_id": current_user.id,
+            "vendor_id": vendor_id,
+            "scheduled_for": pickup_time,
+            "pickup_or_delivery": data.get("pickup_or_delivery", "pickup"),
+            "notes": data.get("order_notes", ""),
+            "items": items_json
+        }
         
-        # Check if procedure returned result
-        if not result:
-            return jsonify({"error": "Stored procedure failed to return result"}), 500
-        
-        # Check if there was an error
-        if result.status_message.startswith("ERROR"):
-            return jsonify({"error": result.status_message}), 400
-        
-        # Get complete order details 
+        # Store the estimate and get complete order details in one statement
         order_sql = """
-            SELECT 
+            UPDATE orders o
+            SET estimated_ready_at = :eta
+            FROM vendors v
+            WHERE o.id = :order_id AND v.id = o.vendor_id
+            RETURNING 
                 o.id, 
                 o.total_amount, 
                 o.status, 
                 o.placed_at,
                 o.scheduled_for,
+                o.estimated_ready_at,
+                o.release_at,
+                o.released_at,
                 v.vendor_name,
-                v.location
-            FROM orders o
-            JOIN vendors v ON o.vendor_id = v.id
-            WHERE o.id = :order_id;
+                v.location;
         """
         
-        order = db.session.execute(
-            db.text(order_sql), 
-            {"order_id": result.order_id}
-        ).first()
+        for attempt in range(1, PLACE_ORDER_ATTEMPTS + 1):
+            estimated_order_id = None
+            try:
+                result = db.session.execute(db.text(sql), params).first()
+                order = None
+                if result and result.status_message.startswith("SUCCESS"):
+                    estimated_order_id = result.order_id
+                    # Queue-aware estimate from the in-memory ETA engine (no query over the queue),
+                    # written in the order's own transaction: the order commits with it or not at all
+                    eta = eta_engine.order_placed(result.order_id, vendor_id, result.prep_minutes, pickup_time)
+                    order = db.session.execute(
+                        db.text(order_sql),
+                        {"order_id": result.order_id, "eta": eta}
+                    ).first()
+                db.session.commit()
+                break
+            except Exception as e:
+                db.session.rollback()
+                if estimated_order_id is not None:
+                    # the order was rolled back: take it out of the ETA engine again
+                    eta_engine.status_changed(estimated_order_id, "cancelled")
+                if not retryable(e):
+                    raise
+                if attempt == PLACE_ORDER_ATTEMPTS:
+                    response = jsonify({"error": "Too many orders for these items at once, please try again"})
+                    response.headers["Retry-After"] = "1"
+                    return response, 503
+        
+        # Check if procedure returned result
+        if not result:
+            return jsonify({"error": "Stored procedure failed to return result"}), 500
+        
+        # Out of stock: nothing was ordered, tell the client which items to drop
+        if result.status_message.startswith("SOLD_OUT"):
+            return jsonify({
+                "error": result.status_message,
+                "code": "SOLD_OUT",
+                "sold_out_item_ids": result.sold_out_item_ids
+            }), 409
+        
+        # Pickup slot full: nothing was ordered, offer the nearest slots that can take it
+        if result.status_message.startswith("SLOT_FULL"):
+            suggestions = db.session.execute(
+                db.text("SELECT * FROM suggest_pickup_slots(:vendor_id, :scheduled_for, :prep_minutes, :limit);"),
+                {
+                    "vendor_id": vendor_id,
+                    "scheduled_for": pickup_time,
+                    "prep_minutes": result.prep_minutes,
+                    "limit": SLOT_SUGGESTIONS
+                }
+            )
+            return jsonify({
+                "error": result.status_message,
+                "code": "SLOT_FULL",
+                "suggested_slots": [row_to_dict(row) for row in suggestions]
+            }), 409
+        
+        # Check if there was an error
+        if result.status_message.startswith("ERROR"):
+            return jsonify({"error": result.status_message}), 400
         
         if not order:
             return jsonify({"error": "Order created but could not retrieve details"}), 500
         
+        # Future order: the kitchen sees it at scheduled_for minus its prep time
+        if order.released_at is None:
+            release_scheduler.schedule(order.id, order.release_at)
+        
         order_dict = row_to_dict(order)
         
         return jsonify({
@@ -304,7 +551,8 @@ def place_order(current_user):
                 "total_amount": order_dict["total_amount"],
                 "status": order_dict["status"],
                 "placed_at": order_dict["placed_at"],
-                "scheduled_for": order_dict["scheduled_for"]
+                "scheduled_for": order_dict["scheduled_for"],
+                "estimated_ready_at": order_dict["estimated_ready_at"]
             }
         }), 201
         
@@ -316,6 +564,47 @@ def place_order(current_user):
 # ============================================
 # 4. VIEW ORDER DETAILS
 # ============================================
+
+def order_details_sql(orders_table, items_table):
+    return f"""
+        SELECT 
+            o.id,
+            o.status,
+            o.payment_status,
+            o.total_amount,
+            o.placed_at,
+            o.scheduled_for,
+            o.estimated_ready_at,
+            o.pickup_or_delivery,
+            o.notes,
+            o.version,
+            v.id AS vendor_id,
+            v.vendor_name,
+            v.location,
+            (SELECT COUNT(*) FROM {items_table} WHERE order_id = o.id AND placed_at = o.placed_at) AS items_count,
+            (SELECT SUM(quantity) FROM {items_table} WHERE order_id = o.id AND placed_at = o.placed_at) AS total_quantity
+        FROM {orders_table} o
+        JOIN vendors v ON o.vendor_id = v.id
+        WHERE o.id = :order_id AND o.customer_id = :customer_id;
+    """
+
+
+def order_detail_items_sql(items_table):
+    # placed_at prunes to the order's partition
+    return f"""
+        SELECT 
+            id,
+            name_snapshot AS name,
+            price_snapshot AS price,
+            quantity,
+            notes,
+            (price_snapshot * quantity) AS item_total
+        FROM {items_table} 
+        WHERE order_id = :order_id AND placed_at = :placed_at
+        ORDER BY id;
+    """
+
+
 @bp.route("/orders/<int:order_id>", methods=["GET"])
 @token_required
 @require_customer
@@ -325,59 +614,31 @@ def get_order_details(current_user, order_id):
     SQL: Complex query with subqueries
     """
     try:
-    
-        sql = """
-            SELECT 
-                o.id,
-                o.status,
-                o.payment_status,
-                o.total_amount,
-                o.placed_at,
-                o.scheduled_for,
-                o.estimated_ready_at,
-                o.pickup_or_delivery,
-                o.notes,
-                v.id AS vendor_id,
-                v.vendor_name,
-                v.location,
-                (SELECT COUNT(*) FROM order_items WHERE order_id = o.id) AS items_count,
-                (SELECT SUM(quantity) FROM order_items WHERE order_id = o.id) AS total_quantity
-            FROM orders o
-            JOIN vendors v ON o.vendor_id = v.id
-            WHERE o.id = :order_id AND o.customer_id = :customer_id;
-        """
+        include_archived = request.args.get("include_archived", "false").lower() == "true"
+        orders_table, items_table = order_tables(include_archived)
         
+        # not cached: an order changes with every status move, so a per-table cache of
+        # orders would be invalidated by every order on campus
         result = db.session.execute(
-            db.text(sql),
+            db.text(order_details_sql(orders_table, items_table)),
             {"order_id": order_id, "customer_id": current_user.id}
         ).first()
         
         if not result:
             return jsonify({"error": "Order not found"}), 404
         
-        # Get order items 
-        items_sql = """
-            SELECT 
-                id,
-                name_snapshot AS name,
-                price_snapshot AS price,
-                quantity,
-                notes,
-                (price_snapshot * quantity) AS item_total
-            FROM order_items 
-            WHERE order_id = :order_id
-            ORDER BY id;
-        """
-        
         items_result = db.session.execute(
-            db.text(items_sql), 
-            {"order_id": order_id}
+            db.text(order_detail_items_sql(items_table)), 
+            {"order_id": order_id, "placed_at": result.placed_at}
         )
         
         items = [row_to_dict(row) for row in items_result]
         
+        order = row_to_dict(result)
+        order["eta"] = iso_eta(order_id, order["estimated_ready_at"])
+        
         return jsonify({
-            "order": row_to_dict(result),
+            "order": order,
             "items": items
         }), 200
         
@@ -388,6 +649,70 @@ def get_order_details(current_user, order_id):
 # ============================================
 # 5. VIEW ORDER HISTORY
 # ============================================
+
+def history_filters(args):
+    """
+    Validated ?status / ?limit / ?include_archived (Flask or Starlette query args)
+    Returns (filters, None) or (None, error message)
+    """
+    status_filter = args.get("status")
+    try:
+        limit = int(args.get("limit", 50))
+    except (TypeError, ValueError):
+        limit = 50
+    include_archived = str(args.get("include_archived", "false")).lower() == "true"
+
+    # Validate limit
+    if limit < 1 or limit > 100:
+        return None, "Limit must be between 1 and 100"
+    if status_filter and status_filter not in ORDER_STATUSES:
+        return None, f"Invalid status. Must be one of: {', '.join(ORDER_STATUSES)}"
+
+    return {"status": status_filter, "limit": limit, "include_archived": include_archived}, None
+
+
+def order_history_sql(orders_table, with_status=False):
+    sql = f"""
+        SELECT
+            o.id AS order_id,
+            o.vendor_id,
+            o.status,
+            o.payment_status,
+            o.total_amount,
+            o.placed_at,
+            o.scheduled_for,
+            o.estimated_ready_at,
+            o.pickup_or_delivery,
+            o.notes,
+            v.vendor_name,
+            v.location
+        FROM {orders_table} o
+        JOIN vendors v ON o.vendor_id = v.id
+        WHERE o.customer_id = :customer_id
+    """
+    # Add status filter if provided
+    if with_status:
+        sql += " AND o.status = :status"
+    return sql + """
+        ORDER BY o.placed_at DESC
+        LIMIT :limit;
+    """
+
+
+def order_history_items_sql(items_table):
+    return f"""
+        SELECT
+            id,
+            name_snapshot AS name,
+            price_snapshot AS price,
+            quantity,
+            notes
+        FROM {items_table}
+        WHERE order_id = :order_id AND placed_at = :placed_at
+        ORDER BY id;
+    """
+
+
 @bp.route("/orders", methods=["GET"])
 @token_required
 @require_customer
@@ -397,76 +722,36 @@ def get_order_history(current_user):
     SQL: Multiple queries to fetch orders and their items
     """
     try:
-        status_filter = request.args.get("status")
-        limit = request.args.get("limit", 50, type=int)
+        filters, error = history_filters(request.args)
+        if error:
+            return jsonify({"error": error}), 400
+        orders_table, items_table = order_tables(filters["include_archived"])
 
-        # Validate limit
-        if limit < 1 or limit > 100:
-            return jsonify({"error": "Limit must be between 1 and 100"}), 400
+        params = {"customer_id": current_user.id, "limit": filters["limit"]}
+        if filters["status"]:
+            params["status"] = filters["status"]
 
-        # Get orders
-        sql = """
-            SELECT
-                o.id AS order_id,
-                o.vendor_id,
-                o.status,
-                o.payment_status,
-                o.total_amount,
-                o.placed_at,
-                o.scheduled_for,
-                o.pickup_or_delivery,
-                o.notes,
-                v.vendor_name,
-                v.location
-            FROM orders o
-            JOIN vendors v ON o.vendor_id = v.id
-            WHERE o.customer_id = :customer_id
-        """
-
-        params = {"customer_id": current_user.id}
-
-        # Add status filter if provided
-        if status_filter:
-            valid_statuses = ['pending', 'accepted', 'preparing', 'ready', 'completed', 'cancelled', 'rejected']
-            if status_filter not in valid_statuses:
-                return jsonify({"error": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"}), 400
-            sql += " AND o.status = :status"
-            params["status"] = status_filter
-
-        sql += """
-            ORDER BY o.placed_at DESC
-            LIMIT :limit;
-        """
-        params["limit"] = limit
-
-        result = db.session.execute(db.text(sql), params)
+        result = db.session.execute(
+            db.text(order_history_sql(orders_table, with_status=bool(filters["status"]))),
+            params
+        )
         orders = [row_to_dict(row) for row in result]
 
         # Fetch items for each order
         for order in orders:
-            items_sql = """
-                SELECT
-                    id,
-                    name_snapshot AS name,
-                    price_snapshot AS price,
-                    quantity,
-                    notes
-                FROM order_items
-                WHERE order_id = :order_id
-                ORDER BY id;
-            """
-
             items_result = db.session.execute(
-                db.text(items_sql),
-                {"order_id": order["order_id"]}
+                db.text(order_history_items_sql(items_table)),
+                {"order_id": order["order_id"], "placed_at": order["placed_at"]}
             )
 
             order["items"] = [row_to_dict(row) for row in items_result]
+            order["eta"] = iso_eta(order["order_id"], order["estimated_ready_at"])
 
         return jsonify({
             "orders": orders,
             "total": len(orders),
-            "showing": len(orders)
+            "showing": len(orders),
+            "include_archived": filters["include_archived"]
         }), 200
 
     except Exception as e:
@@ -481,20 +766,26 @@ def get_order_history(current_user):
 @require_customer
 def cancel_order(current_user, order_id):
     """
-    Cancel an order
-    SQL: Calls cancel_customer_order() stored procedure
+    Cancel an order (optional "version" in the body: only cancel if unchanged)
+    SQL: Calls cancel_customer_order() stored procedure (compare-and-set, 409 on conflict)
     """
     try:
+        data = request.get_json(silent=True) or {}
+        expected_version = data.get("version")
+        if expected_version is not None and (not isinstance(expected_version, int) or isinstance(expected_version, bool)):
+            return jsonify({"error": "version must be an integer"}), 400
+        
         sql = """
             SELECT cancel_customer_order(
                 :order_id, 
-                :customer_id
+                :customer_id,
+                :expected_version
             ) AS result;
         """
         
         result = db.session.execute(
             db.text(sql),
-            {"order_id": order_id, "customer_id": current_user.id}
+            {"order_id": order_id, "customer_id": current_user.id, "expected_version": expected_version}
         ).first()
         
         db.session.commit()
@@ -502,9 +793,14 @@ def cancel_order(current_user, order_id):
         if not result:
             return jsonify({"error": "Failed to cancel order"}), 500
         
+        if result.result.startswith("CONFLICT"):
+            return jsonify({"error": result.result}), 409
+        
         if result.result.startswith("ERROR"):
             return jsonify({"error": result.result}), 400
         
+        eta_engine.status_changed(order_id, 'cancelled')
+        
         return jsonify({
             "message": result.result,
             "order_id": order_id
@@ -524,19 +820,23 @@ def cancel_order(current_user, order_id):
 def get_customer_stats(current_user):
     """
     Get customer statistics
-    SQL: Uses stored functions and views
+    SQL: Primary-key lookup on customer_stats (kept current by trigger on orders)
     """
     try:
         sql = """
             SELECT 
-                get_customer_order_count(:customer_id) AS total_orders,
-                COALESCE(
-                    (SELECT total_spent FROM customer_order_summary_view 
-                     WHERE customer_id = :customer_id), 
-                    0
-                ) AS total_spent,
-                (SELECT last_order_date FROM customer_order_summary_view 
-                 WHERE customer_id = :customer_id) AS last_order;
+                total_orders,
+                total_spent,
+                last_order_at AS last_order,
+                pending_orders,
+                accepted_orders,
+                preparing_orders,
+                ready_orders,
+                completed_orders,
+                cancelled_orders,
+                rejected_orders
+            FROM customer_stats
+            WHERE customer_id = :customer_id;
         """
         
         result = db.session.execute(
@@ -544,16 +844,24 @@ def get_customer_stats(current_user):
             {"customer_id": current_user.id}
         ).first()
         
+        #no row yet means the customer has never placed an order
         if not result:
             return jsonify({
                 "stats": {
                     "total_orders": 0,
                     "total_spent": 0.0,
-                    "last_order": None
+                    "last_order": None,
+                    "orders_by_status": {status: 0 for status in ORDER_STATUSES}
                 }
             }), 200
         
-        stats = row_to_dict(result)
+        row = row_to_dict(result)
+        stats = {
+            "total_orders": row["total_orders"],
+            "total_spent": row["total_spent"],
+            "last_order": row["last_order"],
+            "orders_by_status": {status: row[f"{status}_orders"] for status in ORDER_STATUSES}
+        }
         
         return jsonify({"stats": stats}), 200
         
@@ -562,7 +870,106 @@ def get_customer_stats(current_user):
 
 
 # ============================================
-# 8. HEALTH CHECK
+# 8. PICKUP SLOT AVAILABILITY
+# ============================================
+SLOT_SUGGESTIONS = 3
+SLOT_WINDOW_MAX_HOURS = 48
+
+
+@bp.route("/vendors/<int:vendor_id>/slots", methods=["GET"])
+@token_required
+@require_customer
+def get_vendor_slots(current_user, vendor_id):
+    """
+    Get pickup slot availability for a vendor (default: the next 12 hours)
+    Query: ?from=2025-12-01T11:00:00&to=2025-12-01T15:00:00
+    SQL: Calls get_vendor_slots(), which reads the vendor_slot_usage counters
+    """
+    try:
+        try:
+            window_from = datetime.fromisoformat(request.args["from"].replace("Z", "")) if request.args.get("from") else datetime.utcnow()
+            window_to = datetime.fromisoformat(request.args["to"].replace("Z", "")) if request.args.get("to") else window_from + timedelta(hours=12)
+        except ValueError:
+            return jsonify({"error": "Invalid from/to format. Use ISO format: 2025-12-01T14:30:00"}), 400
+        
+        if window_to <= window_from:
+            return jsonify({"error": "to must be after from"}), 400
+        if window_to - window_from > timedelta(hours=SLOT_WINDOW_MAX_HOURS):
+            return jsonify({"error": f"Window can be at most {SLOT_WINDOW_MAX_HOURS} hours"}), 400
+        
+        settings = db.session.execute(
+            db.text("SELECT slot_minutes, capacity_minutes FROM vendor_slot_settings WHERE vendor_id = :vendor_id;"),
+            {"vendor_id": vendor_id}
+        ).first()
+        
+        # No capacity configured: every pickup time is accepted
+        if not settings:
+            return jsonify({
+                "vendor_id": vendor_id,
+                "limited": False,
+                "slots": []
+            }), 200
+        
+        result = db.session.execute(
+            db.text("SELECT * FROM get_vendor_slots(:vendor_id, :window_from, :window_to);"),
+            {"vendor_id": vendor_id, "window_from": window_from, "window_to": window_to}
+        )
+        
+        slots = []
+        for row in result:
+            slot = row_to_dict(row)
+            slot["full"] = slot["used_minutes"] > 0 and slot["remaining_minutes"] == 0
+            slots.append(slot)
+        
+        return jsonify({
+            "vendor_id": vendor_id,
+            "limited": True,
+            "slot_minutes": settings.slot_minutes,
+            "capacity_minutes": settings.capacity_minutes,
+            "slots": slots
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+# ============================================
+# 9. CAMPUS CATALOG
+# ============================================
+
+@bp.route("/catalog", methods=["GET"])
+@token_required
+@require_customer
+def get_catalog(current_user):
+    """
+    Every vendor with its active menu's available items, for the home screen in one request
+    Precomputed per catalog version (backend/catalog.py), gzip-compressed, with an ETag:
+    If-None-Match with the current one gets 304 Not Modified
+    SQL: one fingerprint query over cache_versions; on a version change, one LEFT JOIN
+    over vendors, menus and menu_items
+    """
+    try:
+        bundle = campus_catalog.current()
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    
+    if request.if_none_match.contains_weak(bundle.etag):
+        response = Response(status=304)
+    elif request.accept_encodings["gzip"]:
+        response = Response(bundle.gzipped, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(bundle.body, mimetype="application/json")
+    
+    # per user (authenticated), and always revalidated: the 304 is the cheap path
+    response.set_etag(bundle.etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+# ============================================
+# 10. HEALTH CHECK
 # ============================================
 @bp.route("/health", methods=["GET"])
 def health_check():
@@ -573,11 +980,16 @@ def health_check():
         return jsonify({
             "status": "healthy",
             "service": "customer_routes",
-            "database": "connected"
+            "database": "connected",
+            "coalescing": coalescer.stats(),
+            "cache": cache_bus.stats(),
+            "snapshot": catalog_snapshot.stats(),
+            "catalog": campus_catalog.stats()
         }), 200
     except Exception as e:
         return jsonify({
             "status": "unhealthy",
             "service": "customer_routes",
-            "error": str(e)
+            "error": str(e),
+            "snapshot": catalog_snapshot.stats()
         }), 500
@@ -0,0 +1,282 @@
+# backend/eta.py
+"""
+Queue-aware ETA engine for estimated_ready_at
+
+Keeps an in-memory model of each vendor's kitchen queue (accepted and preparing
+orders, in the order they were accepted) so an ETA is a couple of additions, not
+a query over orders:
+
+- every queued order remembers `mark`: the vendor's total enqueued kitchen minutes
+  right after it joined the queue
+- the vendor keeps `done`: total kitchen minutes that have left the queue
+- work still ahead of (and including) an order is `mark - done`, so
+  ETA = now + (mark - done) / rate, where rate is kitchen minutes per wall minute
+
+`rate` starts from the vendor's slot capacity (capacity_minutes / slot_minutes,
+1.0 without settings) and follows observed throughput as orders become ready.
+An order being prepared is never promised sooner than the rest of its own prep time.
+
+The model is per process. It is rebuilt from the database on first use in each
+process (so also after a fork), and again every ETA_REBUILD_SECONDS, which folds in
+changes made by other workers. Until then another worker may have moved an order on,
+so responses use the live estimate only while the stored estimated_ready_at is the one
+this process issued (iso_eta).
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from .extensions import db
+
+QUEUED_STATUSES = ('accepted', 'preparing')
+
+DEFAULT_PREP_MINUTES = 15
+DEFAULT_RATE = 1.0          # one kitchen minute per minute: a single cook
+MIN_RATE, MAX_RATE = 0.25, 16.0
+RATE_SMOOTHING = 0.2        # weight of each new throughput sample
+DEFAULT_REBUILD_SECONDS = 300
+
+
+class _VendorQueue:
+    __slots__ = ("enqueued", "done", "rate", "last_ready_at", "size")
+
+    def __init__(self, rate=DEFAULT_RATE):
+        self.enqueued = 0.0
+        self.done = 0.0
+        self.rate = rate
+        self.last_ready_at = None
+        self.size = 0
+
+
+class _OrderEntry:
+    __slots__ = ("vendor_id", "prep", "status", "mark", "scheduled_for", "started_at", "issued")
+
+    def __init__(self, vendor_id, prep, status, scheduled_for):
+        self.vendor_id = vendor_id
+        self.prep = prep
+        self.status = status
+        self.mark = None
+        self.scheduled_for = scheduled_for
+        self.started_at = None  # when it went to 'preparing'
+        self.issued = None      # the last ETA this process returned for an event on it
+
+
+class EtaEngine:
+    def __init__(self, app=None):
+        self._lock = threading.RLock()
+        self._vendors = {}
+        self._orders = {}
+        self._pid = None
+        self._built_at = 0.0
+        self.rebuild_seconds = DEFAULT_REBUILD_SECONDS
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.rebuild_seconds = app.config.get("ETA_REBUILD_SECONDS", DEFAULT_REBUILD_SECONDS)
+        app.extensions["eta_engine"] = self
+
+    # ============================================
+    # REBUILD
+    # ============================================
+
+    def rebuild(self):
+        """Reload every open order and vendor rate from the database (needs an app context)"""
+        with db.engine.connect() as conn:
+            rates = dict(conn.execute(db.text("""
+                SELECT vendor_id, capacity_minutes::FLOAT / slot_minutes
+                FROM vendor_slot_settings;
+            """)).all())
+            rows = conn.execute(db.text("""
+                SELECT id, vendor_id, status, COALESCE(prep_minutes, :default_prep), scheduled_for
+                FROM orders
+                WHERE status IN ('pending', 'accepted', 'preparing')
+                ORDER BY vendor_id, placed_at, id;
+            """), {"default_prep": DEFAULT_PREP_MINUTES}).all()
+
+        now = datetime.utcnow()
+        vendors = {}
+        orders = {}
+        for order_id, vendor_id, status, prep, scheduled_for in rows:
+            queue = vendors.get(vendor_id)
+            if queue is None:
+                queue = vendors[vendor_id] = _VendorQueue(_clamp(rates.get(vendor_id, DEFAULT_RATE)))
+            entry = orders[order_id] = _OrderEntry(vendor_id, prep, status, scheduled_for)
+            if status in QUEUED_STATUSES:
+                self._enqueue(queue, entry)
+            if status == 'preparing':
+                # the database doesn't record when; at the latest now
+                entry.started_at = now
+
+        with self._lock:
+            # keep what only this process knows about orders still in the same state
+            for order_id, entry in orders.items():
+                known = self._orders.get(order_id)
+                if known is not None and known.status == entry.status:
+                    entry.started_at = known.started_at or entry.started_at
+                    entry.issued = known.issued
+            # keep learned throughput across rebuilds
+            for vendor_id, queue in vendors.items():
+                if vendor_id in self._vendors and vendor_id not in rates:
+                    queue.rate = self._vendors[vendor_id].rate
+            self._vendors = vendors
+            self._orders = orders
+            self._pid = os.getpid()
+            self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        if self._pid != os.getpid() or time.monotonic() - self._built_at > self.rebuild_seconds:
+            try:
+                self.rebuild()
+            except Exception:
+                # keep serving the last model (or stored estimates); try again next interval
+                current_app.logger.exception("ETA engine rebuild failed")
+                self._pid = os.getpid()
+                self._built_at = time.monotonic()
+
+    # ============================================
+    # EVENTS
+    # ============================================
+
+    def order_placed(self, order_id, vendor_id, prep_minutes, scheduled_for, now=None):
+        """Track a new pending order; returns its ETA"""
+        self._ensure_built()
+        with self._lock:
+            self._orders[order_id] = _OrderEntry(
+                vendor_id, prep_minutes or DEFAULT_PREP_MINUTES, 'pending', scheduled_for
+            )
+            return self._issue(order_id, now or datetime.utcnow())
+
+    def status_changed(self, order_id, new_status, vendor_id=None, prep_minutes=None, scheduled_for=None, now=None):
+        """
+        Move an order through the queue; returns its new ETA (None once it's closed)
+        vendor_id / prep_minutes / scheduled_for are only needed for orders this
+        process hasn't seen yet (placed by another worker since the last rebuild)
+        """
+        self._ensure_built()
+        now = now or datetime.utcnow()
+        with self._lock:
+            entry = self._orders.get(order_id)
+            if entry is None:
+                if vendor_id is None:
+                    return None
+                entry = self._orders[order_id] = _OrderEntry(
+                    vendor_id, prep_minutes or DEFAULT_PREP_MINUTES, 'pending', scheduled_for
+                )
+            queue = self._queue(entry.vendor_id)
+
+            if new_status in QUEUED_STATUSES:
+                if entry.mark is None:
+                    self._enqueue(queue, entry)
+                if new_status == 'preparing' and entry.status != 'preparing':
+                    entry.started_at = now
+                entry.status = new_status
+                return self._issue(order_id, now)
+
+            # ready / completed / cancelled / rejected: the work leaves the queue
+            if entry.mark is not None:
+                queue.done += entry.prep
+                queue.size -= 1
+                if new_status == 'ready':
+                    self._observe(queue, entry.prep, now)
+            del self._orders[order_id]
+            return now if new_status == 'ready' else None
+
+    def eta(self, order_id, stored=None, now=None):
+        """
+        Current ETA of an open order, or None when this process isn't tracking it
+        Given the order's stored estimated_ready_at, also None unless that is the ETA this
+        process issued last: otherwise another worker (or the vendor) has moved it since
+        """
+        self._ensure_built()
+        with self._lock:
+            entry = self._orders.get(order_id)
+            if entry is None or (stored is not None and entry.issued != stored):
+                return None
+            return self._eta(order_id, now or datetime.utcnow())
+
+    def vendor_backlog(self, vendor_id):
+        """(queued orders, kitchen minutes still queued, rate) for one vendor"""
+        self._ensure_built()
+        with self._lock:
+            queue = self._vendors.get(vendor_id)
+            if queue is None:
+                return 0, 0.0, DEFAULT_RATE
+            return queue.size, max(queue.enqueued - queue.done, 0.0), queue.rate
+
+    # ============================================
+    # INTERNALS (call with the lock held)
+    # ============================================
+
+    def _queue(self, vendor_id):
+        queue = self._vendors.get(vendor_id)
+        if queue is None:
+            queue = self._vendors[vendor_id] = _VendorQueue()
+        return queue
+
+    @staticmethod
+    def _enqueue(queue, entry):
+        if queue.size == 0:
+            # an idle kitchen doesn't count toward the next throughput sample
+            queue.last_ready_at = None
+        queue.enqueued += entry.prep
+        queue.size += 1
+        entry.mark = queue.enqueued
+
+    @staticmethod
+    def _observe(queue, prep, now):
+        if queue.last_ready_at is not None:
+            elapsed = max((now - queue.last_ready_at).total_seconds() / 60, 0.5)
+            sample = _clamp(prep / elapsed)
+            queue.rate = _clamp((1 - RATE_SMOOTHING) * queue.rate + RATE_SMOOTHING * sample)
+        queue.last_ready_at = now
+
+    def _issue(self, order_id, now):
+        eta = self._orders[order_id].issued = self._eta(order_id, now)
+        return eta
+
+    def _eta(self, order_id, now):
+        entry = self._orders[order_id]
+        queue = self._queue(entry.vendor_id)
+        if entry.mark is None:
+            # not accepted yet: as if it joined the back of the queue now
+            ahead = max(queue.enqueued - queue.done, 0.0) + entry.prep
+        else:
+            # orders leaving out of turn can make mark - done undershoot; never less than its own prep
+            ahead = max(entry.mark - queue.done, entry.prep if entry.status == 'accepted' else 0.0)
+        minutes = ahead / queue.rate
+        if entry.status == 'preparing':
+            # already cooking: at least what's left of its own prep time
+            elapsed = (now - entry.started_at).total_seconds() / 60 if entry.started_at else 0.0
+            minutes = max(minutes, entry.prep - elapsed)
+        eta = now + timedelta(minutes=minutes)
+        # the kitchen times pre-orders for pickup; no point promising them earlier
+        if entry.scheduled_for and entry.scheduled_for > eta:
+            return entry.scheduled_for
+        return eta
+
+
+def _clamp(rate):
+    return min(max(rate, MIN_RATE), MAX_RATE)
+
+
+def iso_eta(order_id, stored=None):
+    """
+    ETA for a response: the stored estimated_ready_at, or the engine's live estimate
+    while this process tracks the order and issued the stored one
+    """
+    # routes pass it through row_to_dict, i.e. as an ISO string
+    issued = datetime.fromisoformat(stored) if isinstance(stored, str) else stored
+    eta = eta_engine.eta(order_id, stored=issued)
+    if eta is None:
+        eta = stored
+    if isinstance(eta, datetime):
+        return eta.isoformat()
+    return eta
+
+
+eta_engine = EtaEngine()
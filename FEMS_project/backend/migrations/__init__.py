@@ -0,0 +1,378 @@
+# backend/migrations/__init__.py
+"""
+Versioned schema migrations for FEMS
+
+Migration 0 builds the baseline schema (sql/table_creation.sql, sql/partitioning.sql and
+the route files as they were then), so an empty database needs nothing but db-migrate.
+Every change after that ships as a numbered migration in versions.py; applied versions
+are recorded in the schema_migrations table, so each migration runs exactly once per database.
+
+Step types:
+- Baseline: the baseline files, applied only while no migration has been recorded
+- Sql: a statement run inside the migration's transaction
+- SqlFile: applies the functions, views and triggers a migration changed, as they were
+  then (CREATE OR REPLACE, plus DROP ... IF EXISTS where a signature or trigger changed).
+  The file lives in sql/migrations/NNNN_<file>.sql and is never edited, so migration N
+  always runs the SQL it shipped with, not objects later migrations create
+- ConcurrentIndex: CREATE INDEX CONCURRENTLY, run outside a transaction so writes are never blocked
+
+Each index migration ships ExplainChecks: the query the index exists for, which must
+show the index in its EXPLAIN plan. A migration is recorded as applied only after its
+checks pass; a failed check leaves it pending.
+
+Usage:
+    flask --app backend.app db-migrate [--target N]
+    flask --app backend.app db-status
+    flask --app backend.app db-check-indexes
+"""
+
+import json
+import os
+import time
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "sql")
+
+# pg_advisory_lock key so two deploys never run migrations at the same time
+MIGRATION_LOCK_KEY = 7_240_301
+
+
+class Sql:
+    """A statement run inside the migration's transaction"""
+
+    transactional = True
+
+    def __init__(self, statement):
+        self.statement = statement
+
+    def describe(self):
+        return self.statement.strip().splitlines()[0]
+
+    def apply(self, conn):
+        run_script(conn, self.statement)
+
+
+class SqlFile:
+    """Applies a file under sql/ (its objects must be CREATE OR REPLACE / IF NOT EXISTS)"""
+
+    transactional = True
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def describe(self):
+        return f"apply sql/{self.filename}"
+
+    def apply(self, conn):
+        with open(os.path.join(SQL_DIR, self.filename), encoding="utf-8") as f:
+            run_script(conn, f.read())
+
+
+class Baseline:
+    """
+    Applies the baseline files under sql/, in order, to a database no migration has run on
+
+    A database migrated before migration 0 existed already has the baseline (it was set up
+    by hand from these files), so once any version is recorded the step does nothing.
+    The files are safe to re-run over tables that db.create_all() already made.
+    """
+
+    transactional = True
+
+    def __init__(self, *filenames):
+        self.filenames = filenames
+
+    def describe(self):
+        return "baseline schema: " + ", ".join(f"sql/{name}" for name in self.filenames)
+
+    def apply(self, conn):
+        if applied_versions(conn):
+            return
+        for filename in self.filenames:
+            with open(os.path.join(SQL_DIR, filename), encoding="utf-8") as f:
+                run_script(conn, f.read())
+
+
+class ConcurrentIndex:
+    """
+    CREATE INDEX CONCURRENTLY, skipped when a valid index of that name already exists
+
+    Postgres can't build an index concurrently on a partitioned table, so for those the
+    parent index is created ON ONLY the parent and each partition's index is built
+    concurrently and attached, which leaves the parent index valid once all are attached.
+    """
+
+    transactional = False
+
+    def __init__(self, name, table, columns, where=None, unique=False):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.where = where
+        self.unique = unique
+
+    def describe(self):
+        where = f" WHERE {self.where}" if self.where else ""
+        return f"index {self.name} ON {self.table}({self.columns}){where}"
+
+    def _definition(self, table, name, concurrently=False, only=False):
+        return "CREATE {unique}INDEX {concurrently}{name} ON {only}{table} ({columns}){where}".format(
+            unique="UNIQUE " if self.unique else "",
+            concurrently="CONCURRENTLY " if concurrently else "",
+            name=name,
+            only="ONLY " if only else "",
+            table=table,
+            columns=self.columns,
+            where=f" WHERE {self.where}" if self.where else "",
+        )
+
+    def _validity(self, conn, name):
+        """True / False for a valid / INVALID index of that name, None when it doesn't exist"""
+        return conn.exec_driver_sql(
+            "SELECT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass(%(name)s)",
+            {"name": name}
+        ).scalar()
+
+    def _ensure(self, conn, table, name):
+        """Build one index concurrently, dropping an INVALID leftover from a failed attempt first"""
+        state = self._validity(conn, name)
+        if state is True:
+            return
+        if state is False:
+            conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        conn.exec_driver_sql(self._definition(table, name, concurrently=True))
+
+    def apply(self, conn):
+        if self._validity(conn, self.name) is True:
+            return
+
+        partitions = conn.exec_driver_sql(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%(table)s) ORDER BY c.relname",
+            {"table": self.table}
+        ).scalars().all()
+
+        if not partitions:
+            self._ensure(conn, self.table, self.name)
+            return
+
+        # parent stays INVALID (and unused) until every partition index is attached
+        if self._validity(conn, self.name) is None:
+            conn.exec_driver_sql(self._definition(self.table, self.name, only=True))
+
+        for partition in partitions:
+            child = f"{partition}_{self.name}"[:63]
+            self._ensure(conn, partition, child)
+            attached = conn.exec_driver_sql(
+                "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%(child)s) "
+                "AND inhparent = to_regclass(%(parent)s)",
+                {"child": child, "parent": self.name}
+            ).first()
+            if not attached:
+                conn.exec_driver_sql(f"ALTER INDEX {self.name} ATTACH PARTITION {child}")
+
+
+class ExplainCheck:
+    """
+    Proves the planner can serve `query` from `index` (or that index's partition indexes)
+
+    With `index_cond`, the index must also be searched on that column (it appears in the
+    node's Index Cond): with seq scans off, a full scan of any matching partial index
+    would otherwise pass.
+    """
+
+    def __init__(self, index, query, params=None, index_cond=None):
+        self.index = index
+        self.query = query
+        self.params = params or {}
+        self.index_cond = index_cond
+
+    def run(self, conn):
+        """Returns (passed, index names found in the plan); leaves nothing behind in conn"""
+        from sqlalchemy import text
+
+        # inside a migration's transaction the check runs in a savepoint
+        with (conn.begin_nested() if conn.in_transaction() else conn.begin()) as trans:
+            expected = set(conn.execute(text("""
+                WITH RECURSIVE tree AS (
+                    SELECT to_regclass(:index)::OID AS oid
+                    UNION ALL
+                    SELECT i.inhrelid FROM pg_inherits i JOIN tree t ON i.inhparent = t.oid
+                )
+                SELECT c.relname FROM tree JOIN pg_class c ON c.oid = tree.oid;
+            """), {"index": self.index}).scalars().all())
+
+            # small dev tables make a seq scan cheapest; we want to know the index is usable
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+            plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {self.query}"), self.params).scalar()
+            trans.rollback()
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans = list(_plan_indexes(plan[0]["Plan"]))
+        passed = any(
+            name in expected and (self.index_cond is None or self.index_cond in cond)
+            for name, cond in scans
+        )
+        return passed, sorted({name for name, _ in scans})
+
+
+def _plan_indexes(node):
+    """(index name, Index Cond) for every index scan in the plan"""
+    if "Index Name" in node:
+        yield node["Index Name"], node.get("Index Cond", "")
+    for child in node.get("Plans", []):
+        yield from _plan_indexes(child)
+
+
+class Migration:
+    def __init__(self, version, description, steps, checks=()):
+        self.version = version
+        self.description = description
+        self.steps = steps
+        self.checks = checks
+
+    @property
+    def transactional(self):
+        return all(step.transactional for step in self.steps)
+
+
+def run_script(conn, sql):
+    """Run a multi-statement script through the DBAPI cursor (no bind-parameter parsing)"""
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(sql)
+    finally:
+        cursor.close()
+
+
+class MigrationCheckFailed(Exception):
+    """A migration's EXPLAIN checks failed, so it was not recorded as applied"""
+
+
+# ============================================
+# RUNNER
+# ============================================
+
+def ensure_migrations_table(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT NOW(),
+            duration_ms INTEGER
+        )
+    """)
+
+
+def applied_versions(conn):
+    return set(conn.exec_driver_sql("SELECT version FROM schema_migrations").scalars().all())
+
+
+def latest_version():
+    from .versions import MIGRATIONS
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def schema_version(engine):
+    """Highest applied migration in one query (None before the first db-migrate)"""
+    from sqlalchemy.exc import ProgrammingError
+
+    with engine.connect() as conn:
+        try:
+            return conn.exec_driver_sql("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").scalar()
+        except ProgrammingError:
+            # schema_migrations doesn't exist yet
+            return None
+
+
+def pending_migrations(conn, target=None):
+    from .versions import MIGRATIONS
+    done = applied_versions(conn)
+    return [
+        m for m in MIGRATIONS
+        if m.version not in done and (target is None or m.version <= target)
+    ]
+
+
+def apply_migration(engine, migration, log=print):
+    """Run the steps, then the checks; the version is recorded only if every check passed"""
+    started = time.perf_counter()
+
+    if migration.transactional:
+        with engine.begin() as conn:
+            for step in migration.steps:
+                log(f"  - {step.describe()}")
+                step.apply(conn)
+            # raising here rolls the whole migration back
+            _check(conn, migration, log)
+            _record(conn, migration, started)
+        return
+
+    # CONCURRENTLY can't run in a transaction block: each step commits on its own, and
+    # every step is idempotent so a migration interrupted halfway (or failing its
+    # checks) can simply be re-run
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for step in migration.steps:
+            log(f"  - {step.describe()}")
+            step.apply(conn)
+    with engine.begin() as conn:
+        _check(conn, migration, log)
+        _record(conn, migration, started)
+
+
+def _record(conn, migration, started):
+    conn.exec_driver_sql(
+        "INSERT INTO schema_migrations (version, description, duration_ms) "
+        "VALUES (%(version)s, %(description)s, %(duration_ms)s)",
+        {
+            "version": migration.version,
+            "description": migration.description,
+            "duration_ms": int((time.perf_counter() - started) * 1000),
+        }
+    )
+
+
+def _check(conn, migration, log):
+    if not migration.checks:
+        return
+    log("  checking that the new indexes are used:")
+    failed = _run_checks(conn, migration, log)
+    if failed:
+        raise MigrationCheckFailed(
+            f"{migration.version:04d}: {failed} index(es) not used by the queries they were "
+            f"added for; the migration stays pending"
+        )
+
+
+def _run_checks(conn, migration, log):
+    failed = 0
+    for check in migration.checks:
+        passed, used = check.run(conn)
+        status = "ok" if passed else "FAILED"
+        log(f"  [{status}] {migration.version:04d} {check.index} (plan uses: {', '.join(used) or 'no index'})")
+        failed += 0 if passed else 1
+    return failed
+
+
+def run_checks(engine, migrations, log=print):
+    """Run the EXPLAIN checks of the given migrations; returns the number that failed"""
+    failed = 0
+    for migration in migrations:
+        with engine.connect() as conn:
+            failed += _run_checks(conn, migration, log)
+    return failed
+
+
+def migrate(engine, target=None, log=print):
+    """Apply pending migrations in order under an advisory lock; returns the applied list"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.exec_driver_sql(f"SELECT pg_advisory_lock({MIGRATION_LOCK_KEY})")
+        try:
+            ensure_migrations_table(lock_conn)
+            todo = pending_migrations(lock_conn, target)
+            for migration in todo:
+                log(f"Applying {migration.version:04d} {migration.description}")
+                apply_migration(engine, migration, log)
+            return todo
+        finally:
+            lock_conn.exec_driver_sql(f"SELECT pg_advisory_unlock({MIGRATION_LOCK_KEY})")
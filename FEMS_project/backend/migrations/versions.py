@@ -0,0 +1,445 @@
+# backend/migrations/versions.py
+"""
+Ordered list of FEMS schema migrations
+
+Append new migrations at the end with the next version number; never edit or
+renumber one that has shipped. Index migrations use ConcurrentIndex and carry an
+ExplainCheck with the query from the route the index was added for.
+
+A migration that changes functions or triggers in sql/customer_routes.sql or
+sql/vendor_routes.sql copies just the objects it changed to sql/migrations/NNNN_<file>.sql
+and applies that file with SqlFile.
+"""
+
+from . import Migration, Baseline, Sql, SqlFile, ConcurrentIndex, ExplainCheck
+from ..order_status import seed_transitions_sql
+
+MIGRATIONS = [
+    # the schema before versioned migrations: tables, monthly order partitions, route functions
+    Migration(
+        0, "baseline schema",
+        steps=[
+            Baseline(
+                "table_creation.sql",
+                "partitioning.sql",
+                "migrations/0000_customer_routes.sql",
+                "migrations/0000_vendor_routes.sql",
+            ),
+        ],
+    ),
+
+    # verify_email: EmailVerification.query.filter_by(user_id=..., code=..., is_used=False)
+    Migration(
+        1, "email_verifications lookup by user and unused code",
+        steps=[
+            ConcurrentIndex(
+                "idx_email_verifications_user_code_unused", "email_verifications",
+                "user_id, code", where="NOT is_used"
+            ),
+        ],
+        checks=[
+            ExplainCheck(
+                "idx_email_verifications_user_code_unused",
+                "SELECT id FROM email_verifications "
+                "WHERE user_id = :user_id AND code = :code AND is_used = false LIMIT 1",
+                {"user_id": 1, "code": "0" * 10}
+            ),
+        ],
+    ),
+
+    # customer_routes.get_order_history: newest orders first for one customer
+    Migration(
+        2, "orders by customer, newest first",
+        steps=[
+            ConcurrentIndex("idx_orders_customer_placed", "orders", "customer_id, placed_at DESC"),
+        ],
+        checks=[
+            ExplainCheck(
+                "idx_orders_customer_placed",
+                "SELECT o.id FROM orders o WHERE o.customer_id = :customer_id "
+                "ORDER BY o.placed_at DESC LIMIT 50",
+                {"customer_id": 1}
+            ),
+        ],
+    ),
+
+    # vendors.get_vendor_orders?status=...: a vendor's queue for one status, newest first
+    Migration(
+        3, "orders by vendor and status, newest first",
+        steps=[
+            ConcurrentIndex("idx_orders_vendor_status_placed", "orders", "vendor_id, status, placed_at DESC"),
+        ],
+        checks=[
+            ExplainCheck(
+                "idx_orders_vendor_status_placed",
+                "SELECT o.id FROM orders o WHERE o.vendor_id = :vendor_id AND o.status = :status "
+                "ORDER BY o.placed_at DESC LIMIT 50",
+                {"vendor_id": 1, "status": "pending"}
+            ),
+        ],
+    ),
+
+    # vendors.upsert_menu_items: bump once per write so menu caches can be invalidated
+    Migration(
+        4, "menus.version counter",
+        steps=[
+            Sql("ALTER TABLE menus ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;"),
+        ],
+    ),
+
+    # vendors.upsert_menu_items: INSERT ... ON CONFLICT (menu_id, name) needs a unique index
+    # (fails if a menu already has two items with the same name; rename them and re-run)
+    Migration(
+        5, "unique menu item name per menu",
+        steps=[
+            ConcurrentIndex("uq_menu_items_menu_name", "menu_items", "menu_id, name", unique=True),
+        ],
+        checks=[
+            ExplainCheck(
+                "uq_menu_items_menu_name",
+                "SELECT id FROM menu_items WHERE menu_id = :menu_id AND name = :name",
+                {"menu_id": 1, "name": "Item"}
+            ),
+        ],
+    ),
+
+    # update_order_status / cancel_customer_order: compare-and-set against an explicit
+    # transition table, with orders.version for clients that send what they last saw
+    Migration(
+        6, "order state machine: transition table and orders.version",
+        steps=[
+            Sql("""
+                CREATE TABLE IF NOT EXISTS order_status_transitions (
+                    actor VARCHAR(20) NOT NULL,
+                    to_status VARCHAR(20) NOT NULL,
+                    from_status VARCHAR(20) NOT NULL,
+                    PRIMARY KEY (actor, to_status, from_status)
+                );
+            """),
+            Sql(seed_transitions_sql()),
+            # archive.orders must keep the same columns as orders or archiving can't attach partitions
+            Sql("""
+                ALTER TABLE orders ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+                ALTER TABLE IF EXISTS archive.orders ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+                CREATE OR REPLACE VIEW orders_all AS
+                SELECT * FROM public.orders
+                UNION ALL
+                SELECT * FROM archive.orders;
+            """),
+            SqlFile("migrations/0006_customer_routes.sql"),
+            SqlFile("migrations/0006_vendor_routes.sql"),
+        ],
+    ),
+
+    # place_customer_order: optional per-item stock, taken with a conditional UPDATE
+    Migration(
+        7, "menu_items.stock and atomic decrement at order placement",
+        steps=[
+            Sql("""
+                ALTER TABLE menu_items ADD COLUMN IF NOT EXISTS stock INTEGER
+                    CONSTRAINT menu_items_stock_check CHECK (stock IS NULL OR stock >= 0);
+            """),
+            SqlFile("migrations/0007_customer_routes.sql"),
+            SqlFile("migrations/0007_vendor_routes.sql"),
+        ],
+    ),
+
+    # place_customer_order: per-vendor pickup slot capacity, admitted with one conditional upsert
+    Migration(
+        8, "pickup slot capacity and usage counters",
+        steps=[
+            Sql("""
+                CREATE TABLE IF NOT EXISTS vendor_slot_settings (
+                    vendor_id INTEGER PRIMARY KEY REFERENCES vendors(id) ON DELETE CASCADE,
+                    slot_minutes INTEGER NOT NULL DEFAULT 15 CHECK (slot_minutes > 0),
+                    capacity_minutes INTEGER NOT NULL CHECK (capacity_minutes > 0),
+                    updated_at TIMESTAMP DEFAULT NOW()
+                );
+                CREATE TABLE IF NOT EXISTS vendor_slot_usage (
+                    vendor_id INTEGER NOT NULL REFERENCES vendors(id) ON DELETE CASCADE,
+                    slot_start TIMESTAMP NOT NULL,
+                    used_minutes INTEGER NOT NULL DEFAULT 0,
+                    order_count INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT NOW(),
+                    PRIMARY KEY (vendor_id, slot_start)
+                );
+            """),
+            Sql("""
+                ALTER TABLE orders ADD COLUMN IF NOT EXISTS prep_minutes INTEGER;
+                ALTER TABLE orders ADD COLUMN IF NOT EXISTS slot_start TIMESTAMP;
+                ALTER TABLE IF EXISTS archive.orders ADD COLUMN IF NOT EXISTS prep_minutes INTEGER;
+                ALTER TABLE IF EXISTS archive.orders ADD COLUMN IF NOT EXISTS slot_start TIMESTAMP;
+                CREATE OR REPLACE VIEW orders_all AS
+                SELECT * FROM public.orders
+                UNION ALL
+                SELECT * FROM archive.orders;
+            """),
+            SqlFile("migrations/0008_customer_routes.sql"),
+        ],
+    ),
+
+    # customer_routes.get_all_vendors: per-vendor open-order counters kept by a trigger on orders
+    Migration(
+        9, "vendor_load queue counters for the vendor directory",
+        steps=[
+            Sql("""
+                CREATE TABLE IF NOT EXISTS vendor_load (
+                    vendor_id INTEGER PRIMARY KEY REFERENCES vendors(id) ON DELETE CASCADE,
+                    queued_orders INTEGER NOT NULL DEFAULT 0,
+                    queued_minutes INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT NOW()
+                );
+            """),
+            SqlFile("migrations/0009_customer_routes.sql"),
+            Sql("SELECT rebuild_vendor_load();"),
+        ],
+    ),
+
+    # vendors.get_kitchen_queue: item totals across accepted / preparing orders, kept by a trigger on orders
+    Migration(
+        10, "kitchen queue lines and per-slot item totals",
+        steps=[
+            Sql("""
+                CREATE TABLE IF NOT EXISTS kitchen_queue_lines (
+                    order_item_id INTEGER PRIMARY KEY,
+                    order_id INTEGER NOT NULL,
+                    vendor_id INTEGER NOT NULL REFERENCES vendors(id) ON DELETE CASCADE,
+                    slot_start TIMESTAMP NOT NULL,
+                    menu_item_id INTEGER NOT NULL,
+                    name VARCHAR(200) NOT NULL,
+                    quantity INTEGER NOT NULL,
+                    notes TEXT,
+                    added_at TIMESTAMP DEFAULT NOW()
+                );
+                CREATE INDEX IF NOT EXISTS idx_kitchen_queue_lines_order ON kitchen_queue_lines(order_id);
+                CREATE INDEX IF NOT EXISTS idx_kitchen_queue_lines_vendor_notes
+                    ON kitchen_queue_lines(vendor_id, slot_start, menu_item_id) WHERE notes IS NOT NULL;
+                CREATE TABLE IF NOT EXISTS kitchen_queue_totals (
+                    vendor_id INTEGER NOT NULL REFERENCES vendors(id) ON DELETE CASCADE,
+                    slot_start TIMESTAMP NOT NULL,
+                    menu_item_id INTEGER NOT NULL,
+                    name VARCHAR(200) NOT NULL,
+                    quantity INTEGER NOT NULL DEFAULT 0,
+                    line_count INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT NOW(),
+                    PRIMARY KEY (vendor_id, slot_start, menu_item_id)
+                );
+            """),
+            SqlFile("migrations/0010_vendor_routes.sql"),
+            Sql("SELECT rebuild_kitchen_queue();"),
+        ],
+    ),
+
+    # place_customer_order / backend/scheduler.py: hold future orders until scheduled_for minus prep
+    Migration(
+        11, "orders.release_at / released_at for scheduled release",
+        steps=[
+            Sql("""
+                ALTER TABLE orders ADD COLUMN IF NOT EXISTS release_at TIMESTAMP;
+                ALTER TABLE orders ADD COLUMN IF NOT EXISTS released_at TIMESTAMP;
+                ALTER TABLE IF EXISTS archive.orders ADD COLUMN IF NOT EXISTS release_at TIMESTAMP;
+                ALTER TABLE IF EXISTS archive.orders ADD COLUMN IF NOT EXISTS released_at TIMESTAMP;
+                CREATE OR REPLACE VIEW orders_all AS
+                SELECT * FROM public.orders
+                UNION ALL
+                SELECT * FROM archive.orders;
+            """),
+            # vendors already see every open order; keep it that way for orders placed before this
+            Sql("""
+                UPDATE orders
+                SET released_at = placed_at
+                WHERE status = 'pending' AND released_at IS NULL;
+            """),
+            SqlFile("migrations/0011_customer_routes.sql"),
+            Sql("SELECT rebuild_vendor_load();"),
+        ],
+    ),
+
+    # scheduler._resync (recovery after restart) and vendors.get_vendor_orders: held orders only
+    # (superseded by migration 25: _resync filters on release_at, which this index can't search;
+    # its check only passed as a full scan of the partial index, so it was dropped)
+    Migration(
+        12, "unreleased pending orders by vendor and pickup time",
+        steps=[
+            ConcurrentIndex(
+                "idx_orders_unreleased", "orders", "vendor_id, scheduled_for",
+                where="status = 'pending' AND released_at IS NULL"
+            ),
+        ],
+    ),
+
+    # backend/sweeper.py: per-run metrics, plus the indexes its batches walk
+    Migration(
+        13, "maintenance_runs metrics table",
+        steps=[
+            Sql("""
+                CREATE TABLE IF NOT EXISTS maintenance_runs (
+                    id SERIAL PRIMARY KEY,
+                    job VARCHAR(50) NOT NULL,
+                    dry_run BOOLEAN NOT NULL DEFAULT FALSE,
+                    rows_affected INTEGER NOT NULL DEFAULT 0,
+                    batches INTEGER NOT NULL DEFAULT 0,
+                    duration_ms INTEGER,
+                    details JSONB,
+                    started_at TIMESTAMP DEFAULT NOW()
+                );
+                CREATE INDEX IF NOT EXISTS idx_maintenance_runs_job_started ON maintenance_runs(job, started_at DESC);
+            """),
+        ],
+    ),
+
+    # sweeper.sweep_stale_orders: oldest pending orders first, SKIP LOCKED batches
+    Migration(
+        14, "pending orders by pickup time",
+        steps=[
+            ConcurrentIndex("idx_orders_pending_scheduled", "orders", "scheduled_for", where="status = 'pending'"),
+        ],
+        checks=[
+            ExplainCheck(
+                "idx_orders_pending_scheduled",
+                "SELECT o.id FROM orders o WHERE o.status = 'pending' "
+                "AND o.scheduled_for < NOW() - make_interval(mins => :grace_minutes) "
+                "ORDER BY o.scheduled_for LIMIT 500",
+                {"grace_minutes": 30}
+            ),
+        ],
+    ),
+
+    # sweeper.prune_verification_codes: expired codes, oldest first
+    Migration(
+        15, "email_verifications by expiry",
+        steps=[
+            ConcurrentIndex("idx_email_verifications_expires", "email_verifications", "expires_at"),
+        ],
+        checks=[
+            ExplainCheck(
+                "idx_email_verifications_expires",
+                "SELECT id FROM email_verifications WHERE expires_at < NOW() ORDER BY expires_at LIMIT 500"
+            ),
+        ],
+    ),
+
+    # backend/cache.py: per-key versions for the cross-worker invalidation bus
+    Migration(
+        16, "cache_versions for the cache invalidation bus",
+        steps=[
+            Sql("""
+                CREATE TABLE IF NOT EXISTS cache_versions (
+                    cache_name VARCHAR(50) NOT NULL,
+                    cache_key VARCHAR(100) NOT NULL,
+                    version BIGINT NOT NULL DEFAULT 1,
+                    updated_at TIMESTAMP DEFAULT NOW(),
+                    PRIMARY KEY (cache_name, cache_key)
+                );
+            """),
+            SqlFile("migrations/0016_customer_routes.sql"),
+        ],
+    ),
+
+    # backend/query_cache.py: statement triggers that notify the workers of table changes
+    Migration(
+        17, "table change notifications for the query cache",
+        steps=[
+            SqlFile("migrations/0017_customer_routes.sql"),
+        ],
+    ),
+
+    # restore_order_stock(): a restocked sold-out item invalidates the menu caches
+    Migration(
+        18, "menu invalidation on restock",
+        steps=[
+            SqlFile("migrations/0018_vendor_routes.sql"),
+        ],
+    ),
+
+    # customer_routes.get_menu_changes: per-vendor log of menu item changes
+    Migration(
+        19, "menu_item_changes log for menu deltas",
+        steps=[
+            Sql("""
+                CREATE TABLE IF NOT EXISTS menu_change_heads (
+                    vendor_id INTEGER PRIMARY KEY,
+                    version BIGINT NOT NULL DEFAULT 0,
+                    compacted_through BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT NOW()
+                );
+                CREATE TABLE IF NOT EXISTS menu_item_changes (
+                    vendor_id INTEGER NOT NULL,
+                    version BIGINT NOT NULL,
+                    menu_item_id INTEGER,
+                    op VARCHAR(10) NOT NULL,
+                    changed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                    PRIMARY KEY (vendor_id, version)
+                );
+                CREATE INDEX IF NOT EXISTS idx_menu_item_changes_changed_at ON menu_item_changes(changed_at);
+            """),
+            SqlFile("migrations/0019_vendor_routes.sql"),
+        ],
+    ),
+
+    # sync_menu_item_stats(): statement-level triggers, lines summed per item
+    Migration(
+        20, "menu_item_stats triggers per statement",
+        steps=[
+            SqlFile("migrations/0020_vendor_routes.sql"),
+        ],
+    ),
+
+    # place_customer_order(): items locked in id order, order lines in one INSERT
+    Migration(
+        21, "place_customer_order lock order",
+        steps=[
+            SqlFile("migrations/0021_customer_routes.sql"),
+        ],
+    ),
+
+    # query cache: no notifications from the order path (orders, order_items,
+    # customer_stats) or from sign-ins (users.last_login)
+    Migration(
+        22, "query cache watches read-mostly tables only",
+        steps=[
+            SqlFile("migrations/0022_customer_routes.sql"),
+        ],
+    ),
+
+    # menu change log: order stock decrements no longer take the vendor's head row
+    Migration(
+        23, "menu change log skips order stock counts",
+        steps=[
+            SqlFile("migrations/0023_vendor_routes.sql"),
+            SqlFile("migrations/0023_customer_routes.sql"),
+        ],
+    ),
+
+    # apply_customer_stats_delta(): deleting a customer with orders no longer re-creates
+    # the stats row the delete just cascaded away
+    Migration(
+        24, "customer stats skip deleted customers",
+        steps=[
+            SqlFile("migrations/0024_customer_routes.sql"),
+        ],
+    ),
+
+    # scheduler._resync: held orders due within the horizon, searched on release_at
+    # (orders is partitioned, so the old index can't be dropped CONCURRENTLY; dropping
+    # it is a catalog change that only waits for queries already running on orders)
+    Migration(
+        25, "unreleased pending orders by release time",
+        steps=[
+            ConcurrentIndex(
+                "idx_orders_unreleased_release_at", "orders", "release_at",
+                where="status = 'pending' AND released_at IS NULL"
+            ),
+            Sql("DROP INDEX IF EXISTS idx_orders_unreleased;"),
+        ],
+        checks=[
+            ExplainCheck(
+                "idx_orders_unreleased_release_at",
+                "SELECT id, release_at FROM orders WHERE status = 'pending' AND released_at IS NULL "
+                "AND release_at < NOW() + make_interval(secs => :horizon)",
+                {"horizon": 600},
+                index_cond="release_at"
+            ),
+        ],
+    ),
+]
@@ -10,6 +10,9 @@ from datetime import datetime, timezone #for timestamps
 #db=SQLAlchemy()
 from .extensions import db
 
+#every python default has a matching server_default: the SQL functions and triggers insert rows
+#without going through these models, so a create_all database needs the defaults in postgres too
+
 #USER TABLE
 class User(db.Model):
     __tablename__ = 'users'
@@ -20,8 +23,8 @@ class User(db.Model):
     role = db.Column(db.String(20), nullable=False)  # 'customer' or 'vendor'
     full_name = db.Column(db.String(200))
     phone = db.Column(db.String(20))
-    is_email_verified = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    is_email_verified = db.Column(db.Boolean, default=False, server_default=db.text("false"))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
     last_login = db.Column(db.DateTime)
     
     #relationships with other tables
@@ -50,8 +53,8 @@ class EmailVerification(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     code = db.Column(db.String(10), nullable=False)
     expires_at = db.Column(db.DateTime, nullable=False)
-    is_used = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    is_used = db.Column(db.Boolean, default=False, server_default=db.text("false"))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
     
     # Relationship - not need of dup
     #user = db.relationship('User', backref='verification_codes')
@@ -65,9 +68,9 @@ class Vendor(db.Model): #db.model means this class is a db table
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), unique=True, nullable=False)
     vendor_name = db.Column(db.String(200), nullable=False)
     location = db.Column(db.Text)
-    pickup_available = db.Column(db.Boolean, default=True)
-    delivery_available = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    pickup_available = db.Column(db.Boolean, default=True, server_default=db.text("true"))
+    delivery_available = db.Column(db.Boolean, default=False, server_default=db.text("false"))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
     
     # Relationships
     menu = db.relationship('Menu', backref='vendor', uselist=False, cascade='all, delete-orphan')#vendor deleted -> menu deleted 
@@ -92,8 +95,9 @@ class Menu(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), unique=True,nullable=False)
     title = db.Column(db.String(100), nullable=False)
-    is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    is_active = db.Column(db.Boolean, default=True, server_default=db.text("true"))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default=db.text("1"))  # bumped on every menu write
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
     
     # Relationships
     menu_items = db.relationship('MenuItem', backref='menu', lazy=True, cascade='all, delete-orphan')
@@ -109,6 +113,10 @@ class Menu(db.Model):
 #MENU ITEMS TABLE
 class MenuItem(db.Model):
     __tablename__ = 'menu_items'
+    __table_args__ = (
+        db.UniqueConstraint('menu_id', 'name', name='uq_menu_items_menu_name'),
+        db.CheckConstraint('stock IS NULL OR stock >= 0', name='menu_items_stock_check'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     menu_id = db.Column(db.Integer, db.ForeignKey('menus.id', ondelete='CASCADE'), nullable=False)
@@ -116,10 +124,11 @@ class MenuItem(db.Model):
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Numeric(10, 2), nullable=False)
-    available = db.Column(db.Boolean, default=True)
-    preparation_time_minutes = db.Column(db.Integer, default=15)
+    available = db.Column(db.Boolean, default=True, server_default=db.text("true"))
+    stock = db.Column(db.Integer)  # NULL = not tracked; decremented at order placement
+    preparation_time_minutes = db.Column(db.Integer, default=15, server_default=db.text("15"))
     image_url = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
     
     #relationships
     order_items = db.relationship('OrderItem', backref='menu_item', lazy=True)
@@ -131,6 +140,7 @@ class MenuItem(db.Model):
             'description': self.description,
             'price': float(self.price),
             'available': self.available,
+            'stock': self.stock,
             'preparation_time_minutes': self.preparation_time_minutes,
             'image_url': self.image_url
         }
@@ -143,15 +153,20 @@ class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
     vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), nullable=False)
-    placed_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    placed_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())  # partition key
     scheduled_for = db.Column(db.DateTime, nullable=False)
     total_amount = db.Column(db.Numeric(12, 2), nullable=False)
-    status = db.Column(db.String(20), default='pending')  # pending, accepted, preparing, ready, completed, cancelled, rejected
-    payment_status = db.Column(db.String(20), default='pending')  # pending, paid, failed
-    pickup_or_delivery = db.Column(db.String(20), default='pickup')
+    status = db.Column(db.String(20), default='pending', server_default="pending")  # pending, accepted, preparing, ready, completed, cancelled, rejected
+    payment_status = db.Column(db.String(20), default='pending', server_default="pending")  # pending, paid, failed
+    pickup_or_delivery = db.Column(db.String(20), default='pickup', server_default="pickup")
     notes = db.Column(db.Text)
     estimated_ready_at = db.Column(db.DateTime)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+    version = db.Column(db.Integer, nullable=False, default=1, server_default=db.text("1"))  # bumped on every status change (compare-and-set)
+    prep_minutes = db.Column(db.Integer)  # kitchen minutes charged to the pickup slot
+    slot_start = db.Column(db.DateTime)  # NULL when the vendor has no slot capacity configured
+    release_at = db.Column(db.DateTime)  # scheduled_for minus prep_minutes: when the kitchen should see it
+    released_at = db.Column(db.DateTime)  # set at placement if already due, else by backend/scheduler.py
     
     # Relationships
     order_items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
@@ -177,10 +192,11 @@ class OrderItem(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False)
+    placed_at = db.Column(db.DateTime, nullable=False)  # copy of the order's placed_at, for co-partitioning
     menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_items.id', ondelete='SET NULL'))
     name_snapshot = db.Column(db.String(200), nullable=False)
     price_snapshot = db.Column(db.Numeric(10, 2), nullable=False)
-    quantity = db.Column(db.Integer, nullable=False, default=1)
+    quantity = db.Column(db.Integer, nullable=False, default=1, server_default=db.text("1"))
     notes = db.Column(db.Text)
     
     def to_dict(self):
@@ -192,6 +208,90 @@ class OrderItem(db.Model):
             'notes': self.notes
         }
         
+#VENDOR SLOT SETTINGS TABLE (no row = unlimited pickup capacity)
+class VendorSlotSettings(db.Model):
+    __tablename__ = 'vendor_slot_settings'
+    
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), primary_key=True)
+    slot_minutes = db.Column(db.Integer, nullable=False, default=15, server_default=db.text("15"))
+    capacity_minutes = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+
+#VENDOR SLOT USAGE TABLE (counters kept by place_customer_order / trg_orders_release_slot)
+class VendorSlotUsage(db.Model):
+    __tablename__ = 'vendor_slot_usage'
+    
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), primary_key=True)
+    slot_start = db.Column(db.DateTime, primary_key=True)
+    used_minutes = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    order_count = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+
+#VENDOR LOAD TABLE (open-order counters kept by trg_orders_vendor_load)
+class VendorLoad(db.Model):
+    __tablename__ = 'vendor_load'
+
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), primary_key=True)
+    queued_orders = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    queued_minutes = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+
+#KITCHEN QUEUE LINES TABLE (lines of accepted / preparing orders, kept by trg_orders_kitchen_queue)
+class KitchenQueueLine(db.Model):
+    __tablename__ = 'kitchen_queue_lines'
+
+    order_item_id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False, index=True)
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), nullable=False)
+    slot_start = db.Column(db.DateTime, nullable=False)
+    menu_item_id = db.Column(db.Integer, nullable=False)  # 0 when the item left the menu
+    name = db.Column(db.String(200), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    notes = db.Column(db.Text)
+    added_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+
+#KITCHEN QUEUE TOTALS TABLE (per vendor, slot and item; kept by trg_orders_kitchen_queue)
+class KitchenQueueTotal(db.Model):
+    __tablename__ = 'kitchen_queue_totals'
+
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), primary_key=True)
+    slot_start = db.Column(db.DateTime, primary_key=True)
+    menu_item_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    line_count = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+
+#MAINTENANCE RUNS TABLE (one row per sweeper job run, see backend/sweeper.py)
+class MaintenanceRun(db.Model):
+    __tablename__ = 'maintenance_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job = db.Column(db.String(50), nullable=False)
+    dry_run = db.Column(db.Boolean, nullable=False, default=False, server_default=db.text("false"))
+    rows_affected = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    batches = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    duration_ms = db.Column(db.Integer)
+    details = db.Column(db.JSON)
+    started_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+
+#CACHE VERSIONS TABLE (per-key versions for the cache invalidation bus, see backend/cache.py)
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_versions'
+
+    cache_name = db.Column(db.String(50), primary_key=True)
+    cache_key = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=1, server_default=db.text("1"))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+
+#ORDER STATUS TRANSITIONS TABLE (seeded from backend/order_status.py)
+class OrderStatusTransition(db.Model):
+    __tablename__ = 'order_status_transitions'
+    
+    actor = db.Column(db.String(20), primary_key=True)  # vendor, customer
+    to_status = db.Column(db.String(20), primary_key=True)
+    from_status = db.Column(db.String(20), primary_key=True)
+
 #NOTIFICATION TABLE 
 class Notification(db.Model):
     __tablename__ = 'notifications'
@@ -200,8 +300,8 @@ class Notification(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     type = db.Column(db.String(50), nullable=False)
     payload = db.Column(db.JSON)
-    is_read = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    is_read = db.Column(db.Boolean, default=False, server_default=db.text("false"))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
     
     #relationship - no need of dup
     #user = db.relationship('User', backref='notifications')
@@ -214,7 +314,7 @@ class VendorAnalyticsEvent(db.Model):
     vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), nullable=False)
     event_type = db.Column(db.String(50), nullable=False)
     meta = db.Column(db.JSON)
-    event_time = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    event_time = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
     
     # Relationship - no need of dup
     #vendor = db.relationship('Vendor', backref='analytics_events')
@@ -226,4 +326,64 @@ class VendorAnalyticsEvent(db.Model):
             'event_type': self.event_type,
             'meta': self.meta,
             'event_time': self.event_time.isoformat() if self.event_time else None
-        }
\ No newline at end of file
+        }
+
+#CUSTOMER STATS TABLE (one row per customer, kept current by trigger on orders)
+class CustomerStats(db.Model):
+    __tablename__ = 'customer_stats'
+    
+    customer_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total_orders = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    total_spent = db.Column(db.Numeric(12, 2), nullable=False, default=0, server_default=db.text("0"))
+    last_order_at = db.Column(db.DateTime)
+    pending_orders = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    accepted_orders = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    preparing_orders = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    ready_orders = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    completed_orders = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    cancelled_orders = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    rejected_orders = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+
+
+#MENU ITEM STATS TABLE (per-item sales counters, kept current by trigger on order_items)
+class MenuItemStats(db.Model):
+    __tablename__ = 'menu_item_stats'
+    
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_items.id', ondelete='CASCADE'), primary_key=True)
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), nullable=False, index=True)
+    times_ordered = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    quantity_sold = db.Column(db.Integer, nullable=False, default=0, server_default=db.text("0"))
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0, server_default=db.text("0"))
+    last_ordered_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+
+
+#MENU CHANGE HEADS TABLE (per-vendor menu change version, see trg_menu_items_change_log)
+class MenuChangeHead(db.Model):
+    __tablename__ = 'menu_change_heads'
+
+    vendor_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0, server_default=db.text("0"))
+    compacted_through = db.Column(db.BigInteger, nullable=False, default=0, server_default=db.text("0"))  # log pruned up to here
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+
+#MENU ITEM CHANGES TABLE (per-vendor log of item upserts / deletes; menu_item_id NULL = whole menu)
+class MenuItemChange(db.Model):
+    __tablename__ = 'menu_item_changes'
+
+    vendor_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, primary_key=True)
+    menu_item_id = db.Column(db.Integer)
+    op = db.Column(db.String(10), nullable=False)  # upsert, delete, menu
+    changed_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), server_default=db.func.now(), index=True)
+
+
+#SCHEMA MIGRATIONS TABLE (written by backend/migrations)
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migrations'
+    
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.Text, nullable=False)
+    applied_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), server_default=db.func.now())
+    duration_ms = db.Column(db.Integer)
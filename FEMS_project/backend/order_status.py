@@ -0,0 +1,62 @@
+# backend/order_status.py
+"""
+Order status lifecycle shared by the customer and vendor routes
+
+pending -> accepted -> preparing -> ready -> completed
+Vendors can reject a pending order and cancel anything not yet ready;
+customers can only cancel while the order is still pending.
+completed, cancelled and rejected are terminal.
+
+These maps are the source of truth for the order_status_transitions table that
+update_order_status() / cancel_customer_order() check against. After changing
+them, ship a migration with Sql(seed_transitions_sql()) so the table matches.
+"""
+
+import json
+
+ORDER_STATUSES = ['pending', 'accepted', 'preparing', 'ready', 'completed', 'cancelled', 'rejected']
+
+TERMINAL_STATUSES = ('completed', 'cancelled', 'rejected')
+
+ORDER_STATUS_TRANSITIONS = {
+    'vendor': {
+        'pending': ['accepted', 'rejected', 'cancelled'],
+        'accepted': ['preparing', 'cancelled'],
+        'preparing': ['ready', 'cancelled'],
+        'ready': ['completed'],
+    },
+    'customer': {
+        'pending': ['cancelled'],
+    },
+}
+
+
+def can_transition(old_status, new_status, actor='vendor'):
+    """Vendors may re-send the current status of an open order (to move estimated_ready_at)"""
+    if old_status == new_status:
+        return actor == 'vendor' and old_status not in TERMINAL_STATUSES
+    return new_status in ORDER_STATUS_TRANSITIONS[actor].get(old_status, [])
+
+
+def transition_pairs():
+    """Every allowed (actor, from_status, to_status) row"""
+    return [
+        {"actor": actor, "from_status": old, "to_status": new}
+        for actor in ORDER_STATUS_TRANSITIONS
+        for old in ORDER_STATUSES
+        for new in ORDER_STATUSES
+        if can_transition(old, new, actor)
+    ]
+
+
+def seed_transitions_sql():
+    """Statement that rewrites order_status_transitions to match the maps above"""
+    rows = json.dumps(transition_pairs()).replace("'", "''")
+    return f"""
+        DELETE FROM order_status_transitions;
+        INSERT INTO order_status_transitions (actor, from_status, to_status)
+        SELECT actor, from_status, to_status
+        FROM jsonb_to_recordset('{rows}'::JSONB) AS t(
+            actor VARCHAR(20), from_status VARCHAR(20), to_status VARCHAR(20)
+        );
+    """
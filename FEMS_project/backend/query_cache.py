@@ -0,0 +1,210 @@
+# backend/query_cache.py
+"""
+Result cache for raw db.text() reads, invalidated per table
+
+A read opts in by naming the tables its SQL reads:
+
+    rows = query_cache.fetch(sql, params, tables=("vendors", "users", "vendor_slot_settings"))
+
+and gets what db.session.execute(db.text(sql), params).all() would return, from this
+worker's cache while none of those tables has changed.
+
+- every watched table has a statement-level trigger (notify_table_change() in
+  sql/customer_routes.sql) that pg_notify()s the table name on fems_tables. Postgres
+  delivers it only if the write commits, once per table per transaction, so every write
+  path (routes, stored procedures, other triggers, psql) is covered without hand-written
+  invalidation and without a shared row to lock
+- each worker counts the changes it has been told about per table (the cache bus
+  listener in backend/cache.py delivers them). An entry is dropped as soon as one of its
+  tables changes, and a result is not stored if one changed while it was being read
+- per table, not per row, and every notification takes Postgres' global NOTIFY lock at
+  commit: only for tables read far more often than written. Nothing the order path
+  writes (orders, order_items, customer_stats, stock) is watched
+- the worker that committed a write drops the affected entries right away (wrote()),
+  without waiting for its own notification; other workers lag by the listener's delivery
+- bounded by entries (QUERY_CACHE_MAX_ENTRIES) and approximate result size
+  (QUERY_CACHE_MAX_MB), least recently used out first; max_age caps how long a read of
+  an unwatched table (e.g. the vendor_load counters) may be served
+- bypassed while the cache bus listener is down, and flushed when it reconnects, like
+  the other caches
+
+Rows are shared between requests: treat them as read-only.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from .extensions import db
+from .cache import MISS, cache_bus
+from .coalesce import coalescer
+
+CHANNEL = "fems_tables"
+
+# tables with a notify_table_change() trigger (keep in step with sql/customer_routes.sql)
+WATCHED_TABLES = frozenset({"users", "vendors", "vendor_slot_settings"})
+
+
+class _Entry:
+    __slots__ = ("tables", "rows", "size", "stored_at")
+
+    def __init__(self, tables, rows, size):
+        self.tables = tables
+        self.rows = rows
+        self.size = size
+        self.stored_at = time.monotonic()
+
+
+def result_size(key, rows):
+    """Rough bytes held by a cached result (the SQL text, the row tuples and their values)"""
+    size = sys.getsizeof(key[0])
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class QueryCache:
+    name = "query"
+
+    def __init__(self, app=None, max_entries=5000, max_bytes=64 * 1024 * 1024):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # (sql, params) -> _Entry
+        self._by_table = {}             # table -> keys of the entries that read it
+        self._versions = {}             # table -> changes seen by this worker
+        self._epoch = 0
+        self._bytes = 0
+        self.enabled = True
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.invalidations = self.refused = self.evictions = 0
+        cache_bus.register(self)
+        cache_bus.subscribe(CHANNEL, self.table_changed)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("QUERY_CACHE_ENABLED", True)
+        self.max_entries = app.config.get("QUERY_CACHE_MAX_ENTRIES", self.max_entries)
+        self.max_bytes = int(app.config.get("QUERY_CACHE_MAX_MB", 64) * 1024 * 1024)
+        app.extensions["query_cache"] = self
+
+    @staticmethod
+    def key(sql, params):
+        return sql, tuple(sorted((params or {}).items()))
+
+    def usable(self, tables):
+        """Whether reads of these tables may be cached right now"""
+        unwatched = set(tables) - WATCHED_TABLES
+        if unwatched:
+            # a change to an unwatched table would never invalidate the entry
+            raise ValueError(f"No change notifications for: {', '.join(sorted(unwatched))}")
+        return self.enabled and bool(tables) and cache_bus.healthy
+
+    def get(self, key, max_age=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (max_age is not None and time.monotonic() - entry.stored_at > max_age):
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.rows
+
+    def begin(self, tables):
+        """Token for a read about to start; put() refuses it if any of its tables changes meanwhile"""
+        with self._lock:
+            return self._epoch, tuple(self._versions.get(table, 0) for table in tables)
+
+    def put(self, key, tables, rows, token):
+        size = result_size(key, rows)
+        with self._lock:
+            if token != (self._epoch, tuple(self._versions.get(table, 0) for table in tables)):
+                self.refused += 1
+                return False
+            if size > self.max_bytes:
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(tables, rows, size)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+    def table_changed(self, table):
+        with self._lock:
+            self.invalidations += 1
+            self._versions[table] = self._versions.get(table, 0) + 1
+            for key in self._by_table.pop(table, ()):
+                if key in self._entries:
+                    self._drop(key)
+
+    def wrote(self, *tables):
+        """
+        Call after committing a write to watched tables: drops their entries in this process
+        now (the trigger's notification still reaches every worker, this one included)
+        """
+        for table in tables:
+            self.table_changed(table)
+
+    def flush(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+            self._epoch += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "refused": self.refused,
+                "evictions": self.evictions,
+            }
+
+    def fetch(self, sql, params=None, tables=(), max_age=None, coalesce=None):
+        """
+        Rows of db.text(sql) with params, cached until one of tables changes (or max_age
+        seconds). coalesce names a coalescer route: identical concurrent misses then share
+        one query
+        """
+        params = params or {}
+        key = self.key(sql, params)
+
+        if not self.usable(tables):
+            def load():
+                return db.session.execute(db.text(sql), params).all()
+        else:
+            rows = self.get(key, max_age)
+            if rows is not MISS:
+                return rows
+
+            def load():
+                # only the caller that runs the query stores it, under versions read before it
+                token = self.begin(tables)
+                rows = db.session.execute(db.text(sql), params).all()
+                self.put(key, tables, rows, token)
+                return rows
+
+        if coalesce is None:
+            return load()
+        return coalescer.do(coalesce, key, load)
+
+
+query_cache = QueryCache()
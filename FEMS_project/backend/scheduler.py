@@ -0,0 +1,186 @@
+# backend/scheduler.py
+"""
+Scheduled release of future orders to the kitchen
+
+An order for 19:00 placed at 09:00 should not sit in the vendor's pending queue all
+day. place_customer_order() stamps every order with release_at = scheduled_for minus
+its kitchen minutes; orders already due get released_at straight away, the rest are
+held (vendors only see them with ?include_scheduled=true).
+
+This module releases the held ones on time without polling orders:
+- a heap of (release_at, order_id) per process; one thread sleeps on a Condition
+  until the earliest deadline (or until a new, earlier order is scheduled)
+- due orders are released in one conditional UPDATE (still pending, not yet
+  released), which also writes an 'order_released' notification for the vendor;
+  orders cancelled or accepted early simply don't match
+- on start, and every RELEASE_RESYNC_SECONDS, orders due within the next two
+  intervals are loaded from the partial index idx_orders_unreleased_release_at, which covers
+  restarts and orders placed by other workers. Several workers may hold the same
+  order; the conditional UPDATE lets exactly one of them release it.
+
+The thread starts on the first request in each process (so also after a fork), never
+in CLI commands.
+"""
+
+import heapq
+import os
+import threading
+import time
+from datetime import datetime
+
+from .extensions import db
+
+DEFAULT_RESYNC_SECONDS = 300
+RETRY_SECONDS = 30          # after a failed release / resync (database down)
+
+
+class ReleaseScheduler:
+    def __init__(self, app=None):
+        self._cond = threading.Condition()
+        self._heap = []         # (release_at, order_id)
+        self._queued = {}       # order_id -> release_at of its live heap entry
+        self._listeners = []
+        self._pid = None
+        self._next_resync = 0.0
+        self._app = None
+        self.enabled = True
+        self.resync_seconds = DEFAULT_RESYNC_SECONDS
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.enabled = app.config.get("RELEASE_SCHEDULER_ENABLED", True)
+        self.resync_seconds = app.config.get("RELEASE_RESYNC_SECONDS", DEFAULT_RESYNC_SECONDS)
+        app.extensions["release_scheduler"] = self
+        app.before_request(self.ensure_started)
+
+    def on_release(self, callback):
+        """Register callback(rows) for released orders (id, vendor_id, customer_id, scheduled_for, release_at)"""
+        self._listeners.append(callback)
+        return callback
+
+    def ensure_started(self):
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            # a forked worker inherits the parent's heap but not its thread
+            self._heap = []
+            self._queued = {}
+            self._next_resync = 0.0
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="order-release", daemon=True).start()
+
+    def schedule(self, order_id, release_at):
+        """Hold an order until release_at (naive UTC, like the orders columns)"""
+        if not self.enabled:
+            return
+        self.ensure_started()
+        with self._cond:
+            self._push(order_id, release_at)
+            if self._heap[0][1] == order_id:
+                self._cond.notify()
+
+    def pending(self):
+        """Number of orders this process is holding"""
+        with self._cond:
+            return len(self._queued)
+
+    # ============================================
+    # THREAD
+    # ============================================
+
+    def _push(self, order_id, release_at):
+        if self._queued.get(order_id) == release_at:
+            return
+        # an older entry for the same order stays in the heap and is skipped when popped
+        self._queued[order_id] = release_at
+        heapq.heappush(self._heap, (release_at, order_id))
+
+    def _wait_for_due(self):
+        """Block until orders are due or a resync is; returns the due order ids"""
+        with self._cond:
+            while True:
+                now = datetime.utcnow()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    release_at, order_id = heapq.heappop(self._heap)
+                    if self._queued.get(order_id) == release_at:
+                        del self._queued[order_id]
+                        due.append(order_id)
+                if due:
+                    return due
+
+                timeout = self._next_resync - time.monotonic()
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+                if timeout <= 0:
+                    return []
+                self._cond.wait(timeout)
+
+    def _run(self):
+        while True:
+            due = self._wait_for_due()
+            try:
+                with self._app.app_context():
+                    if due:
+                        self._release(due)
+                    if time.monotonic() >= self._next_resync:
+                        self._resync()
+            except Exception:
+                # due orders are still unreleased in the database; the retry resync finds them
+                self._app.logger.exception("Order release scheduler failed")
+                self._next_resync = time.monotonic() + RETRY_SECONDS
+
+    def _resync(self):
+        rows = db.session.execute(db.text("""
+            SELECT id, release_at
+            FROM orders
+            WHERE status = 'pending'
+            AND released_at IS NULL
+            AND release_at < NOW() + make_interval(secs => :horizon);
+        """), {"horizon": 2 * self.resync_seconds}).all()
+        db.session.commit()
+
+        with self._cond:
+            for order_id, release_at in rows:
+                self._push(order_id, release_at)
+            self._next_resync = time.monotonic() + self.resync_seconds
+
+    def _release(self, order_ids):
+        rows = db.session.execute(db.text("""
+            WITH released AS (
+                UPDATE orders o
+                SET released_at = NOW()
+                WHERE o.id = ANY(:order_ids)
+                AND o.status = 'pending'
+                AND o.released_at IS NULL
+                RETURNING o.id, o.vendor_id, o.customer_id, o.scheduled_for, o.release_at
+            ),
+            notified AS (
+                INSERT INTO notifications (user_id, type, payload)
+                SELECT
+                    v.user_id,
+                    'order_released',
+                    jsonb_build_object(
+                        'order_id', r.id,
+                        'vendor_id', r.vendor_id,
+                        'scheduled_for', r.scheduled_for
+                    )
+                FROM released r
+                JOIN vendors v ON v.id = r.vendor_id
+                RETURNING 1
+            )
+            SELECT * FROM released;
+        """), {"order_ids": order_ids}).all()
+        db.session.commit()
+
+        if rows:
+            self._app.logger.info("Released %d scheduled order(s) to the kitchen", len(rows))
+        for callback in self._listeners:
+            callback(rows)
+
+
+release_scheduler = ReleaseScheduler()
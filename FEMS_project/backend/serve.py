@@ -0,0 +1,114 @@
+# backend/serve.py
+"""
+Production launcher: gunicorn, several worker processes, threads in each
+
+    python -m backend.serve [--workers N] [--threads N] [--bind 0.0.0.0:5000]
+
+- preload: the app is built once in the master and the workers fork from it. Each
+  worker disposes the SQLAlchemy pool it inherited (post_fork), so no two processes
+  ever share a Postgres connection. Per-process state (ETA engine, release scheduler)
+  notices the new pid and starts fresh.
+- the master checks the schema version once before forking (SCHEMA_STARTUP, see
+  backend/startup.py), and each worker's first request is timed from its fork.
+- kill -HUP <master pid>: graceful reload. New workers start, and old ones finish
+  their in-flight requests (up to --graceful-timeout) before exiting. Because the app
+  is preloaded, new workers reuse the master's code: to deploy new code, send USR2
+  (start a new master), then QUIT to the old one.
+- --max-requests (with jitter) recycles each worker after that many requests.
+- --timeout restarts a worker that is stuck on one request for that long.
+
+Each worker has its own connection pool (5 + 10 overflow by default), so keep
+--threads at or below the pool size and workers * threads within what the database
+(or its pooler) accepts.
+
+Flags override the WEB_* environment variables, which override the defaults below.
+"""
+
+import argparse
+import multiprocessing
+import os
+
+from .extensions import db
+from .startup import startup_timer
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def default_options():
+    return {
+        "bind": os.getenv("WEB_BIND", "0.0.0.0:5000"),
+        "workers": _env_int("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1),
+        "threads": _env_int("WEB_THREADS", 4),
+        "max_requests": _env_int("WEB_MAX_REQUESTS", 1000),
+        "max_requests_jitter": _env_int("WEB_MAX_REQUESTS_JITTER", 100),
+        "timeout": _env_int("WEB_TIMEOUT", 30),
+        "graceful_timeout": _env_int("WEB_GRACEFUL_TIMEOUT", 30),
+        "keepalive": _env_int("WEB_KEEPALIVE", 5),
+    }
+
+
+def post_fork(server, worker):
+    """Drop the connection pool copied from the master; the worker opens its own"""
+    startup_timer.mark_fork()
+    with server.app.wsgi().app_context():
+        # close=False: the sockets belong to the master, only forget them here
+        db.engine.dispose(close=False)
+
+
+def run(options):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("gunicorn is not installed (pip install gunicorn); it runs on Linux and macOS only")
+
+    class FemsServer(BaseApplication):
+        def __init__(self, settings):
+            self.settings = settings
+            self.application = None
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            if self.application is None:
+                from .app import create_app
+                from .startup import prepare_schema
+                self.application = create_app()
+                # once, in the master: every worker forks from a checked app
+                prepare_schema(self.application)
+            return self.application
+
+    settings = {
+        **options,
+        "worker_class": "gthread" if options["threads"] > 1 else "sync",
+        "preload_app": True,
+        "post_fork": post_fork,
+        "accesslog": os.getenv("WEB_ACCESS_LOG"),
+    }
+    FemsServer(settings).run()
+
+
+def main():
+    defaults = default_options()
+    parser = argparse.ArgumentParser(description="Run the FEMS API with gunicorn")
+    parser.add_argument("--bind", default=defaults["bind"])
+    parser.add_argument("--workers", type=int, default=defaults["workers"])
+    parser.add_argument("--threads", type=int, default=defaults["threads"], help="Threads per worker")
+    parser.add_argument("--max-requests", type=int, default=defaults["max_requests"],
+                        help="Recycle a worker after this many requests (0 = never)")
+    parser.add_argument("--max-requests-jitter", type=int, default=defaults["max_requests_jitter"])
+    parser.add_argument("--timeout", type=int, default=defaults["timeout"],
+                        help="Restart a worker silent for this many seconds")
+    parser.add_argument("--graceful-timeout", type=int, default=defaults["graceful_timeout"],
+                        help="Seconds old workers get to finish requests on reload / shutdown")
+    parser.add_argument("--keepalive", type=int, default=defaults["keepalive"])
+    args = parser.parse_args()
+    run(vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+# backend/snapshot.py
+"""
+Catalog snapshot: the vendor directory and every vendor's active menu in one file
+
+Menus barely change, so when Postgres restarts or fails over customers can keep
+browsing: GET /api/customer/vendors and /vendors/<id>/menu fall back to this file,
+flagged "degraded" with the snapshot's time and age.
+
+- written every SNAPSHOT_SECONDS by one worker per host (a non-blocking flock picks
+  it, the others skip that round) to a temp file renamed over SNAPSHOT_PATH, so a
+  reader never sees a half-written file. A failed write keeps the previous snapshot
+- format: magic, index length, a JSON index of where each entry's JSON is, then the
+  entries. Readers mmap the file and parse only the index, so serving one menu
+  decodes only that menu's bytes
+- warm start: when a worker's cache bus listener connects, menus whose cache version
+  still matches cache_versions (one query) go straight into the menu cache, their
+  snapshot age counted against MENU_CACHE_SECONDS
+- degraded mode can't load the user, so these two reads (nothing user-specific in
+  them) run on the token's own claims while the database is unreachable
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+
+from .extensions import db
+from .cache import cache_bus, menu_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: every worker writes its own rounds
+    fcntl = None
+
+MAGIC = b"FEMSCAT1"
+HEADER = struct.Struct(">8sQ")   # magic, index length in bytes
+CHECK_SECONDS = 1.0              # how often readers look for a newer file
+
+MENU_VERSIONS_SQL = "SELECT cache_key, version FROM cache_versions WHERE cache_name = 'menu';"
+
+# every vendor and every active menu at once, with the columns of customer_routes'
+# VENDOR_SQL / MENU_SQL (plus vendor_id), so the per-vendor shaping is shared
+SNAPSHOT_VENDORS_SQL = """
+    SELECT id, vendor_name, location, pickup_available, delivery_available
+    FROM vendors
+    ORDER BY id;
+"""
+SNAPSHOT_MENUS_SQL = """
+    SELECT 
+        m.vendor_id,
+        m.id AS menu_id,
+        m.title AS menu_title,
+        m.is_active,
+        mi.id AS item_id,
+        mi.name AS item_name,
+        mi.description,
+        mi.price,
+        mi.available,
+        mi.stock,
+        mi.preparation_time_minutes,
+        mi.image_url
+    FROM menus m
+    LEFT JOIN menu_items mi ON m.id = mi.menu_id
+    WHERE m.is_active = TRUE
+    ORDER BY m.vendor_id, mi.name;
+"""
+
+
+def db_unreachable(error):
+    """Whether an exception means the database is down or not answering (not a bad query)"""
+    from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+    if isinstance(error, (OperationalError, InterfaceError, OSError, TimeoutError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+def serves_snapshot(f):
+    """Marks a catalog read that may run on the token's claims while the database is unreachable"""
+    f.serves_snapshot = True
+    return f
+
+
+def encode_snapshot(directory, menus, written_at):
+    """
+    directory: sort -> vendor list; menus: vendor id -> (cache version, (vendor, menu));
+    written_at: epoch seconds. Returns the file's bytes
+    """
+    blobs = []
+    offset = 0
+
+    def add(value):
+        nonlocal offset
+        blob = json.dumps(value, default=str, separators=(",", ":")).encode()
+        blobs.append(blob)
+        entry = [offset, len(blob)]
+        offset += len(blob)
+        return entry
+
+    index = {"written_at": written_at, "directory": {}, "menus": {}}
+    for sort, vendors in directory.items():
+        index["directory"][sort] = add(vendors)
+    for vendor_id, (version, (vendor, menu)) in menus.items():
+        index["menus"][str(vendor_id)] = add({"vendor": vendor, "menu": menu}) + [version]
+
+    index_bytes = json.dumps(index, separators=(",", ":")).encode()
+    return b"".join([HEADER.pack(MAGIC, len(index_bytes)), index_bytes, *blobs])
+
+
+class MappedSnapshot:
+    """A snapshot file mapped read-only; entries are decoded on demand"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._map) < HEADER.size:
+                raise ValueError(f"{path} is truncated")
+            magic, length = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a catalog snapshot")
+            # a cut-off index fails to parse (JSONDecodeError is a ValueError)
+            self.index = json.loads(self._map[HEADER.size:HEADER.size + length])
+        except ValueError:
+            self._map.close()
+            raise
+        self._base = HEADER.size + length
+
+    def same_file(self, stat):
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size) == (
+            self.stat.st_ino, self.stat.st_mtime_ns, self.stat.st_size
+        )
+
+    def read(self, entry):
+        start = self._base + entry[0]
+        return json.loads(self._map[start:start + entry[1]])
+
+    @property
+    def age(self):
+        return time.time() - self.index["written_at"]
+
+    def degraded(self):
+        return {
+            "degraded": True,
+            "snapshot_at": datetime.fromtimestamp(self.index["written_at"], timezone.utc).isoformat(),
+            "snapshot_age_seconds": int(self.age),
+        }
+
+
+class CatalogSnapshot:
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._app = None
+        self._mapped = None
+        self._checked = 0.0
+        self.enabled = True
+        self.path = None
+        self.interval = 15
+        self.writes = self.degraded_reads = self.warmed = 0
+        self.last_error = None
+        cache_bus.on_connect(self.warm)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.enabled = app.config.get("SNAPSHOT_ENABLED", True)
+        self.path = app.config.get("SNAPSHOT_PATH") or os.path.join(app.instance_path, "catalog.snapshot")
+        self.interval = app.config.get("SNAPSHOT_SECONDS", 15)
+        app.extensions["catalog_snapshot"] = self
+        app.before_request(self.ensure_started)
+
+    # ============================================
+    # READING
+    # ============================================
+
+    def current(self):
+        """The newest snapshot on disk (looked up at most once a second), or None"""
+        if not self.enabled or self.path is None:
+            return None
+        now = time.monotonic()
+        if now - self._checked < CHECK_SECONDS:
+            return self._mapped
+        with self._lock:
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+                if self._mapped is None or not self._mapped.same_file(stat):
+                    self._mapped = MappedSnapshot(self.path)
+            except (OSError, ValueError) as e:
+                # keep serving the last good one
+                self.last_error = str(e)
+            return self._mapped
+
+    def degraded_directory(self, sort):
+        """(body, status) for GET /vendors from the snapshot, or None without one"""
+        mapped = self.current()
+        if mapped is None or sort not in mapped.index["directory"]:
+            return None
+        vendors = mapped.read(mapped.index["directory"][sort])
+        self.degraded_reads += 1
+        return {
+            "vendors": vendors,
+            "total": len(vendors),
+            "sort": sort,
+            "message": "Database unreachable: vendors from the last catalog snapshot",
+            **mapped.degraded()
+        }, 200
+
+    def degraded_menu(self, vendor_id):
+        """(body, status) for GET /vendors/<id>/menu from the snapshot, or None without one"""
+        mapped = self.current()
+        if mapped is None:
+            return None
+        self.degraded_reads += 1
+        entry = mapped.index["menus"].get(str(vendor_id))
+        if entry is None:
+            return {"error": "Vendor not found", **mapped.degraded()}, 404
+        found = mapped.read(entry)
+        return {"vendor": found["vendor"], "menu": found["menu"], **mapped.degraded()}, 200
+
+    def warm(self, conn):
+        """Cache bus connect hook: menus still at their snapshot version go into the menu cache"""
+        mapped = self.current()
+        if mapped is None or (menu_cache.ttl is not None and mapped.age >= menu_cache.ttl):
+            return
+        token = menu_cache.begin()
+        with conn.cursor() as cursor:
+            cursor.execute(MENU_VERSIONS_SQL)
+            versions = dict(cursor.fetchall())
+        age = mapped.age
+        for vendor_id, entry in mapped.index["menus"].items():
+            if versions.get(vendor_id, 0) != entry[2]:
+                continue
+            found = mapped.read(entry)
+            if menu_cache.put(int(vendor_id), entry[2], (found["vendor"], found["menu"]), token, age=age):
+                self.warmed += 1
+
+    def stats(self):
+        mapped = self.current()
+        return {
+            "path": self.path,
+            "snapshot_at": mapped.degraded()["snapshot_at"] if mapped else None,
+            "age_seconds": int(mapped.age) if mapped else None,
+            "vendors": len(mapped.index["menus"]) if mapped else 0,
+            "writes": self.writes,
+            "warmed_menus": self.warmed,
+            "degraded_reads": self.degraded_reads,
+            "last_error": self.last_error,
+        }
+
+    # ============================================
+    # WRITER THREAD
+    # ============================================
+
+    def ensure_started(self):
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="catalog-snapshot", daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self.write_if_due()
+            except Exception as e:
+                # most likely the database is down: exactly when the old snapshot is needed
+                self.last_error = str(e)
+                self._app.logger.warning("Catalog snapshot not written: %s", e)
+            time.sleep(self.interval)
+
+    def write_if_due(self):
+        """Write a new snapshot unless another worker holds the lock or just wrote one"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".lock", "a") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+            try:
+                if time.time() - os.stat(self.path).st_mtime < self.interval / 2:
+                    return False
+            except FileNotFoundError:
+                pass
+
+            with self._app.app_context():
+                data = build_snapshot()
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self.writes += 1
+            self.last_error = None
+            return True
+
+
+def build_snapshot():
+    """
+    The current directory and menus, encoded (needs an app context)
+    A fixed number of queries however many vendors there are: one per directory sort,
+    then the menu versions, every vendor and every active menu
+    """
+    from .customer_routes import VENDOR_SORTS, vendor_directory_sql, shape_menu, row_to_dict
+
+    written_at = time.time()
+    directory = {
+        sort: [row_to_dict(row) for row in db.session.execute(db.text(vendor_directory_sql(sort)))]
+        for sort in VENDOR_SORTS
+    }
+
+    # versions before the data, like fetch_vendor_menu(): a menu written in between
+    # carries an older version than its data and is simply not used for warm starts
+    versions = dict(db.session.execute(db.text(MENU_VERSIONS_SQL)).all())
+    menu_rows = {}
+    for row in db.session.execute(db.text(SNAPSHOT_MENUS_SQL)):
+        menu_rows.setdefault(row.vendor_id, []).append(row)
+
+    menus = {}
+    for vendor in db.session.execute(db.text(SNAPSHOT_VENDORS_SQL)):
+        menus[vendor.id] = (
+            versions.get(str(vendor.id), 0),
+            (row_to_dict(vendor), shape_menu(menu_rows.get(vendor.id, [])))
+        )
+    return encode_snapshot(directory, menus, written_at)
+
+
+catalog_snapshot = CatalogSnapshot()
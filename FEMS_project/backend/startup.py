@@ -0,0 +1,120 @@
+# backend/startup.py
+"""
+Worker cold start for FEMS
+
+With autoscaling, a new worker's first request is the number that matters. This module:
+- times each step of boot (imports, create_app phases, the schema step) per process
+- prepare_schema(): instead of db.create_all() (a catalog round trip per table on every
+  boot), the production entry points compare schema_migrations with the newest
+  migration this code ships, in one query, and refuse to start on an older schema
+- times the first request each process serves, measured from the fork (gunicorn
+  post_fork calls mark_fork()) or from process start, against STARTUP_BUDGET_MS;
+  going over the budget is logged as a warning with the phase breakdown
+
+Optional subsystems stay out of boot: the ETA engine builds its queues on first use,
+and the release scheduler starts its thread on the first request.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from .extensions import db
+
+DEFAULT_BUDGET_MS = 500
+SCHEMA_MODES = ("check", "create_all", "skip")
+
+
+class StartupTimer:
+    def __init__(self):
+        self._pid = os.getpid()
+        self._started = time.perf_counter()     # first import of backend.startup
+        self.phases = []                        # (name, ms)
+        self.first_request_ms = None
+        self.budget_ms = DEFAULT_BUDGET_MS
+        self._app = None
+
+    def init_app(self, app):
+        self._app = app
+        self.budget_ms = app.config.get("STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)
+        app.extensions["startup"] = self
+        app.after_request(self._after_request)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started)
+
+    def record(self, name, started):
+        self.phases.append((name, round((time.perf_counter() - started) * 1000, 1)))
+
+    def mark_fork(self):
+        """Called in a freshly forked worker: its first request is measured from here"""
+        self._pid = os.getpid()
+        self._started = time.perf_counter()
+        self.first_request_ms = None
+
+    def since_start_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 1)
+
+    def report(self):
+        return {
+            "pid": os.getpid(),
+            "phases": dict(self.phases),
+            "first_request_ms": self.first_request_ms,
+            "budget_ms": self.budget_ms,
+        }
+
+    def _after_request(self, response):
+        if self._pid != os.getpid():
+            # forked by a server that doesn't call mark_fork(): the fork time is unknown,
+            # so this worker's first request can't be timed (it reports ~0 ms)
+            self.mark_fork()
+        if self.first_request_ms is not None:
+            return response
+
+        self.first_request_ms = self.since_start_ms()
+        phases = ", ".join(f"{name} {ms} ms" for name, ms in self.phases)
+        if self.first_request_ms > self.budget_ms:
+            self._app.logger.warning(
+                "First request served %s ms after start, over the %s ms budget (%s)",
+                self.first_request_ms, self.budget_ms, phases
+            )
+        else:
+            self._app.logger.info("First request served %s ms after start (%s)", self.first_request_ms, phases)
+        return response
+
+
+def prepare_schema(app, default_mode="check"):
+    """
+    check: one query; RuntimeError when the database is behind this code
+    create_all: db.create_all() (the dev server default, builds a fresh database)
+    skip: nothing
+    """
+    mode = app.config.get("SCHEMA_STARTUP") or default_mode
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"SCHEMA_STARTUP must be one of: {', '.join(SCHEMA_MODES)}")
+
+    with startup_timer.phase(f"schema {mode}"), app.app_context():
+        if mode == "create_all":
+            from . import models  # noqa: F401 (registers the tables)
+            db.create_all()
+        elif mode == "check":
+            from .migrations import schema_version, latest_version
+
+            current, expected = schema_version(db.engine), latest_version()
+            if current is None or current < expected:
+                raise RuntimeError(
+                    f"Database schema is at version {current or 0}, this code needs {expected}: "
+                    f"run flask --app backend.app db-migrate"
+                )
+            if current > expected:
+                # rolling deploy: the database already has the next release's migrations
+                app.logger.warning("Database schema version %s is newer than this code (%s)", current, expected)
+    return mode
+
+
+startup_timer = StartupTimer()
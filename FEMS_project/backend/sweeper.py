@@ -0,0 +1,256 @@
+# backend/sweeper.py
+"""
+Maintenance sweeper for FEMS
+
+Jobs:
+- stale_orders: pending orders whose scheduled_for passed more than grace minutes ago
+  are rejected (customer gets an 'order_status' notification with reason 'expired');
+  the order triggers give back stock, slot minutes and queue counters as usual
+- verification_codes: email_verifications rows past expires_at are deleted (codes live
+  VERIFICATION_CODE_EXPIRES_MINUTES, so used codes go too once they would have expired)
+- menu_changes: menu_item_changes rows older than MENU_CHANGE_KEEP_HOURS are deleted and
+  the vendor's compacted_through moves up, so clients asking for changes from before it
+  get the full menu instead
+
+Every batch is one short transaction: at most batch_size rows picked through an index
+(ORDER BY + LIMIT) with FOR UPDATE SKIP LOCKED, so a row a customer or vendor is
+touching right now is skipped until the next run, and nothing waits on a lock for
+longer than LOCK_TIMEOUT. Each run records its metrics in maintenance_runs.
+
+Usage:
+    flask --app backend.app sweep [--dry-run] [--job stale_orders] [--every 60]
+"""
+
+import json
+import time
+
+from .extensions import db
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_BATCHES = 100
+DEFAULT_GRACE_MINUTES = 30
+MENU_CHANGE_KEEP_HOURS = 7 * 24
+LOCK_TIMEOUT = "2s"
+
+
+def _batch_settings():
+    db.session.execute(db.text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}';"))
+
+
+def sweep_stale_orders(batch_size, max_batches, grace_minutes, dry_run=False):
+    """Reject pending orders that were never picked up in time; returns (rows, batches, details)"""
+    params = {"batch_size": batch_size, "grace_minutes": grace_minutes}
+
+    if dry_run:
+        rows = db.session.execute(db.text("""
+            SELECT o.id, o.vendor_id, o.scheduled_for
+            FROM orders o
+            WHERE o.status = 'pending'
+            AND o.scheduled_for < NOW() - make_interval(mins => :grace_minutes)
+            ORDER BY o.scheduled_for
+            LIMIT :limit;
+        """), {**params, "limit": batch_size * max_batches}).all()
+        db.session.rollback()
+        return len(rows), 0, _order_details(rows)
+
+    swept = []
+    batches = 0
+    while batches < max_batches:
+        _batch_settings()
+        rows = db.session.execute(db.text("""
+            WITH stale AS (
+                SELECT o.id, o.placed_at
+                FROM orders o
+                WHERE o.status = 'pending'
+                AND o.scheduled_for < NOW() - make_interval(mins => :grace_minutes)
+                ORDER BY o.scheduled_for
+                LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED
+            ),
+            rejected AS (
+                UPDATE orders o
+                SET status = 'rejected', version = o.version + 1
+                FROM stale s
+                WHERE o.id = s.id AND o.placed_at = s.placed_at
+                RETURNING o.id, o.vendor_id, o.customer_id, o.scheduled_for
+            ),
+            notified AS (
+                INSERT INTO notifications (user_id, type, payload)
+                SELECT
+                    r.customer_id,
+                    'order_status',
+                    jsonb_build_object(
+                        'order_id', r.id,
+                        'vendor_id', r.vendor_id,
+                        'old_status', 'pending',
+                        'new_status', 'rejected',
+                        'reason', 'expired'
+                    )
+                FROM rejected r
+                WHERE r.customer_id IS NOT NULL
+                RETURNING 1
+            )
+            SELECT id, vendor_id, scheduled_for FROM rejected;
+        """), params).all()
+        db.session.commit()
+
+        batches += 1
+        swept.extend(rows)
+        if len(rows) < batch_size:
+            break
+
+    return len(swept), batches, _order_details(swept)
+
+
+def _order_details(rows):
+    per_vendor = {}
+    for row in rows:
+        per_vendor[row.vendor_id] = per_vendor.get(row.vendor_id, 0) + 1
+    return {
+        "per_vendor": {str(vendor_id): count for vendor_id, count in sorted(per_vendor.items())},
+        "oldest_scheduled_for": min(row.scheduled_for for row in rows).isoformat() if rows else None,
+    }
+
+
+def prune_verification_codes(batch_size, max_batches, dry_run=False):
+    """Delete expired email verification codes; returns (rows, batches, details)"""
+    if dry_run:
+        count = db.session.execute(db.text("""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM email_verifications
+                WHERE expires_at < NOW()
+                LIMIT :limit
+            ) expired;
+        """), {"limit": batch_size * max_batches}).scalar()
+        db.session.rollback()
+        return count, 0, {}
+
+    deleted = 0
+    batches = 0
+    while batches < max_batches:
+        _batch_settings()
+        rows = db.session.execute(db.text("""
+            WITH expired AS (
+                SELECT id
+                FROM email_verifications
+                WHERE expires_at < NOW()
+                ORDER BY expires_at
+                LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED
+            )
+            DELETE FROM email_verifications ev
+            USING expired e
+            WHERE ev.id = e.id;
+        """), {"batch_size": batch_size}).rowcount
+        db.session.commit()
+
+        batches += 1
+        deleted += rows
+        if rows < batch_size:
+            break
+
+    return deleted, batches, {}
+
+
+def compact_menu_changes(batch_size, max_batches, dry_run=False):
+    """Delete old menu change log rows; returns (rows, batches, details)"""
+    params = {"batch_size": batch_size, "keep_hours": MENU_CHANGE_KEEP_HOURS}
+
+    if dry_run:
+        count = db.session.execute(db.text("""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM menu_item_changes
+                WHERE changed_at < NOW() - make_interval(hours => :keep_hours)
+                LIMIT :limit
+            ) expired;
+        """), {**params, "limit": batch_size * max_batches}).scalar()
+        db.session.rollback()
+        return count, 0, {}
+
+    per_vendor = {}
+    batches = 0
+    while batches < max_batches:
+        _batch_settings()
+        # the log rows and the new compacted_through commit together, so a reader
+        # (one statement over both) never sees rows missing without knowing it
+        rows = db.session.execute(db.text("""
+            WITH expired AS (
+                SELECT vendor_id, version
+                FROM menu_item_changes
+                WHERE changed_at < NOW() - make_interval(hours => :keep_hours)
+                ORDER BY changed_at
+                LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED
+            ),
+            deleted AS (
+                DELETE FROM menu_item_changes c
+                USING expired e
+                WHERE c.vendor_id = e.vendor_id AND c.version = e.version
+                RETURNING c.vendor_id, c.version
+            ),
+            compacted AS (
+                UPDATE menu_change_heads h
+                SET compacted_through = GREATEST(h.compacted_through, d.version)
+                FROM (SELECT vendor_id, MAX(version) AS version FROM deleted GROUP BY vendor_id) d
+                WHERE h.vendor_id = d.vendor_id
+                RETURNING h.vendor_id
+            )
+            SELECT vendor_id FROM deleted;
+        """), params).all()
+        db.session.commit()
+
+        batches += 1
+        for row in rows:
+            per_vendor[row.vendor_id] = per_vendor.get(row.vendor_id, 0) + 1
+        if len(rows) < batch_size:
+            break
+
+    details = {"per_vendor": {str(vendor_id): count for vendor_id, count in sorted(per_vendor.items())}}
+    return sum(per_vendor.values()), batches, details
+
+
+JOBS = {
+    "stale_orders": lambda opts: sweep_stale_orders(
+        opts["batch_size"], opts["max_batches"], opts["grace_minutes"], opts["dry_run"]
+    ),
+    "verification_codes": lambda opts: prune_verification_codes(
+        opts["batch_size"], opts["max_batches"], opts["dry_run"]
+    ),
+    "menu_changes": lambda opts: compact_menu_changes(
+        opts["batch_size"], opts["max_batches"], opts["dry_run"]
+    ),
+}
+
+
+def run_sweep(jobs=None, batch_size=DEFAULT_BATCH_SIZE, max_batches=DEFAULT_MAX_BATCHES,
+              grace_minutes=DEFAULT_GRACE_MINUTES, dry_run=False):
+    """Run the given jobs (default all) once; returns one metrics dict per job"""
+    opts = {
+        "batch_size": batch_size,
+        "max_batches": max_batches,
+        "grace_minutes": grace_minutes,
+        "dry_run": dry_run,
+    }
+    results = []
+    for job in jobs or JOBS:
+        started = time.perf_counter()
+        rows, batches, details = JOBS[job](opts)
+        metrics = {
+            "job": job,
+            "dry_run": dry_run,
+            "rows": rows,
+            "batches": batches,
+            "duration_ms": int((time.perf_counter() - started) * 1000),
+            "details": details,
+        }
+        _record(metrics)
+        results.append(metrics)
+    return results
+
+
+def _record(metrics):
+    db.session.execute(db.text("""
+        INSERT INTO maintenance_runs (job, dry_run, rows_affected, batches, duration_ms, details)
+        VALUES (:job, :dry_run, :rows, :batches, :duration_ms, CAST(:details AS JSONB));
+    """), {**metrics, "details": json.dumps(metrics["details"])})
+    db.session.commit()
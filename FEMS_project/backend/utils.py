@@ -24,11 +24,19 @@ def create_token(user_id: int, role: str) -> str:
     # PyJWT returns str in modern versions
     return token
 
-def decode_token(token: str):
-    secret = current_app.config["SECRET_KEY"]
-    algorithm = current_app.config.get("JWT_ALGORITHM", "HS256")
+def decode_token(token: str, config=None):
+    # config: an app's config when called outside a Flask request (the ASGI reads)
+    config = current_app.config if config is None else config
+    secret = config["SECRET_KEY"]
+    algorithm = config.get("JWT_ALGORITHM", "HS256")
     return jwt.decode(token, secret, algorithms=[algorithm])
 
 def generate_verification_code(length=32) -> str:
     # generates a secure hex token (length bytes -> 2*length hex chars)
-    return secrets.token_hex(length)
\ No newline at end of file
+    return secrets.token_hex(length)
+
+def order_tables(include_archived: bool = False):
+    # archived months live in the archive schema and are only read when a caller asks for them
+    if include_archived:
+        return "orders_all", "order_items_all"
+    return "orders", "order_items"
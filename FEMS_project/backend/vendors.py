@@ -10,13 +10,20 @@ Features:
 5. Inventory Tracking
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from .extensions import db
 from .models import Vendor  # Only for type hints/validation
 from .auth import token_required
+from .utils import order_tables
+from .order_status import ORDER_STATUSES
+from .eta import eta_engine, iso_eta
+from .cache import cache_bus
+from .query_cache import query_cache
 from datetime import datetime, timedelta
 from decimal import Decimal
 import json
+import csv
+import io
 
 bp = Blueprint("vendors", __name__, url_prefix="/api/vendors")
 
@@ -91,6 +98,9 @@ def create_menu(current_user, vendor_id):
             {"vendor_id": vendor_id, "title": title}
         ).first()
         
+        if result and not result.status_message.startswith("ERROR"):
+            cache_bus.publish("menu", vendor_id)
+        
         db.session.commit()
         
         if not result or result.status_message.startswith("ERROR"):
@@ -120,8 +130,9 @@ def create_menu(current_user, vendor_id):
 @require_vendor
 def add_menu_items(current_user, vendor_id, menu_id):
     """
-    Add menu items using stored procedure
-    SQL: Calls add_menu_item() for each item
+    Add menu items (single object or array); names already on the menu are rejected
+    (409, nothing added) - the bulk import endpoint updates existing items
+    SQL: One multi-row INSERT ... ON CONFLICT (menu_id, name) DO NOTHING via upsert_menu_items()
     """
     try:
         # Verify ownership
@@ -133,58 +144,26 @@ def add_menu_items(current_user, vendor_id, menu_id):
         
         if not items:
             return jsonify({"error": "items array cannot be empty"}), 400
+        if len(items) > MENU_IMPORT_MAX_ROWS:
+            return jsonify({"error": f"At most {MENU_IMPORT_MAX_ROWS} items per request"}), 400
         
-        created_items = []
+        rows, errors = validate_menu_import_rows(items)
+        if errors:
+            return jsonify({"error": "Invalid menu items", "errors": errors}), 400
         
-        for item in items:
-            name = item.get("name", "").strip()
-            price = item.get("price")
-            
-            if not name or price is None:
-                return jsonify({"error": "Each item requires name and price"}), 400
-            
-            # Call stored procedure for each item
-            sql = """
-                SELECT * FROM add_menu_item(
-                    :vendor_id,
-                    :menu_id,
-                    :name,
-                    :description,
-                    :price,
-                    :available,
-                    :prep_time,
-                    :image_url
-                );
-            """
-            
-            result = db.session.execute(
-                db.text(sql),
-                {
-                    "vendor_id": vendor_id,
-                    "menu_id": menu_id,
-                    "name": name,
-                    "description": item.get("description", ""),
-                    "price": price,
-                    "available": item.get("available", True),
-                    "prep_time": item.get("preparation_time_minutes", 15),
-                    "image_url": item.get("image_url")
-                }
-            ).first()
-            
-            if not result or result.status_message.startswith("ERROR"):
-                db.session.rollback()
-                error_msg = result.status_message if result else "Failed to add item"
-                return jsonify({"error": error_msg}), 400
-            
-            created_items.append({
-                "id": result.item_id,
-                "name": result.name,
-                "description": result.description,
-                "price": float(result.price) if result.price else 0.0,
-                "available": result.available,
-                "preparation_time_minutes": result.preparation_time_minutes,
-                "image_url": result.image_url
-            })
+        result = upsert_menu_items(vendor_id, menu_id, rows, update_existing=False)
+        if result is None:
+            return jsonify({"error": "ERROR: Menu not found or access denied"}), 400
+        
+        created_items, _, _ = result
+        if len(created_items) < len(rows):
+            db.session.rollback()
+            created_names = {item["name"] for item in created_items}
+            duplicates = [row["name"] for row in rows if row["name"] not in created_names]
+            return jsonify({
+                "error": "Menu already has item(s) with these names; nothing was added",
+                "duplicates": duplicates
+            }), 409
         
         db.session.commit()
         
@@ -246,6 +225,9 @@ def update_menu_item(current_user, vendor_id, menu_id, item_id):
             }
         ).first()
         
+        if result and not result.status_message.startswith("ERROR"):
+            bump_menu_version(vendor_id, menu_id)
+        
         db.session.commit()
         
         if not result or result.status_message.startswith("ERROR"):
@@ -296,6 +278,9 @@ def delete_menu_item(current_user, vendor_id, menu_id, item_id):
             {"vendor_id": vendor_id, "menu_id": menu_id, "item_id": item_id}
         ).first()
         
+        if result and not result.status_message.startswith("ERROR"):
+            bump_menu_version(vendor_id, menu_id)
+        
         db.session.commit()
         
         if not result or result.status_message.startswith("ERROR"):
@@ -360,6 +345,7 @@ def get_vendor(vendor_id):
                 mi.description,
                 mi.price,
                 mi.available,
+                mi.stock,
                 mi.preparation_time_minutes,
                 mi.image_url
             FROM menus m
@@ -392,6 +378,7 @@ def get_vendor(vendor_id):
                     "description": row.description,
                     "price": float(row.price) if row.price else 0.0,
                     "available": row.available,
+                    "stock": row.stock,
                     "preparation_time_minutes": row.preparation_time_minutes,
                     "image_url": row.image_url
                 })
@@ -419,6 +406,8 @@ def get_vendor(vendor_id):
 def get_vendor_orders(current_user, vendor_id):
     """
     Get vendor's orders with filters and items
+    (pending orders held for a later pickup are hidden until their release time
+    unless include_scheduled=true)
     SQL: Raw SQL with JOINs
     """
     try:
@@ -429,13 +418,16 @@ def get_vendor_orders(current_user, vendor_id):
         # Get query parameters
         status_filter = request.args.get("status")
         limit = request.args.get("limit", 50, type=int)
+        include_archived = request.args.get("include_archived", "false").lower() == "true"
+        include_scheduled = request.args.get("include_scheduled", "false").lower() == "true"
+        orders_table, items_table = order_tables(include_archived)
 
         # Validate limit
         if limit < 1 or limit > 100:
             return jsonify({"error": "Limit must be between 1 and 100"}), 400
 
         # Get orders
-        sql = """
+        sql = f"""
             SELECT
                 o.id AS order_id,
                 o.customer_id,
@@ -449,19 +441,25 @@ def get_vendor_orders(current_user, vendor_id):
                 o.payment_status,
                 o.pickup_or_delivery,
                 o.notes,
-                o.estimated_ready_at
-            FROM orders o
+                o.estimated_ready_at,
+                o.release_at,
+                o.released_at
+            FROM {orders_table} o
             INNER JOIN users u ON o.customer_id = u.id
             WHERE o.vendor_id = :vendor_id
         """
 
         params = {"vendor_id": vendor_id}
 
+        # Held orders: judged by release_at rather than released_at, so a lagging
+        # scheduler never hides an order that is due
+        if not include_scheduled:
+            sql += " AND (o.status <> 'pending' OR o.release_at IS NULL OR o.release_at <= NOW())"
+
         # Add status filter if provided
         if status_filter:
-            valid_statuses = ['pending', 'accepted', 'preparing', 'ready', 'completed', 'cancelled', 'rejected']
-            if status_filter not in valid_statuses:
-                return jsonify({"error": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"}), 400
+            if status_filter not in ORDER_STATUSES:
+                return jsonify({"error": f"Invalid status. Must be one of: {', '.join(ORDER_STATUSES)}"}), 400
             sql += " AND o.status = :status"
             params["status"] = status_filter
 
@@ -476,31 +474,34 @@ def get_vendor_orders(current_user, vendor_id):
 
         # Fetch items for each order
         for order in orders:
-            items_sql = """
+            items_sql = f"""
                 SELECT
                     id,
                     name_snapshot AS name,
                     price_snapshot AS price,
                     quantity,
                     notes
-                FROM order_items
-                WHERE order_id = :order_id
+                FROM {items_table}
+                WHERE order_id = :order_id AND placed_at = :placed_at
                 ORDER BY id;
             """
 
             items_result = db.session.execute(
                 db.text(items_sql),
-                {"order_id": order["order_id"]}
+                {"order_id": order["order_id"], "placed_at": order["placed_at"]}
             )
 
             order["items"] = [row_to_dict(row) for row in items_result]
+            order["eta"] = iso_eta(order["order_id"], order["estimated_ready_at"])
 
         return jsonify({
             "orders": orders,
             "total": len(orders),
             "filters": {
                 "status": status_filter,
-                "limit": limit
+                "limit": limit,
+                "include_archived": include_archived,
+                "include_scheduled": include_scheduled
             }
         }), 200
 
@@ -524,8 +525,11 @@ def get_order_details(current_user, vendor_id, order_id):
         if not verify_vendor_ownership(current_user.id, vendor_id):
             return jsonify({"error": "Access denied"}), 403
         
+        include_archived = request.args.get("include_archived", "false").lower() == "true"
+        orders_table, items_table = order_tables(include_archived)
+        
         # Get order details
-        order_sql = """
+        order_sql = f"""
             SELECT 
                 o.id,
                 o.customer_id,
@@ -539,8 +543,9 @@ def get_order_details(current_user, vendor_id, order_id):
                 o.payment_status,
                 o.pickup_or_delivery,
                 o.notes,
-                o.estimated_ready_at
-            FROM orders o
+                o.estimated_ready_at,
+                o.version
+            FROM {orders_table} o
             INNER JOIN users u ON o.customer_id = u.id
             WHERE o.id = :order_id AND o.vendor_id = :vendor_id;
         """
@@ -553,8 +558,8 @@ def get_order_details(current_user, vendor_id, order_id):
         if not order_result:
             return jsonify({"error": "Order not found"}), 404
         
-        # Get order items
-        items_sql = """
+        # Get order items (placed_at prunes to the order's partition)
+        items_sql = f"""
             SELECT 
                 id,
                 menu_item_id,
@@ -563,20 +568,23 @@ def get_order_details(current_user, vendor_id, order_id):
                 quantity,
                 notes,
                 (price_snapshot * quantity) AS item_total
-            FROM order_items
-            WHERE order_id = :order_id
+            FROM {items_table}
+            WHERE order_id = :order_id AND placed_at = :placed_at
             ORDER BY id;
         """
         
         items_result = db.session.execute(
             db.text(items_sql),
-            {"order_id": order_id}
+            {"order_id": order_id, "placed_at": order_result.placed_at}
         )
         
         items = [row_to_dict(row) for row in items_result]
         
+        order = row_to_dict(order_result)
+        order["eta"] = iso_eta(order_id, order["estimated_ready_at"])
+        
         return jsonify({
-            "order": row_to_dict(order_result),
+            "order": order,
             "items": items,
             "items_count": len(items)
         }), 200
@@ -594,7 +602,8 @@ def get_order_details(current_user, vendor_id, order_id):
 def update_order_status(current_user, vendor_id, order_id):
     """
     Update order status (pending -> accepted -> preparing -> ready -> completed)
-    SQL: Calls update_order_status() stored procedure
+    Optional "version" makes the update conditional on the order being unchanged
+    SQL: Calls update_order_status() stored procedure (compare-and-set, 409 on conflict)
     """
     try:
         # Verify ownership
@@ -604,9 +613,12 @@ def update_order_status(current_user, vendor_id, order_id):
         data = request.get_json() or {}
         new_status = data.get("status", "").strip()
         estimated_ready_at = data.get("estimated_ready_at")
+        expected_version = data.get("version")
         
         if not new_status:
             return jsonify({"error": "status is required"}), 400
+        if expected_version is not None and (not isinstance(expected_version, int) or isinstance(expected_version, bool)):
+            return jsonify({"error": "version must be an integer"}), 400
         
         # Parse estimated_ready_at if provided
         ready_time = None
@@ -622,7 +634,8 @@ def update_order_status(current_user, vendor_id, order_id):
                 :vendor_id,
                 :order_id,
                 :new_status,
-                :estimated_ready_at
+                :estimated_ready_at,
+                :expected_version
             );
         """
         
@@ -632,23 +645,47 @@ def update_order_status(current_user, vendor_id, order_id):
                 "vendor_id": vendor_id,
                 "order_id": order_id,
                 "new_status": new_status,
-                "estimated_ready_at": ready_time
+                "estimated_ready_at": ready_time,
+                "expected_version": expected_version
             }
         ).first()
         
         db.session.commit()
         
+        if result and result.status_message.startswith("CONFLICT"):
+            return jsonify({
+                "error": result.status_message,
+                "current_status": result.old_status,
+                "version": result.version
+            }), 409
+        
         if not result or result.status_message.startswith("ERROR"):
             error_msg = result.status_message if result else "Failed to update status"
             return jsonify({"error": error_msg}), 400
         
+        # Move the order through the in-memory queue; store the engine's estimate
+        # unless the vendor gave one (version guard: skip if the order moved on)
+        estimated_ready_at = result.estimated_ready_at
+        eta = eta_engine.status_changed(order_id, result.new_status, vendor_id=vendor_id)
+        if ready_time is None and eta is not None:
+            db.session.execute(
+                db.text("""
+                    UPDATE orders SET estimated_ready_at = :eta
+                    WHERE id = :order_id AND vendor_id = :vendor_id AND version = :version;
+                """),
+                {"eta": eta, "order_id": order_id, "vendor_id": vendor_id, "version": result.version}
+            )
+            db.session.commit()
+            estimated_ready_at = eta
+        
         return jsonify({
             "message": "Order status updated successfully",
             "order": {
                 "id": result.order_id,
                 "old_status": result.old_status,
                 "new_status": result.new_status,
-                "estimated_ready_at": result.estimated_ready_at.isoformat() if result.estimated_ready_at else None
+                "estimated_ready_at": estimated_ready_at.isoformat() if estimated_ready_at else None,
+                "version": result.version
             }
         }), 200
         
@@ -712,7 +749,1186 @@ def get_vendor_stats(current_user, vendor_id):
 
 
 # ============================================
-# 10. HEALTH CHECK
+# 10. GET MENU ITEM STATS (Best Sellers)
+# ============================================
+MENU_STATS_SORT_COLUMNS = {
+    "times_ordered": "COALESCE(s.times_ordered, 0)",
+    "quantity_sold": "COALESCE(s.quantity_sold, 0)",
+    "revenue": "COALESCE(s.revenue, 0)",
+    "last_ordered_at": "s.last_ordered_at",
+    "name": "mi.name",
+}
+
+
+@bp.route("/<int:vendor_id>/menu/stats", methods=["GET"])
+@token_required
+@require_vendor
+def get_menu_item_stats(current_user, vendor_id):
+    """
+    Get per-item sales counters (times ordered, quantity sold, revenue)
+    SQL: Primary-key join to menu_item_stats counters, no aggregate at read time
+    """
+    try:
+        # Verify ownership
+        if not verify_vendor_ownership(current_user.id, vendor_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        sort = request.args.get("sort", "quantity_sold")
+        order = request.args.get("order", "asc" if sort == "name" else "desc").lower()
+        limit = request.args.get("limit", 50, type=int)
+        
+        if sort not in MENU_STATS_SORT_COLUMNS:
+            return jsonify({"error": f"Invalid sort. Must be one of: {', '.join(MENU_STATS_SORT_COLUMNS)}"}), 400
+        if order not in ("asc", "desc"):
+            return jsonify({"error": "order must be 'asc' or 'desc'"}), 400
+        if limit < 1 or limit > 500:
+            return jsonify({"error": "Limit must be between 1 and 500"}), 400
+        
+        # sort column comes from the whitelist above, never from user input
+        sql = f"""
+            SELECT 
+                mi.id AS item_id,
+                mi.name,
+                mi.price,
+                mi.available,
+                COALESCE(s.times_ordered, 0) AS times_ordered,
+                COALESCE(s.quantity_sold, 0) AS quantity_sold,
+                COALESCE(s.revenue, 0) AS revenue,
+                s.last_ordered_at
+            FROM menu_items mi
+            LEFT JOIN menu_item_stats s ON s.menu_item_id = mi.id
+            WHERE mi.vendor_id = :vendor_id
+            ORDER BY {MENU_STATS_SORT_COLUMNS[sort]} {order.upper()} NULLS LAST, mi.id
+            LIMIT :limit;
+        """
+        
+        result = db.session.execute(
+            db.text(sql),
+            {"vendor_id": vendor_id, "limit": limit}
+        )
+        
+        items = [row_to_dict(row) for row in result]
+        
+        return jsonify({
+            "items": items,
+            "total": len(items),
+            "sort": {
+                "by": sort,
+                "order": order,
+                "limit": limit
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+# ============================================
+# 11. EXPORT ORDERS (Streaming CSV / NDJSON)
+# ============================================
+EXPORT_FETCH_SIZE = 2000  # rows pulled per round trip from the server-side cursor
+EXPORT_CHUNK_ROWS = 500   # rows buffered before a chunk is sent to the client
+
+EXPORT_COLUMNS = [
+    "order_id", "placed_at", "scheduled_for", "status", "payment_status",
+    "pickup_or_delivery", "total_amount", "order_notes", "customer_id",
+    "customer_name", "customer_email", "order_item_id", "menu_item_id",
+    "item_name", "item_price", "quantity", "item_notes"
+]
+
+ORDER_EXPORT_COLUMNS = EXPORT_COLUMNS[:EXPORT_COLUMNS.index("order_item_id")]
+ITEM_EXPORT_COLUMNS = EXPORT_COLUMNS[EXPORT_COLUMNS.index("order_item_id"):]
+
+
+def stream_export_rows(vendor_id, date_from, date_to, include_archived=False):
+    """
+    Yield one row per order item (orders and items joined in a single pass)
+    Uses a server-side (named) cursor so memory stays flat regardless of export size
+    """
+    orders_table, items_table = order_tables(include_archived)
+    
+    sql = f"""
+        SELECT
+            o.id AS order_id,
+            o.placed_at,
+            o.scheduled_for,
+            o.status,
+            o.payment_status,
+            o.pickup_or_delivery,
+            o.total_amount,
+            o.notes AS order_notes,
+            o.customer_id,
+            u.full_name AS customer_name,
+            u.email AS customer_email,
+            oi.id AS order_item_id,
+            oi.menu_item_id,
+            oi.name_snapshot AS item_name,
+            oi.price_snapshot AS item_price,
+            oi.quantity,
+            oi.notes AS item_notes
+        FROM {orders_table} o
+        LEFT JOIN users u ON o.customer_id = u.id
+        LEFT JOIN {items_table} oi ON oi.order_id = o.id AND oi.placed_at = o.placed_at
+        WHERE o.vendor_id = :vendor_id
+    """
+    
+    params = {"vendor_id": vendor_id}
+    
+    if date_from:
+        sql += " AND o.placed_at >= :date_from"
+        params["date_from"] = date_from
+    if date_to:
+        sql += " AND o.placed_at < :date_to"
+        params["date_to"] = date_to
+    
+    sql += """
+        ORDER BY o.placed_at, o.id, oi.id;
+    """
+    
+    # dedicated connection: the request session is torn down before the body finishes streaming
+    with db.engine.connect() as conn:
+        result = conn.execution_options(yield_per=EXPORT_FETCH_SIZE).execute(db.text(sql), params)
+        for row in result:
+            yield row_to_dict(row)
+
+
+def export_csv_chunks(rows):
+    """Encode export rows as CSV, one line per order item"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+
+
+def export_ndjson_chunks(rows):
+    """Encode export rows as NDJSON, one line per order with its items nested"""
+    lines = []
+    order = None
+    
+    for row in rows:
+        if order is None or order["order_id"] != row["order_id"]:
+            if order is not None:
+                lines.append(json.dumps(order))
+                if len(lines) >= EXPORT_CHUNK_ROWS:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            order = {column: row[column] for column in ORDER_EXPORT_COLUMNS}
+            order["items"] = []
+        
+        # LEFT JOIN leaves item columns NULL for orders without items
+        if row["order_item_id"] is not None:
+            order["items"].append({column: row[column] for column in ITEM_EXPORT_COLUMNS})
+    
+    if order is not None:
+        lines.append(json.dumps(order))
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+@bp.route("/<int:vendor_id>/orders/export", methods=["GET"])
+@token_required
+@require_vendor
+def export_vendor_orders(current_user, vendor_id):
+    """
+    Export all of a vendor's orders and items for a date range
+    SQL: Single JOIN over orders and order_items read through a server-side cursor
+    """
+    try:
+        # Verify ownership
+        if not verify_vendor_ownership(current_user.id, vendor_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        export_format = request.args.get("format", "csv").lower()
+        if export_format not in ("csv", "ndjson"):
+            return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+        
+        # Parse the optional [from, to) range on placed_at
+        bounds = {}
+        for param in ("from", "to"):
+            value = request.args.get(param)
+            bounds[param] = None
+            if value:
+                try:
+                    bounds[param] = datetime.fromisoformat(value.replace("Z", ""))
+                except ValueError:
+                    return jsonify({"error": f"Invalid {param} format. Use ISO format: 2025-12-01T00:00:00"}), 400
+        
+        if bounds["from"] and bounds["to"] and bounds["from"] >= bounds["to"]:
+            return jsonify({"error": "from must be earlier than to"}), 400
+        
+        include_archived = request.args.get("include_archived", "false").lower() == "true"
+        rows = stream_export_rows(vendor_id, bounds["from"], bounds["to"], include_archived)
+        
+        if export_format == "csv":
+            body, mimetype = export_csv_chunks(rows), "text/csv"
+        else:
+            body, mimetype = export_ndjson_chunks(rows), "application/x-ndjson"
+        
+        filename = f"vendor_{vendor_id}_orders.{export_format}"
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+        
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+# ============================================
+# 12. BULK MENU IMPORT (JSON array or CSV upload)
+# ============================================
+MENU_IMPORT_MAX_ROWS = 1000
+MENU_IMPORT_COLUMNS = [
+    "name", "description", "price", "available", "preparation_time_minutes", "image_url",
+]
+TRUE_VALUES = ("true", "1", "yes", "y")
+FALSE_VALUES = ("false", "0", "no", "n")
+
+
+def parse_bool(value, default):
+    """Accept JSON booleans as well as CSV strings like 'true' / 'no' / ''"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError("must be true or false")
+
+
+def validate_menu_import_rows(items):
+    """
+    Validate every row up front so the import is all-or-nothing
+    Returns (rows, errors); errors lists every bad row, not just the first
+    """
+    rows = []
+    errors = []
+    seen_names = {}
+    
+    for index, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            errors.append({"row": index, "error": "Each item must be an object"})
+            continue
+        
+        row_errors = []
+        name = item.get("name")
+        if name is not None and not isinstance(name, str):
+            row_errors.append("name must be a string")
+            name = None
+        else:
+            name = (name or "").strip()
+            if not name:
+                row_errors.append("name is required")
+            elif len(name) > 200:
+                row_errors.append("name must be at most 200 characters")
+            elif name in seen_names:
+                row_errors.append(f"duplicate name (also on row {seen_names[name]})")
+            else:
+                seen_names[name] = index
+        
+        for field in ("description", "image_url"):
+            if item.get(field) is not None and not isinstance(item.get(field), str):
+                row_errors.append(f"{field} must be a string")
+        
+        price = None
+        if item.get("price") in (None, ""):
+            row_errors.append("price is required")
+        else:
+            try:
+                price = Decimal(str(item.get("price")))
+                if not price.is_finite() or price < 0 or price >= Decimal("100000000"):
+                    raise ValueError
+            except Exception:
+                row_errors.append("price must be a non-negative number")
+        
+        try:
+            available = parse_bool(item.get("available"), True)
+        except ValueError as e:
+            row_errors.append(f"available {e}")
+        
+        prep_time = item.get("preparation_time_minutes")
+        try:
+            prep_time = 15 if prep_time in (None, "") else int(prep_time)
+            if prep_time < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            row_errors.append("preparation_time_minutes must be a non-negative integer")
+        
+        if row_errors:
+            errors.append({"row": index, "name": name or None, "error": "; ".join(row_errors)})
+            continue
+        
+        rows.append({
+            "name": name,
+            "description": item.get("description") or "",
+            "price": str(price),
+            "available": available,
+            "preparation_time_minutes": prep_time,
+            "image_url": item.get("image_url") or None,
+        })
+    
+    return rows, errors
+
+
+def read_menu_import_payload():
+    """Rows from an uploaded CSV (multipart 'file' or a text/csv body) or a JSON array"""
+    upload = request.files.get("file")
+    if upload is not None:
+        text = upload.read().decode("utf-8-sig")
+    elif request.mimetype == "text/csv":
+        text = request.get_data(as_text=True)
+    else:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload = payload.get("items")
+        if not isinstance(payload, list):
+            raise ValueError("Send a JSON array of items, {\"items\": [...]}, or a CSV file")
+        return payload
+    
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or "name" not in reader.fieldnames or "price" not in reader.fieldnames:
+        raise ValueError(f"CSV header must include name and price (columns: {', '.join(MENU_IMPORT_COLUMNS)})")
+    return [{key: value for key, value in row.items() if key in MENU_IMPORT_COLUMNS} for row in reader]
+
+
+def upsert_menu_items(vendor_id, menu_id, rows, update_existing=True):
+    """
+    Insert or update all rows in a single statement, bumping the menu version once
+    With update_existing=False rows whose name is already on the menu are skipped
+    (and missing from the returned items)
+    Returns (items, inserted_count, menu_version), or None when the menu isn't the vendor's
+    """
+    # Doubles as the ownership check and locks the menu row, so two imports
+    # into the same menu run one after the other
+    version = bump_menu_version(vendor_id, menu_id)
+    if version is None:
+        return None
+    
+    on_conflict = """
+        DO UPDATE SET
+            description = EXCLUDED.description,
+            price = EXCLUDED.price,
+            available = EXCLUDED.available,
+            preparation_time_minutes = EXCLUDED.preparation_time_minutes,
+            image_url = EXCLUDED.image_url
+    """ if update_existing else "DO NOTHING"
+    
+    sql = f"""
+        INSERT INTO menu_items (
+            menu_id, vendor_id, name, description, price,
+            available, preparation_time_minutes, image_url
+        )
+        SELECT 
+            :menu_id, :vendor_id, r.name, r.description, r.price,
+            r.available, r.preparation_time_minutes, r.image_url
+        FROM jsonb_to_recordset(CAST(:rows AS JSONB)) AS r(
+            name VARCHAR(200),
+            description TEXT,
+            price DECIMAL(10,2),
+            available BOOLEAN,
+            preparation_time_minutes INT,
+            image_url TEXT
+        )
+        ON CONFLICT (menu_id, name) {on_conflict}
+        RETURNING 
+            id, name, description, price, available,
+            preparation_time_minutes, image_url,
+            (xmax = 0) AS inserted;
+    """
+    
+    result = db.session.execute(
+        db.text(sql),
+        {"vendor_id": vendor_id, "menu_id": menu_id, "rows": json.dumps(rows)}
+    )
+    
+    items = [row_to_dict(row) for row in result]
+    inserted = sum(1 for item in items if item.pop("inserted"))
+    
+    return items, inserted, version
+
+
+def bump_menu_version(vendor_id, menu_id):
+    """
+    Invalidate cached copies of a menu; call once per write, not once per item
+    (clients see menus.version; every worker's menu cache is told through the cache bus)
+    Returns the new version, or None when the menu isn't the vendor's
+    """
+    version = db.session.execute(
+        db.text("""
+            UPDATE menus SET version = version + 1
+            WHERE id = :menu_id AND vendor_id = :vendor_id
+            RETURNING version;
+        """),
+        {"vendor_id": vendor_id, "menu_id": menu_id}
+    ).scalar()
+    if version is not None:
+        cache_bus.publish("menu", vendor_id)
+    return version
+
+
+@bp.route("/<int:vendor_id>/menu/<int:menu_id>/items/bulk", methods=["POST"])
+@token_required
+@require_vendor
+def bulk_import_menu_items(current_user, vendor_id, menu_id):
+    """
+    Create or update many menu items at once, matched on (menu_id, name)
+    Body: JSON array / {"items": [...]}, a text/csv body, or a multipart 'file' upload
+    SQL: One INSERT ... ON CONFLICT DO UPDATE over jsonb_to_recordset()
+    """
+    try:
+        # Verify ownership
+        if not verify_vendor_ownership(current_user.id, vendor_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        try:
+            items = read_menu_import_payload()
+        except (ValueError, UnicodeDecodeError) as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if not items:
+            return jsonify({"error": "No items to import"}), 400
+        if len(items) > MENU_IMPORT_MAX_ROWS:
+            return jsonify({"error": f"At most {MENU_IMPORT_MAX_ROWS} items per import"}), 400
+        
+        rows, errors = validate_menu_import_rows(items)
+        if errors:
+            return jsonify({
+                "error": f"{len(errors)} invalid row(s); nothing was imported",
+                "errors": errors
+            }), 400
+        
+        result = upsert_menu_items(vendor_id, menu_id, rows)
+        if result is None:
+            return jsonify({"error": "ERROR: Menu not found or access denied"}), 400
+        
+        db.session.commit()
+        
+        imported, inserted, menu_version = result
+        return jsonify({
+            "message": f"{len(imported)} item(s) imported successfully",
+            "created": inserted,
+            "updated": len(imported) - inserted,
+            "menu_version": menu_version,
+            "items": imported
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+# ============================================
+# 13. BATCH ITEM AVAILABILITY / PRICE ("86" items)
+# ============================================
+MENU_BATCH_MAX_ITEMS = 500
+
+
+@bp.route("/<int:vendor_id>/menu/<int:menu_id>/items", methods=["PATCH"])
+@token_required
+@require_vendor
+def batch_update_menu_items(current_user, vendor_id, menu_id):
+    """
+    Flip availability (and optionally price) for many items in one request
+    Body: {"item_ids": [1, 2], "available": false}
+       or {"items": [{"id": 1, "available": false, "price": 4.5}, ...]}
+    SQL: One UPDATE ... FROM jsonb_to_recordset(), one menu version bump
+    """
+    try:
+        # Verify ownership
+        if not verify_vendor_ownership(current_user.id, vendor_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        data = request.get_json() or {}
+        
+        if "items" in data:
+            changes = data.get("items")
+        else:
+            item_ids = data.get("item_ids")
+            if not isinstance(item_ids, list):
+                return jsonify({"error": "item_ids array or items array is required"}), 400
+            changes = [
+                {"id": item_id, "available": data.get("available"), "price": data.get("price")}
+                for item_id in item_ids
+            ]
+        
+        if not isinstance(changes, list) or not changes:
+            return jsonify({"error": "items array cannot be empty"}), 400
+        if len(changes) > MENU_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"At most {MENU_BATCH_MAX_ITEMS} items per request"}), 400
+        
+        rows = []
+        errors = []
+        seen_ids = set()
+        for index, change in enumerate(changes, start=1):
+            if not isinstance(change, dict):
+                errors.append({"row": index, "error": "Each item must be an object"})
+                continue
+            
+            item_id = change.get("id")
+            available = change.get("available")
+            price = change.get("price")
+            
+            if not isinstance(item_id, int) or isinstance(item_id, bool):
+                errors.append({"row": index, "error": "id must be an integer"})
+                continue
+            if item_id in seen_ids:
+                errors.append({"row": index, "id": item_id, "error": "duplicate id"})
+                continue
+            seen_ids.add(item_id)
+            
+            if available is not None and not isinstance(available, bool):
+                errors.append({"row": index, "id": item_id, "error": "available must be true or false"})
+                continue
+            if price is not None:
+                try:
+                    price = Decimal(str(price))
+                    if not price.is_finite() or price < 0 or price >= Decimal("100000000"):
+                        raise ValueError
+                except Exception:
+                    errors.append({"row": index, "id": item_id, "error": "price must be a non-negative number"})
+                    continue
+                price = str(price)
+            if available is None and price is None:
+                errors.append({"row": index, "id": item_id, "error": "Nothing to update (send available and/or price)"})
+                continue
+            
+            rows.append({"id": item_id, "available": available, "price": price})
+        
+        if errors:
+            return jsonify({"error": "Invalid items; nothing was updated", "errors": errors}), 400
+        
+        # Doubles as the menu ownership check and locks the menu row
+        menu_version = bump_menu_version(vendor_id, menu_id)
+        if menu_version is None:
+            return jsonify({"error": "ERROR: Menu not found or access denied"}), 400
+        
+        sql = """
+            UPDATE menu_items mi
+            SET 
+                available = COALESCE(r.available, mi.available),
+                price = COALESCE(r.price, mi.price)
+            FROM jsonb_to_recordset(CAST(:rows AS JSONB)) AS r(
+                id INTEGER,
+                available BOOLEAN,
+                price DECIMAL(10,2)
+            )
+            WHERE mi.id = r.id
+              AND mi.menu_id = :menu_id
+            RETURNING mi.id, mi.name, mi.price, mi.available;
+        """
+        
+        result = db.session.execute(
+            db.text(sql),
+            {"menu_id": menu_id, "rows": json.dumps(rows)}
+        )
+        updated = [row_to_dict(row) for row in result]
+        
+        missing = sorted(seen_ids - {item["id"] for item in updated})
+        if missing:
+            db.session.rollback()
+            return jsonify({
+                "error": "Some items are not on this menu; nothing was updated",
+                "missing_item_ids": missing
+            }), 404
+        
+        db.session.commit()
+        
+        return jsonify({
+            "message": f"{len(updated)} item(s) updated successfully",
+            "menu_version": menu_version,
+            "items": updated
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+# ============================================
+# 14. BATCH ORDER STATUS (Kitchen Board)
+# ============================================
+ORDER_BATCH_MAX = 200
+
+
+@bp.route("/<int:vendor_id>/orders/status", methods=["PUT"])
+@token_required
+@require_vendor
+def batch_update_order_status(current_user, vendor_id):
+    """
+    Move many orders at once, e.g. preparing -> ready during rush
+    Body: {"orders": [{"order_id": 1, "status": "ready", "estimated_ready_at": "...", "version": 3}, ...]}
+    SQL: One statement: compare-and-set UPDATE ... FROM the requested moves joined to
+         order_status_transitions, plus one INSERT of customer notifications
+    """
+    try:
+        # Verify ownership
+        if not verify_vendor_ownership(current_user.id, vendor_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        data = request.get_json() or {}
+        moves = data.get("orders")
+        
+        if not isinstance(moves, list) or not moves:
+            return jsonify({"error": "orders array is required"}), 400
+        if len(moves) > ORDER_BATCH_MAX:
+            return jsonify({"error": f"At most {ORDER_BATCH_MAX} orders per request"}), 400
+        
+        rows = []
+        results = {}
+        for index, move in enumerate(moves, start=1):
+            order_id = move.get("order_id") if isinstance(move, dict) else None
+            if not isinstance(order_id, int) or isinstance(order_id, bool):
+                return jsonify({"error": f"orders[{index}]: order_id must be an integer"}), 400
+            if order_id in results:
+                return jsonify({"error": f"orders[{index}]: order {order_id} appears more than once"}), 400
+            
+            new_status = (move.get("status") or "").strip()
+            if new_status not in ORDER_STATUSES:
+                results[order_id] = {"order_id": order_id, "result": "invalid", "error": "Invalid status"}
+                continue
+            
+            expected_version = move.get("version")
+            if expected_version is not None and (not isinstance(expected_version, int) or isinstance(expected_version, bool)):
+                results[order_id] = {"order_id": order_id, "result": "invalid", "error": "version must be an integer"}
+                continue
+            
+            ready_time = None
+            if move.get("estimated_ready_at"):
+                try:
+                    ready_time = datetime.fromisoformat(str(move["estimated_ready_at"]).replace("Z", ""))
+                except ValueError:
+                    results[order_id] = {"order_id": order_id, "result": "invalid", "error": "Invalid estimated_ready_at format"}
+                    continue
+            
+            results[order_id] = None
+            rows.append({
+                "order_id": order_id,
+                "new_status": new_status,
+                "estimated_ready_at": ready_time.isoformat() if ready_time else None,
+                "expected_version": expected_version
+            })
+        
+        notifications_sent = 0
+        if rows:
+            # The transition and version checks live in the UPDATE's WHERE clause, so they
+            # are re-evaluated against the latest row if another request got there first
+            sql = """
+                WITH requested AS (
+                    SELECT * FROM jsonb_to_recordset(CAST(:rows AS JSONB)) AS r(
+                        order_id INTEGER,
+                        new_status VARCHAR(20),
+                        estimated_ready_at TIMESTAMP,
+                        expected_version INTEGER
+                    )
+                ),
+                updated AS (
+                    UPDATE orders o
+                    SET 
+                        status = req.new_status,
+                        estimated_ready_at = COALESCE(req.estimated_ready_at, o.estimated_ready_at),
+                        version = o.version + 1
+                    FROM requested req
+                    JOIN order_status_transitions t
+                      ON t.actor = 'vendor' AND t.to_status = req.new_status
+                    WHERE o.id = req.order_id
+                      AND o.vendor_id = :vendor_id
+                      AND o.status = t.from_status
+                      AND (req.expected_version IS NULL OR o.version = req.expected_version)
+                    RETURNING 
+                        o.id AS order_id,
+                        o.customer_id,
+                        t.from_status AS old_status,
+                        o.status AS new_status,
+                        o.estimated_ready_at,
+                        o.version,
+                        o.prep_minutes,
+                        o.scheduled_for
+                ),
+                notified AS (
+                    INSERT INTO notifications (user_id, type, payload)
+                    SELECT 
+                        u.customer_id,
+                        'order_status',
+                        jsonb_build_object(
+                            'order_id', u.order_id,
+                            'vendor_id', CAST(:vendor_id AS INTEGER),
+                            'old_status', u.old_status,
+                            'new_status', u.new_status,
+                            'estimated_ready_at', u.estimated_ready_at
+                        )
+                    FROM updated u
+                    WHERE u.customer_id IS NOT NULL
+                    RETURNING 1
+                )
+                SELECT 
+                    u.order_id, u.old_status, u.new_status, u.estimated_ready_at, u.version,
+                    u.prep_minutes, u.scheduled_for,
+                    (SELECT COUNT(*) FROM notified) AS notifications_sent
+                FROM updated u;
+            """
+            
+            updated = db.session.execute(
+                db.text(sql),
+                {"vendor_id": vendor_id, "rows": json.dumps(rows)}
+            ).fetchall()
+            
+            requested = {row["order_id"]: row for row in rows}
+            engine_etas = []
+            for row in updated:
+                notifications_sent = row.notifications_sent
+                estimated_ready_at = row.estimated_ready_at
+                
+                eta = eta_engine.status_changed(
+                    row.order_id, row.new_status,
+                    vendor_id=vendor_id, prep_minutes=row.prep_minutes, scheduled_for=row.scheduled_for
+                )
+                if requested[row.order_id]["estimated_ready_at"] is None and eta is not None:
+                    engine_etas.append({"order_id": row.order_id, "eta": eta.isoformat(), "version": row.version})
+                    estimated_ready_at = eta
+                
+                results[row.order_id] = {
+                    "order_id": row.order_id,
+                    "result": "updated",
+                    "old_status": row.old_status,
+                    "new_status": row.new_status,
+                    "estimated_ready_at": estimated_ready_at.isoformat() if estimated_ready_at else None,
+                    "version": row.version
+                }
+            
+            # Engine estimates for the moves that didn't carry one, in one statement
+            if engine_etas:
+                db.session.execute(
+                    db.text("""
+                        UPDATE orders o
+                        SET estimated_ready_at = e.eta
+                        FROM jsonb_to_recordset(CAST(:etas AS JSONB)) AS e(
+                            order_id INTEGER, eta TIMESTAMP, version INTEGER
+                        )
+                        WHERE o.id = e.order_id
+                          AND o.vendor_id = :vendor_id
+                          AND o.version = e.version;
+                    """),
+                    {"etas": json.dumps(engine_etas), "vendor_id": vendor_id}
+                )
+            
+            # Explain the rows the UPDATE skipped: not this vendor's, changed underneath, or a disallowed move
+            skipped = [row["order_id"] for row in rows if results[row["order_id"]] is None]
+            if skipped:
+                current = {
+                    row.id: row for row in db.session.execute(
+                        db.text("SELECT id, status, version FROM orders WHERE id = ANY(:ids) AND vendor_id = :vendor_id;"),
+                        {"ids": skipped, "vendor_id": vendor_id}
+                    )
+                }
+                for order_id in skipped:
+                    if order_id not in current:
+                        results[order_id] = {"order_id": order_id, "result": "not_found", "error": "Order not found or access denied"}
+                        continue
+                    
+                    order = current[order_id]
+                    expected_version = requested[order_id]["expected_version"]
+                    if expected_version is not None and order.version != expected_version:
+                        error = f"Order was modified (now version {order.version}, status {order.status})"
+                    else:
+                        error = f"Cannot move order from {order.status} to {requested[order_id]['new_status']}"
+                    results[order_id] = {
+                        "order_id": order_id,
+                        "result": "conflict",
+                        "current_status": order.status,
+                        "version": order.version,
+                        "error": error
+                    }
+        
+        db.session.commit()
+        
+        ordered = [results[move["order_id"]] for move in moves]
+        updated_count = sum(1 for r in ordered if r["result"] == "updated")
+        
+        return jsonify({
+            "message": f"{updated_count} of {len(ordered)} order(s) updated",
+            "updated": updated_count,
+            "failed": len(ordered) - updated_count,
+            "notifications_sent": notifications_sent,
+            "results": ordered
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+# ============================================
+# 15. INVENTORY (Restock)
+# ============================================
+def validate_stock_changes(changes):
+    """
+    Each change is {"id", "stock"} (set, null stops tracking) or {"id", "add"} (restock)
+    Returns (rows, errors)
+    """
+    rows = []
+    errors = []
+    seen_ids = set()
+    
+    for index, change in enumerate(changes, start=1):
+        if not isinstance(change, dict):
+            errors.append({"row": index, "error": "Each item must be an object"})
+            continue
+        
+        item_id = change.get("id")
+        if not isinstance(item_id, int) or isinstance(item_id, bool):
+            errors.append({"row": index, "error": "id must be an integer"})
+            continue
+        if item_id in seen_ids:
+            errors.append({"row": index, "id": item_id, "error": "duplicate id"})
+            continue
+        seen_ids.add(item_id)
+        
+        has_stock = "stock" in change
+        has_add = "add" in change
+        if has_stock == has_add:
+            errors.append({"row": index, "id": item_id, "error": "Send exactly one of stock or add"})
+            continue
+        
+        value = change["stock"] if has_stock else change["add"]
+        if has_stock and value is None:
+            rows.append({"id": item_id, "untrack": True, "stock": None, "added": None})
+            continue
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0 or (has_add and value == 0):
+            field = "stock" if has_stock else "add"
+            errors.append({"row": index, "id": item_id, "error": f"{field} must be a {'non-negative' if has_stock else 'positive'} integer"})
+            continue
+        
+        rows.append({
+            "id": item_id,
+            "untrack": False,
+            "stock": value if has_stock else None,
+            "added": value if has_add else None
+        })
+    
+    return rows, errors
+
+
+def apply_stock_changes(vendor_id, menu_id, rows):
+    """
+    Set or add stock for many items in one UPDATE; availability follows the new count
+    Returns (items, menu_version) or None when the menu isn't the vendor's
+    """
+    # Doubles as the menu ownership check and locks the menu row
+    menu_version = bump_menu_version(vendor_id, menu_id)
+    if menu_version is None:
+        return None
+    
+    # `add` on an untracked item starts tracking from zero
+    sql = """
+        UPDATE menu_items mi
+        SET 
+            stock = CASE 
+                WHEN r.untrack THEN NULL
+                WHEN r.stock IS NOT NULL THEN r.stock
+                ELSE COALESCE(mi.stock, 0) + r.added
+            END,
+            available = CASE 
+                WHEN r.untrack THEN mi.available
+                ELSE COALESCE(r.stock, COALESCE(mi.stock, 0) + r.added) > 0
+            END
+        FROM jsonb_to_recordset(CAST(:rows AS JSONB)) AS r(
+            id INTEGER,
+            untrack BOOLEAN,
+            stock INTEGER,
+            added INTEGER
+        )
+        WHERE mi.id = r.id
+          AND mi.menu_id = :menu_id
+        RETURNING mi.id, mi.name, mi.stock, mi.available;
+    """
+    
+    result = db.session.execute(
+        db.text(sql),
+        {"menu_id": menu_id, "rows": json.dumps(rows)}
+    )
+    return [row_to_dict(row) for row in result], menu_version
+
+
+@bp.route("/<int:vendor_id>/menu/<int:menu_id>/stock", methods=["PUT"])
+@token_required
+@require_vendor
+def update_menu_stock(current_user, vendor_id, menu_id):
+    """
+    Restock / set stock for many items
+    Body: {"items": [{"id": 1, "add": 20}, {"id": 2, "stock": 0}, {"id": 3, "stock": null}]}
+    SQL: One UPDATE ... FROM jsonb_to_recordset(), one menu version bump
+    """
+    try:
+        # Verify ownership
+        if not verify_vendor_ownership(current_user.id, vendor_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        data = request.get_json() or {}
+        changes = data.get("items")
+        
+        if not isinstance(changes, list) or not changes:
+            return jsonify({"error": "items array is required"}), 400
+        if len(changes) > MENU_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"At most {MENU_BATCH_MAX_ITEMS} items per request"}), 400
+        
+        rows, errors = validate_stock_changes(changes)
+        if errors:
+            return jsonify({"error": "Invalid items; no stock was changed", "errors": errors}), 400
+        
+        result = apply_stock_changes(vendor_id, menu_id, rows)
+        if result is None:
+            return jsonify({"error": "ERROR: Menu not found or access denied"}), 400
+        
+        items, menu_version = result
+        missing = sorted({row["id"] for row in rows} - {item["id"] for item in items})
+        if missing:
+            db.session.rollback()
+            return jsonify({
+                "error": "Some items are not on this menu; no stock was changed",
+                "missing_item_ids": missing
+            }), 404
+        
+        db.session.commit()
+        
+        return jsonify({
+            "message": f"Stock updated for {len(items)} item(s)",
+            "menu_version": menu_version,
+            "items": items
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+@bp.route("/<int:vendor_id>/menu/<int:menu_id>/items/<int:item_id>/stock", methods=["PUT"])
+@token_required
+@require_vendor
+def update_menu_item_stock(current_user, vendor_id, menu_id, item_id):
+    """
+    Restock / set stock for one item
+    Body: {"add": 20}, {"stock": 50} or {"stock": null} to stop tracking
+    """
+    try:
+        # Verify ownership
+        if not verify_vendor_ownership(current_user.id, vendor_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        data = request.get_json() or {}
+        rows, errors = validate_stock_changes([{**data, "id": item_id}])
+        if errors:
+            return jsonify({"error": errors[0]["error"]}), 400
+        
+        result = apply_stock_changes(vendor_id, menu_id, rows)
+        if result is None:
+            return jsonify({"error": "ERROR: Menu not found or access denied"}), 400
+        
+        items, menu_version = result
+        if not items:
+            db.session.rollback()
+            return jsonify({"error": "ERROR: Menu item not found"}), 404
+        
+        db.session.commit()
+        
+        return jsonify({
+            "message": "Stock updated successfully",
+            "menu_version": menu_version,
+            "item": items[0]
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+# ============================================
+# 16. PICKUP SLOT CAPACITY SETTINGS
+# ============================================
+SLOT_MINUTES_CHOICES = (5, 10, 15, 20, 30, 60)
+
+
+@bp.route("/<int:vendor_id>/slots/settings", methods=["GET", "PUT", "DELETE"])
+@token_required
+@require_vendor
+def slot_settings(current_user, vendor_id):
+    """
+    View / set / remove pickup slot capacity
+    Body (PUT): {"slot_minutes": 15, "capacity_minutes": 60}
+      capacity_minutes = kitchen minutes per slot, orders weigh
+      quantity * preparation_time_minutes
+    SQL: Upsert into vendor_slot_settings; changing slot_minutes re-buckets upcoming
+         orders with rebuild_vendor_slot_usage()
+    """
+    try:
+        # Verify ownership
+        if not verify_vendor_ownership(current_user.id, vendor_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        if request.method == "DELETE":
+            db.session.execute(
+                db.text("DELETE FROM vendor_slot_settings WHERE vendor_id = :vendor_id;"),
+                {"vendor_id": vendor_id}
+            )
+            db.session.execute(
+                db.text("SELECT rebuild_vendor_slot_usage(:vendor_id);"),
+                {"vendor_id": vendor_id}
+            )
+            db.session.commit()
+            query_cache.wrote("vendor_slot_settings")
+            return jsonify({"message": "Slot capacity removed; all pickup times are accepted"}), 200
+        
+        if request.method == "PUT":
+            data = request.get_json() or {}
+            slot_minutes = data.get("slot_minutes", 15)
+            capacity_minutes = data.get("capacity_minutes")
+            
+            if slot_minutes not in SLOT_MINUTES_CHOICES:
+                return jsonify({"error": f"slot_minutes must be one of: {', '.join(map(str, SLOT_MINUTES_CHOICES))}"}), 400
+            if not isinstance(capacity_minutes, int) or isinstance(capacity_minutes, bool) or capacity_minutes < 1:
+                return jsonify({"error": "capacity_minutes must be a positive integer"}), 400
+            
+            previous = db.session.execute(
+                db.text("SELECT slot_minutes FROM vendor_slot_settings WHERE vendor_id = :vendor_id;"),
+                {"vendor_id": vendor_id}
+            ).scalar()
+            
+            db.session.execute(
+                db.text("""
+                    INSERT INTO vendor_slot_settings (vendor_id, slot_minutes, capacity_minutes)
+                    VALUES (:vendor_id, :slot_minutes, :capacity_minutes)
+                    ON CONFLICT (vendor_id) DO UPDATE SET
+                        slot_minutes = EXCLUDED.slot_minutes,
+                        capacity_minutes = EXCLUDED.capacity_minutes,
+                        updated_at = NOW();
+                """),
+                {"vendor_id": vendor_id, "slot_minutes": slot_minutes, "capacity_minutes": capacity_minutes}
+            )
+            
+            # Upcoming orders were counted in the old buckets (or not at all)
+            if previous != slot_minutes:
+                db.session.execute(
+                    db.text("SELECT rebuild_vendor_slot_usage(:vendor_id);"),
+                    {"vendor_id": vendor_id}
+                )
+            
+            db.session.commit()
+            # the directory's wait estimate reads these settings: don't serve this
+            # vendor the old ones until the notification comes back
+            query_cache.wrote("vendor_slot_settings")
+        
+        settings = db.session.execute(
+            db.text("""
+                SELECT slot_minutes, capacity_minutes, updated_at
+                FROM vendor_slot_settings
+                WHERE vendor_id = :vendor_id;
+            """),
+            {"vendor_id": vendor_id}
+        ).first()
+        
+        return jsonify({
+            "vendor_id": vendor_id,
+            "limited": settings is not None,
+            "settings": row_to_dict(settings)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+# ============================================
+# 17. KITCHEN QUEUE (batched item totals)
+# ============================================
+@bp.route("/<int:vendor_id>/kitchen", methods=["GET"])
+@token_required
+@require_vendor
+def get_kitchen_queue(current_user, vendor_id):
+    """
+    Item totals across accepted and preparing orders, per pickup slot, with line notes
+    (polled every few seconds by the kitchen display)
+    SQL: Reads kitchen_queue_totals / kitchen_queue_lines, kept current by trigger on
+         orders - never re-aggregates order_items
+    """
+    try:
+        # Verify ownership
+        if not verify_vendor_ownership(current_user.id, vendor_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        totals = db.session.execute(
+            db.text("""
+                SELECT slot_start, menu_item_id, name, quantity, line_count
+                FROM kitchen_queue_totals
+                WHERE vendor_id = :vendor_id
+                ORDER BY slot_start, name;
+            """),
+            {"vendor_id": vendor_id}
+        ).all()
+        
+        noted = db.session.execute(
+            db.text("""
+                SELECT slot_start, menu_item_id, order_id, quantity, notes
+                FROM kitchen_queue_lines
+                WHERE vendor_id = :vendor_id AND notes IS NOT NULL
+                ORDER BY added_at, order_item_id;
+            """),
+            {"vendor_id": vendor_id}
+        ).all()
+        
+        notes = {}
+        for line in noted:
+            notes.setdefault((line.slot_start, line.menu_item_id), []).append({
+                "order_id": line.order_id,
+                "quantity": line.quantity,
+                "note": line.notes
+            })
+        
+        slots = {}
+        items = {}
+        for row in totals:
+            # menu_item_id 0: the item was deleted from the menu after the order was placed
+            menu_item_id = row.menu_item_id or None
+            slots.setdefault(row.slot_start, []).append({
+                "menu_item_id": menu_item_id,
+                "name": row.name,
+                "quantity": row.quantity,
+                "order_lines": row.line_count,
+                "notes": notes.get((row.slot_start, row.menu_item_id), [])
+            })
+            item = items.setdefault((row.menu_item_id, row.name), {
+                "menu_item_id": menu_item_id,
+                "name": row.name,
+                "quantity": 0
+            })
+            item["quantity"] += row.quantity
+        
+        return jsonify({
+            "vendor_id": vendor_id,
+            "slots": [
+                {"slot_start": slot_start.isoformat(), "items": slot_items}
+                for slot_start, slot_items in slots.items()
+            ],
+            "totals": sorted(items.values(), key=lambda item: (-item["quantity"], item["name"])),
+            "generated_at": datetime.utcnow().isoformat()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+
+# ============================================
+# 18. HEALTH CHECK
 # ============================================
 @bp.route("/health", methods=["GET"])
 def health_check():
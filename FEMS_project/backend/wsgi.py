@@ -0,0 +1,17 @@
+# backend/wsgi.py
+"""
+WSGI entry point for production servers
+
+    python -m backend.serve              (gunicorn with the settings in backend/serve.py)
+    gunicorn backend.wsgi:app            (any other WSGI server works the same way)
+
+The only database work at import is one query: the schema version check (see
+backend/startup.py). The schema itself is managed with
+flask --app backend.app db-migrate.
+"""
+
+from .app import create_app
+from .startup import prepare_schema
+
+app = create_app()
+prepare_schema(app)
@@ -0,0 +1,209 @@
+"""
+FEMS Order Export Benchmark
+Measures throughput and peak RSS of GET /api/vendors/<id>/orders/export
+
+For each size a throwaway vendor is seeded with that many orders (2 items each),
+then the export is streamed in a fresh child process so every run starts from a
+clean ru_maxrss. Flat peak RSS across sizes means the server-side cursor works.
+
+Usage (from FEMS_project/, DATABASE_URL pointing at a scratch database):
+    python export_benchmark.py --sizes 1000,100000,1000000 --format csv
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import uuid
+
+GREEN = "\033[92m"
+RED = "\033[91m"
+BLUE = "\033[94m"
+CYAN = "\033[96m"
+RESET = "\033[0m"
+
+
+def print_section(title, color=BLUE):
+    print(f"\n{color}{'='*80}")
+    print(f"  {title}")
+    print(f"{'='*80}{RESET}\n")
+
+
+def print_success(msg):
+    print(f"{GREEN}✓ {msg}{RESET}")
+
+
+def print_error(msg):
+    print(f"{RED}✗ {msg}{RESET}")
+
+
+def print_info(msg):
+    print(f"{CYAN}➤ {msg}{RESET}")
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ============================================================================ #
+# SEEDING
+# ============================================================================ #
+
+def seed_vendor(db, order_count):
+    """Create a vendor with order_count orders entirely server-side; returns (vendor_id, user_id, customer_id)"""
+    tag = uuid.uuid4().hex[:8]
+    params = {"tag": tag, "n": order_count}
+
+    user_id = db.session.execute(db.text("""
+        INSERT INTO users (email, password_hash, role, full_name, is_email_verified)
+        VALUES ('bench-vendor-' || :tag || '@example.com', 'x', 'vendor', 'Bench Vendor', TRUE)
+        RETURNING id;
+    """), params).scalar()
+    customer_id = db.session.execute(db.text("""
+        INSERT INTO users (email, password_hash, role, full_name, is_email_verified)
+        VALUES ('bench-customer-' || :tag || '@example.com', 'x', 'customer', 'Bench Customer', TRUE)
+        RETURNING id;
+    """), params).scalar()
+    vendor_id = db.session.execute(db.text("""
+        INSERT INTO vendors (user_id, vendor_name, location)
+        VALUES (:user_id, 'Bench Vendor ' || :tag, 'Benchmark Hall')
+        RETURNING id;
+    """), {**params, "user_id": user_id}).scalar()
+    menu_id = db.session.execute(db.text("""
+        INSERT INTO menus (vendor_id, title) VALUES (:vendor_id, 'Bench Menu') RETURNING id;
+    """), {"vendor_id": vendor_id}).scalar()
+    db.session.execute(db.text("""
+        INSERT INTO menu_items (menu_id, vendor_id, name, price)
+        SELECT :menu_id, :vendor_id, 'Item ' || i, 100 + i FROM generate_series(1, 5) i;
+    """), {"menu_id": menu_id, "vendor_id": vendor_id})
+
+    db.session.execute(db.text("""
+        INSERT INTO orders (customer_id, vendor_id, placed_at, scheduled_for, total_amount, status, notes)
+        SELECT :customer_id, :vendor_id,
+               NOW() - (i || ' seconds')::INTERVAL,
+               NOW() - (i || ' seconds')::INTERVAL + INTERVAL '30 minutes',
+               205, 'completed', 'bench order ' || i
+        FROM generate_series(1, :n) i;
+    """), {**params, "customer_id": customer_id, "vendor_id": vendor_id})
+    db.session.execute(db.text("""
+        INSERT INTO order_items (order_id, placed_at, menu_item_id, name_snapshot, price_snapshot, quantity)
+        SELECT o.id, o.placed_at, mi.id, mi.name, mi.price, 1
+        FROM orders o
+        CROSS JOIN LATERAL (
+            SELECT id, name, price FROM menu_items WHERE vendor_id = :vendor_id ORDER BY id LIMIT 2
+        ) mi
+        WHERE o.vendor_id = :vendor_id;
+    """), {"vendor_id": vendor_id})
+    db.session.commit()
+
+    return vendor_id, user_id, customer_id
+
+
+def cleanup(db, user_ids):
+    db.session.execute(db.text("DELETE FROM users WHERE id = ANY(:ids);"), {"ids": list(user_ids)})
+    db.session.commit()
+
+
+# ============================================================================ #
+# CHILD PROCESS: stream one export and report
+# ============================================================================ #
+
+def run_export(vendor_id, user_id, export_format):
+    from backend.app import create_app
+    from backend.utils import create_token
+
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        token = create_token(user_id, "vendor")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    url = f"/api/vendors/{vendor_id}/orders/export?format={export_format}"
+
+    # warm up imports and the connection pool before taking the baseline
+    client.get(f"/api/vendors/{vendor_id}/orders?limit=1", headers=headers)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    response = client.get(url, headers=headers, buffered=False)
+    total_bytes = 0
+    lines = 0
+    for chunk in response.response:
+        total_bytes += len(chunk)
+        lines += chunk.count(b"\n")
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "status": response.status_code,
+        "lines": lines,
+        "bytes": total_bytes,
+        "seconds": elapsed,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+# ============================================================================ #
+# MAIN
+# ============================================================================ #
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming order export")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="comma separated order counts")
+    parser.add_argument("--format", default="csv", choices=["csv", "ndjson"])
+    parser.add_argument("--keep", action="store_true", help="keep seeded vendors")
+    parser.add_argument("--child", nargs=2, type=int, metavar=("VENDOR_ID", "USER_ID"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_export(args.child[0], args.child[1], args.format)
+        return
+
+    from backend.app import create_app
+    from backend.extensions import db
+
+    app = create_app()
+    print_section(f"📦 ORDER EXPORT BENCHMARK ({args.format})")
+
+    results = []
+    with app.app_context():
+        for size in [int(s) for s in args.sizes.split(",")]:
+            print_info(f"Seeding {size:,} orders...")
+            vendor_id, user_id, customer_id = seed_vendor(db, size)
+
+            print_info("Streaming export in a fresh process...")
+            proc = subprocess.run(
+                [sys.executable, __file__, "--format", args.format, "--child", str(vendor_id), str(user_id)],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                print_error(proc.stderr.strip().splitlines()[-1] if proc.stderr else "export failed")
+            else:
+                run = json.loads(proc.stdout.strip().splitlines()[-1])
+                run["orders"] = size
+                results.append(run)
+                print_success(
+                    f"{size:,} orders: {run['lines']:,} lines in {run['seconds']:.2f}s "
+                    f"({run['lines'] / run['seconds']:,.0f} lines/s, "
+                    f"{run['bytes'] / run['seconds'] / 1e6:.1f} MB/s), "
+                    f"peak RSS {run['peak_rss_mb']:.1f} MB (+{run['peak_rss_mb'] - run['baseline_rss_mb']:.1f} MB)"
+                )
+
+            if not args.keep:
+                cleanup(db, (user_id, customer_id))
+
+    print_section("SUMMARY")
+    print(f"{'orders':>12} {'lines/s':>12} {'MB/s':>8} {'peak RSS MB':>12} {'RSS growth MB':>14}")
+    for run in results:
+        print(
+            f"{run['orders']:>12,} {run['lines'] / run['seconds']:>12,.0f} "
+            f"{run['bytes'] / run['seconds'] / 1e6:>8.1f} {run['peak_rss_mb']:>12.1f} "
+            f"{run['peak_rss_mb'] - run['baseline_rss_mb']:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+FEMS Inventory Stress Test
+Races many customers for the last units of one item and checks nothing is oversold
+
+A throwaway vendor gets one item with --stock units; --clients customers are
+released together (threading.Barrier) against POST /api/customer/orders on a
+running server, each asking for --quantity units. Afterwards the database must
+show exactly min(stock, clients * quantity) units sold, stock never below zero,
+and every loser must have been told the item is sold out (409, code SOLD_OUT).
+
+Usage (from FEMS_project/, server running with the same DATABASE_URL / SECRET_KEY):
+    python inventory_stress_test.py --clients 200 --stock 50
+"""
+
+import argparse
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+BASE_URL = "http://127.0.0.1:5000"
+
+GREEN = "\033[92m"
+RED = "\033[91m"
+BLUE = "\033[94m"
+CYAN = "\033[96m"
+RESET = "\033[0m"
+
+
+def print_section(title, color=BLUE):
+    print(f"\n{color}{'='*80}")
+    print(f"  {title}")
+    print(f"{'='*80}{RESET}\n")
+
+
+def print_success(msg):
+    print(f"{GREEN}✓ {msg}{RESET}")
+
+
+def print_error(msg):
+    print(f"{RED}✗ {msg}{RESET}")
+
+
+def print_info(msg):
+    print(f"{CYAN}➤ {msg}{RESET}")
+
+
+# ============================================================================ #
+# SEEDING
+# ============================================================================ #
+
+def seed(db, clients, stock):
+    """Vendor with one tracked item and `clients` customers; returns (vendor_id, item_id, user_ids, customer_ids)"""
+    tag = uuid.uuid4().hex[:8]
+
+    vendor_user_id = db.session.execute(db.text("""
+        INSERT INTO users (email, password_hash, role, full_name, is_email_verified)
+        VALUES ('stress-vendor-' || :tag || '@example.com', 'x', 'vendor', 'Stress Vendor', TRUE)
+        RETURNING id;
+    """), {"tag": tag}).scalar()
+    vendor_id = db.session.execute(db.text("""
+        INSERT INTO vendors (user_id, vendor_name, location)
+        VALUES (:user_id, 'Stress Vendor ' || :tag, 'Stress Hall')
+        RETURNING id;
+    """), {"tag": tag, "user_id": vendor_user_id}).scalar()
+    menu_id = db.session.execute(db.text("""
+        INSERT INTO menus (vendor_id, title) VALUES (:vendor_id, 'Stress Menu') RETURNING id;
+    """), {"vendor_id": vendor_id}).scalar()
+    item_id = db.session.execute(db.text("""
+        INSERT INTO menu_items (menu_id, vendor_id, name, price, stock)
+        VALUES (:menu_id, :vendor_id, 'Last Samosas', 50, :stock)
+        RETURNING id;
+    """), {"menu_id": menu_id, "vendor_id": vendor_id, "stock": stock}).scalar()
+
+    customer_ids = db.session.execute(db.text("""
+        INSERT INTO users (email, password_hash, role, full_name, is_email_verified)
+        SELECT 'stress-customer-' || :tag || '-' || i || '@example.com', 'x', 'customer', 'Stress Customer ' || i, TRUE
+        FROM generate_series(1, :n) i
+        RETURNING id;
+    """), {"tag": tag, "n": clients}).scalars().all()
+    db.session.commit()
+
+    return vendor_id, item_id, [vendor_user_id, *customer_ids], customer_ids
+
+
+def cleanup(db, user_ids):
+    db.session.execute(db.text("DELETE FROM users WHERE id = ANY(:ids);"), {"ids": list(user_ids)})
+    db.session.commit()
+
+
+# ============================================================================ #
+# RACE
+# ============================================================================ #
+
+def race(tokens, vendor_id, item_id, quantity):
+    """
+    Fire one order per token, all released at once
+    Returns [(status_code, error code or None, seconds)]
+    """
+    barrier = threading.Barrier(len(tokens))
+    pickup_time = (datetime.utcnow() + timedelta(hours=1)).isoformat()
+
+    def place(token):
+        session = requests.Session()
+        body = {
+            "vendor_id": vendor_id,
+            "pickup_time": pickup_time,
+            "items": [{"menu_item_id": item_id, "quantity": quantity}],
+        }
+        barrier.wait()
+        start = time.perf_counter()
+        response = session.post(
+            f"{BASE_URL}/api/customer/orders",
+            json=body,
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        seconds = time.perf_counter() - start
+        code = response.json().get("code") if response.status_code == 409 else None
+        return response.status_code, code, seconds
+
+    with ThreadPoolExecutor(max_workers=len(tokens)) as pool:
+        return list(pool.map(place, tokens))
+
+
+# ============================================================================ #
+# MAIN
+# ============================================================================ #
+
+def main():
+    global BASE_URL
+
+    parser = argparse.ArgumentParser(description="Race customers for limited stock")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=50)
+    parser.add_argument("--quantity", type=int, default=1, help="units each client orders")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--keep", action="store_true", help="keep seeded rows")
+    args = parser.parse_args()
+    BASE_URL = args.base_url
+
+    from backend.app import create_app
+    from backend.extensions import db
+    from backend.utils import create_token
+
+    app = create_app()
+    print_section(f"📦 INVENTORY STRESS TEST ({args.clients} clients, {args.stock} units)")
+
+    with app.app_context():
+        print_info("Seeding vendor, item and customers...")
+        vendor_id, item_id, user_ids, customer_ids = seed(db, args.clients, args.stock)
+        tokens = [create_token(customer_id, "customer") for customer_id in customer_ids]
+
+        try:
+            print_info("Releasing all clients at once...")
+            wall_start = time.perf_counter()
+            results = race(tokens, vendor_id, item_id, args.quantity)
+            wall = time.perf_counter() - wall_start
+
+            db.session.expire_all()
+            final_stock, available = db.session.execute(db.text(
+                "SELECT stock, available FROM menu_items WHERE id = :item_id;"
+            ), {"item_id": item_id}).first()
+            units_sold = db.session.execute(db.text(
+                "SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE menu_item_id = :item_id;"
+            ), {"item_id": item_id}).scalar()
+        finally:
+            if not args.keep:
+                cleanup(db, user_ids)
+
+    # a 409 is only a sold-out answer when it says so (SLOT_FULL is a 409 too)
+    placed = sum(1 for status, _, _ in results if status == 201)
+    sold_out = sum(1 for status, code, _ in results if status == 409 and code == "SOLD_OUT")
+    slot_full = sum(1 for status, code, _ in results if status == 409 and code == "SLOT_FULL")
+    other = len(results) - placed - sold_out - slot_full
+    latencies = sorted(seconds for _, _, seconds in results)
+    expected_sold = min(args.stock // args.quantity, args.clients) * args.quantity
+
+    print_section("RESULTS")
+    print(f"  orders placed      {placed}")
+    print(f"  sold out (409)     {sold_out}")
+    print(f"  slot full (409)    {slot_full}")
+    print(f"  other responses    {other}")
+    print(f"  units sold         {units_sold} (expected {expected_sold})")
+    print(f"  final stock        {final_stock} (available={available})")
+    print(f"  wall time          {wall:.2f}s ({len(results) / wall:,.0f} requests/s)")
+    print(f"  latency p50 / p95  {statistics.median(latencies) * 1000:.0f} ms / "
+          f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms")
+    print()
+
+    ok = True
+    if units_sold != expected_sold or placed * args.quantity != units_sold:
+        print_error("Oversold or undersold")
+        ok = False
+    if final_stock != args.stock - units_sold or final_stock < 0:
+        print_error("Stock counter does not match units sold")
+        ok = False
+    if final_stock == 0 and available:
+        print_error("Item still available at zero stock")
+        ok = False
+    if slot_full:
+        print_error(f"{slot_full} request(s) hit a full pickup slot; the vendor should have no slot capacity")
+        ok = False
+    if other:
+        print_error(f"{other} request(s) failed with something other than 201 or a SOLD_OUT 409")
+        ok = False
+
+    if ok:
+        print_success("No oversell: every unit went to exactly one order")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
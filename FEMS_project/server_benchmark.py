@@ -0,0 +1,312 @@
+"""
+FEMS Server Benchmark
+Compares the Werkzeug dev server with the gunicorn launcher (backend/serve.py) on a
+mixed customer workload
+
+For each mode a server is started on its own port, then --clients threads hammer it
+for --duration seconds (after a short warm-up) with this mix:
+    70%  GET  /api/customer/vendors/<id>/menu
+    15%  GET  /api/customer/vendors
+    10%  POST /api/customer/orders          (1-3 random items, pickup in 2 hours)
+     5%  GET  /api/customer/orders?limit=10
+and requests/s plus p50 / p95 / p99 latency are reported per mode and per operation.
+
+"dev" runs the app the way `python -m backend` does (debug on, threaded Werkzeug).
+Run it against a scratch database: it seeds a vendor with a menu and one customer
+per client, and deletes them (and their orders) afterwards.
+
+Usage (from FEMS_project/):
+    python server_benchmark.py --modes dev,gunicorn --clients 32 --duration 30 --workers 4 --threads 4
+"""
+
+import argparse
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import requests
+
+GREEN = "\033[92m"
+RED = "\033[91m"
+BLUE = "\033[94m"
+CYAN = "\033[96m"
+RESET = "\033[0m"
+
+MIX = (
+    ("menu", 70),
+    ("vendors", 15),
+    ("place_order", 10),
+    ("history", 5),
+)
+WARMUP_SECONDS = 3
+STARTUP_TIMEOUT = 60
+
+
+def print_section(title, color=BLUE):
+    print(f"\n{color}{'='*80}")
+    print(f"  {title}")
+    print(f"{'='*80}{RESET}\n")
+
+
+def print_success(msg):
+    print(f"{GREEN}✓ {msg}{RESET}")
+
+
+def print_error(msg):
+    print(f"{RED}✗ {msg}{RESET}")
+
+
+def print_info(msg):
+    print(f"{CYAN}➤ {msg}{RESET}")
+
+
+# ============================================================================ #
+# SEEDING
+# ============================================================================ #
+
+def seed(db, customers, items):
+    """Vendor with a menu of `items` untracked items and `customers` customers; returns (vendor_id, item_ids, user_ids, customer_ids)"""
+    tag = uuid.uuid4().hex[:8]
+
+    vendor_user_id = db.session.execute(db.text("""
+        INSERT INTO users (email, password_hash, role, full_name, is_email_verified)
+        VALUES ('bench-vendor-' || :tag || '@example.com', 'x', 'vendor', 'Bench Vendor', TRUE)
+        RETURNING id;
+    """), {"tag": tag}).scalar()
+    vendor_id = db.session.execute(db.text("""
+        INSERT INTO vendors (user_id, vendor_name, location)
+        VALUES (:user_id, 'Bench Vendor ' || :tag, 'Bench Hall')
+        RETURNING id;
+    """), {"tag": tag, "user_id": vendor_user_id}).scalar()
+    menu_id = db.session.execute(db.text("""
+        INSERT INTO menus (vendor_id, title) VALUES (:vendor_id, 'Bench Menu') RETURNING id;
+    """), {"vendor_id": vendor_id}).scalar()
+    item_ids = db.session.execute(db.text("""
+        INSERT INTO menu_items (menu_id, vendor_id, name, description, price, preparation_time_minutes)
+        SELECT :menu_id, :vendor_id, 'Bench Item ' || i, 'Benchmark item number ' || i, 100 + i, 5
+        FROM generate_series(1, :n) i
+        RETURNING id;
+    """), {"menu_id": menu_id, "vendor_id": vendor_id, "n": items}).scalars().all()
+
+    customer_ids = db.session.execute(db.text("""
+        INSERT INTO users (email, password_hash, role, full_name, is_email_verified)
+        SELECT 'bench-customer-' || :tag || '-' || i || '@example.com', 'x', 'customer', 'Bench Customer ' || i, TRUE
+        FROM generate_series(1, :n) i
+        RETURNING id;
+    """), {"tag": tag, "n": customers}).scalars().all()
+    db.session.commit()
+
+    return vendor_id, item_ids, [vendor_user_id, *customer_ids], customer_ids
+
+
+def cleanup(db, user_ids):
+    db.session.execute(db.text("DELETE FROM users WHERE id = ANY(:ids);"), {"ids": list(user_ids)})
+    db.session.commit()
+
+
+# ============================================================================ #
+# SERVERS
+# ============================================================================ #
+
+def start_server(mode, port, workers, threads):
+    if mode == "dev":
+        command = [
+            sys.executable, "-m", "flask", "--app", "backend.app", "--debug",
+            "run", "--port", str(port), "--no-reload",
+        ]
+    else:
+        command = [
+            sys.executable, "-m", "backend.serve", "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers), "--threads", str(threads),
+        ]
+    proc = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{mode} server exited with code {proc.returncode}: {' '.join(command)}")
+        try:
+            if requests.get(f"{base_url}/api/customer/health", timeout=1).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+
+    proc.terminate()
+    raise SystemExit(f"{mode} server did not become healthy within {STARTUP_TIMEOUT}s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# ============================================================================ #
+# LOAD
+# ============================================================================ #
+
+def client(base_url, token, vendor_id, item_ids, stop_at, record_from, samples, seed_value):
+    rng = random.Random(seed_value)
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {token}"
+    operations = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+
+    while True:
+        started = time.perf_counter()
+        if started >= stop_at:
+            return
+        operation = rng.choices(operations, weights)[0]
+
+        try:
+            if operation == "menu":
+                response = session.get(f"{base_url}/api/customer/vendors/{vendor_id}/menu")
+            elif operation == "vendors":
+                response = session.get(f"{base_url}/api/customer/vendors")
+            elif operation == "history":
+                response = session.get(f"{base_url}/api/customer/orders", params={"limit": 10})
+            else:
+                response = session.post(f"{base_url}/api/customer/orders", json={
+                    "vendor_id": vendor_id,
+                    "pickup_time": (datetime.utcnow() + timedelta(hours=2)).isoformat(),
+                    "items": [
+                        {"menu_item_id": item_id, "quantity": rng.randint(1, 2)}
+                        for item_id in rng.sample(item_ids, rng.randint(1, 3))
+                    ],
+                })
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+
+        finished = time.perf_counter()
+        if started >= record_from:
+            samples.append((operation, ok, finished - started))
+
+
+def run_load(base_url, tokens, vendor_id, item_ids, duration):
+    """Warm up, then measure for `duration` seconds; returns (samples, measured seconds)"""
+    samples = []
+    record_from = time.perf_counter() + WARMUP_SECONDS
+    stop_at = record_from + duration
+    threads = [
+        threading.Thread(
+            target=client,
+            args=(base_url, token, vendor_id, item_ids, stop_at, record_from, samples, index)
+        )
+        for index, token in enumerate(tokens)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, duration
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def summarize(samples, seconds):
+    latencies = sorted(latency for _, _, latency in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, ok, _ in samples if not ok),
+        "rps": len(samples) / seconds,
+        "p50": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+    }
+
+
+# ============================================================================ #
+# MAIN
+# ============================================================================ #
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the dev server with gunicorn on a mixed workload")
+    parser.add_argument("--modes", default="dev,gunicorn", help="Comma-separated: dev, gunicorn")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent client threads")
+    parser.add_argument("--duration", type=int, default=30, help="Measured seconds per mode")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--items", type=int, default=30, help="Menu items to seed")
+    parser.add_argument("--port-base", type=int, default=5100)
+    parser.add_argument("--keep", action="store_true", help="keep seeded rows")
+    args = parser.parse_args()
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+
+    for mode in modes:
+        if mode not in ("dev", "gunicorn"):
+            raise SystemExit(f"Unknown mode: {mode}")
+
+    from backend.app import create_app
+    from backend.extensions import db
+    from backend.utils import create_token
+
+    app = create_app()
+    print_section(f"🚀 SERVER BENCHMARK ({args.clients} clients, {args.duration}s per mode)")
+
+    with app.app_context():
+        print_info("Seeding vendor, menu and customers...")
+        vendor_id, item_ids, user_ids, customer_ids = seed(db, args.clients, args.items)
+        tokens = [create_token(customer_id, "customer") for customer_id in customer_ids]
+
+    results = {}
+    try:
+        for index, mode in enumerate(modes):
+            label = mode if mode == "dev" else f"gunicorn {args.workers}x{args.threads}"
+            print_info(f"Starting {label} server...")
+            proc, base_url = start_server(mode, args.port_base + index, args.workers, args.threads)
+            try:
+                print_info(f"Running load against {label} ({WARMUP_SECONDS}s warm-up + {args.duration}s)...")
+                samples, seconds = run_load(base_url, tokens, vendor_id, item_ids, args.duration)
+            finally:
+                stop_server(proc)
+
+            results[label] = (summarize(samples, seconds), {
+                operation: summarize([s for s in samples if s[0] == operation], seconds)
+                for operation, _ in MIX
+            })
+            print_success(f"{label}: {results[label][0]['rps']:,.0f} requests/s")
+    finally:
+        if not args.keep:
+            with app.app_context():
+                cleanup(db, user_ids)
+
+    print_section("RESULTS")
+    print(f"  {'server':<22}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>10}")
+    for label, (overall, _) in results.items():
+        print(f"  {label:<22}{overall['rps']:>10,.0f}{overall['p50']:>10.1f}"
+              f"{overall['p95']:>10.1f}{overall['p99']:>10.1f}{overall['errors']:>10}")
+
+    print()
+    for label, (_, per_operation) in results.items():
+        print(f"  {label}")
+        for operation, stats in per_operation.items():
+            print(f"    {operation:<18}{stats['rps']:>10,.0f} req/s   p50 {stats['p50']:>7.1f} ms   "
+                  f"p95 {stats['p95']:>7.1f} ms   errors {stats['errors']}")
+    print()
+
+    if len(results) == 2:
+        (base_label, (base, _)), (label, (other, _)) = results.items()
+        if base["rps"]:
+            print_success(f"{label} handled {other['rps'] / base['rps']:.1f}x the throughput of {base_label}")
+
+    if any(overall["errors"] for overall, _ in results.values()):
+        print_error("Some requests failed; check the server logs")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -61,7 +61,25 @@ RETURNS BOOLEAN AS $$
     WHERE id = p_item_id;
 $$ LANGUAGE SQL;
 
+-- Function 4: Start of the pickup slot a time falls into (fixed buckets from the epoch)
+CREATE OR REPLACE FUNCTION pickup_slot_start(p_time TIMESTAMP, p_slot_minutes INTEGER)
+RETURNS TIMESTAMP AS $$
+    SELECT TIMESTAMP 'epoch'
+        + floor(extract(epoch FROM p_time) / (p_slot_minutes * 60)) * (p_slot_minutes * 60) * INTERVAL '1 second';
+$$ LANGUAGE sql IMMUTABLE;
+
 -- Procedure 1: Place Order
+-- Tracked stock (menu_items.stock NOT NULL) is taken with a conditional UPDATE, so two
+-- customers racing for the last unit can't both get it; every sold-out line is
+-- collected and returned together, and the whole order is rolled back.
+-- When the vendor has slot capacity configured, the order's kitchen minutes are
+-- admitted into its pickup slot with one conditional upsert on vendor_slot_usage.
+-- Rows are locked in item id order (tracked items up front, order lines and their
+-- stats counters in one INSERT sorted by item), so orders sharing items queue instead
+-- of deadlocking. A deadlock or serialization failure is raised to the caller, which
+-- retries the whole transaction
+DROP FUNCTION IF EXISTS place_customer_order(INTEGER, INTEGER, TIMESTAMP, VARCHAR, TEXT, JSONB);
+
 CREATE OR REPLACE FUNCTION place_customer_order(
     p_customer_id INTEGER,
     p_vendor_id INTEGER,
@@ -72,27 +90,47 @@ CREATE OR REPLACE FUNCTION place_customer_order(
 ) RETURNS TABLE(
     order_id INTEGER,
     total_amount DECIMAL(12,2),
-    status_message TEXT
+    status_message TEXT,
+    sold_out_item_ids INTEGER[],
+    prep_minutes INTEGER
 ) AS $$
 DECLARE
     v_order_id INTEGER;
+    v_placed_at TIMESTAMP;
     v_total DECIMAL(12,2) := 0;
     v_item JSONB;
     v_menu_item RECORD;
+    v_quantity INTEGER;
+    v_stock_left INTEGER;
     v_item_total DECIMAL(12,2);
+    v_lines JSONB := '[]';
+    v_sold_out INTEGER[] := '{}';
+    v_emptied_menus INTEGER[] := '{}';
+    v_prep INTEGER := 0;
+    v_settings RECORD;
+    v_slot TIMESTAMP;
 BEGIN
     -- Validate vendor
     IF NOT EXISTS (SELECT 1 FROM vendors WHERE id = p_vendor_id) THEN
-        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'ERROR: Vendor not found';
+        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'ERROR: Vendor not found', NULL::INTEGER[], NULL::INTEGER;
         RETURN;
     END IF;
     
     -- Validate pickup time
     IF p_scheduled_for <= NOW() THEN
-        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'ERROR: Pickup time must be in the future';
+        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'ERROR: Pickup time must be in the future', NULL::INTEGER[], NULL::INTEGER;
         RETURN;
     END IF;
     
+    -- Lock every tracked item of the order in id order before decrementing any of them
+    PERFORM 1
+    FROM menu_items mi
+    WHERE mi.vendor_id = p_vendor_id
+      AND mi.stock IS NOT NULL
+      AND mi.id IN (SELECT (e->>'menu_item_id')::INTEGER FROM jsonb_array_elements(p_items) e)
+    ORDER BY mi.id
+    FOR UPDATE;
+    
     -- Create order
     INSERT INTO orders (
         customer_id, vendor_id, scheduled_for,
@@ -102,11 +140,16 @@ BEGIN
         p_customer_id, p_vendor_id, p_scheduled_for,
         0, 'pending', 'pending',
         p_pickup_or_delivery, p_notes
-    ) RETURNING id INTO v_order_id;
+    ) RETURNING id, placed_at INTO v_order_id, v_placed_at;
+    
+    -- Stock decrements below are not menu changes (trg_menu_items_change_log_update)
+    PERFORM set_config('fems.order_stock', 'on', true);
     
     -- Process items
     FOR v_item IN SELECT * FROM jsonb_array_elements(p_items)
     LOOP
+        v_quantity := (v_item->>'quantity')::INTEGER;
+        
         SELECT * INTO v_menu_item
         FROM menu_items
         WHERE id = (v_item->>'menu_item_id')::INTEGER
@@ -117,62 +160,627 @@ BEGIN
         END IF;
         
         IF NOT v_menu_item.available THEN
-            RAISE EXCEPTION 'Item % is not available', v_menu_item.name;
+            v_sold_out := v_sold_out || v_menu_item.id;
+            CONTINUE;
         END IF;
         
-        v_item_total := v_menu_item.price * (v_item->>'quantity')::INTEGER;
+        -- Untracked items (stock IS NULL) are never locked; tracked ones are decremented
+        -- only if enough is left, and go unavailable when they hit zero
+        IF v_menu_item.stock IS NOT NULL THEN
+            UPDATE menu_items mi
+            SET 
+                stock = mi.stock - v_quantity,
+                available = mi.available AND mi.stock - v_quantity > 0
+            WHERE mi.id = v_menu_item.id
+              AND mi.available
+              AND mi.stock >= v_quantity
+            RETURNING mi.stock INTO v_stock_left;
+            
+            IF NOT FOUND THEN
+                v_sold_out := v_sold_out || v_menu_item.id;
+                CONTINUE;
+            END IF;
+            
+            IF v_stock_left = 0 THEN
+                v_emptied_menus := v_emptied_menus || v_menu_item.menu_id;
+            END IF;
+        END IF;
+        
+        v_item_total := v_menu_item.price * v_quantity;
         v_total := v_total + v_item_total;
+        v_prep := v_prep + COALESCE(v_menu_item.preparation_time_minutes, 15) * v_quantity;
         
-        INSERT INTO order_items (
-            order_id, menu_item_id, name_snapshot,
-            price_snapshot, quantity, notes
-        ) VALUES (
-            v_order_id,
-            v_menu_item.id,
-            v_menu_item.name,
-            v_menu_item.price,
-            (v_item->>'quantity')::INTEGER,
-            v_item->>'notes'
+        v_lines := v_lines || jsonb_build_object(
+            'line', jsonb_array_length(v_lines),
+            'menu_item_id', v_menu_item.id,
+            'name', v_menu_item.name,
+            'price', v_menu_item.price,
+            'quantity', v_quantity,
+            'notes', v_item->>'notes'
         );
     END LOOP;
     
-    -- Update total
-    UPDATE orders SET total_amount = v_total WHERE id = v_order_id;
+    PERFORM set_config('fems.order_stock', 'off', true);
+    
+    -- Undoes the order and every decrement made above (the block is a subtransaction)
+    IF array_length(v_sold_out, 1) > 0 THEN
+        RAISE EXCEPTION 'SOLD_OUT';
+    END IF;
+    
+    -- One statement for all lines, in item order: the statement-level menu_item_stats
+    -- trigger sees the whole order and updates its counters in that order too
+    INSERT INTO order_items (
+        order_id, placed_at, menu_item_id, name_snapshot,
+        price_snapshot, quantity, notes
+    )
+    SELECT v_order_id, v_placed_at, l.menu_item_id, l.name, l.price, l.quantity, l.notes
+    FROM jsonb_to_recordset(v_lines) AS l(
+        line INTEGER,
+        menu_item_id INTEGER,
+        name VARCHAR(200),
+        price DECIMAL(10,2),
+        quantity INTEGER,
+        notes TEXT
+    )
+    ORDER BY l.menu_item_id, l.line;
+    
+    -- Slot admission: the WHERE on the conflict branch is the capacity check, so concurrent
+    -- orders for the same slot can't overshoot it. An empty slot always takes one order,
+    -- otherwise an order bigger than the whole capacity could never be placed
+    SELECT * INTO v_settings FROM vendor_slot_settings WHERE vendor_id = p_vendor_id;
+    IF FOUND THEN
+        v_slot := pickup_slot_start(p_scheduled_for, v_settings.slot_minutes);
+        
+        INSERT INTO vendor_slot_usage AS u (vendor_id, slot_start, used_minutes, order_count)
+        VALUES (p_vendor_id, v_slot, v_prep, 1)
+        ON CONFLICT (vendor_id, slot_start) DO UPDATE SET
+            used_minutes = u.used_minutes + EXCLUDED.used_minutes,
+            order_count = u.order_count + 1,
+            updated_at = NOW()
+        WHERE u.used_minutes = 0
+           OR u.used_minutes + EXCLUDED.used_minutes <= v_settings.capacity_minutes;
+        
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'SLOT_FULL';
+        END IF;
+    END IF;
+    
+    -- Items that just sold out: one menu version bump and one invalidation for the order
+    IF array_length(v_emptied_menus, 1) > 0 THEN
+        UPDATE menus SET version = version + 1 WHERE id = ANY(v_emptied_menus);
+        PERFORM publish_cache_invalidation('menu', p_vendor_id::TEXT);
+    END IF;
+    
+    -- Update total; hold the order from the kitchen until scheduled_for minus its kitchen
+    -- minutes (backend/scheduler.py releases it), or release it now if that's already due
+    UPDATE orders 
+    SET 
+        total_amount = v_total,
+        prep_minutes = v_prep,
+        slot_start = v_slot,
+        release_at = p_scheduled_for - make_interval(mins => v_prep),
+        released_at = CASE WHEN p_scheduled_for - make_interval(mins => v_prep) <= NOW() THEN NOW() END
+    WHERE id = v_order_id AND placed_at = v_placed_at;
     
-    RETURN QUERY SELECT v_order_id, v_total, 'SUCCESS: Order placed successfully';
+    RETURN QUERY SELECT v_order_id, v_total, 'SUCCESS: Order placed successfully', NULL::INTEGER[], v_prep;
     
 EXCEPTION
+    WHEN deadlock_detected OR serialization_failure THEN
+        -- Nothing was ordered; the caller retries the transaction (not an ERROR row)
+        RAISE;
     WHEN OTHERS THEN
-        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), ('ERROR: ' || SQLERRM);
+        IF SQLERRM = 'SOLD_OUT' THEN
+            RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'SOLD_OUT: Some items are sold out'::TEXT, v_sold_out, NULL::INTEGER;
+        ELSIF SQLERRM = 'SLOT_FULL' THEN
+            RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), ('SLOT_FULL: The ' || to_char(v_slot, 'HH24:MI') || ' pickup slot is full')::TEXT, NULL::INTEGER[], v_prep;
+        ELSE
+            RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), ('ERROR: ' || SQLERRM), NULL::INTEGER[], NULL::INTEGER;
+        END IF;
 END;
 $$ LANGUAGE plpgsql;
 
 -- Procedure 2: Cancel Order
+DROP FUNCTION IF EXISTS cancel_customer_order(INTEGER, INTEGER);
+
 CREATE OR REPLACE FUNCTION cancel_customer_order(
     p_order_id INTEGER,
-    p_customer_id INTEGER
+    p_customer_id INTEGER,
+    p_expected_version INTEGER DEFAULT NULL
 ) RETURNS TEXT AS $$
 DECLARE
-    v_order RECORD;
+    v_current RECORD;
 BEGIN
-    SELECT * INTO v_order
-    FROM orders
-    WHERE id = p_order_id AND customer_id = p_customer_id;
+    -- Compare-and-set: only succeeds if the order is still in a status customers may cancel from
+    UPDATE orders o
+    SET 
+        status = 'cancelled',
+        version = o.version + 1
+    FROM order_status_transitions t
+    WHERE o.id = p_order_id
+      AND o.customer_id = p_customer_id
+      AND t.actor = 'customer'
+      AND t.to_status = 'cancelled'
+      AND t.from_status = o.status
+      AND (p_expected_version IS NULL OR o.version = p_expected_version);
     
-    IF NOT FOUND THEN
-        RETURN 'ERROR: Order not found';
+    IF FOUND THEN
+        RETURN 'SUCCESS: Order cancelled';
     END IF;
     
-    IF v_order.status NOT IN ('pending') THEN
-        RETURN 'ERROR: Only pending orders can be cancelled';
-    END IF;
+    SELECT o.status, o.version INTO v_current
+    FROM orders o
+    WHERE o.id = p_order_id AND o.customer_id = p_customer_id;
     
-    UPDATE orders SET status = 'cancelled' WHERE id = p_order_id;
+    IF NOT FOUND THEN
+        RETURN 'ERROR: Order not found';
+    ELSIF p_expected_version IS NOT NULL AND v_current.version <> p_expected_version THEN
+        RETURN 'CONFLICT: Order was modified (now version ' || v_current.version || ', status ' || v_current.status || ')';
+    END IF;
     
-    RETURN 'SUCCESS: Order cancelled';
+    RETURN 'CONFLICT: Only pending orders can be cancelled (order is ' || v_current.status || ')';
     
 EXCEPTION
     WHEN OTHERS THEN
         RETURN 'ERROR: ' || SQLERRM;
 END;
-$$ LANGUAGE plpgsql;
\ No newline at end of file
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- PICKUP SLOT CAPACITY
+-- ============================================
+
+-- Trigger: give a cancelled or rejected order's kitchen minutes back to its slot
+CREATE OR REPLACE FUNCTION release_order_slot()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.slot_start IS NULL
+       OR NEW.status NOT IN ('cancelled', 'rejected')
+       OR OLD.status IN ('cancelled', 'rejected') THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE vendor_slot_usage
+    SET 
+        used_minutes = GREATEST(used_minutes - COALESCE(NEW.prep_minutes, 0), 0),
+        order_count = GREATEST(order_count - 1, 0),
+        updated_at = NOW()
+    WHERE vendor_id = NEW.vendor_id AND slot_start = NEW.slot_start;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_release_slot ON orders;
+CREATE TRIGGER trg_orders_release_slot
+AFTER UPDATE OF status ON orders
+FOR EACH ROW EXECUTE FUNCTION release_order_slot();
+
+-- Function 5: Slot availability between two times, read from the vendor_slot_usage counters
+CREATE OR REPLACE FUNCTION get_vendor_slots(
+    p_vendor_id INTEGER,
+    p_from TIMESTAMP,
+    p_to TIMESTAMP
+) RETURNS TABLE(
+    slot_start TIMESTAMP,
+    slot_end TIMESTAMP,
+    capacity_minutes INTEGER,
+    used_minutes INTEGER,
+    remaining_minutes INTEGER,
+    order_count INTEGER
+) AS $$
+    SELECT 
+        g.slot_start,
+        g.slot_start + make_interval(mins => s.slot_minutes),
+        s.capacity_minutes,
+        COALESCE(u.used_minutes, 0),
+        GREATEST(s.capacity_minutes - COALESCE(u.used_minutes, 0), 0),
+        COALESCE(u.order_count, 0)
+    FROM vendor_slot_settings s
+    CROSS JOIN LATERAL generate_series(
+        pickup_slot_start(p_from, s.slot_minutes),
+        p_to,
+        make_interval(mins => s.slot_minutes)
+    ) AS g(slot_start)
+    LEFT JOIN vendor_slot_usage u 
+        ON u.vendor_id = s.vendor_id AND u.slot_start = g.slot_start
+    WHERE s.vendor_id = p_vendor_id
+    ORDER BY g.slot_start;
+$$ LANGUAGE sql STABLE;
+
+-- Function 6: Open slots closest to the requested time that can still take p_prep_minutes
+CREATE OR REPLACE FUNCTION suggest_pickup_slots(
+    p_vendor_id INTEGER,
+    p_around TIMESTAMP,
+    p_prep_minutes INTEGER,
+    p_limit INTEGER DEFAULT 3
+) RETURNS TABLE(
+    slot_start TIMESTAMP,
+    remaining_minutes INTEGER
+) AS $$
+    SELECT v.slot_start, v.remaining_minutes
+    FROM get_vendor_slots(p_vendor_id, p_around - INTERVAL '3 hours', p_around + INTERVAL '3 hours') v
+    WHERE v.slot_start > NOW()
+    AND (v.used_minutes = 0 OR v.remaining_minutes >= p_prep_minutes)
+    ORDER BY abs(extract(epoch FROM v.slot_start - p_around)), v.slot_start
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Procedure 3: Re-derive upcoming orders' slots from the current settings and rebuild usage
+-- (after a vendor changes slot_minutes, or to repair drifted counters)
+CREATE OR REPLACE FUNCTION rebuild_vendor_slot_usage(p_vendor_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    -- Blocks admissions until we commit, so no order is double-counted or lost
+    LOCK TABLE vendor_slot_usage IN EXCLUSIVE MODE;
+
+    UPDATE orders o
+    SET 
+        slot_start = CASE WHEN s.vendor_id IS NULL THEN NULL ELSE pickup_slot_start(o.scheduled_for, s.slot_minutes) END,
+        prep_minutes = COALESCE(o.prep_minutes, (
+            SELECT SUM(COALESCE(mi.preparation_time_minutes, 15) * oi.quantity)::INTEGER
+            FROM order_items oi
+            LEFT JOIN menu_items mi ON mi.id = oi.menu_item_id
+            WHERE oi.order_id = o.id AND oi.placed_at = o.placed_at
+        ))
+    FROM vendors v
+    LEFT JOIN vendor_slot_settings s ON s.vendor_id = v.id
+    WHERE o.vendor_id = v.id
+    AND o.scheduled_for >= NOW()
+    AND (p_vendor_id IS NULL OR o.vendor_id = p_vendor_id);
+
+    DELETE FROM vendor_slot_usage
+    WHERE slot_start >= pickup_slot_start(NOW(), 1440)
+    AND (p_vendor_id IS NULL OR vendor_id = p_vendor_id);
+
+    INSERT INTO vendor_slot_usage (vendor_id, slot_start, used_minutes, order_count)
+    SELECT o.vendor_id, o.slot_start, COALESCE(SUM(o.prep_minutes), 0), COUNT(*)
+    FROM orders o
+    WHERE o.slot_start IS NOT NULL
+    AND o.slot_start >= pickup_slot_start(NOW(), 1440)
+    AND o.status NOT IN ('cancelled', 'rejected')
+    AND (p_vendor_id IS NULL OR o.vendor_id = p_vendor_id)
+    GROUP BY o.vendor_id, o.slot_start;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- CUSTOMER STATS (materialized per-customer aggregates)
+-- ============================================
+
+-- Function 7: Apply a delta to one customer's stats row (upsert)
+CREATE OR REPLACE FUNCTION apply_customer_stats_delta(
+    p_customer_id INTEGER,
+    p_order_delta INTEGER,
+    p_amount_delta DECIMAL(12,2),
+    p_placed_at TIMESTAMP,
+    p_old_status VARCHAR(20),
+    p_new_status VARCHAR(20)
+) RETURNS VOID AS $$
+BEGIN
+    IF p_customer_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    -- Deleting a customer cascades to their stats row first, then sets their orders'
+    -- customer_id to NULL, which fires the trigger for the old id: nothing left to count
+    INSERT INTO customer_stats AS cs (
+        customer_id, total_orders, total_spent, last_order_at,
+        pending_orders, accepted_orders, preparing_orders, ready_orders,
+        completed_orders, cancelled_orders, rejected_orders
+    )
+    SELECT
+        p_customer_id, p_order_delta, p_amount_delta, p_placed_at,
+        (p_new_status IS NOT DISTINCT FROM 'pending')::INT - (p_old_status IS NOT DISTINCT FROM 'pending')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'accepted')::INT - (p_old_status IS NOT DISTINCT FROM 'accepted')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'preparing')::INT - (p_old_status IS NOT DISTINCT FROM 'preparing')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'ready')::INT - (p_old_status IS NOT DISTINCT FROM 'ready')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'completed')::INT - (p_old_status IS NOT DISTINCT FROM 'completed')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'cancelled')::INT - (p_old_status IS NOT DISTINCT FROM 'cancelled')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'rejected')::INT - (p_old_status IS NOT DISTINCT FROM 'rejected')::INT
+    WHERE EXISTS (SELECT 1 FROM users WHERE id = p_customer_id)
+    ON CONFLICT (customer_id) DO UPDATE SET
+        total_orders = cs.total_orders + EXCLUDED.total_orders,
+        total_spent = cs.total_spent + EXCLUDED.total_spent,
+        last_order_at = GREATEST(cs.last_order_at, EXCLUDED.last_order_at),
+        pending_orders = cs.pending_orders + EXCLUDED.pending_orders,
+        accepted_orders = cs.accepted_orders + EXCLUDED.accepted_orders,
+        preparing_orders = cs.preparing_orders + EXCLUDED.preparing_orders,
+        ready_orders = cs.ready_orders + EXCLUDED.ready_orders,
+        completed_orders = cs.completed_orders + EXCLUDED.completed_orders,
+        cancelled_orders = cs.cancelled_orders + EXCLUDED.cancelled_orders,
+        rejected_orders = cs.rejected_orders + EXCLUDED.rejected_orders,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger: keep customer_stats in step with orders inside the same transaction
+CREATE OR REPLACE FUNCTION sync_customer_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM apply_customer_stats_delta(NEW.customer_id, 1, NEW.total_amount, NEW.placed_at, NULL, NEW.status);
+
+    ELSIF TG_OP = 'UPDATE' THEN
+        IF NEW.customer_id IS NOT DISTINCT FROM OLD.customer_id THEN
+            PERFORM apply_customer_stats_delta(NEW.customer_id, 0, NEW.total_amount - OLD.total_amount, NEW.placed_at, OLD.status, NEW.status);
+        ELSE
+            PERFORM apply_customer_stats_delta(OLD.customer_id, -1, -OLD.total_amount, NULL, OLD.status, NULL);
+            PERFORM apply_customer_stats_delta(NEW.customer_id, 1, NEW.total_amount, NEW.placed_at, NULL, NEW.status);
+        END IF;
+
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM apply_customer_stats_delta(OLD.customer_id, -1, -OLD.total_amount, NULL, OLD.status, NULL);
+    END IF;
+
+    -- MAX() can't be decremented, so recompute last_order_at when its order goes away
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.customer_id IS NOT NULL
+       AND (TG_OP = 'DELETE' OR NEW.customer_id IS DISTINCT FROM OLD.customer_id) THEN
+        UPDATE customer_stats
+        SET last_order_at = (SELECT MAX(placed_at) FROM orders_all WHERE customer_id = OLD.customer_id)
+        WHERE customer_id = OLD.customer_id AND last_order_at = OLD.placed_at;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_customer_stats ON orders;
+CREATE TRIGGER trg_orders_customer_stats
+AFTER INSERT OR DELETE OR UPDATE OF customer_id, status, total_amount ON orders
+FOR EACH ROW EXECUTE FUNCTION sync_customer_stats();
+
+-- Procedure 4: Rebuild customer_stats from the raw orders table, archive included (backfill)
+CREATE OR REPLACE FUNCTION rebuild_customer_stats(p_customer_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    -- Blocks trigger writes until we commit, so no concurrent delta is lost or counted twice
+    LOCK TABLE customer_stats IN EXCLUSIVE MODE;
+
+    DELETE FROM customer_stats
+    WHERE p_customer_id IS NULL OR customer_id = p_customer_id;
+
+    INSERT INTO customer_stats (
+        customer_id, total_orders, total_spent, last_order_at,
+        pending_orders, accepted_orders, preparing_orders, ready_orders,
+        completed_orders, cancelled_orders, rejected_orders
+    )
+    SELECT
+        o.customer_id,
+        COUNT(*),
+        COALESCE(SUM(o.total_amount), 0),
+        MAX(o.placed_at),
+        COUNT(*) FILTER (WHERE o.status = 'pending'),
+        COUNT(*) FILTER (WHERE o.status = 'accepted'),
+        COUNT(*) FILTER (WHERE o.status = 'preparing'),
+        COUNT(*) FILTER (WHERE o.status = 'ready'),
+        COUNT(*) FILTER (WHERE o.status = 'completed'),
+        COUNT(*) FILTER (WHERE o.status = 'cancelled'),
+        COUNT(*) FILTER (WHERE o.status = 'rejected')
+    FROM orders_all o
+    WHERE o.customer_id IS NOT NULL
+    AND (p_customer_id IS NULL OR o.customer_id = p_customer_id)
+    GROUP BY o.customer_id;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function 8: Compare customer_stats against the raw orders table, archive included
+-- Returns one row per customer whose stored stats disagree with the orders
+CREATE OR REPLACE FUNCTION check_customer_stats()
+RETURNS TABLE(
+    customer_id INTEGER,
+    expected JSONB,
+    actual JSONB
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH raw AS (
+        SELECT
+            o.customer_id,
+            jsonb_build_object(
+                'total_orders', COUNT(*),
+                'total_spent', COALESCE(SUM(o.total_amount), 0),
+                'last_order_at', MAX(o.placed_at),
+                'pending_orders', COUNT(*) FILTER (WHERE o.status = 'pending'),
+                'accepted_orders', COUNT(*) FILTER (WHERE o.status = 'accepted'),
+                'preparing_orders', COUNT(*) FILTER (WHERE o.status = 'preparing'),
+                'ready_orders', COUNT(*) FILTER (WHERE o.status = 'ready'),
+                'completed_orders', COUNT(*) FILTER (WHERE o.status = 'completed'),
+                'cancelled_orders', COUNT(*) FILTER (WHERE o.status = 'cancelled'),
+                'rejected_orders', COUNT(*) FILTER (WHERE o.status = 'rejected')
+            ) AS stats
+        FROM orders_all o
+        WHERE o.customer_id IS NOT NULL
+        GROUP BY o.customer_id
+    ),
+    stored AS (
+        SELECT
+            cs.customer_id,
+            jsonb_build_object(
+                'total_orders', cs.total_orders,
+                'total_spent', cs.total_spent,
+                'last_order_at', cs.last_order_at,
+                'pending_orders', cs.pending_orders,
+                'accepted_orders', cs.accepted_orders,
+                'preparing_orders', cs.preparing_orders,
+                'ready_orders', cs.ready_orders,
+                'completed_orders', cs.completed_orders,
+                'cancelled_orders', cs.cancelled_orders,
+                'rejected_orders', cs.rejected_orders
+            ) AS stats
+        FROM customer_stats cs
+        -- an all-zero row is what a customer looks like after every order was deleted
+        WHERE cs.total_orders <> 0 OR cs.total_spent <> 0 OR cs.last_order_at IS NOT NULL
+    )
+    SELECT
+        COALESCE(raw.customer_id, stored.customer_id),
+        raw.stats,
+        stored.stats
+    FROM raw
+    FULL OUTER JOIN stored ON raw.customer_id = stored.customer_id
+    WHERE raw.stats IS DISTINCT FROM stored.stats
+    ORDER BY 1;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- VENDOR LOAD (live queue counters for the vendor directory)
+-- ============================================
+
+-- Function 9: Apply a delta to one vendor's load row (upsert)
+CREATE OR REPLACE FUNCTION apply_vendor_load_delta(
+    p_vendor_id INTEGER,
+    p_order_delta INTEGER,
+    p_minutes_delta INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    IF p_vendor_id IS NULL OR (p_order_delta = 0 AND p_minutes_delta = 0) THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO vendor_load AS vl (vendor_id, queued_orders, queued_minutes)
+    VALUES (p_vendor_id, GREATEST(p_order_delta, 0), GREATEST(p_minutes_delta, 0))
+    ON CONFLICT (vendor_id) DO UPDATE SET
+        queued_orders = GREATEST(vl.queued_orders + p_order_delta, 0),
+        queued_minutes = GREATEST(vl.queued_minutes + p_minutes_delta, 0),
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger: keep vendor_load in step with open orders inside the same transaction
+-- (prep_minutes is filled in by place_customer_order's final UPDATE, hence UPDATE OF prep_minutes;
+-- pending orders held for later only count once the release scheduler sets released_at)
+CREATE OR REPLACE FUNCTION sync_vendor_load()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old_open BOOLEAN := TG_OP IN ('UPDATE', 'DELETE') AND (
+        OLD.status IN ('accepted', 'preparing') OR (OLD.status = 'pending' AND OLD.released_at IS NOT NULL)
+    );
+    v_new_open BOOLEAN := TG_OP IN ('INSERT', 'UPDATE') AND (
+        NEW.status IN ('accepted', 'preparing') OR (NEW.status = 'pending' AND NEW.released_at IS NOT NULL)
+    );
+BEGIN
+    IF TG_OP = 'UPDATE' AND v_old_open AND v_new_open AND NEW.vendor_id = OLD.vendor_id THEN
+        PERFORM apply_vendor_load_delta(
+            NEW.vendor_id, 0, COALESCE(NEW.prep_minutes, 0) - COALESCE(OLD.prep_minutes, 0)
+        );
+        RETURN NULL;
+    END IF;
+
+    IF v_old_open THEN
+        PERFORM apply_vendor_load_delta(OLD.vendor_id, -1, -COALESCE(OLD.prep_minutes, 0));
+    END IF;
+    IF v_new_open THEN
+        PERFORM apply_vendor_load_delta(NEW.vendor_id, 1, COALESCE(NEW.prep_minutes, 0));
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_vendor_load ON orders;
+CREATE TRIGGER trg_orders_vendor_load
+AFTER INSERT OR DELETE OR UPDATE OF vendor_id, status, prep_minutes, released_at ON orders
+FOR EACH ROW EXECUTE FUNCTION sync_vendor_load();
+
+-- Procedure 5: Rebuild vendor_load from the open orders (backfill, or to repair drifted counters)
+CREATE OR REPLACE FUNCTION rebuild_vendor_load(p_vendor_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    -- Blocks trigger writes until we commit, so no concurrent delta is lost or counted twice
+    LOCK TABLE vendor_load IN EXCLUSIVE MODE;
+
+    DELETE FROM vendor_load
+    WHERE p_vendor_id IS NULL OR vendor_id = p_vendor_id;
+
+    INSERT INTO vendor_load (vendor_id, queued_orders, queued_minutes)
+    SELECT o.vendor_id, COUNT(*), COALESCE(SUM(o.prep_minutes), 0)
+    FROM orders o
+    WHERE (o.status IN ('accepted', 'preparing') OR (o.status = 'pending' AND o.released_at IS NOT NULL))
+    AND (p_vendor_id IS NULL OR o.vendor_id = p_vendor_id)
+    GROUP BY o.vendor_id;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- CACHE BUS (invalidation of the workers' in-process caches)
+-- ============================================
+
+-- Function 10: Bump a cache key's version and notify every worker, inside the caller's
+-- transaction: the row lock orders versions per key by commit, and NOTIFY is only
+-- delivered if the write commits (backend/cache.py listens on fems_cache)
+CREATE OR REPLACE FUNCTION publish_cache_invalidation(p_cache TEXT, p_key TEXT)
+RETURNS BIGINT AS $$
+DECLARE
+    v_version BIGINT;
+BEGIN
+    INSERT INTO cache_versions (cache_name, cache_key, version)
+    VALUES (p_cache, p_key, 1)
+    ON CONFLICT (cache_name, cache_key) DO UPDATE SET
+        version = cache_versions.version + 1,
+        updated_at = NOW()
+    RETURNING version INTO v_version;
+
+    PERFORM pg_notify('fems_cache', json_build_object(
+        'cache', p_cache,
+        'key', p_key,
+        'version', v_version
+    )::TEXT);
+
+    RETURN v_version;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- QUERY CACHE (per-table invalidation of cached reads)
+-- ============================================
+
+-- Trigger: tell every worker a table changed (backend/query_cache.py listens on fems_tables).
+-- One statement-level trigger per watched table, so every write path is covered; Postgres
+-- sends identical payloads once per transaction and only if it commits
+CREATE OR REPLACE FUNCTION notify_table_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('fems_tables', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Watched tables: keep in step with WATCHED_TABLES in backend/query_cache.py
+-- Only tables written far less often than they are read: each notification takes the
+-- cluster-wide NOTIFY lock at commit, which must stay off the order path
+-- users: only the columns the vendor directory shows (not last_login on every sign-in);
+-- a deleted user takes its vendor row with it, which notifies through vendors
+DROP TRIGGER IF EXISTS trg_users_query_cache ON users;
+CREATE TRIGGER trg_users_query_cache
+AFTER UPDATE OF full_name, email OR TRUNCATE ON users
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
+
+DROP TRIGGER IF EXISTS trg_vendors_query_cache ON vendors;
+CREATE TRIGGER trg_vendors_query_cache
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON vendors
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
+
+DROP TRIGGER IF EXISTS trg_vendor_slot_settings_query_cache ON vendor_slot_settings;
+CREATE TRIGGER trg_vendor_slot_settings_query_cache
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON vendor_slot_settings
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
+
+-- No longer watched (written by every order): drop the triggers earlier versions created
+DROP TRIGGER IF EXISTS trg_orders_query_cache ON orders;
+DROP TRIGGER IF EXISTS trg_order_items_query_cache ON order_items;
+DROP TRIGGER IF EXISTS trg_customer_stats_query_cache ON customer_stats;
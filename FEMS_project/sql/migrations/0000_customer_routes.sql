@@ -0,0 +1,367 @@
+-- Migration 0000: sql/customer_routes.sql as of the baseline schema, applied to a new database.
+-- Frozen: later changes go in sql/customer_routes.sql and a new migration with its own file.
+-- Functions whose signature changed later are dropped first, for databases set up from newer route files.
+
+-- ============================================
+-- FEMS Customer Routes - Database Objects
+-- ============================================
+
+-- View 1: Active menu items with vendor info
+CREATE OR REPLACE VIEW active_menu_items_view AS
+SELECT 
+    mi.id AS item_id,
+    mi.name AS item_name,
+    mi.description,
+    mi.price,
+    mi.available,
+    mi.preparation_time_minutes,
+    v.id AS vendor_id,
+    v.vendor_name,
+    v.location,
+    m.title AS menu_title
+FROM menu_items mi
+INNER JOIN menus m ON mi.menu_id = m.id
+INNER JOIN vendors v ON mi.vendor_id = v.id
+WHERE mi.available = TRUE AND m.is_active = TRUE;
+
+--inner join used as it will basically return the items fulfilling the common condition
+
+
+-- View 2: Customer order summary
+CREATE OR REPLACE VIEW customer_order_summary_view AS
+SELECT 
+    u.id AS customer_id,
+    u.full_name,
+    u.email,
+    COUNT(o.id) AS total_orders,
+    COALESCE(SUM(o.total_amount), 0) AS total_spent,
+    MAX(o.placed_at) AS last_order_date
+FROM users u
+LEFT JOIN orders o ON u.id = o.customer_id
+WHERE u.role = 'customer'
+GROUP BY u.id, u.full_name, u.email;
+
+-- Function 1: Calculate order total
+CREATE OR REPLACE FUNCTION calculate_order_total(p_order_id INTEGER)
+RETURNS DECIMAL(12,2) AS $$
+    SELECT COALESCE(SUM(price_snapshot * quantity), 0)
+    FROM order_items
+    WHERE order_id = p_order_id;
+$$ LANGUAGE SQL;
+
+-- Function 2: Get customer order count
+CREATE OR REPLACE FUNCTION get_customer_order_count(p_customer_id INTEGER)
+RETURNS INTEGER AS $$
+    SELECT COUNT(*)::INTEGER
+    FROM orders
+    WHERE customer_id = p_customer_id;
+$$ LANGUAGE SQL;
+
+-- Function 3: Check if item is available
+CREATE OR REPLACE FUNCTION is_item_available(p_item_id INTEGER)
+RETURNS BOOLEAN AS $$
+    SELECT available
+    FROM menu_items
+    WHERE id = p_item_id;
+$$ LANGUAGE SQL;
+
+-- Procedure 1: Place Order
+DROP FUNCTION IF EXISTS place_customer_order(INTEGER, INTEGER, TIMESTAMP, VARCHAR, TEXT, JSONB);
+CREATE OR REPLACE FUNCTION place_customer_order(
+    p_customer_id INTEGER,
+    p_vendor_id INTEGER,
+    p_scheduled_for TIMESTAMP,
+    p_pickup_or_delivery VARCHAR(20),
+    p_notes TEXT,
+    p_items JSONB
+) RETURNS TABLE(
+    order_id INTEGER,
+    total_amount DECIMAL(12,2),
+    status_message TEXT
+) AS $$
+DECLARE
+    v_order_id INTEGER;
+    v_placed_at TIMESTAMP;
+    v_total DECIMAL(12,2) := 0;
+    v_item JSONB;
+    v_menu_item RECORD;
+    v_item_total DECIMAL(12,2);
+BEGIN
+    -- Validate vendor
+    IF NOT EXISTS (SELECT 1 FROM vendors WHERE id = p_vendor_id) THEN
+        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'ERROR: Vendor not found';
+        RETURN;
+    END IF;
+    
+    -- Validate pickup time
+    IF p_scheduled_for <= NOW() THEN
+        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'ERROR: Pickup time must be in the future';
+        RETURN;
+    END IF;
+    
+    -- Create order
+    INSERT INTO orders (
+        customer_id, vendor_id, scheduled_for,
+        total_amount, status, payment_status,
+        pickup_or_delivery, notes
+    ) VALUES (
+        p_customer_id, p_vendor_id, p_scheduled_for,
+        0, 'pending', 'pending',
+        p_pickup_or_delivery, p_notes
+    ) RETURNING id, placed_at INTO v_order_id, v_placed_at;
+    
+    -- Process items
+    FOR v_item IN SELECT * FROM jsonb_array_elements(p_items)
+    LOOP
+        SELECT * INTO v_menu_item
+        FROM menu_items
+        WHERE id = (v_item->>'menu_item_id')::INTEGER
+        AND vendor_id = p_vendor_id;
+        
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'Menu item % not found', v_item->>'menu_item_id';
+        END IF;
+        
+        IF NOT v_menu_item.available THEN
+            RAISE EXCEPTION 'Item % is not available', v_menu_item.name;
+        END IF;
+        
+        v_item_total := v_menu_item.price * (v_item->>'quantity')::INTEGER;
+        v_total := v_total + v_item_total;
+        
+        INSERT INTO order_items (
+            order_id, placed_at, menu_item_id, name_snapshot,
+            price_snapshot, quantity, notes
+        ) VALUES (
+            v_order_id,
+            v_placed_at,
+            v_menu_item.id,
+            v_menu_item.name,
+            v_menu_item.price,
+            (v_item->>'quantity')::INTEGER,
+            v_item->>'notes'
+        );
+    END LOOP;
+    
+    -- Update total
+    UPDATE orders SET total_amount = v_total WHERE id = v_order_id AND placed_at = v_placed_at;
+    
+    RETURN QUERY SELECT v_order_id, v_total, 'SUCCESS: Order placed successfully';
+    
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), ('ERROR: ' || SQLERRM);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Procedure 2: Cancel Order
+DROP FUNCTION IF EXISTS cancel_customer_order(INTEGER, INTEGER, INTEGER);
+CREATE OR REPLACE FUNCTION cancel_customer_order(
+    p_order_id INTEGER,
+    p_customer_id INTEGER
+) RETURNS TEXT AS $$
+DECLARE
+    v_order RECORD;
+BEGIN
+    SELECT * INTO v_order
+    FROM orders
+    WHERE id = p_order_id AND customer_id = p_customer_id;
+    
+    IF NOT FOUND THEN
+        RETURN 'ERROR: Order not found';
+    END IF;
+    
+    IF v_order.status NOT IN ('pending') THEN
+        RETURN 'ERROR: Only pending orders can be cancelled';
+    END IF;
+    
+    UPDATE orders SET status = 'cancelled' WHERE id = p_order_id;
+    
+    RETURN 'SUCCESS: Order cancelled';
+    
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN 'ERROR: ' || SQLERRM;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- CUSTOMER STATS (materialized per-customer aggregates)
+-- ============================================
+
+-- Function 4: Apply a delta to one customer's stats row (upsert)
+CREATE OR REPLACE FUNCTION apply_customer_stats_delta(
+    p_customer_id INTEGER,
+    p_order_delta INTEGER,
+    p_amount_delta DECIMAL(12,2),
+    p_placed_at TIMESTAMP,
+    p_old_status VARCHAR(20),
+    p_new_status VARCHAR(20)
+) RETURNS VOID AS $$
+BEGIN
+    IF p_customer_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO customer_stats AS cs (
+        customer_id, total_orders, total_spent, last_order_at,
+        pending_orders, accepted_orders, preparing_orders, ready_orders,
+        completed_orders, cancelled_orders, rejected_orders
+    ) VALUES (
+        p_customer_id, p_order_delta, p_amount_delta, p_placed_at,
+        (p_new_status IS NOT DISTINCT FROM 'pending')::INT - (p_old_status IS NOT DISTINCT FROM 'pending')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'accepted')::INT - (p_old_status IS NOT DISTINCT FROM 'accepted')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'preparing')::INT - (p_old_status IS NOT DISTINCT FROM 'preparing')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'ready')::INT - (p_old_status IS NOT DISTINCT FROM 'ready')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'completed')::INT - (p_old_status IS NOT DISTINCT FROM 'completed')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'cancelled')::INT - (p_old_status IS NOT DISTINCT FROM 'cancelled')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'rejected')::INT - (p_old_status IS NOT DISTINCT FROM 'rejected')::INT
+    )
+    ON CONFLICT (customer_id) DO UPDATE SET
+        total_orders = cs.total_orders + EXCLUDED.total_orders,
+        total_spent = cs.total_spent + EXCLUDED.total_spent,
+        last_order_at = GREATEST(cs.last_order_at, EXCLUDED.last_order_at),
+        pending_orders = cs.pending_orders + EXCLUDED.pending_orders,
+        accepted_orders = cs.accepted_orders + EXCLUDED.accepted_orders,
+        preparing_orders = cs.preparing_orders + EXCLUDED.preparing_orders,
+        ready_orders = cs.ready_orders + EXCLUDED.ready_orders,
+        completed_orders = cs.completed_orders + EXCLUDED.completed_orders,
+        cancelled_orders = cs.cancelled_orders + EXCLUDED.cancelled_orders,
+        rejected_orders = cs.rejected_orders + EXCLUDED.rejected_orders,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger: keep customer_stats in step with orders inside the same transaction
+CREATE OR REPLACE FUNCTION sync_customer_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM apply_customer_stats_delta(NEW.customer_id, 1, NEW.total_amount, NEW.placed_at, NULL, NEW.status);
+
+    ELSIF TG_OP = 'UPDATE' THEN
+        IF NEW.customer_id IS NOT DISTINCT FROM OLD.customer_id THEN
+            PERFORM apply_customer_stats_delta(NEW.customer_id, 0, NEW.total_amount - OLD.total_amount, NEW.placed_at, OLD.status, NEW.status);
+        ELSE
+            PERFORM apply_customer_stats_delta(OLD.customer_id, -1, -OLD.total_amount, NULL, OLD.status, NULL);
+            PERFORM apply_customer_stats_delta(NEW.customer_id, 1, NEW.total_amount, NEW.placed_at, NULL, NEW.status);
+        END IF;
+
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM apply_customer_stats_delta(OLD.customer_id, -1, -OLD.total_amount, NULL, OLD.status, NULL);
+    END IF;
+
+    -- MAX() can't be decremented, so recompute last_order_at when its order goes away
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.customer_id IS NOT NULL
+       AND (TG_OP = 'DELETE' OR NEW.customer_id IS DISTINCT FROM OLD.customer_id) THEN
+        UPDATE customer_stats
+        SET last_order_at = (SELECT MAX(placed_at) FROM orders_all WHERE customer_id = OLD.customer_id)
+        WHERE customer_id = OLD.customer_id AND last_order_at = OLD.placed_at;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_customer_stats ON orders;
+CREATE TRIGGER trg_orders_customer_stats
+AFTER INSERT OR DELETE OR UPDATE OF customer_id, status, total_amount ON orders
+FOR EACH ROW EXECUTE FUNCTION sync_customer_stats();
+
+-- Procedure 3: Rebuild customer_stats from the raw orders table, archive included (backfill)
+CREATE OR REPLACE FUNCTION rebuild_customer_stats(p_customer_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    -- Blocks trigger writes until we commit, so no concurrent delta is lost or counted twice
+    LOCK TABLE customer_stats IN EXCLUSIVE MODE;
+
+    DELETE FROM customer_stats
+    WHERE p_customer_id IS NULL OR customer_id = p_customer_id;
+
+    INSERT INTO customer_stats (
+        customer_id, total_orders, total_spent, last_order_at,
+        pending_orders, accepted_orders, preparing_orders, ready_orders,
+        completed_orders, cancelled_orders, rejected_orders
+    )
+    SELECT
+        o.customer_id,
+        COUNT(*),
+        COALESCE(SUM(o.total_amount), 0),
+        MAX(o.placed_at),
+        COUNT(*) FILTER (WHERE o.status = 'pending'),
+        COUNT(*) FILTER (WHERE o.status = 'accepted'),
+        COUNT(*) FILTER (WHERE o.status = 'preparing'),
+        COUNT(*) FILTER (WHERE o.status = 'ready'),
+        COUNT(*) FILTER (WHERE o.status = 'completed'),
+        COUNT(*) FILTER (WHERE o.status = 'cancelled'),
+        COUNT(*) FILTER (WHERE o.status = 'rejected')
+    FROM orders_all o
+    WHERE o.customer_id IS NOT NULL
+    AND (p_customer_id IS NULL OR o.customer_id = p_customer_id)
+    GROUP BY o.customer_id;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function 5: Compare customer_stats against the raw orders table, archive included
+-- Returns one row per customer whose stored stats disagree with the orders
+CREATE OR REPLACE FUNCTION check_customer_stats()
+RETURNS TABLE(
+    customer_id INTEGER,
+    expected JSONB,
+    actual JSONB
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH raw AS (
+        SELECT
+            o.customer_id,
+            jsonb_build_object(
+                'total_orders', COUNT(*),
+                'total_spent', COALESCE(SUM(o.total_amount), 0),
+                'last_order_at', MAX(o.placed_at),
+                'pending_orders', COUNT(*) FILTER (WHERE o.status = 'pending'),
+                'accepted_orders', COUNT(*) FILTER (WHERE o.status = 'accepted'),
+                'preparing_orders', COUNT(*) FILTER (WHERE o.status = 'preparing'),
+                'ready_orders', COUNT(*) FILTER (WHERE o.status = 'ready'),
+                'completed_orders', COUNT(*) FILTER (WHERE o.status = 'completed'),
+                'cancelled_orders', COUNT(*) FILTER (WHERE o.status = 'cancelled'),
+                'rejected_orders', COUNT(*) FILTER (WHERE o.status = 'rejected')
+            ) AS stats
+        FROM orders_all o
+        WHERE o.customer_id IS NOT NULL
+        GROUP BY o.customer_id
+    ),
+    stored AS (
+        SELECT
+            cs.customer_id,
+            jsonb_build_object(
+                'total_orders', cs.total_orders,
+                'total_spent', cs.total_spent,
+                'last_order_at', cs.last_order_at,
+                'pending_orders', cs.pending_orders,
+                'accepted_orders', cs.accepted_orders,
+                'preparing_orders', cs.preparing_orders,
+                'ready_orders', cs.ready_orders,
+                'completed_orders', cs.completed_orders,
+                'cancelled_orders', cs.cancelled_orders,
+                'rejected_orders', cs.rejected_orders
+            ) AS stats
+        FROM customer_stats cs
+        -- an all-zero row is what a customer looks like after every order was deleted
+        WHERE cs.total_orders <> 0 OR cs.total_spent <> 0 OR cs.last_order_at IS NOT NULL
+    )
+    SELECT
+        COALESCE(raw.customer_id, stored.customer_id),
+        raw.stats,
+        stored.stats
+    FROM raw
+    FULL OUTER JOIN stored ON raw.customer_id = stored.customer_id
+    WHERE raw.stats IS DISTINCT FROM stored.stats
+    ORDER BY 1;
+END;
+$$ LANGUAGE plpgsql;
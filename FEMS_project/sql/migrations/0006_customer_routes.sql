@@ -0,0 +1,48 @@
+-- Migration 0006: the objects of sql/customer_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/customer_routes.sql and a new migration with its own file.
+
+-- Procedure 2: Cancel Order
+DROP FUNCTION IF EXISTS cancel_customer_order(INTEGER, INTEGER);
+
+CREATE OR REPLACE FUNCTION cancel_customer_order(
+    p_order_id INTEGER,
+    p_customer_id INTEGER,
+    p_expected_version INTEGER DEFAULT NULL
+) RETURNS TEXT AS $$
+DECLARE
+    v_current RECORD;
+BEGIN
+    -- Compare-and-set: only succeeds if the order is still in a status customers may cancel from
+    UPDATE orders o
+    SET 
+        status = 'cancelled',
+        version = o.version + 1
+    FROM order_status_transitions t
+    WHERE o.id = p_order_id
+      AND o.customer_id = p_customer_id
+      AND t.actor = 'customer'
+      AND t.to_status = 'cancelled'
+      AND t.from_status = o.status
+      AND (p_expected_version IS NULL OR o.version = p_expected_version);
+    
+    IF FOUND THEN
+        RETURN 'SUCCESS: Order cancelled';
+    END IF;
+    
+    SELECT o.status, o.version INTO v_current
+    FROM orders o
+    WHERE o.id = p_order_id AND o.customer_id = p_customer_id;
+    
+    IF NOT FOUND THEN
+        RETURN 'ERROR: Order not found';
+    ELSIF p_expected_version IS NOT NULL AND v_current.version <> p_expected_version THEN
+        RETURN 'CONFLICT: Order was modified (now version ' || v_current.version || ', status ' || v_current.status || ')';
+    END IF;
+    
+    RETURN 'CONFLICT: Only pending orders can be cancelled (order is ' || v_current.status || ')';
+    
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN 'ERROR: ' || SQLERRM;
+END;
+$$ LANGUAGE plpgsql;
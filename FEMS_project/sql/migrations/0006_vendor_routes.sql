@@ -0,0 +1,77 @@
+-- Migration 0006: the objects of sql/vendor_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/vendor_routes.sql and a new migration with its own file.
+
+-- Procedure 5: Update Order Status (compare-and-set against order_status_transitions)
+-- One UPDATE both validates and applies the move, so a customer cancelling at the
+-- same moment can't be overwritten; the loser gets a CONFLICT instead
+DROP FUNCTION IF EXISTS update_order_status(INTEGER, INTEGER, VARCHAR, TIMESTAMP);
+
+CREATE OR REPLACE FUNCTION update_order_status(
+    p_vendor_id INTEGER,
+    p_order_id INTEGER,
+    p_new_status VARCHAR(20),
+    p_estimated_ready_at TIMESTAMP DEFAULT NULL,
+    p_expected_version INTEGER DEFAULT NULL
+)
+RETURNS TABLE(
+    order_id INTEGER,
+    old_status VARCHAR(20),
+    new_status VARCHAR(20),
+    estimated_ready_at TIMESTAMP,
+    version INTEGER,
+    status_message TEXT
+) AS $$
+#variable_conflict use_column
+DECLARE
+    v_updated RECORD;
+    v_current RECORD;
+BEGIN
+    IF p_new_status NOT IN ('pending', 'accepted', 'preparing', 'ready', 'completed', 'cancelled', 'rejected') THEN
+        RETURN QUERY SELECT NULL::INTEGER, NULL::VARCHAR, NULL::VARCHAR, NULL::TIMESTAMP, NULL::INTEGER, 'ERROR: Invalid status'::TEXT;
+        RETURN;
+    END IF;
+    
+    -- Transition check and write in one statement; t.from_status is the status we moved away from
+    UPDATE orders o
+    SET 
+        status = p_new_status,
+        estimated_ready_at = COALESCE(p_estimated_ready_at, o.estimated_ready_at),
+        version = o.version + 1
+    FROM order_status_transitions t
+    WHERE o.id = p_order_id
+      AND o.vendor_id = p_vendor_id
+      AND t.actor = 'vendor'
+      AND t.to_status = p_new_status
+      AND t.from_status = o.status
+      AND (p_expected_version IS NULL OR o.version = p_expected_version)
+    RETURNING o.id, t.from_status, o.status, o.estimated_ready_at, o.version
+    INTO v_updated;
+    
+    IF FOUND THEN
+        RETURN QUERY SELECT 
+            v_updated.id, v_updated.from_status, v_updated.status,
+            v_updated.estimated_ready_at, v_updated.version,
+            'SUCCESS: Order status updated'::TEXT;
+        RETURN;
+    END IF;
+    
+    -- Only on failure: work out why nothing matched
+    SELECT o.status, o.version, o.estimated_ready_at INTO v_current
+    FROM orders o
+    WHERE o.id = p_order_id AND o.vendor_id = p_vendor_id;
+    
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT NULL::INTEGER, NULL::VARCHAR, NULL::VARCHAR, NULL::TIMESTAMP, NULL::INTEGER, 'ERROR: Order not found or access denied'::TEXT;
+    ELSIF p_expected_version IS NOT NULL AND v_current.version <> p_expected_version THEN
+        RETURN QUERY SELECT p_order_id, v_current.status, v_current.status, v_current.estimated_ready_at, v_current.version,
+            ('CONFLICT: Order was modified (now version ' || v_current.version || ', status ' || v_current.status || ')')::TEXT;
+    ELSE
+        RETURN QUERY SELECT p_order_id, v_current.status, v_current.status, v_current.estimated_ready_at, v_current.version,
+            ('CONFLICT: Cannot move order from ' || v_current.status || ' to ' || p_new_status)::TEXT;
+    END IF;
+    
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN QUERY SELECT NULL::INTEGER, NULL::VARCHAR, NULL::VARCHAR, NULL::TIMESTAMP, NULL::INTEGER, ('ERROR: ' || SQLERRM)::TEXT;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,46 @@
+-- Migration 0007: the objects of sql/vendor_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/vendor_routes.sql and a new migration with its own file.
+
+-- ============================================
+-- INVENTORY
+-- ============================================
+
+-- Trigger: put tracked stock back when an order is cancelled or rejected
+-- (place_customer_order() takes it; items that had sold out become available again)
+CREATE OR REPLACE FUNCTION restore_order_stock()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.status NOT IN ('cancelled', 'rejected') OR OLD.status IN ('cancelled', 'rejected') THEN
+        RETURN NULL;
+    END IF;
+
+    WITH returned AS (
+        SELECT oi.menu_item_id, SUM(oi.quantity) AS quantity
+        FROM order_items oi
+        WHERE oi.order_id = NEW.id
+        AND oi.placed_at = NEW.placed_at
+        AND oi.menu_item_id IS NOT NULL
+        GROUP BY oi.menu_item_id
+    ),
+    restocked AS (
+        UPDATE menu_items mi
+        SET 
+            stock = mi.stock + r.quantity,
+            available = mi.available OR mi.stock = 0
+        FROM returned r
+        WHERE mi.id = r.menu_item_id
+        AND mi.stock IS NOT NULL
+        RETURNING mi.menu_id, mi.stock - r.quantity AS stock_before
+    )
+    UPDATE menus
+    SET version = version + 1
+    WHERE id IN (SELECT menu_id FROM restocked WHERE stock_before = 0);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_restore_stock ON orders;
+CREATE TRIGGER trg_orders_restore_stock
+AFTER UPDATE OF status ON orders
+FOR EACH ROW EXECUTE FUNCTION restore_order_stock();
@@ -0,0 +1,295 @@
+-- Migration 0008: the objects of sql/customer_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/customer_routes.sql and a new migration with its own file.
+
+-- Function 4: Start of the pickup slot a time falls into (fixed buckets from the epoch)
+CREATE OR REPLACE FUNCTION pickup_slot_start(p_time TIMESTAMP, p_slot_minutes INTEGER)
+RETURNS TIMESTAMP AS $$
+    SELECT TIMESTAMP 'epoch'
+        + floor(extract(epoch FROM p_time) / (p_slot_minutes * 60)) * (p_slot_minutes * 60) * INTERVAL '1 second';
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Procedure 1: Place Order
+-- Tracked stock (menu_items.stock NOT NULL) is taken with a conditional UPDATE, so two
+-- customers racing for the last unit can't both get it; every sold-out line is
+-- collected and returned together, and the whole order is rolled back.
+-- When the vendor has slot capacity configured, the order's kitchen minutes are
+-- admitted into its pickup slot with one conditional upsert on vendor_slot_usage
+DROP FUNCTION IF EXISTS place_customer_order(INTEGER, INTEGER, TIMESTAMP, VARCHAR, TEXT, JSONB);
+
+CREATE OR REPLACE FUNCTION place_customer_order(
+    p_customer_id INTEGER,
+    p_vendor_id INTEGER,
+    p_scheduled_for TIMESTAMP,
+    p_pickup_or_delivery VARCHAR(20),
+    p_notes TEXT,
+    p_items JSONB
+) RETURNS TABLE(
+    order_id INTEGER,
+    total_amount DECIMAL(12,2),
+    status_message TEXT,
+    sold_out_item_ids INTEGER[],
+    prep_minutes INTEGER
+) AS $$
+DECLARE
+    v_order_id INTEGER;
+    v_placed_at TIMESTAMP;
+    v_total DECIMAL(12,2) := 0;
+    v_item JSONB;
+    v_menu_item RECORD;
+    v_quantity INTEGER;
+    v_stock_left INTEGER;
+    v_item_total DECIMAL(12,2);
+    v_sold_out INTEGER[] := '{}';
+    v_prep INTEGER := 0;
+    v_settings RECORD;
+    v_slot TIMESTAMP;
+BEGIN
+    -- Validate vendor
+    IF NOT EXISTS (SELECT 1 FROM vendors WHERE id = p_vendor_id) THEN
+        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'ERROR: Vendor not found', NULL::INTEGER[], NULL::INTEGER;
+        RETURN;
+    END IF;
+    
+    -- Validate pickup time
+    IF p_scheduled_for <= NOW() THEN
+        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'ERROR: Pickup time must be in the future', NULL::INTEGER[], NULL::INTEGER;
+        RETURN;
+    END IF;
+    
+    -- Create order
+    INSERT INTO orders (
+        customer_id, vendor_id, scheduled_for,
+        total_amount, status, payment_status,
+        pickup_or_delivery, notes
+    ) VALUES (
+        p_customer_id, p_vendor_id, p_scheduled_for,
+        0, 'pending', 'pending',
+        p_pickup_or_delivery, p_notes
+    ) RETURNING id, placed_at INTO v_order_id, v_placed_at;
+    
+    -- Process items
+    FOR v_item IN SELECT * FROM jsonb_array_elements(p_items)
+    LOOP
+        v_quantity := (v_item->>'quantity')::INTEGER;
+        
+        SELECT * INTO v_menu_item
+        FROM menu_items
+        WHERE id = (v_item->>'menu_item_id')::INTEGER
+        AND vendor_id = p_vendor_id;
+        
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'Menu item % not found', v_item->>'menu_item_id';
+        END IF;
+        
+        IF NOT v_menu_item.available THEN
+            v_sold_out := v_sold_out || v_menu_item.id;
+            CONTINUE;
+        END IF;
+        
+        -- Untracked items (stock IS NULL) are never locked; tracked ones are decremented
+        -- only if enough is left, and go unavailable when they hit zero
+        IF v_menu_item.stock IS NOT NULL THEN
+            UPDATE menu_items mi
+            SET 
+                stock = mi.stock - v_quantity,
+                available = mi.available AND mi.stock - v_quantity > 0
+            WHERE mi.id = v_menu_item.id
+              AND mi.available
+              AND mi.stock >= v_quantity
+            RETURNING mi.stock INTO v_stock_left;
+            
+            IF NOT FOUND THEN
+                v_sold_out := v_sold_out || v_menu_item.id;
+                CONTINUE;
+            END IF;
+            
+            IF v_stock_left = 0 THEN
+                UPDATE menus SET version = version + 1 WHERE id = v_menu_item.menu_id;
+            END IF;
+        END IF;
+        
+        v_item_total := v_menu_item.price * v_quantity;
+        v_total := v_total + v_item_total;
+        v_prep := v_prep + COALESCE(v_menu_item.preparation_time_minutes, 15) * v_quantity;
+        
+        INSERT INTO order_items (
+            order_id, placed_at, menu_item_id, name_snapshot,
+            price_snapshot, quantity, notes
+        ) VALUES (
+            v_order_id,
+            v_placed_at,
+            v_menu_item.id,
+            v_menu_item.name,
+            v_menu_item.price,
+            v_quantity,
+            v_item->>'notes'
+        );
+    END LOOP;
+    
+    -- Undoes the order and every decrement made above (the block is a subtransaction)
+    IF array_length(v_sold_out, 1) > 0 THEN
+        RAISE EXCEPTION 'SOLD_OUT';
+    END IF;
+    
+    -- Slot admission: the WHERE on the conflict branch is the capacity check, so concurrent
+    -- orders for the same slot can't overshoot it. An empty slot always takes one order,
+    -- otherwise an order bigger than the whole capacity could never be placed
+    SELECT * INTO v_settings FROM vendor_slot_settings WHERE vendor_id = p_vendor_id;
+    IF FOUND THEN
+        v_slot := pickup_slot_start(p_scheduled_for, v_settings.slot_minutes);
+        
+        INSERT INTO vendor_slot_usage AS u (vendor_id, slot_start, used_minutes, order_count)
+        VALUES (p_vendor_id, v_slot, v_prep, 1)
+        ON CONFLICT (vendor_id, slot_start) DO UPDATE SET
+            used_minutes = u.used_minutes + EXCLUDED.used_minutes,
+            order_count = u.order_count + 1,
+            updated_at = NOW()
+        WHERE u.used_minutes = 0
+           OR u.used_minutes + EXCLUDED.used_minutes <= v_settings.capacity_minutes;
+        
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'SLOT_FULL';
+        END IF;
+    END IF;
+    
+    -- Update total
+    UPDATE orders 
+    SET total_amount = v_total, prep_minutes = v_prep, slot_start = v_slot
+    WHERE id = v_order_id AND placed_at = v_placed_at;
+    
+    RETURN QUERY SELECT v_order_id, v_total, 'SUCCESS: Order placed successfully', NULL::INTEGER[], v_prep;
+    
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLERRM = 'SOLD_OUT' THEN
+            RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'SOLD_OUT: Some items are sold out'::TEXT, v_sold_out, NULL::INTEGER;
+        ELSIF SQLERRM = 'SLOT_FULL' THEN
+            RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), ('SLOT_FULL: The ' || to_char(v_slot, 'HH24:MI') || ' pickup slot is full')::TEXT, NULL::INTEGER[], v_prep;
+        ELSE
+            RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), ('ERROR: ' || SQLERRM), NULL::INTEGER[], NULL::INTEGER;
+        END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- PICKUP SLOT CAPACITY
+-- ============================================
+
+-- Trigger: give a cancelled or rejected order's kitchen minutes back to its slot
+CREATE OR REPLACE FUNCTION release_order_slot()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.slot_start IS NULL
+       OR NEW.status NOT IN ('cancelled', 'rejected')
+       OR OLD.status IN ('cancelled', 'rejected') THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE vendor_slot_usage
+    SET 
+        used_minutes = GREATEST(used_minutes - COALESCE(NEW.prep_minutes, 0), 0),
+        order_count = GREATEST(order_count - 1, 0),
+        updated_at = NOW()
+    WHERE vendor_id = NEW.vendor_id AND slot_start = NEW.slot_start;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_release_slot ON orders;
+CREATE TRIGGER trg_orders_release_slot
+AFTER UPDATE OF status ON orders
+FOR EACH ROW EXECUTE FUNCTION release_order_slot();
+
+-- Function 5: Slot availability between two times, read from the vendor_slot_usage counters
+CREATE OR REPLACE FUNCTION get_vendor_slots(
+    p_vendor_id INTEGER,
+    p_from TIMESTAMP,
+    p_to TIMESTAMP
+) RETURNS TABLE(
+    slot_start TIMESTAMP,
+    slot_end TIMESTAMP,
+    capacity_minutes INTEGER,
+    used_minutes INTEGER,
+    remaining_minutes INTEGER,
+    order_count INTEGER
+) AS $$
+    SELECT 
+        g.slot_start,
+        g.slot_start + make_interval(mins => s.slot_minutes),
+        s.capacity_minutes,
+        COALESCE(u.used_minutes, 0),
+        GREATEST(s.capacity_minutes - COALESCE(u.used_minutes, 0), 0),
+        COALESCE(u.order_count, 0)
+    FROM vendor_slot_settings s
+    CROSS JOIN LATERAL generate_series(
+        pickup_slot_start(p_from, s.slot_minutes),
+        p_to,
+        make_interval(mins => s.slot_minutes)
+    ) AS g(slot_start)
+    LEFT JOIN vendor_slot_usage u 
+        ON u.vendor_id = s.vendor_id AND u.slot_start = g.slot_start
+    WHERE s.vendor_id = p_vendor_id
+    ORDER BY g.slot_start;
+$$ LANGUAGE sql STABLE;
+
+-- Function 6: Open slots closest to the requested time that can still take p_prep_minutes
+CREATE OR REPLACE FUNCTION suggest_pickup_slots(
+    p_vendor_id INTEGER,
+    p_around TIMESTAMP,
+    p_prep_minutes INTEGER,
+    p_limit INTEGER DEFAULT 3
+) RETURNS TABLE(
+    slot_start TIMESTAMP,
+    remaining_minutes INTEGER
+) AS $$
+    SELECT v.slot_start, v.remaining_minutes
+    FROM get_vendor_slots(p_vendor_id, p_around - INTERVAL '3 hours', p_around + INTERVAL '3 hours') v
+    WHERE v.slot_start > NOW()
+    AND (v.used_minutes = 0 OR v.remaining_minutes >= p_prep_minutes)
+    ORDER BY abs(extract(epoch FROM v.slot_start - p_around)), v.slot_start
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Procedure 3: Re-derive upcoming orders' slots from the current settings and rebuild usage
+-- (after a vendor changes slot_minutes, or to repair drifted counters)
+CREATE OR REPLACE FUNCTION rebuild_vendor_slot_usage(p_vendor_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    -- Blocks admissions until we commit, so no order is double-counted or lost
+    LOCK TABLE vendor_slot_usage IN EXCLUSIVE MODE;
+
+    UPDATE orders o
+    SET 
+        slot_start = CASE WHEN s.vendor_id IS NULL THEN NULL ELSE pickup_slot_start(o.scheduled_for, s.slot_minutes) END,
+        prep_minutes = COALESCE(o.prep_minutes, (
+            SELECT SUM(COALESCE(mi.preparation_time_minutes, 15) * oi.quantity)::INTEGER
+            FROM order_items oi
+            LEFT JOIN menu_items mi ON mi.id = oi.menu_item_id
+            WHERE oi.order_id = o.id AND oi.placed_at = o.placed_at
+        ))
+    FROM vendors v
+    LEFT JOIN vendor_slot_settings s ON s.vendor_id = v.id
+    WHERE o.vendor_id = v.id
+    AND o.scheduled_for >= NOW()
+    AND (p_vendor_id IS NULL OR o.vendor_id = p_vendor_id);
+
+    DELETE FROM vendor_slot_usage
+    WHERE slot_start >= pickup_slot_start(NOW(), 1440)
+    AND (p_vendor_id IS NULL OR vendor_id = p_vendor_id);
+
+    INSERT INTO vendor_slot_usage (vendor_id, slot_start, used_minutes, order_count)
+    SELECT o.vendor_id, o.slot_start, COALESCE(SUM(o.prep_minutes), 0), COUNT(*)
+    FROM orders o
+    WHERE o.slot_start IS NOT NULL
+    AND o.slot_start >= pickup_slot_start(NOW(), 1440)
+    AND o.status NOT IN ('cancelled', 'rejected')
+    AND (p_vendor_id IS NULL OR o.vendor_id = p_vendor_id)
+    GROUP BY o.vendor_id, o.slot_start;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,81 @@
+-- Migration 0009: the objects of sql/customer_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/customer_routes.sql and a new migration with its own file.
+
+-- ============================================
+-- VENDOR LOAD (live queue counters for the vendor directory)
+-- ============================================
+
+-- Function 9: Apply a delta to one vendor's load row (upsert)
+CREATE OR REPLACE FUNCTION apply_vendor_load_delta(
+    p_vendor_id INTEGER,
+    p_order_delta INTEGER,
+    p_minutes_delta INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    IF p_vendor_id IS NULL OR (p_order_delta = 0 AND p_minutes_delta = 0) THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO vendor_load AS vl (vendor_id, queued_orders, queued_minutes)
+    VALUES (p_vendor_id, GREATEST(p_order_delta, 0), GREATEST(p_minutes_delta, 0))
+    ON CONFLICT (vendor_id) DO UPDATE SET
+        queued_orders = GREATEST(vl.queued_orders + p_order_delta, 0),
+        queued_minutes = GREATEST(vl.queued_minutes + p_minutes_delta, 0),
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger: keep vendor_load in step with open orders inside the same transaction
+-- (prep_minutes is filled in by place_customer_order's final UPDATE, hence UPDATE OF prep_minutes)
+CREATE OR REPLACE FUNCTION sync_vendor_load()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old_open BOOLEAN := TG_OP IN ('UPDATE', 'DELETE') AND OLD.status IN ('pending', 'accepted', 'preparing');
+    v_new_open BOOLEAN := TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IN ('pending', 'accepted', 'preparing');
+BEGIN
+    IF TG_OP = 'UPDATE' AND v_old_open AND v_new_open AND NEW.vendor_id = OLD.vendor_id THEN
+        PERFORM apply_vendor_load_delta(
+            NEW.vendor_id, 0, COALESCE(NEW.prep_minutes, 0) - COALESCE(OLD.prep_minutes, 0)
+        );
+        RETURN NULL;
+    END IF;
+
+    IF v_old_open THEN
+        PERFORM apply_vendor_load_delta(OLD.vendor_id, -1, -COALESCE(OLD.prep_minutes, 0));
+    END IF;
+    IF v_new_open THEN
+        PERFORM apply_vendor_load_delta(NEW.vendor_id, 1, COALESCE(NEW.prep_minutes, 0));
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_vendor_load ON orders;
+CREATE TRIGGER trg_orders_vendor_load
+AFTER INSERT OR DELETE OR UPDATE OF vendor_id, status, prep_minutes ON orders
+FOR EACH ROW EXECUTE FUNCTION sync_vendor_load();
+
+-- Procedure 5: Rebuild vendor_load from the open orders (backfill, or to repair drifted counters)
+CREATE OR REPLACE FUNCTION rebuild_vendor_load(p_vendor_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    -- Blocks trigger writes until we commit, so no concurrent delta is lost or counted twice
+    LOCK TABLE vendor_load IN EXCLUSIVE MODE;
+
+    DELETE FROM vendor_load
+    WHERE p_vendor_id IS NULL OR vendor_id = p_vendor_id;
+
+    INSERT INTO vendor_load (vendor_id, queued_orders, queued_minutes)
+    SELECT o.vendor_id, COUNT(*), COALESCE(SUM(o.prep_minutes), 0)
+    FROM orders o
+    WHERE o.status IN ('pending', 'accepted', 'preparing')
+    AND (p_vendor_id IS NULL OR o.vendor_id = p_vendor_id)
+    GROUP BY o.vendor_id;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
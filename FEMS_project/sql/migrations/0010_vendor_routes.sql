@@ -0,0 +1,123 @@
+-- Migration 0010: the objects of sql/vendor_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/vendor_routes.sql and a new migration with its own file.
+
+-- ============================================
+-- KITCHEN QUEUE (item totals across accepted / preparing orders)
+-- ============================================
+
+-- Function 4: Kitchen grouping slot: the order's pickup slot, or its 15-minute bucket
+-- when the vendor has no slot settings
+CREATE OR REPLACE FUNCTION kitchen_slot_start(p_slot_start TIMESTAMP, p_scheduled_for TIMESTAMP, p_placed_at TIMESTAMP)
+RETURNS TIMESTAMP AS $$
+    SELECT COALESCE(p_slot_start, pickup_slot_start(COALESCE(p_scheduled_for, p_placed_at), 15));
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Trigger: copy an order's lines into the kitchen queue when it becomes accepted or
+-- preparing, and take them out again when it leaves those states (or moves slot).
+-- Totals are subtracted from the copied lines, so they stay exact even if the menu
+-- item is deleted while the order is still cooking.
+CREATE OR REPLACE FUNCTION sync_kitchen_queue()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old_active BOOLEAN := TG_OP IN ('UPDATE', 'DELETE') AND OLD.status IN ('accepted', 'preparing');
+    v_new_active BOOLEAN := TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IN ('accepted', 'preparing');
+BEGIN
+    IF TG_OP = 'UPDATE' AND v_old_active AND v_new_active
+       AND NEW.slot_start IS NOT DISTINCT FROM OLD.slot_start
+       AND NEW.scheduled_for IS NOT DISTINCT FROM OLD.scheduled_for THEN
+        RETURN NULL;
+    END IF;
+
+    IF v_old_active THEN
+        WITH removed AS (
+            DELETE FROM kitchen_queue_lines
+            WHERE order_id = OLD.id
+            RETURNING vendor_id, slot_start, menu_item_id, quantity
+        ),
+        totals AS (
+            SELECT vendor_id, slot_start, menu_item_id, SUM(quantity) AS quantity, COUNT(*) AS line_count
+            FROM removed
+            GROUP BY vendor_id, slot_start, menu_item_id
+        )
+        UPDATE kitchen_queue_totals kt
+        SET 
+            quantity = kt.quantity - t.quantity,
+            line_count = kt.line_count - t.line_count,
+            updated_at = NOW()
+        FROM totals t
+        WHERE kt.vendor_id = t.vendor_id
+        AND kt.slot_start = t.slot_start
+        AND kt.menu_item_id = t.menu_item_id;
+
+        DELETE FROM kitchen_queue_totals
+        WHERE vendor_id = OLD.vendor_id AND line_count <= 0;
+    END IF;
+
+    IF v_new_active THEN
+        WITH added AS (
+            INSERT INTO kitchen_queue_lines (
+                order_item_id, order_id, vendor_id, slot_start, menu_item_id, name, quantity, notes
+            )
+            SELECT 
+                oi.id, NEW.id, NEW.vendor_id,
+                kitchen_slot_start(NEW.slot_start, NEW.scheduled_for, NEW.placed_at),
+                COALESCE(oi.menu_item_id, 0), oi.name_snapshot, oi.quantity, NULLIF(btrim(oi.notes), '')
+            FROM order_items oi
+            WHERE oi.order_id = NEW.id AND oi.placed_at = NEW.placed_at
+            ON CONFLICT (order_item_id) DO NOTHING
+            RETURNING vendor_id, slot_start, menu_item_id, name, quantity
+        )
+        INSERT INTO kitchen_queue_totals AS kt (vendor_id, slot_start, menu_item_id, name, quantity, line_count)
+        SELECT vendor_id, slot_start, menu_item_id, MAX(name), SUM(quantity), COUNT(*)
+        FROM added
+        GROUP BY vendor_id, slot_start, menu_item_id
+        ON CONFLICT (vendor_id, slot_start, menu_item_id) DO UPDATE SET
+            name = EXCLUDED.name,
+            quantity = kt.quantity + EXCLUDED.quantity,
+            line_count = kt.line_count + EXCLUDED.line_count,
+            updated_at = NOW();
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_kitchen_queue ON orders;
+CREATE TRIGGER trg_orders_kitchen_queue
+AFTER INSERT OR DELETE OR UPDATE OF status, slot_start, scheduled_for ON orders
+FOR EACH ROW EXECUTE FUNCTION sync_kitchen_queue();
+
+-- Procedure 8: Rebuild the kitchen queue from the open orders (backfill, or to repair drift)
+CREATE OR REPLACE FUNCTION rebuild_kitchen_queue(p_vendor_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    -- Blocks trigger writes until we commit, so no concurrent change is lost or counted twice
+    LOCK TABLE kitchen_queue_lines, kitchen_queue_totals IN EXCLUSIVE MODE;
+
+    DELETE FROM kitchen_queue_lines WHERE p_vendor_id IS NULL OR vendor_id = p_vendor_id;
+    DELETE FROM kitchen_queue_totals WHERE p_vendor_id IS NULL OR vendor_id = p_vendor_id;
+
+    INSERT INTO kitchen_queue_lines (
+        order_item_id, order_id, vendor_id, slot_start, menu_item_id, name, quantity, notes
+    )
+    SELECT 
+        oi.id, o.id, o.vendor_id,
+        kitchen_slot_start(o.slot_start, o.scheduled_for, o.placed_at),
+        COALESCE(oi.menu_item_id, 0), oi.name_snapshot, oi.quantity, NULLIF(btrim(oi.notes), '')
+    FROM orders o
+    JOIN order_items oi ON oi.order_id = o.id AND oi.placed_at = o.placed_at
+    WHERE o.status IN ('accepted', 'preparing')
+    AND (p_vendor_id IS NULL OR o.vendor_id = p_vendor_id);
+
+    INSERT INTO kitchen_queue_totals (vendor_id, slot_start, menu_item_id, name, quantity, line_count)
+    SELECT vendor_id, slot_start, menu_item_id, MAX(name), SUM(quantity), COUNT(*)
+    FROM kitchen_queue_lines
+    WHERE p_vendor_id IS NULL OR vendor_id = p_vendor_id
+    GROUP BY vendor_id, slot_start, menu_item_id;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,231 @@
+-- Migration 0011: the objects of sql/customer_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/customer_routes.sql and a new migration with its own file.
+
+-- Procedure 1: Place Order
+-- Tracked stock (menu_items.stock NOT NULL) is taken with a conditional UPDATE, so two
+-- customers racing for the last unit can't both get it; every sold-out line is
+-- collected and returned together, and the whole order is rolled back.
+-- When the vendor has slot capacity configured, the order's kitchen minutes are
+-- admitted into its pickup slot with one conditional upsert on vendor_slot_usage
+DROP FUNCTION IF EXISTS place_customer_order(INTEGER, INTEGER, TIMESTAMP, VARCHAR, TEXT, JSONB);
+
+CREATE OR REPLACE FUNCTION place_customer_order(
+    p_customer_id INTEGER,
+    p_vendor_id INTEGER,
+    p_scheduled_for TIMESTAMP,
+    p_pickup_or_delivery VARCHAR(20),
+    p_notes TEXT,
+    p_items JSONB
+) RETURNS TABLE(
+    order_id INTEGER,
+    total_amount DECIMAL(12,2),
+    status_message TEXT,
+    sold_out_item_ids INTEGER[],
+    prep_minutes INTEGER
+) AS $$
+DECLARE
+    v_order_id INTEGER;
+    v_placed_at TIMESTAMP;
+    v_total DECIMAL(12,2) := 0;
+    v_item JSONB;
+    v_menu_item RECORD;
+    v_quantity INTEGER;
+    v_stock_left INTEGER;
+    v_item_total DECIMAL(12,2);
+    v_sold_out INTEGER[] := '{}';
+    v_prep INTEGER := 0;
+    v_settings RECORD;
+    v_slot TIMESTAMP;
+BEGIN
+    -- Validate vendor
+    IF NOT EXISTS (SELECT 1 FROM vendors WHERE id = p_vendor_id) THEN
+        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'ERROR: Vendor not found', NULL::INTEGER[], NULL::INTEGER;
+        RETURN;
+    END IF;
+    
+    -- Validate pickup time
+    IF p_scheduled_for <= NOW() THEN
+        RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'ERROR: Pickup time must be in the future', NULL::INTEGER[], NULL::INTEGER;
+        RETURN;
+    END IF;
+    
+    -- Create order
+    INSERT INTO orders (
+        customer_id, vendor_id, scheduled_for,
+        total_amount, status, payment_status,
+        pickup_or_delivery, notes
+    ) VALUES (
+        p_customer_id, p_vendor_id, p_scheduled_for,
+        0, 'pending', 'pending',
+        p_pickup_or_delivery, p_notes
+    ) RETURNING id, placed_at INTO v_order_id, v_placed_at;
+    
+    -- Process items
+    FOR v_item IN SELECT * FROM jsonb_array_elements(p_items)
+    LOOP
+        v_quantity := (v_item->>'quantity')::INTEGER;
+        
+        SELECT * INTO v_menu_item
+        FROM menu_items
+        WHERE id = (v_item->>'menu_item_id')::INTEGER
+        AND vendor_id = p_vendor_id;
+        
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'Menu item % not found', v_item->>'menu_item_id';
+        END IF;
+        
+        IF NOT v_menu_item.available THEN
+            v_sold_out := v_sold_out || v_menu_item.id;
+            CONTINUE;
+        END IF;
+        
+        -- Untracked items (stock IS NULL) are never locked; tracked ones are decremented
+        -- only if enough is left, and go unavailable when they hit zero
+        IF v_menu_item.stock IS NOT NULL THEN
+            UPDATE menu_items mi
+            SET 
+                stock = mi.stock - v_quantity,
+                available = mi.available AND mi.stock - v_quantity > 0
+            WHERE mi.id = v_menu_item.id
+              AND mi.available
+              AND mi.stock >= v_quantity
+            RETURNING mi.stock INTO v_stock_left;
+            
+            IF NOT FOUND THEN
+                v_sold_out := v_sold_out || v_menu_item.id;
+                CONTINUE;
+            END IF;
+            
+            IF v_stock_left = 0 THEN
+                UPDATE menus SET version = version + 1 WHERE id = v_menu_item.menu_id;
+            END IF;
+        END IF;
+        
+        v_item_total := v_menu_item.price * v_quantity;
+        v_total := v_total + v_item_total;
+        v_prep := v_prep + COALESCE(v_menu_item.preparation_time_minutes, 15) * v_quantity;
+        
+        INSERT INTO order_items (
+            order_id, placed_at, menu_item_id, name_snapshot,
+            price_snapshot, quantity, notes
+        ) VALUES (
+            v_order_id,
+            v_placed_at,
+            v_menu_item.id,
+            v_menu_item.name,
+            v_menu_item.price,
+            v_quantity,
+            v_item->>'notes'
+        );
+    END LOOP;
+    
+    -- Undoes the order and every decrement made above (the block is a subtransaction)
+    IF array_length(v_sold_out, 1) > 0 THEN
+        RAISE EXCEPTION 'SOLD_OUT';
+    END IF;
+    
+    -- Slot admission: the WHERE on the conflict branch is the capacity check, so concurrent
+    -- orders for the same slot can't overshoot it. An empty slot always takes one order,
+    -- otherwise an order bigger than the whole capacity could never be placed
+    SELECT * INTO v_settings FROM vendor_slot_settings WHERE vendor_id = p_vendor_id;
+    IF FOUND THEN
+        v_slot := pickup_slot_start(p_scheduled_for, v_settings.slot_minutes);
+        
+        INSERT INTO vendor_slot_usage AS u (vendor_id, slot_start, used_minutes, order_count)
+        VALUES (p_vendor_id, v_slot, v_prep, 1)
+        ON CONFLICT (vendor_id, slot_start) DO UPDATE SET
+            used_minutes = u.used_minutes + EXCLUDED.used_minutes,
+            order_count = u.order_count + 1,
+            updated_at = NOW()
+        WHERE u.used_minutes = 0
+           OR u.used_minutes + EXCLUDED.used_minutes <= v_settings.capacity_minutes;
+        
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'SLOT_FULL';
+        END IF;
+    END IF;
+    
+    -- Update total; hold the order from the kitchen until scheduled_for minus its kitchen
+    -- minutes (backend/scheduler.py releases it), or release it now if that's already due
+    UPDATE orders 
+    SET 
+        total_amount = v_total,
+        prep_minutes = v_prep,
+        slot_start = v_slot,
+        release_at = p_scheduled_for - make_interval(mins => v_prep),
+        released_at = CASE WHEN p_scheduled_for - make_interval(mins => v_prep) <= NOW() THEN NOW() END
+    WHERE id = v_order_id AND placed_at = v_placed_at;
+    
+    RETURN QUERY SELECT v_order_id, v_total, 'SUCCESS: Order placed successfully', NULL::INTEGER[], v_prep;
+    
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLERRM = 'SOLD_OUT' THEN
+            RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), 'SOLD_OUT: Some items are sold out'::TEXT, v_sold_out, NULL::INTEGER;
+        ELSIF SQLERRM = 'SLOT_FULL' THEN
+            RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), ('SLOT_FULL: The ' || to_char(v_slot, 'HH24:MI') || ' pickup slot is full')::TEXT, NULL::INTEGER[], v_prep;
+        ELSE
+            RETURN QUERY SELECT NULL::INTEGER, NULL::DECIMAL(12,2), ('ERROR: ' || SQLERRM), NULL::INTEGER[], NULL::INTEGER;
+        END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger: keep vendor_load in step with open orders inside the same transaction
+-- (prep_minutes is filled in by place_customer_order's final UPDATE, hence UPDATE OF prep_minutes;
+-- pending orders held for later only count once the release scheduler sets released_at)
+CREATE OR REPLACE FUNCTION sync_vendor_load()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old_open BOOLEAN := TG_OP IN ('UPDATE', 'DELETE') AND (
+        OLD.status IN ('accepted', 'preparing') OR (OLD.status = 'pending' AND OLD.released_at IS NOT NULL)
+    );
+    v_new_open BOOLEAN := TG_OP IN ('INSERT', 'UPDATE') AND (
+        NEW.status IN ('accepted', 'preparing') OR (NEW.status = 'pending' AND NEW.released_at IS NOT NULL)
+    );
+BEGIN
+    IF TG_OP = 'UPDATE' AND v_old_open AND v_new_open AND NEW.vendor_id = OLD.vendor_id THEN
+        PERFORM apply_vendor_load_delta(
+            NEW.vendor_id, 0, COALESCE(NEW.prep_minutes, 0) - COALESCE(OLD.prep_minutes, 0)
+        );
+        RETURN NULL;
+    END IF;
+
+    IF v_old_open THEN
+        PERFORM apply_vendor_load_delta(OLD.vendor_id, -1, -COALESCE(OLD.prep_minutes, 0));
+    END IF;
+    IF v_new_open THEN
+        PERFORM apply_vendor_load_delta(NEW.vendor_id, 1, COALESCE(NEW.prep_minutes, 0));
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_vendor_load ON orders;
+CREATE TRIGGER trg_orders_vendor_load
+AFTER INSERT OR DELETE OR UPDATE OF vendor_id, status, prep_minutes, released_at ON orders
+FOR EACH ROW EXECUTE FUNCTION sync_vendor_load();
+
+-- Procedure 5: Rebuild vendor_load from the open orders (backfill, or to repair drifted counters)
+CREATE OR REPLACE FUNCTION rebuild_vendor_load(p_vendor_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    -- Blocks trigger writes until we commit, so no concurrent delta is lost or counted twice
+    LOCK TABLE vendor_load IN EXCLUSIVE MODE;
+
+    DELETE FROM vendor_load
+    WHERE p_vendor_id IS NULL OR vendor_id = p_vendor_id;
+
+    INSERT INTO vendor_load (vendor_id, queued_orders, queued_minutes)
+    SELECT o.vendor_id, COUNT(*), COALESCE(SUM(o.prep_minutes), 0)
+    FROM orders o
+    WHERE (o.status IN ('accepted', 'preparing') OR (o.status = 'pending' AND o.released_at IS NOT NULL))
+    AND (p_vendor_id IS NULL OR o.vendor_id = p_vendor_id)
+    GROUP BY o.vendor_id;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,48 @@
+-- Migration 0017: the objects of sql/customer_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/customer_routes.sql and a new migration with its own file.
+
+-- ============================================
+-- QUERY CACHE (per-table invalidation of cached reads)
+-- ============================================
+
+-- Trigger: tell every worker a table changed (backend/query_cache.py listens on fems_tables).
+-- One statement-level trigger per watched table, so every write path is covered; Postgres
+-- sends identical payloads once per transaction and only if it commits
+CREATE OR REPLACE FUNCTION notify_table_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('fems_tables', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Watched tables: keep in step with WATCHED_TABLES in backend/query_cache.py
+DROP TRIGGER IF EXISTS trg_users_query_cache ON users;
+CREATE TRIGGER trg_users_query_cache
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON users
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
+
+DROP TRIGGER IF EXISTS trg_vendors_query_cache ON vendors;
+CREATE TRIGGER trg_vendors_query_cache
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON vendors
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
+
+DROP TRIGGER IF EXISTS trg_vendor_slot_settings_query_cache ON vendor_slot_settings;
+CREATE TRIGGER trg_vendor_slot_settings_query_cache
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON vendor_slot_settings
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
+
+DROP TRIGGER IF EXISTS trg_orders_query_cache ON orders;
+CREATE TRIGGER trg_orders_query_cache
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON orders
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
+
+DROP TRIGGER IF EXISTS trg_order_items_query_cache ON order_items;
+CREATE TRIGGER trg_order_items_query_cache
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON order_items
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
+
+DROP TRIGGER IF EXISTS trg_customer_stats_query_cache ON customer_stats;
+CREATE TRIGGER trg_customer_stats_query_cache
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customer_stats
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
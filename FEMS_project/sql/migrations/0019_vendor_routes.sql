@@ -0,0 +1,82 @@
+-- Migration 0019: the objects of sql/vendor_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/vendor_routes.sql and a new migration with its own file.
+
+-- ============================================
+-- MENU CHANGE LOG (GET /api/customer/vendors/<id>/menu/changes)
+-- ============================================
+
+-- Function 5: Next menu change version for a vendor. The head row stays locked until the
+-- writing transaction commits, so a vendor's versions become visible in order
+CREATE OR REPLACE FUNCTION next_menu_change_version(p_vendor_id INTEGER)
+RETURNS BIGINT AS $$
+DECLARE
+    v_version BIGINT;
+BEGIN
+    INSERT INTO menu_change_heads (vendor_id, version)
+    VALUES (p_vendor_id, 1)
+    ON CONFLICT (vendor_id) DO UPDATE SET
+        version = menu_change_heads.version + 1,
+        updated_at = NOW()
+    RETURNING version INTO v_version;
+
+    RETURN v_version;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger: log menu item inserts, updates (stock included) and deletes per vendor;
+-- an item moved to another menu is a delete there and an upsert here
+CREATE OR REPLACE FUNCTION log_menu_item_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.menu_id IS DISTINCT FROM OLD.menu_id) THEN
+        INSERT INTO menu_item_changes (vendor_id, version, menu_item_id, op)
+        SELECT m.vendor_id, next_menu_change_version(m.vendor_id), OLD.id, 'delete'
+        FROM menus m
+        WHERE m.id = OLD.menu_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO menu_item_changes (vendor_id, version, menu_item_id, op)
+        SELECT m.vendor_id, next_menu_change_version(m.vendor_id), NEW.id, 'upsert'
+        FROM menus m
+        WHERE m.id = NEW.menu_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_menu_items_change_log ON menu_items;
+CREATE TRIGGER trg_menu_items_change_log
+AFTER INSERT OR DELETE ON menu_items
+FOR EACH ROW EXECUTE FUNCTION log_menu_item_change();
+
+DROP TRIGGER IF EXISTS trg_menu_items_change_log_update ON menu_items;
+CREATE TRIGGER trg_menu_items_change_log_update
+AFTER UPDATE ON menu_items
+FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+EXECUTE FUNCTION log_menu_item_change();
+
+-- Trigger: a menu created, removed, (de)activated or retitled changes the whole item set,
+-- logged without an item so clients fetch the full menu again
+CREATE OR REPLACE FUNCTION log_menu_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO menu_item_changes (vendor_id, version, menu_item_id, op)
+        VALUES (OLD.vendor_id, next_menu_change_version(OLD.vendor_id), NULL, 'menu');
+    END IF;
+
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.vendor_id IS DISTINCT FROM OLD.vendor_id) THEN
+        INSERT INTO menu_item_changes (vendor_id, version, menu_item_id, op)
+        VALUES (NEW.vendor_id, next_menu_change_version(NEW.vendor_id), NULL, 'menu');
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_menus_change_log ON menus;
+CREATE TRIGGER trg_menus_change_log
+AFTER INSERT OR DELETE OR UPDATE OF vendor_id, title, is_active ON menus
+FOR EACH ROW EXECUTE FUNCTION log_menu_change();
@@ -0,0 +1,99 @@
+-- Migration 0020: the objects of sql/vendor_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/vendor_routes.sql and a new migration with its own file.
+
+-- ============================================
+-- MENU ITEM SALES COUNTERS
+-- ============================================
+
+-- Trigger: bump menu_item_stats as order lines are written, once per statement
+-- Lines are summed per item first, so an item repeated within one multi-row INSERT still
+-- counts one order. last_ordered_at is the order's placed_at, as in rebuild_menu_item_stats()
+CREATE OR REPLACE FUNCTION sync_menu_item_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO menu_item_stats AS s (
+            menu_item_id, vendor_id, times_ordered, quantity_sold, revenue, last_ordered_at
+        )
+        SELECT
+            mi.id,
+            mi.vendor_id,
+            l.orders,
+            l.quantity,
+            l.revenue,
+            l.last_placed_at
+        FROM (
+            SELECT
+                n.menu_item_id,
+                -- times_ordered counts orders: one that already had a line for the item
+                -- before this statement was counted then
+                COUNT(DISTINCT (n.order_id, n.placed_at)) FILTER (WHERE NOT EXISTS (
+                    SELECT 1 FROM order_items oi
+                    WHERE oi.order_id = n.order_id
+                    AND oi.placed_at = n.placed_at
+                    AND oi.menu_item_id = n.menu_item_id
+                    AND oi.id NOT IN (SELECT id FROM new_lines)
+                )) AS orders,
+                SUM(n.quantity) AS quantity,
+                SUM(n.price_snapshot * n.quantity) AS revenue,
+                MAX(n.placed_at) AS last_placed_at
+            FROM new_lines n
+            WHERE n.menu_item_id IS NOT NULL
+            GROUP BY n.menu_item_id
+        ) l
+        INNER JOIN menu_items mi ON mi.id = l.menu_item_id
+        -- same row order in every transaction, so concurrent orders can't deadlock here
+        ORDER BY mi.id
+        ON CONFLICT (menu_item_id) DO UPDATE SET
+            times_ordered = s.times_ordered + EXCLUDED.times_ordered,
+            quantity_sold = s.quantity_sold + EXCLUDED.quantity_sold,
+            revenue = s.revenue + EXCLUDED.revenue,
+            last_ordered_at = GREATEST(s.last_ordered_at, EXCLUDED.last_ordered_at),
+            updated_at = NOW();
+
+    ELSIF TG_OP = 'DELETE' THEN
+        -- Lines are only deleted with their order; rebuild_menu_item_stats() is authoritative
+        -- for last_ordered_at
+        UPDATE menu_item_stats s
+        SET 
+            times_ordered = GREATEST(s.times_ordered - l.orders, 0),
+            quantity_sold = s.quantity_sold - l.quantity,
+            revenue = s.revenue - l.revenue,
+            updated_at = NOW()
+        FROM (
+            SELECT
+                o.menu_item_id,
+                -- an order still holding another line for the item keeps counting
+                COUNT(DISTINCT (o.order_id, o.placed_at)) FILTER (WHERE NOT EXISTS (
+                    SELECT 1 FROM order_items oi
+                    WHERE oi.order_id = o.order_id
+                    AND oi.placed_at = o.placed_at
+                    AND oi.menu_item_id = o.menu_item_id
+                )) AS orders,
+                SUM(o.quantity) AS quantity,
+                SUM(o.price_snapshot * o.quantity) AS revenue
+            FROM old_lines o
+            WHERE o.menu_item_id IS NOT NULL
+            GROUP BY o.menu_item_id
+        ) l
+        WHERE s.menu_item_id = l.menu_item_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level, with the written lines as transition tables (one trigger per event:
+-- a trigger with transition tables can't fire on both)
+DROP TRIGGER IF EXISTS trg_order_items_menu_item_stats ON order_items;
+DROP TRIGGER IF EXISTS trg_order_items_menu_item_stats_insert ON order_items;
+CREATE TRIGGER trg_order_items_menu_item_stats_insert
+AFTER INSERT ON order_items
+REFERENCING NEW TABLE AS new_lines
+FOR EACH STATEMENT EXECUTE FUNCTION sync_menu_item_stats();
+
+DROP TRIGGER IF EXISTS trg_order_items_menu_item_stats_delete ON order_items;
+CREATE TRIGGER trg_order_items_menu_item_stats_delete
+AFTER DELETE ON order_items
+REFERENCING OLD TABLE AS old_lines
+FOR EACH STATEMENT EXECUTE FUNCTION sync_menu_item_stats();
@@ -0,0 +1,17 @@
+-- Migration 0022: the objects of sql/customer_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/customer_routes.sql and a new migration with its own file.
+
+-- Watched tables: keep in step with WATCHED_TABLES in backend/query_cache.py
+-- Only tables written far less often than they are read: each notification takes the
+-- cluster-wide NOTIFY lock at commit, which must stay off the order path
+-- users: only the columns the vendor directory shows (not last_login on every sign-in);
+-- a deleted user takes its vendor row with it, which notifies through vendors
+DROP TRIGGER IF EXISTS trg_users_query_cache ON users;
+CREATE TRIGGER trg_users_query_cache
+AFTER UPDATE OF full_name, email OR TRUNCATE ON users
+FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change();
+
+-- No longer watched (written by every order): drop the triggers earlier versions created
+DROP TRIGGER IF EXISTS trg_orders_query_cache ON orders;
+DROP TRIGGER IF EXISTS trg_order_items_query_cache ON order_items;
+DROP TRIGGER IF EXISTS trg_customer_stats_query_cache ON customer_stats;
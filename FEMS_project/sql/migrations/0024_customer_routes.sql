@@ -0,0 +1,48 @@
+-- Migration 0024: the objects of sql/customer_routes.sql this migration changed, as they were then.
+-- Frozen: later changes go in sql/customer_routes.sql and a new migration with its own file.
+
+-- Function 7: Apply a delta to one customer's stats row (upsert)
+CREATE OR REPLACE FUNCTION apply_customer_stats_delta(
+    p_customer_id INTEGER,
+    p_order_delta INTEGER,
+    p_amount_delta DECIMAL(12,2),
+    p_placed_at TIMESTAMP,
+    p_old_status VARCHAR(20),
+    p_new_status VARCHAR(20)
+) RETURNS VOID AS $$
+BEGIN
+    IF p_customer_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    -- Deleting a customer cascades to their stats row first, then sets their orders'
+    -- customer_id to NULL, which fires the trigger for the old id: nothing left to count
+    INSERT INTO customer_stats AS cs (
+        customer_id, total_orders, total_spent, last_order_at,
+        pending_orders, accepted_orders, preparing_orders, ready_orders,
+        completed_orders, cancelled_orders, rejected_orders
+    )
+    SELECT
+        p_customer_id, p_order_delta, p_amount_delta, p_placed_at,
+        (p_new_status IS NOT DISTINCT FROM 'pending')::INT - (p_old_status IS NOT DISTINCT FROM 'pending')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'accepted')::INT - (p_old_status IS NOT DISTINCT FROM 'accepted')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'preparing')::INT - (p_old_status IS NOT DISTINCT FROM 'preparing')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'ready')::INT - (p_old_status IS NOT DISTINCT FROM 'ready')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'completed')::INT - (p_old_status IS NOT DISTINCT FROM 'completed')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'cancelled')::INT - (p_old_status IS NOT DISTINCT FROM 'cancelled')::INT,
+        (p_new_status IS NOT DISTINCT FROM 'rejected')::INT - (p_old_status IS NOT DISTINCT FROM 'rejected')::INT
+    WHERE EXISTS (SELECT 1 FROM users WHERE id = p_customer_id)
+    ON CONFLICT (customer_id) DO UPDATE SET
+        total_orders = cs.total_orders + EXCLUDED.total_orders,
+        total_spent = cs.total_spent + EXCLUDED.total_spent,
+        last_order_at = GREATEST(cs.last_order_at, EXCLUDED.last_order_at),
+        pending_orders = cs.pending_orders + EXCLUDED.pending_orders,
+        accepted_orders = cs.accepted_orders + EXCLUDED.accepted_orders,
+        preparing_orders = cs.preparing_orders + EXCLUDED.preparing_orders,
+        ready_orders = cs.ready_orders + EXCLUDED.ready_orders,
+        completed_orders = cs.completed_orders + EXCLUDED.completed_orders,
+        cancelled_orders = cs.cancelled_orders + EXCLUDED.cancelled_orders,
+        rejected_orders = cs.rejected_orders + EXCLUDED.rejected_orders,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
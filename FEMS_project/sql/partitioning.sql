@@ -0,0 +1,287 @@
+-- ============================================
+-- FEMS Orders Partitioning & Archival
+-- ============================================
+-- Converts orders and order_items into tables range-partitioned by month on placed_at.
+-- order_items carries its order's placed_at so both tables are co-partitioned and a
+-- month can be moved to the archive schema as a pair.
+--
+-- Applied by migration 0 (flask --app backend.app db-migrate) after table_creation.sql and
+-- before the baseline route files: the conversion drops the old heap tables together
+-- with the views and triggers that were defined on them. When running it by hand on a
+-- database that is already migrated, reapply customer_routes.sql and vendor_routes.sql afterwards.
+-- The new tables take their columns from the old ones, so columns added since the
+-- baseline (by create_all or by migrations) are kept.
+-- Safe to re-run: the conversion is skipped once orders is already partitioned.
+
+CREATE SCHEMA IF NOT EXISTS archive;
+
+
+-- ============================================
+-- PARTITION MANAGEMENT
+-- ============================================
+
+-- Function 1: Create the orders / order_items partitions for one month
+CREATE OR REPLACE FUNCTION create_order_partition(p_month DATE)
+RETURNS VOID AS $$
+DECLARE
+    v_start DATE := date_trunc('month', p_month)::DATE;
+    v_end DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+    v_suffix TEXT := to_char(p_month, 'YYYYMM');
+BEGIN
+    -- An archived month lives in the archive schema; never recreate it in public
+    IF to_regclass(format('archive.%I', 'orders_' || v_suffix)) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.orders FOR VALUES FROM (%L) TO (%L)',
+        'orders_' || v_suffix, v_start, v_end
+    );
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.order_items FOR VALUES FROM (%L) TO (%L)',
+        'order_items_' || v_suffix, v_start, v_end
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function 2: Make sure partitions exist from the current month up to p_months_ahead
+-- Run daily (flask --app backend.app ensure-order-partitions) so the default partition stays empty
+CREATE OR REPLACE FUNCTION ensure_order_partitions(p_months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER AS $$
+DECLARE
+    v_month DATE;
+    v_count INTEGER := 0;
+BEGIN
+    FOR v_month IN
+        SELECT generate_series(
+            date_trunc('month', NOW()),
+            date_trunc('month', NOW()) + make_interval(months => p_months_ahead),
+            INTERVAL '1 month'
+        )::DATE
+    LOOP
+        PERFORM create_order_partition(v_month);
+        v_count := v_count + 1;
+    END LOOP;
+
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- ============================================
+-- ONE-TIME CONVERSION OF THE HEAP TABLES
+-- ============================================
+
+DO $$
+DECLARE
+    v_month DATE;
+    v_columns TEXT;
+    v_select TEXT;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'public.orders'::regclass) = 'p' THEN
+        RAISE NOTICE 'orders is already partitioned, skipping conversion';
+        RETURN;
+    END IF;
+
+    -- Move the heap tables out of the way; their sequences must outlive them
+    ALTER TABLE public.orders RENAME TO orders_legacy;
+    ALTER TABLE public.order_items RENAME TO order_items_legacy;
+    ALTER TABLE public.orders_legacy RENAME CONSTRAINT orders_pkey TO orders_legacy_pkey;
+    ALTER TABLE public.order_items_legacy RENAME CONSTRAINT order_items_pkey TO order_items_legacy_pkey;
+    ALTER SEQUENCE public.orders_id_seq OWNED BY NONE;
+    ALTER SEQUENCE public.order_items_id_seq OWNED BY NONE;
+
+    -- Same columns, defaults and checks as the old tables, whichever of table_creation.sql,
+    -- db.create_all() or later migrations made them; the partition key has to be part of
+    -- the primary key, and foreign keys are not copied by LIKE
+    CREATE TABLE public.orders (
+        LIKE public.orders_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+        PRIMARY KEY (id, placed_at),
+        CONSTRAINT orders_customer_id_fkey FOREIGN KEY (customer_id) REFERENCES users(id) ON DELETE SET NULL,
+        CONSTRAINT orders_vendor_id_fkey FOREIGN KEY (vendor_id) REFERENCES vendors(id) ON DELETE CASCADE
+    ) PARTITION BY RANGE (placed_at);
+    ALTER TABLE public.orders ALTER COLUMN placed_at SET DEFAULT NOW();
+
+    -- order_items carries its order's placed_at (filled in by the copy below)
+    ALTER TABLE public.order_items_legacy ADD COLUMN IF NOT EXISTS placed_at TIMESTAMP;
+    CREATE TABLE public.order_items (
+        LIKE public.order_items_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+        PRIMARY KEY (id, placed_at),
+        FOREIGN KEY (order_id, placed_at) REFERENCES public.orders(id, placed_at) ON DELETE CASCADE,
+        CONSTRAINT order_items_menu_item_id_fkey FOREIGN KEY (menu_item_id) REFERENCES menu_items(id) ON DELETE SET NULL
+    ) PARTITION BY RANGE (placed_at);
+
+    -- Catches rows outside every monthly range; ensure_order_partitions() keeps it empty
+    CREATE TABLE public.orders_default PARTITION OF public.orders DEFAULT;
+    CREATE TABLE public.order_items_default PARTITION OF public.order_items DEFAULT;
+
+    FOR v_month IN
+        SELECT generate_series(
+            date_trunc('month', (SELECT MIN(COALESCE(placed_at, created_at, NOW())) FROM public.orders_legacy)),
+            date_trunc('month', NOW()),
+            INTERVAL '1 month'
+        )::DATE
+    LOOP
+        PERFORM create_order_partition(v_month);
+    END LOOP;
+    PERFORM ensure_order_partitions(3);
+
+    -- Copy history before any trigger exists, so customer_stats / menu_item_stats are not
+    -- counted twice. Every column of the old tables is copied, by name
+    SELECT
+        string_agg(quote_ident(a.attname), ', ' ORDER BY a.attnum),
+        string_agg(
+            CASE WHEN a.attname = 'placed_at' THEN 'COALESCE(placed_at, created_at, NOW())' ELSE quote_ident(a.attname) END,
+            ', ' ORDER BY a.attnum
+        )
+    INTO v_columns, v_select
+    FROM pg_attribute a
+    WHERE a.attrelid = 'public.orders_legacy'::regclass AND a.attnum > 0 AND NOT a.attisdropped;
+
+    EXECUTE format('INSERT INTO public.orders (%s) SELECT %s FROM public.orders_legacy', v_columns, v_select);
+
+    SELECT
+        string_agg(quote_ident(a.attname), ', ' ORDER BY a.attnum),
+        string_agg('oi.' || quote_ident(a.attname), ', ' ORDER BY a.attnum)
+    INTO v_columns, v_select
+    FROM pg_attribute a
+    WHERE a.attrelid = 'public.order_items_legacy'::regclass AND a.attnum > 0 AND NOT a.attisdropped
+    AND a.attname <> 'placed_at';
+
+    EXECUTE format(
+        'INSERT INTO public.order_items (%s, placed_at) SELECT %s, o.placed_at '
+        'FROM public.order_items_legacy oi INNER JOIN public.orders o ON o.id = oi.order_id',
+        v_columns, v_select
+    );
+
+    -- Views and triggers on the old tables go with them; the route SQL files recreate them
+    DROP TABLE public.order_items_legacy CASCADE;
+    DROP TABLE public.orders_legacy CASCADE;
+
+    ALTER SEQUENCE public.orders_id_seq OWNED BY public.orders.id;
+    ALTER SEQUENCE public.order_items_id_seq OWNED BY public.order_items.id;
+
+    -- Indexes are created on the parent and cascade to every partition
+    CREATE INDEX idx_orders_customer_placed ON public.orders(customer_id, placed_at DESC);
+    CREATE INDEX idx_orders_vendor_placed ON public.orders(vendor_id, placed_at DESC);
+    CREATE INDEX idx_orders_vendor_status ON public.orders(vendor_id, status);
+    CREATE INDEX idx_orders_status ON public.orders(status);
+    CREATE INDEX idx_orders_scheduled_for ON public.orders(scheduled_for);
+    CREATE INDEX idx_order_items_order_id ON public.order_items(order_id);
+    CREATE INDEX idx_order_items_menu_item_id ON public.order_items(menu_item_id);
+END;
+$$;
+
+-- table_creation.sql re-run over partitioned tables (migration 0 on a database set up by
+-- hand) recreates its single-column indexes; the (..., placed_at DESC) ones replace them
+DROP INDEX IF EXISTS public.idx_orders_customer_id;
+DROP INDEX IF EXISTS public.idx_orders_vendor_id;
+
+
+-- ============================================
+-- ARCHIVE SCHEMA
+-- ============================================
+
+-- Archived months are re-attached under these parents so old data stays queryable as one table
+CREATE TABLE IF NOT EXISTS archive.orders (
+    LIKE public.orders INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+    PRIMARY KEY (id, placed_at)
+) PARTITION BY RANGE (placed_at);
+
+CREATE TABLE IF NOT EXISTS archive.order_items (
+    LIKE public.order_items INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+    PRIMARY KEY (id, placed_at),
+    FOREIGN KEY (order_id, placed_at) REFERENCES archive.orders(id, placed_at) ON DELETE CASCADE
+) PARTITION BY RANGE (placed_at);
+
+-- View 1: Hot and archived orders together (only read when a caller asks for old data)
+CREATE OR REPLACE VIEW orders_all AS
+SELECT * FROM public.orders
+UNION ALL
+SELECT * FROM archive.orders;
+
+-- View 2: Hot and archived order items together
+CREATE OR REPLACE VIEW order_items_all AS
+SELECT * FROM public.order_items
+UNION ALL
+SELECT * FROM archive.order_items;
+
+
+-- ============================================
+-- ARCHIVAL JOB
+-- ============================================
+
+-- Procedure 1: Move closed months out of the hot tables
+-- A month is archived once it ended more than p_keep_months ago and every order in it
+-- is completed, cancelled or rejected. Months with open orders are left in place.
+CREATE OR REPLACE FUNCTION archive_order_partitions(p_keep_months INTEGER DEFAULT 6)
+RETURNS TABLE(
+    archived_partition TEXT,
+    orders_archived BIGINT
+) AS $$
+DECLARE
+    v_cutoff DATE := (date_trunc('month', NOW()) - make_interval(months => p_keep_months))::DATE;
+    v_orders_part TEXT;
+    v_items_part TEXT;
+    v_start DATE;
+    v_end DATE;
+    v_open BOOLEAN;
+    v_count BIGINT;
+    v_fk TEXT;
+BEGIN
+    FOR v_orders_part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        INNER JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'public.orders'::regclass
+        AND c.relname ~ '^orders_[0-9]{6}$'
+        AND to_date(substring(c.relname from 8), 'YYYYMM') < v_cutoff
+        ORDER BY c.relname
+    LOOP
+        v_items_part := 'order_items_' || substring(v_orders_part from 8);
+        v_start := to_date(substring(v_orders_part from 8), 'YYYYMM');
+        v_end := (v_start + INTERVAL '1 month')::DATE;
+
+        -- Block writers on this month while we decide, so no order reopens mid-move
+        EXECUTE format('LOCK TABLE public.%I IN SHARE MODE', v_orders_part);
+
+        EXECUTE format(
+            'SELECT EXISTS (SELECT 1 FROM public.%I WHERE COALESCE(status, ''pending'') NOT IN (''completed'', ''cancelled'', ''rejected''))',
+            v_orders_part
+        ) INTO v_open;
+
+        IF v_open THEN
+            CONTINUE;
+        END IF;
+
+        EXECUTE format('SELECT COUNT(*) FROM public.%I', v_orders_part) INTO v_count;
+
+        -- Items go first: an orders partition can't be detached while order_items references it
+        EXECUTE format('ALTER TABLE public.order_items DETACH PARTITION public.%I', v_items_part);
+        FOR v_fk IN
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = format('public.%I', v_items_part)::regclass
+            AND contype = 'f'
+            AND confrelid = 'public.orders'::regclass
+        LOOP
+            EXECUTE format('ALTER TABLE public.%I DROP CONSTRAINT %I', v_items_part, v_fk);
+        END LOOP;
+        EXECUTE format('ALTER TABLE public.orders DETACH PARTITION public.%I', v_orders_part);
+
+        EXECUTE format('ALTER TABLE public.%I SET SCHEMA archive', v_orders_part);
+        EXECUTE format('ALTER TABLE public.%I SET SCHEMA archive', v_items_part);
+        EXECUTE format(
+            'ALTER TABLE archive.orders ATTACH PARTITION archive.%I FOR VALUES FROM (%L) TO (%L)',
+            v_orders_part, v_start, v_end
+        );
+        EXECUTE format(
+            'ALTER TABLE archive.order_items ATTACH PARTITION archive.%I FOR VALUES FROM (%L) TO (%L)',
+            v_items_part, v_start, v_end
+        );
+
+        archived_partition := v_orders_part;
+        orders_archived := v_count;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
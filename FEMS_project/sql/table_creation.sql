@@ -1,5 +1,12 @@
+-- ============================================
+-- FEMS Baseline Tables
+-- ============================================
+-- Applied to a new database by migration 0 (flask --app backend.app db-migrate), with
+-- partitioning.sql and the baseline route files. Safe to re-run over tables that
+-- db.create_all() already made. Never edit for a schema change: add a migration.
+
 -- 1. USERS TABLE
-CREATE TABLE users (
+CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
     email VARCHAR(320) UNIQUE NOT NULL,
     password_hash TEXT NOT NULL,
@@ -12,7 +19,7 @@ CREATE TABLE users (
 );
 
 -- 2. EMAIL VERIFICATIONS TABLE
-CREATE TABLE email_verifications (
+CREATE TABLE IF NOT EXISTS email_verifications (
     id SERIAL PRIMARY KEY,
     user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     code VARCHAR(10) NOT NULL,
@@ -22,7 +29,7 @@ CREATE TABLE email_verifications (
 );
 
 -- 3. VENDORS TABLE
-CREATE TABLE vendors (
+CREATE TABLE IF NOT EXISTS vendors (
     id SERIAL PRIMARY KEY,
     user_id INTEGER UNIQUE NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     vendor_name VARCHAR(200) NOT NULL,
@@ -33,7 +40,7 @@ CREATE TABLE vendors (
 );
 
 -- 4. MENUS TABLE
-CREATE TABLE menus (
+CREATE TABLE IF NOT EXISTS menus (
     id SERIAL PRIMARY KEY,
     vendor_id INTEGER NOT NULL REFERENCES vendors(id) ON DELETE CASCADE,
     title VARCHAR(100) NOT NULL,
@@ -42,7 +49,7 @@ CREATE TABLE menus (
 );
 
 -- 5. MENU ITEMS TABLE
-CREATE TABLE menu_items (
+CREATE TABLE IF NOT EXISTS menu_items (
     id SERIAL PRIMARY KEY,
     menu_id INTEGER NOT NULL REFERENCES menus(id) ON DELETE CASCADE,
     vendor_id INTEGER NOT NULL REFERENCES vendors(id) ON DELETE CASCADE,
@@ -55,8 +62,8 @@ CREATE TABLE menu_items (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
--- 6. ORDERS TABLE
-CREATE TABLE orders (
+-- 6. ORDERS TABLE (converted to monthly partitions on placed_at by partitioning.sql)
+CREATE TABLE IF NOT EXISTS orders (
     id SERIAL PRIMARY KEY,
     customer_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
     vendor_id INTEGER NOT NULL REFERENCES vendors(id) ON DELETE CASCADE,
@@ -71,8 +78,8 @@ CREATE TABLE orders (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
--- 7. ORDER ITEMS TABLE
-CREATE TABLE order_items (
+-- 7. ORDER ITEMS TABLE (co-partitioned with orders by partitioning.sql)
+CREATE TABLE IF NOT EXISTS order_items (
     id SERIAL PRIMARY KEY,
     order_id INTEGER NOT NULL REFERENCES orders(id) ON DELETE CASCADE,
     menu_item_id INTEGER REFERENCES menu_items(id) ON DELETE SET NULL,
@@ -83,7 +90,7 @@ CREATE TABLE order_items (
 );
 
 -- 8. NOTIFICATIONS TABLE
-CREATE TABLE notifications (
+CREATE TABLE IF NOT EXISTS notifications (
     id SERIAL PRIMARY KEY,
     user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     type VARCHAR(50) NOT NULL,
@@ -93,7 +100,7 @@ CREATE TABLE notifications (
 );
 
 -- 9. VENDOR ANALYTICS EVENTS TABLE
-CREATE TABLE vendor_analytics_events (
+CREATE TABLE IF NOT EXISTS vendor_analytics_events (
     id BIGSERIAL PRIMARY KEY,
     vendor_id INTEGER NOT NULL REFERENCES vendors(id) ON DELETE CASCADE,
     event_type VARCHAR(50) NOT NULL,
@@ -101,19 +108,57 @@ CREATE TABLE vendor_analytics_events (
     event_time TIMESTAMP DEFAULT NOW()
 );
 
+-- 10. CUSTOMER STATS TABLE (maintained by trigger on orders, see customer_routes.sql)
+CREATE TABLE IF NOT EXISTS customer_stats (
+    customer_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    total_orders INTEGER NOT NULL DEFAULT 0,
+    total_spent DECIMAL(12,2) NOT NULL DEFAULT 0,
+    last_order_at TIMESTAMP,
+    pending_orders INTEGER NOT NULL DEFAULT 0,
+    accepted_orders INTEGER NOT NULL DEFAULT 0,
+    preparing_orders INTEGER NOT NULL DEFAULT 0,
+    ready_orders INTEGER NOT NULL DEFAULT 0,
+    completed_orders INTEGER NOT NULL DEFAULT 0,
+    cancelled_orders INTEGER NOT NULL DEFAULT 0,
+    rejected_orders INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- 11. MENU ITEM STATS TABLE (maintained by trigger on order_items, see vendor_routes.sql)
+CREATE TABLE IF NOT EXISTS menu_item_stats (
+    menu_item_id INTEGER PRIMARY KEY REFERENCES menu_items(id) ON DELETE CASCADE,
+    vendor_id INTEGER NOT NULL REFERENCES vendors(id) ON DELETE CASCADE,
+    times_ordered INTEGER NOT NULL DEFAULT 0,
+    quantity_sold INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+    last_ordered_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
 
-CREATE INDEX idx_users_email ON users(email);
-CREATE INDEX idx_users_role ON users(role);
-CREATE INDEX idx_vendors_user_id ON vendors(user_id);
-CREATE INDEX idx_menus_vendor_id ON menus(vendor_id);
-CREATE INDEX idx_menu_items_vendor_id ON menu_items(vendor_id);
-CREATE INDEX idx_menu_items_menu_id ON menu_items(menu_id);
-CREATE INDEX idx_orders_customer_id ON orders(customer_id);
-CREATE INDEX idx_orders_vendor_id ON orders(vendor_id);
-CREATE INDEX idx_orders_status ON orders(status);
-CREATE INDEX idx_order_items_order_id ON order_items(order_id);
-CREATE INDEX idx_notifications_user_id ON notifications(user_id);
-CREATE INDEX idx_vendor_analytics_vendor_id ON vendor_analytics_events(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+CREATE INDEX IF NOT EXISTS idx_vendors_user_id ON vendors(user_id);
+CREATE INDEX IF NOT EXISTS idx_menus_vendor_id ON menus(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_menu_items_vendor_id ON menu_items(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_menu_items_menu_id ON menu_items(menu_id);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders(customer_id);
+CREATE INDEX IF NOT EXISTS idx_orders_vendor_id ON orders(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_id ON notifications(user_id);
+CREATE INDEX IF NOT EXISTS idx_vendor_analytics_vendor_id ON vendor_analytics_events(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_menu_item_stats_vendor_id ON menu_item_stats(vendor_id);
 
 -- Making vendor_id UNIQUE so each vendor can only have ONE menu
-ALTER TABLE menus ADD CONSTRAINT unique_vendor_menu UNIQUE (vendor_id);
\ No newline at end of file
+-- (db.create_all() already adds one as menus_vendor_id_key)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ALL (c.conkey)
+        WHERE c.conrelid = 'menus'::regclass AND c.contype = 'u' AND a.attname = 'vendor_id'
+    ) THEN
+        ALTER TABLE menus ADD CONSTRAINT unique_vendor_menu UNIQUE (vendor_id);
+    END IF;
+END $$;
@@ -27,10 +27,11 @@ SELECT
     COALESCE(SUM(oi.quantity), 0) AS total_items_quantity
 FROM orders o
 INNER JOIN users u ON o.customer_id = u.id
-LEFT JOIN order_items oi ON o.id = oi.order_id
-GROUP BY o.id, u.full_name, u.email, u.phone;
+LEFT JOIN order_items oi ON o.id = oi.order_id AND o.placed_at = oi.placed_at
+GROUP BY o.id, o.placed_at, u.full_name, u.email, u.phone;
 
 -- View 2: Vendor's Menu Items with Stats
+-- Reads the incrementally maintained menu_item_stats counters instead of aggregating order_items
 CREATE OR REPLACE VIEW vendor_menu_items_stats AS
 SELECT 
     mi.id AS item_id,
@@ -42,12 +43,11 @@ SELECT
     mi.preparation_time_minutes,
     mi.image_url,
     mi.created_at,
-    COUNT(DISTINCT oi.order_id) AS times_ordered,
-    COALESCE(SUM(oi.quantity), 0) AS total_quantity_sold,
-    COALESCE(SUM(oi.price_snapshot * oi.quantity), 0) AS total_revenue
+    COALESCE(s.times_ordered, 0)::BIGINT AS times_ordered,
+    COALESCE(s.quantity_sold, 0)::BIGINT AS total_quantity_sold,
+    COALESCE(s.revenue, 0)::NUMERIC AS total_revenue
 FROM menu_items mi
-LEFT JOIN order_items oi ON mi.id = oi.menu_item_id
-GROUP BY mi.id;
+LEFT JOIN menu_item_stats s ON s.menu_item_id = mi.id;
 
 -- View 3: Vendor's Revenue Analytics
 CREATE OR REPLACE VIEW vendor_revenue_analytics AS
@@ -332,64 +332,78 @@ END;
 $$ LANGUAGE plpgsql;
 
 
--- Procedure 5: Update Order Status (NEW - For Vendor Order Management)
+-- Procedure 5: Update Order Status (compare-and-set against order_status_transitions)
+-- One UPDATE both validates and applies the move, so a customer cancelling at the
+-- same moment can't be overwritten; the loser gets a CONFLICT instead
+DROP FUNCTION IF EXISTS update_order_status(INTEGER, INTEGER, VARCHAR, TIMESTAMP);
+
 CREATE OR REPLACE FUNCTION update_order_status(
     p_vendor_id INTEGER,
     p_order_id INTEGER,
     p_new_status VARCHAR(20),
-    p_estimated_ready_at TIMESTAMP DEFAULT NULL
+    p_estimated_ready_at TIMESTAMP DEFAULT NULL,
+    p_expected_version INTEGER DEFAULT NULL
 )
 RETURNS TABLE(
     order_id INTEGER,
     old_status VARCHAR(20),
     new_status VARCHAR(20),
     estimated_ready_at TIMESTAMP,
+    version INTEGER,
     status_message TEXT
 ) AS $$
+#variable_conflict use_column
 DECLARE
-    v_old_status VARCHAR(20);
-    v_order RECORD;
+    v_updated RECORD;
+    v_current RECORD;
 BEGIN
-    -- Verify vendor owns this order
-    SELECT * INTO v_order FROM orders 
-    WHERE id = p_order_id AND vendor_id = p_vendor_id;
-    
-    IF NOT FOUND THEN
-        RETURN QUERY SELECT NULL::INTEGER, NULL::VARCHAR, NULL::VARCHAR, NULL::TIMESTAMP, 'ERROR: Order not found or access denied';
-        RETURN;
-    END IF;
-    
-    v_old_status := v_order.status;
-    
-    -- Validate status transition
-    -- pending -> accepted -> preparing -> ready -> completed
-    -- Any status can go to -> cancelled/rejected
-    
     IF p_new_status NOT IN ('pending', 'accepted', 'preparing', 'ready', 'completed', 'cancelled', 'rejected') THEN
-        RETURN QUERY SELECT NULL::INTEGER, NULL::VARCHAR, NULL::VARCHAR, NULL::TIMESTAMP, 'ERROR: Invalid status';
+        RETURN QUERY SELECT NULL::INTEGER, NULL::VARCHAR, NULL::VARCHAR, NULL::TIMESTAMP, NULL::INTEGER, 'ERROR: Invalid status'::TEXT;
         RETURN;
     END IF;
     
-    -- Update order status
-    UPDATE orders
+    -- Transition check and write in one statement; t.from_status is the status we moved away from
+    UPDATE orders o
     SET 
         status = p_new_status,
-        estimated_ready_at = COALESCE(p_estimated_ready_at, estimated_ready_at)
-    WHERE id = p_order_id;
+        estimated_ready_at = COALESCE(p_estimated_ready_at, o.estimated_ready_at),
+        version = o.version + 1
+    FROM order_status_transitions t
+    WHERE o.id = p_order_id
+      AND o.vendor_id = p_vendor_id
+      AND t.actor = 'vendor'
+      AND t.to_status = p_new_status
+      AND t.from_status = o.status
+      AND (p_expected_version IS NULL OR o.version = p_expected_version)
+    RETURNING o.id, t.from_status, o.status, o.estimated_ready_at, o.version
+    INTO v_updated;
     
-    RETURN QUERY 
-    SELECT 
-        o.id,
-        v_old_status,
-        o.status,
-        o.estimated_ready_at,
-        'SUCCESS: Order status updated'::TEXT
+    IF FOUND THEN
+        RETURN QUERY SELECT 
+            v_updated.id, v_updated.from_status, v_updated.status,
+            v_updated.estimated_ready_at, v_updated.version,
+            'SUCCESS: Order status updated'::TEXT;
+        RETURN;
+    END IF;
+    
+    -- Only on failure: work out why nothing matched
+    SELECT o.status, o.version, o.estimated_ready_at INTO v_current
     FROM orders o
-    WHERE o.id = p_order_id;
+    WHERE o.id = p_order_id AND o.vendor_id = p_vendor_id;
+    
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT NULL::INTEGER, NULL::VARCHAR, NULL::VARCHAR, NULL::TIMESTAMP, NULL::INTEGER, 'ERROR: Order not found or access denied'::TEXT;
+    ELSIF p_expected_version IS NOT NULL AND v_current.version <> p_expected_version THEN
+        RETURN QUERY SELECT p_order_id, v_current.status, v_current.status, v_current.estimated_ready_at, v_current.version,
+            ('CONFLICT: Order was modified (now version ' || v_current.version || ', status ' || v_current.status || ')')::TEXT;
+    ELSE
+        RETURN QUERY SELECT p_order_id, v_current.status, v_current.status, v_current.estimated_ready_at, v_current.version,
+            ('CONFLICT: Cannot move order from ' || v_current.status || ' to ' || p_new_status)::TEXT;
+    END IF;
     
 EXCEPTION
     WHEN OTHERS THEN
-        RETURN QUERY SELECT NULL::INTEGER, NULL::VARCHAR, NULL::VARCHAR, NULL::TIMESTAMP, ('ERROR: ' || SQLERRM)::TEXT;
+        RETURN QUERY SELECT NULL::INTEGER, NULL::VARCHAR, NULL::VARCHAR, NULL::TIMESTAMP, NULL::INTEGER, ('ERROR: ' || SQLERRM)::TEXT;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -446,6 +460,411 @@ END;
 $$ LANGUAGE plpgsql;
 
 
+-- ============================================
+-- MENU ITEM SALES COUNTERS
+-- ============================================
+
+-- Trigger: bump menu_item_stats as order lines are written, once per statement
+-- Lines are summed per item first, so an item repeated within one multi-row INSERT still
+-- counts one order. last_ordered_at is the order's placed_at, as in rebuild_menu_item_stats()
+CREATE OR REPLACE FUNCTION sync_menu_item_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO menu_item_stats AS s (
+            menu_item_id, vendor_id, times_ordered, quantity_sold, revenue, last_ordered_at
+        )
+        SELECT
+            mi.id,
+            mi.vendor_id,
+            l.orders,
+            l.quantity,
+            l.revenue,
+            l.last_placed_at
+        FROM (
+            SELECT
+                n.menu_item_id,
+                -- times_ordered counts orders: one that already had a line for the item
+                -- before this statement was counted then
+                COUNT(DISTINCT (n.order_id, n.placed_at)) FILTER (WHERE NOT EXISTS (
+                    SELECT 1 FROM order_items oi
+                    WHERE oi.order_id = n.order_id
+                    AND oi.placed_at = n.placed_at
+                    AND oi.menu_item_id = n.menu_item_id
+                    AND oi.id NOT IN (SELECT id FROM new_lines)
+                )) AS orders,
+                SUM(n.quantity) AS quantity,
+                SUM(n.price_snapshot * n.quantity) AS revenue,
+                MAX(n.placed_at) AS last_placed_at
+            FROM new_lines n
+            WHERE n.menu_item_id IS NOT NULL
+            GROUP BY n.menu_item_id
+        ) l
+        INNER JOIN menu_items mi ON mi.id = l.menu_item_id
+        -- same row order in every transaction, so concurrent orders can't deadlock here
+        ORDER BY mi.id
+        ON CONFLICT (menu_item_id) DO UPDATE SET
+            times_ordered = s.times_ordered + EXCLUDED.times_ordered,
+            quantity_sold = s.quantity_sold + EXCLUDED.quantity_sold,
+            revenue = s.revenue + EXCLUDED.revenue,
+            last_ordered_at = GREATEST(s.last_ordered_at, EXCLUDED.last_ordered_at),
+            updated_at = NOW();
+
+    ELSIF TG_OP = 'DELETE' THEN
+        -- Lines are only deleted with their order; rebuild_menu_item_stats() is authoritative
+        -- for last_ordered_at
+        UPDATE menu_item_stats s
+        SET 
+            times_ordered = GREATEST(s.times_ordered - l.orders, 0),
+            quantity_sold = s.quantity_sold - l.quantity,
+            revenue = s.revenue - l.revenue,
+            updated_at = NOW()
+        FROM (
+            SELECT
+                o.menu_item_id,
+                -- an order still holding another line for the item keeps counting
+                COUNT(DISTINCT (o.order_id, o.placed_at)) FILTER (WHERE NOT EXISTS (
+                    SELECT 1 FROM order_items oi
+                    WHERE oi.order_id = o.order_id
+                    AND oi.placed_at = o.placed_at
+                    AND oi.menu_item_id = o.menu_item_id
+                )) AS orders,
+                SUM(o.quantity) AS quantity,
+                SUM(o.price_snapshot * o.quantity) AS revenue
+            FROM old_lines o
+            WHERE o.menu_item_id IS NOT NULL
+            GROUP BY o.menu_item_id
+        ) l
+        WHERE s.menu_item_id = l.menu_item_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level, with the written lines as transition tables (one trigger per event:
+-- a trigger with transition tables can't fire on both)
+DROP TRIGGER IF EXISTS trg_order_items_menu_item_stats ON order_items;
+DROP TRIGGER IF EXISTS trg_order_items_menu_item_stats_insert ON order_items;
+CREATE TRIGGER trg_order_items_menu_item_stats_insert
+AFTER INSERT ON order_items
+REFERENCING NEW TABLE AS new_lines
+FOR EACH STATEMENT EXECUTE FUNCTION sync_menu_item_stats();
+
+DROP TRIGGER IF EXISTS trg_order_items_menu_item_stats_delete ON order_items;
+CREATE TRIGGER trg_order_items_menu_item_stats_delete
+AFTER DELETE ON order_items
+REFERENCING OLD TABLE AS old_lines
+FOR EACH STATEMENT EXECUTE FUNCTION sync_menu_item_stats();
+
+-- Procedure 7: Rebuild menu_item_stats from order history, archive included (backfill)
+CREATE OR REPLACE FUNCTION rebuild_menu_item_stats(p_vendor_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    -- Blocks trigger writes until we commit, so no concurrent order line is lost
+    LOCK TABLE menu_item_stats IN EXCLUSIVE MODE;
+
+    DELETE FROM menu_item_stats
+    WHERE p_vendor_id IS NULL OR vendor_id = p_vendor_id;
+
+    INSERT INTO menu_item_stats (
+        menu_item_id, vendor_id, times_ordered, quantity_sold, revenue, last_ordered_at
+    )
+    SELECT
+        mi.id,
+        mi.vendor_id,
+        COUNT(DISTINCT oi.order_id),
+        SUM(oi.quantity),
+        SUM(oi.price_snapshot * oi.quantity),
+        MAX(oi.placed_at)
+    FROM menu_items mi
+    INNER JOIN order_items_all oi ON oi.menu_item_id = mi.id
+    WHERE p_vendor_id IS NULL OR mi.vendor_id = p_vendor_id
+    GROUP BY mi.id, mi.vendor_id;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- ============================================
+-- INVENTORY
+-- ============================================
+
+-- Trigger: put tracked stock back when an order is cancelled or rejected
+-- (place_customer_order() takes it; items that had sold out become available again,
+-- and the workers' cached copies of those menus are invalidated)
+CREATE OR REPLACE FUNCTION restore_order_stock()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_vendor_id INTEGER;
+BEGIN
+    IF NEW.status NOT IN ('cancelled', 'rejected') OR OLD.status IN ('cancelled', 'rejected') THEN
+        RETURN NULL;
+    END IF;
+
+    -- Returned units are not menu changes (trg_menu_items_change_log_update)
+    PERFORM set_config('fems.order_stock', 'on', true);
+
+    FOR v_vendor_id IN
+    WITH returned AS (
+        SELECT oi.menu_item_id, SUM(oi.quantity) AS quantity
+        FROM order_items oi
+        WHERE oi.order_id = NEW.id
+        AND oi.placed_at = NEW.placed_at
+        AND oi.menu_item_id IS NOT NULL
+        GROUP BY oi.menu_item_id
+    ),
+    restocked AS (
+        UPDATE menu_items mi
+        SET 
+            stock = mi.stock + r.quantity,
+            available = mi.available OR mi.stock = 0
+        FROM returned r
+        WHERE mi.id = r.menu_item_id
+        AND mi.stock IS NOT NULL
+        RETURNING mi.menu_id, mi.stock - r.quantity AS stock_before
+    ),
+    bumped AS (
+        UPDATE menus
+        SET version = version + 1
+        WHERE id IN (SELECT menu_id FROM restocked WHERE stock_before = 0)
+        RETURNING vendor_id
+    )
+    SELECT DISTINCT vendor_id FROM bumped
+    LOOP
+        PERFORM publish_cache_invalidation('menu', v_vendor_id::TEXT);
+    END LOOP;
+
+    PERFORM set_config('fems.order_stock', 'off', true);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_restore_stock ON orders;
+CREATE TRIGGER trg_orders_restore_stock
+AFTER UPDATE OF status ON orders
+FOR EACH ROW EXECUTE FUNCTION restore_order_stock();
+
+
+-- ============================================
+-- KITCHEN QUEUE (item totals across accepted / preparing orders)
+-- ============================================
+
+-- Function 4: Kitchen grouping slot: the order's pickup slot, or its 15-minute bucket
+-- when the vendor has no slot settings
+CREATE OR REPLACE FUNCTION kitchen_slot_start(p_slot_start TIMESTAMP, p_scheduled_for TIMESTAMP, p_placed_at TIMESTAMP)
+RETURNS TIMESTAMP AS $$
+    SELECT COALESCE(p_slot_start, pickup_slot_start(COALESCE(p_scheduled_for, p_placed_at), 15));
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Trigger: copy an order's lines into the kitchen queue when it becomes accepted or
+-- preparing, and take them out again when it leaves those states (or moves slot).
+-- Totals are subtracted from the copied lines, so they stay exact even if the menu
+-- item is deleted while the order is still cooking.
+CREATE OR REPLACE FUNCTION sync_kitchen_queue()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old_active BOOLEAN := TG_OP IN ('UPDATE', 'DELETE') AND OLD.status IN ('accepted', 'preparing');
+    v_new_active BOOLEAN := TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IN ('accepted', 'preparing');
+BEGIN
+    IF TG_OP = 'UPDATE' AND v_old_active AND v_new_active
+       AND NEW.slot_start IS NOT DISTINCT FROM OLD.slot_start
+       AND NEW.scheduled_for IS NOT DISTINCT FROM OLD.scheduled_for THEN
+        RETURN NULL;
+    END IF;
+
+    IF v_old_active THEN
+        WITH removed AS (
+            DELETE FROM kitchen_queue_lines
+            WHERE order_id = OLD.id
+            RETURNING vendor_id, slot_start, menu_item_id, quantity
+        ),
+        totals AS (
+            SELECT vendor_id, slot_start, menu_item_id, SUM(quantity) AS quantity, COUNT(*) AS line_count
+            FROM removed
+            GROUP BY vendor_id, slot_start, menu_item_id
+        )
+        UPDATE kitchen_queue_totals kt
+        SET 
+            quantity = kt.quantity - t.quantity,
+            line_count = kt.line_count - t.line_count,
+            updated_at = NOW()
+        FROM totals t
+        WHERE kt.vendor_id = t.vendor_id
+        AND kt.slot_start = t.slot_start
+        AND kt.menu_item_id = t.menu_item_id;
+
+        DELETE FROM kitchen_queue_totals
+        WHERE vendor_id = OLD.vendor_id AND line_count <= 0;
+    END IF;
+
+    IF v_new_active THEN
+        WITH added AS (
+            INSERT INTO kitchen_queue_lines (
+                order_item_id, order_id, vendor_id, slot_start, menu_item_id, name, quantity, notes
+            )
+            SELECT 
+                oi.id, NEW.id, NEW.vendor_id,
+                kitchen_slot_start(NEW.slot_start, NEW.scheduled_for, NEW.placed_at),
+                COALESCE(oi.menu_item_id, 0), oi.name_snapshot, oi.quantity, NULLIF(btrim(oi.notes), '')
+            FROM order_items oi
+            WHERE oi.order_id = NEW.id AND oi.placed_at = NEW.placed_at
+            ON CONFLICT (order_item_id) DO NOTHING
+            RETURNING vendor_id, slot_start, menu_item_id, name, quantity
+        )
+        INSERT INTO kitchen_queue_totals AS kt (vendor_id, slot_start, menu_item_id, name, quantity, line_count)
+        SELECT vendor_id, slot_start, menu_item_id, MAX(name), SUM(quantity), COUNT(*)
+        FROM added
+        GROUP BY vendor_id, slot_start, menu_item_id
+        ON CONFLICT (vendor_id, slot_start, menu_item_id) DO UPDATE SET
+            name = EXCLUDED.name,
+            quantity = kt.quantity + EXCLUDED.quantity,
+            line_count = kt.line_count + EXCLUDED.line_count,
+            updated_at = NOW();
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_kitchen_queue ON orders;
+CREATE TRIGGER trg_orders_kitchen_queue
+AFTER INSERT OR DELETE OR UPDATE OF status, slot_start, scheduled_for ON orders
+FOR EACH ROW EXECUTE FUNCTION sync_kitchen_queue();
+
+-- Procedure 8: Rebuild the kitchen queue from the open orders (backfill, or to repair drift)
+CREATE OR REPLACE FUNCTION rebuild_kitchen_queue(p_vendor_id INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    -- Blocks trigger writes until we commit, so no concurrent change is lost or counted twice
+    LOCK TABLE kitchen_queue_lines, kitchen_queue_totals IN EXCLUSIVE MODE;
+
+    DELETE FROM kitchen_queue_lines WHERE p_vendor_id IS NULL OR vendor_id = p_vendor_id;
+    DELETE FROM kitchen_queue_totals WHERE p_vendor_id IS NULL OR vendor_id = p_vendor_id;
+
+    INSERT INTO kitchen_queue_lines (
+        order_item_id, order_id, vendor_id, slot_start, menu_item_id, name, quantity, notes
+    )
+    SELECT 
+        oi.id, o.id, o.vendor_id,
+        kitchen_slot_start(o.slot_start, o.scheduled_for, o.placed_at),
+        COALESCE(oi.menu_item_id, 0), oi.name_snapshot, oi.quantity, NULLIF(btrim(oi.notes), '')
+    FROM orders o
+    JOIN order_items oi ON oi.order_id = o.id AND oi.placed_at = o.placed_at
+    WHERE o.status IN ('accepted', 'preparing')
+    AND (p_vendor_id IS NULL OR o.vendor_id = p_vendor_id);
+
+    INSERT INTO kitchen_queue_totals (vendor_id, slot_start, menu_item_id, name, quantity, line_count)
+    SELECT vendor_id, slot_start, menu_item_id, MAX(name), SUM(quantity), COUNT(*)
+    FROM kitchen_queue_lines
+    WHERE p_vendor_id IS NULL OR vendor_id = p_vendor_id
+    GROUP BY vendor_id, slot_start, menu_item_id;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- ============================================
+-- MENU CHANGE LOG (GET /api/customer/vendors/<id>/menu/changes)
+-- ============================================
+
+-- Function 5: Next menu change version for a vendor. The head row stays locked until the
+-- writing transaction commits, so a vendor's versions become visible in order
+CREATE OR REPLACE FUNCTION next_menu_change_version(p_vendor_id INTEGER)
+RETURNS BIGINT AS $$
+DECLARE
+    v_version BIGINT;
+BEGIN
+    INSERT INTO menu_change_heads (vendor_id, version)
+    VALUES (p_vendor_id, 1)
+    ON CONFLICT (vendor_id) DO UPDATE SET
+        version = menu_change_heads.version + 1,
+        updated_at = NOW()
+    RETURNING version INTO v_version;
+
+    RETURN v_version;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger: log menu item inserts, updates and deletes per vendor; an item moved to
+-- another menu is a delete there and an upsert here
+CREATE OR REPLACE FUNCTION log_menu_item_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.menu_id IS DISTINCT FROM OLD.menu_id) THEN
+        INSERT INTO menu_item_changes (vendor_id, version, menu_item_id, op)
+        SELECT m.vendor_id, next_menu_change_version(m.vendor_id), OLD.id, 'delete'
+        FROM menus m
+        WHERE m.id = OLD.menu_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO menu_item_changes (vendor_id, version, menu_item_id, op)
+        SELECT m.vendor_id, next_menu_change_version(m.vendor_id), NEW.id, 'upsert'
+        FROM menus m
+        WHERE m.id = NEW.menu_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_menu_items_change_log ON menu_items;
+CREATE TRIGGER trg_menu_items_change_log
+AFTER INSERT OR DELETE ON menu_items
+FOR EACH ROW EXECUTE FUNCTION log_menu_item_change();
+
+-- Stock counts moved by orders are not logged: place_customer_order() and
+-- restore_order_stock() set fems.order_stock for their decrements, and taking the head
+-- row there would queue every order of the vendor behind the one before it. Their
+-- availability flips (sold out, back in stock) are still logged; the items are locked
+-- by then, so the head row is always taken after the item rows
+DROP TRIGGER IF EXISTS trg_menu_items_change_log_update ON menu_items;
+CREATE TRIGGER trg_menu_items_change_log_update
+AFTER UPDATE ON menu_items
+FOR EACH ROW WHEN (
+    OLD.* IS DISTINCT FROM NEW.*
+    AND NOT (
+        current_setting('fems.order_stock', true) IS NOT DISTINCT FROM 'on'
+        AND NEW.available IS NOT DISTINCT FROM OLD.available
+        AND to_jsonb(NEW) - 'stock' = to_jsonb(OLD) - 'stock'
+    )
+)
+EXECUTE FUNCTION log_menu_item_change();
+
+-- Trigger: a menu created, removed, (de)activated or retitled changes the whole item set,
+-- logged without an item so clients fetch the full menu again
+CREATE OR REPLACE FUNCTION log_menu_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO menu_item_changes (vendor_id, version, menu_item_id, op)
+        VALUES (OLD.vendor_id, next_menu_change_version(OLD.vendor_id), NULL, 'menu');
+    END IF;
+
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.vendor_id IS DISTINCT FROM OLD.vendor_id) THEN
+        INSERT INTO menu_item_changes (vendor_id, version, menu_item_id, op)
+        VALUES (NEW.vendor_id, next_menu_change_version(NEW.vendor_id), NULL, 'menu');
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_menus_change_log ON menus;
+CREATE TRIGGER trg_menus_change_log
+AFTER INSERT OR DELETE OR UPDATE OF vendor_id, title, is_active ON menus
+FOR EACH ROW EXECUTE FUNCTION log_menu_change();
+
 -- ============================================
 -- INDEXES FOR PERFORMANCE
 -- ============================================
@@ -479,7 +898,16 @@ AND routine_name IN (
     'update_menu_item',
     'delete_menu_item',
     'update_order_status',
-    'get_vendor_orders'
+    'restore_order_stock',
+    'sync_kitchen_queue',
+    'kitchen_slot_start',
+    'rebuild_kitchen_queue',
+    'get_vendor_orders',
+    'sync_menu_item_stats',
+    'rebuild_menu_item_stats',
+    'next_menu_change_version',
+    'log_menu_item_change',
+    'log_menu_change'
 )
 ORDER BY routine_name;
 
@@ -0,0 +1,188 @@
+"""
+FEMS Startup Benchmark
+Measures how fast a new worker serves its first request, against a budget
+
+Two ways a worker starts:
+    cold   a fresh interpreter imports the app, builds it, runs the schema step and
+           serves GET /api/customer/health (how plain `gunicorn backend.wsgi:app` and
+           uvicorn start workers). Run once per schema mode: create_all (the dev
+           server default) and check (one schema_migrations query).
+    fork   the app is built once, then forked, like `python -m backend.serve` with
+           preload; each child drops the inherited pool and serves the first request.
+Each sample is a separate process; the script reports the median and worst time
+per phase (imports, config, extensions, blueprints, schema step, first request) and
+whether the median first request fits --budget-ms.
+
+The database must be migrated (flask --app backend.app db-migrate) for the check mode.
+
+Usage (from FEMS_project/):
+    python startup_benchmark.py --runs 10 --modes create_all,check --budget-ms 500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+GREEN = "\033[92m"
+RED = "\033[91m"
+BLUE = "\033[94m"
+CYAN = "\033[96m"
+RESET = "\033[0m"
+
+
+def print_section(title, color=BLUE):
+    print(f"\n{color}{'='*80}")
+    print(f"  {title}")
+    print(f"{'='*80}{RESET}\n")
+
+
+def print_success(msg):
+    print(f"{GREEN}✓ {msg}{RESET}")
+
+
+def print_error(msg):
+    print(f"{RED}✗ {msg}{RESET}")
+
+
+def print_info(msg):
+    print(f"{CYAN}➤ {msg}{RESET}")
+
+
+# ============================================================================ #
+# CHILD PROCESSES
+# ============================================================================ #
+
+def first_request(app):
+    response = app.test_client().get("/api/customer/health")
+    if response.status_code != 200:
+        raise SystemExit(f"health check returned {response.status_code}: {response.get_data(as_text=True)}")
+
+
+def child_cold():
+    """One cold start; prints the timer report as JSON"""
+    from backend.app import create_app
+    from backend.startup import startup_timer, prepare_schema
+
+    app = create_app()
+    prepare_schema(app)
+    first_request(app)
+    print(json.dumps(startup_timer.report()))
+
+
+def child_fork(runs):
+    """Boot once, then fork `runs` workers one after another; prints one JSON report per worker"""
+    from backend.app import create_app
+    from backend.extensions import db
+    from backend.startup import startup_timer, prepare_schema
+
+    app = create_app()
+    prepare_schema(app, default_mode="check")
+
+    for _ in range(runs):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            # what backend.serve's post_fork does
+            startup_timer.mark_fork()
+            with app.app_context():
+                db.engine.dispose(close=False)
+            first_request(app)
+            os.write(write_fd, json.dumps(startup_timer.report()).encode())
+            os._exit(0)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            report = pipe.read()
+        os.waitpid(pid, 0)
+        if report:
+            print(report)
+
+
+def run_child(args, env):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *args],
+        env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise SystemExit(f"startup run failed:\n{result.stderr.strip()}")
+    reports = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+    return reports, wall_ms
+
+
+# ============================================================================ #
+# MAIN
+# ============================================================================ #
+
+def summarize(reports):
+    phases = {}
+    for report in reports:
+        for name, ms in report["phases"].items():
+            phases.setdefault(name, []).append(ms)
+        phases.setdefault("first request", []).append(report["first_request_ms"])
+    return {name: (statistics.median(values), max(values)) for name, values in phases.items()}
+
+
+def main():
+    if "--child" in sys.argv:
+        child_cold()
+        return
+    if "--fork-child" in sys.argv:
+        child_fork(int(sys.argv[sys.argv.index("--fork-child") + 1]))
+        return
+
+    parser = argparse.ArgumentParser(description="Measure worker cold start against a budget")
+    parser.add_argument("--runs", type=int, default=10, help="Samples per mode")
+    parser.add_argument("--modes", default="create_all,check", help="Comma-separated cold start schema modes")
+    parser.add_argument("--no-fork", action="store_true", help="skip the preload + fork measurement")
+    parser.add_argument("--budget-ms", type=int, default=500, help="Target for the first request")
+    args = parser.parse_args()
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+
+    print_section(f"⏱ STARTUP BENCHMARK ({args.runs} runs per mode, budget {args.budget_ms} ms)")
+
+    results = {}
+    for mode in modes:
+        print_info(f"cold start, SCHEMA_STARTUP={mode}...")
+        env = {**os.environ, "SCHEMA_STARTUP": mode, "STARTUP_BUDGET_MS": str(args.budget_ms)}
+        reports = []
+        for _ in range(args.runs):
+            run_reports, _ = run_child(["--child"], env)
+            reports.extend(run_reports)
+        results[f"cold / {mode}"] = summarize(reports)
+
+    if not args.no_fork:
+        if not hasattr(os, "fork"):
+            print_error("os.fork is not available here; skipping the fork measurement")
+        else:
+            print_info("preload + fork...")
+            env = {**os.environ, "STARTUP_BUDGET_MS": str(args.budget_ms)}
+            reports, _ = run_child(["--fork-child", str(args.runs)], env)
+            results["fork"] = summarize(reports)
+
+    print_section("RESULTS")
+    over_budget = False
+    for label, phases in results.items():
+        print(f"  {label}")
+        for name, (median, worst) in phases.items():
+            print(f"    {name:<20}{median:>10.1f} ms median{worst:>10.1f} ms worst")
+        median_first = phases["first request"][0]
+        if median_first <= args.budget_ms:
+            print_success(f"{label}: first request {median_first:.1f} ms, within {args.budget_ms} ms")
+        else:
+            print_error(f"{label}: first request {median_first:.1f} ms, over {args.budget_ms} ms")
+            over_budget = True
+        print()
+
+    if over_budget:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+pytest fixtures for the FEMS backend (run from FEMS_project/: python -m pytest tests)
+
+Tests that only need the app skip when Flask isn't installed; tests that need Postgres
+skip unless TEST_DATABASE_URL points at a migrated database (flask --app backend.app
+db-migrate). The request-level scripts in FEMS_project/ (test_auth_endpoints.py,
+integrated_tests.py, ...) run against a live server instead.
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """An app that never touches the database unless a test does"""
+    pytest.importorskip("flask_sqlalchemy")
+    monkeypatch.setenv("DATABASE_URL", os.getenv("TEST_DATABASE_URL", "postgresql://fems@localhost/fems_test"))
+    # no background threads: nothing here should need the database
+    for flag in ("RELEASE_SCHEDULER_ENABLED", "CACHE_BUS_ENABLED", "SNAPSHOT_ENABLED"):
+        monkeypatch.setenv(flag, "false")
+
+    from backend.app import create_app
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def database_url():
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    pytest.importorskip("psycopg2")
+    return url
+
+
+@pytest.fixture
+def connect(database_url):
+    """psycopg2 connections to the test database, closed after the test"""
+    import psycopg2
+
+    connections = []
+
+    def connect(autocommit=False):
+        conn = psycopg2.connect(database_url)
+        conn.autocommit = autocommit
+        connections.append(conn)
+        return conn
+
+    yield connect
+    for conn in connections:
+        conn.close()
+
+
+@pytest.fixture
+def vendor(connect):
+    """
+    A throwaway vendor with one menu, two tracked items and two customers (deleted afterwards)
+
+    Orders from one customer serialize on that customer's customer_stats row, so tests of
+    concurrent orders place them as different customers (customer_ids).
+    """
+    conn = connect(autocommit=True)
+    tag = uuid.uuid4().hex[:8]
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO users (email, password_hash, role, full_name, is_email_verified)
+            VALUES
+                (%(vendor)s, 'x', 'vendor', 'Test Vendor', TRUE),
+                (%(first)s, 'x', 'customer', 'Test Customer', TRUE),
+                (%(second)s, 'x', 'customer', 'Second Customer', TRUE)
+            RETURNING id;
+        """, {
+            "vendor": f"test-vendor-{tag}@example.com",
+            "first": f"test-customer-{tag}@example.com",
+            "second": f"test-customer-2-{tag}@example.com",
+        })
+        vendor_user_id, *customer_ids = [row[0] for row in cur.fetchall()]
+        cur.execute(
+            "INSERT INTO vendors (user_id, vendor_name, location) VALUES (%s, %s, 'Test Hall') RETURNING id;",
+            (vendor_user_id, f"Test Vendor {tag}")
+        )
+        vendor_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO menus (vendor_id, title) VALUES (%s, 'Test Menu') RETURNING id;", (vendor_id,))
+        menu_id = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO menu_items (menu_id, vendor_id, name, price, stock)
+            VALUES (%(menu_id)s, %(vendor_id)s, 'Samosa', 50, 100), (%(menu_id)s, %(vendor_id)s, 'Chai', 30, 100)
+            RETURNING id;
+        """, {"menu_id": menu_id, "vendor_id": vendor_id})
+        item_ids = sorted(row[0] for row in cur.fetchall())
+
+    yield {
+        "vendor_id": vendor_id,
+        "menu_id": menu_id,
+        "item_ids": item_ids,
+        "customer_id": customer_ids[0],
+        "customer_ids": customer_ids,
+    }
+
+    # the vendor's user takes the vendor, menu and orders with it; deleting customers who have
+    # orders needs the customer_stats fix of migration 24
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM users WHERE id = ANY(%s);", ([vendor_user_id] + customer_ids,))
+
+
+def place_order(conn, vendor, item_ids, customer_id=None):
+    """
+    Call place_customer_order() for one unit of each item; returns its status_message
+    Orders as the fixture's first customer unless customer_id is given
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT status_message FROM place_customer_order(
+                %s, %s, (NOW() + INTERVAL '1 hour')::TIMESTAMP, 'pickup', '', %s::jsonb
+            );
+        """, (
+            customer_id or vendor["customer_id"],
+            vendor["vendor_id"],
+            json.dumps([{"menu_item_id": item_id, "quantity": 1} for item_id in item_ids]),
+        ))
+        return cur.fetchone()[0]
+
+
+def wait_until_blocked(conn, pid, timeout=10):
+    """Wait until backend `pid` is waiting on a lock"""
+    deadline = time.monotonic() + timeout
+    with conn.cursor() as cur:
+        while time.monotonic() < deadline:
+            cur.execute("SELECT wait_event_type FROM pg_stat_activity WHERE pid = %s;", (pid,))
+            row = cur.fetchone()
+            if row and row[0] == "Lock":
+                return
+            time.sleep(0.05)
+    raise AssertionError(f"backend {pid} never waited on a lock")
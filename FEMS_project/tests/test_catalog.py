@@ -0,0 +1,110 @@
+"""Campus catalog bundle: rebuilt per fingerprint, served with a weak ETag and 304s"""
+
+import gzip
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from backend import catalog
+from backend.catalog import CATALOG_SQL, CampusCatalog
+
+ROWS = [
+    SimpleNamespace(
+        vendor_id=1, vendor_name="Chai Stop", location="Block A", pickup_available=True,
+        delivery_available=False, menu_id=3, menu_title="Lunch", item_id=11, item_name="Samosa",
+        description=None, price=50, preparation_time_minutes=5, image_url=None,
+    ),
+    SimpleNamespace(
+        vendor_id=2, vendor_name="Closed Kitchen", location=None, pickup_available=True,
+        delivery_available=False, menu_id=None, menu_title=None, item_id=None, item_name=None,
+        description=None, price=None, preparation_time_minutes=None, image_url=None,
+    ),
+]
+
+
+class FakeDatabase:
+    """Stands in for db: the fingerprint query returns `fingerprint`, the catalog query ROWS"""
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.catalog_queries = 0
+        self.session = self
+
+    @staticmethod
+    def text(sql):
+        return sql
+
+    def execute(self, sql):
+        if sql is CATALOG_SQL:
+            self.catalog_queries += 1
+            return iter(ROWS)
+        return SimpleNamespace(scalar=lambda: self.fingerprint)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase("v1")
+    monkeypatch.setattr(catalog, "db", database)
+    return database
+
+
+def test_bundle_is_rebuilt_only_when_the_fingerprint_moves(database):
+    campus = CampusCatalog()
+
+    first = campus.current()
+    assert campus.current() is first
+    assert database.catalog_queries == 1
+
+    database.fingerprint = "v2"
+    second = campus.current()
+    assert second.etag == "v2" and second is not first
+    assert database.catalog_queries == 2
+
+
+def test_bundle_body(database):
+    bundle = CampusCatalog().current()
+    body = json.loads(bundle.body)
+
+    assert gzip.decompress(bundle.gzipped) == bundle.body
+    assert (body["version"], body["total"]) == ("v1", 2)
+    chai, closed = body["vendors"]
+    assert chai["menu"]["items"] == [{
+        "id": 11, "name": "Samosa", "description": None, "price": 50.0,
+        "preparation_time_minutes": 5, "image_url": None,
+    }]
+    assert closed["menu"] is None
+
+
+@pytest.fixture
+def customer_headers(app, monkeypatch):
+    from backend import auth
+    from backend.cache import Principal
+    from backend.utils import create_token
+
+    monkeypatch.setattr(auth, "load_principal", lambda user_id: (0, Principal(user_id, "customer")))
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_token(1, 'customer')}"}
+
+
+def test_catalog_etag_and_304(client, customer_headers, database):
+    response = client.get("/api/customer/catalog", headers={**customer_headers, "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data))["version"] == "v1"
+    etag = response.headers["ETag"]
+    assert etag == 'W/"v1"'
+
+    response = client.get("/api/customer/catalog", headers={**customer_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+    # a catalog change: the old ETag gets the new body
+    database.fingerprint = "v2"
+    response = client.get("/api/customer/catalog", headers={**customer_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert json.loads(response.data)["version"] == "v2"
+    assert response.headers["ETag"] == 'W/"v2"'
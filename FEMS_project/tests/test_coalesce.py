@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+
+from backend.coalesce import Coalescer
+
+
+def run_concurrently(coalescer, count, fn, route="menu", params=(1,), timeout=None):
+    """Start `count` calls with the same key while the first one is still running"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(coalescer.do(route, params, fn, timeout=timeout))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_followers(coalescer, route, count):
+    while coalescer.stats()[route]["calls"] < count:
+        threading.Event().wait(0.001)
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    coalescer = Coalescer()
+    release = threading.Event()
+    computed = []
+
+    def load():
+        computed.append(1)
+        release.wait(5)
+        return {"menu": "shared"}
+
+    threads, results, errors = run_concurrently(coalescer, 10, load)
+    wait_for_followers(coalescer, "menu", 10)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(computed) == 1
+    assert errors == []
+    assert len(results) == 10 and all(result is results[0] for result in results)
+    stats = coalescer.stats()["menu"]
+    assert (stats["leaders"], stats["shared"], stats["in_flight"]) == (1, 9, 0)
+    assert stats["queries_saved"] == 9
+
+
+def test_leader_error_is_raised_in_every_follower():
+    coalescer = Coalescer()
+    release = threading.Event()
+
+    def load():
+        release.wait(5)
+        raise RuntimeError("database went away")
+
+    threads, results, errors = run_concurrently(coalescer, 5, load)
+    wait_for_followers(coalescer, "menu", 5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == []
+    assert len(errors) == 5 and all(str(e) == "database went away" for e in errors)
+    assert coalescer.stats()["menu"]["errors"] == 1
+
+
+def test_nothing_is_kept_once_the_leader_returns():
+    coalescer = Coalescer()
+    values = iter([1, 2])
+
+    assert coalescer.do("menu", (1,), lambda: next(values)) == 1
+    assert coalescer.do("menu", (1,), lambda: next(values)) == 2
+
+
+def test_different_params_are_not_coalesced():
+    coalescer = Coalescer()
+
+    assert coalescer.do("menu", (1,), lambda: "one") == "one"
+    assert coalescer.do("menu", (2,), lambda: "two") == "two"
+    assert coalescer.stats()["menu"]["leaders"] == 2
+
+
+def test_follower_computes_on_its_own_after_the_timeout():
+    coalescer = Coalescer()
+    release = threading.Event()
+    leader = threading.Thread(target=coalescer.do, args=("menu", (1,), lambda: release.wait(5)))
+    leader.start()
+    wait_for_followers(coalescer, "menu", 1)
+
+    assert coalescer.do("menu", (1,), lambda: "own", timeout=0.01) == "own"
+    assert coalescer.stats()["menu"]["timeouts"] == 1
+    release.set()
+    leader.join(5)
+
+
+def test_disabled_coalescer_always_computes():
+    coalescer = Coalescer()
+    coalescer.enabled = False
+
+    with pytest.raises(KeyError):
+        coalescer.do("menu", (1,), lambda: {}["missing"])
+    assert coalescer.stats() == {}
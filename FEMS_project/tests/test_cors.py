@@ -0,0 +1,26 @@
+ORIGIN = "http://localhost:5173"
+
+
+def preflight(client, path, method):
+    return client.options(path, headers={
+        "Origin": ORIGIN,
+        "Access-Control-Request-Method": method,
+        "Access-Control-Request-Headers": "Content-Type, Authorization",
+    })
+
+
+def test_preflight_allows_patch_for_batch_item_updates(client):
+    response = preflight(client, "/api/vendors/1/menu/1/items", "PATCH")
+
+    assert response.status_code == 200
+    assert response.headers["Access-Control-Allow-Origin"] == ORIGIN
+    assert "PATCH" in response.headers["Access-Control-Allow-Methods"]
+
+
+def test_preflight_from_unknown_origin_is_not_allowed(client):
+    response = client.options("/api/vendors/1/menu/1/items", headers={
+        "Origin": "http://evil.example",
+        "Access-Control-Request-Method": "PATCH",
+    })
+
+    assert "Access-Control-Allow-Origin" not in response.headers
@@ -0,0 +1,18 @@
+"""customer_stats trigger vs. customer deletion (needs TEST_DATABASE_URL)"""
+
+from conftest import place_order
+
+
+def test_deleting_a_customer_with_orders(connect, vendor):
+    conn = connect()
+    assert place_order(conn, vendor, vendor["item_ids"]).startswith("SUCCESS")
+    conn.commit()
+
+    # the cascade removes the stats row, then SET NULL on orders fires the stats trigger
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM users WHERE id = %s;", (vendor["customer_id"],))
+        cur.execute("SELECT count(*) FROM customer_stats WHERE customer_id = %s;", (vendor["customer_id"],))
+        assert cur.fetchone()[0] == 0
+        cur.execute("SELECT count(*) FROM orders WHERE vendor_id = %s AND customer_id IS NULL;", (vendor["vendor_id"],))
+        assert cur.fetchone()[0] == 1
+    conn.commit()
@@ -0,0 +1,92 @@
+"""EtaEngine queue model, without a database (the model is fed events directly)"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from backend.eta import EtaEngine
+
+T0 = datetime(2026, 1, 5, 12, 0)
+VENDOR = 1
+
+
+@pytest.fixture
+def engine():
+    engine = EtaEngine()
+    # skip the rebuild from the database
+    engine._pid = os.getpid()
+    engine._built_at = time.monotonic()
+    return engine
+
+
+def minutes(eta, now=T0):
+    return (eta - now).total_seconds() / 60
+
+
+def test_accepted_orders_queue_behind_each_other(engine):
+    engine.order_placed(1, VENDOR, 10, None, now=T0)
+    engine.order_placed(2, VENDOR, 20, None, now=T0)
+
+    assert minutes(engine.status_changed(1, "accepted", now=T0)) == 10
+    assert minutes(engine.status_changed(2, "accepted", now=T0)) == 30
+    assert engine.vendor_backlog(VENDOR) == (2, 30.0, 1.0)
+
+
+def test_pending_order_joins_the_back_of_the_queue(engine):
+    engine.order_placed(1, VENDOR, 10, None, now=T0)
+    engine.status_changed(1, "accepted", now=T0)
+
+    assert minutes(engine.order_placed(2, VENDOR, 5, None, now=T0)) == 15
+
+
+def test_preparing_order_keeps_the_rest_of_its_prep_time(engine):
+    for order_id in (1, 2):
+        engine.order_placed(order_id, VENDOR, 20, None, now=T0)
+        engine.status_changed(order_id, "accepted", now=T0)
+        engine.status_changed(order_id, "preparing", now=T0)
+
+    # the later order finishes first: mark - done for order 1 drops to zero
+    now = T0 + timedelta(minutes=5)
+    engine.status_changed(2, "ready", now=now)
+
+    assert minutes(engine.eta(1, now=now), now) == pytest.approx(15)
+
+
+def test_pre_order_is_not_promised_before_its_pickup_time(engine):
+    pickup = T0 + timedelta(hours=2)
+
+    assert engine.order_placed(1, VENDOR, 10, pickup, now=T0) == pickup
+
+
+def test_closed_orders_leave_the_queue(engine):
+    engine.order_placed(1, VENDOR, 10, None, now=T0)
+    engine.status_changed(1, "accepted", now=T0)
+
+    assert engine.status_changed(1, "cancelled", now=T0) is None
+    assert engine.eta(1) is None
+    assert engine.vendor_backlog(VENDOR)[:2] == (0, 0.0)
+
+
+def test_throughput_follows_ready_orders(engine):
+    for order_id in (1, 2):
+        engine.order_placed(order_id, VENDOR, 10, None, now=T0)
+        engine.status_changed(order_id, "accepted", now=T0)
+    engine.status_changed(1, "ready", now=T0 + timedelta(minutes=10))
+    # 10 kitchen minutes done in 2.5 wall minutes: a sample of 4 minutes per minute
+    engine.status_changed(2, "ready", now=T0 + timedelta(minutes=12.5))
+
+    assert engine.vendor_backlog(VENDOR)[2] == pytest.approx(0.8 * 1.0 + 0.2 * 4.0)
+
+
+def test_live_eta_only_while_the_stored_estimate_is_ours(engine):
+    issued = engine.order_placed(1, VENDOR, 10, None, now=T0)
+
+    assert engine.eta(1, stored=issued, now=T0) == issued
+    # another worker (or the vendor) stored a different estimate since
+    assert engine.eta(1, stored=issued + timedelta(minutes=7), now=T0) is None
+    # nothing stored yet: the engine is all there is
+    assert engine.eta(1, now=T0) == issued
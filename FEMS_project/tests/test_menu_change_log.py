@@ -0,0 +1,84 @@
+"""Menu change log vs. the order path (needs TEST_DATABASE_URL)"""
+
+from conftest import place_order
+
+
+def logged_items(conn, vendor, since=0):
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT menu_item_id FROM menu_item_changes WHERE vendor_id = %s AND version > %s ORDER BY version;",
+            (vendor["vendor_id"], since)
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+def head_version(conn, vendor):
+    with conn.cursor() as cur:
+        cur.execute("SELECT version FROM menu_change_heads WHERE vendor_id = %s;", (vendor["vendor_id"],))
+        row = cur.fetchone()
+        return row[0] if row else 0
+
+
+def fail_fast(conn):
+    # a wait on the vendor's head row shows up as a lock timeout instead of a hang
+    with conn.cursor() as cur:
+        cur.execute("SET lock_timeout = '2s';")
+
+
+def test_orders_for_different_items_do_not_queue(connect, vendor):
+    first, second = vendor["item_ids"]
+    holder, customer = connect(), connect()
+    fail_fast(customer)
+    # two customers: one customer's orders queue on their customer_stats row anyway
+    holder_id, customer_id = vendor["customer_ids"]
+
+    assert place_order(holder, vendor, [first], holder_id).startswith("SUCCESS")
+    # holder's transaction is still open
+    message = place_order(customer, vendor, [second], customer_id)
+
+    customer.commit()
+    holder.commit()
+    assert message.startswith("SUCCESS"), message
+
+
+def test_order_does_not_wait_for_a_vendor_edit(connect, vendor):
+    first, second = vendor["item_ids"]
+    vendor_conn, customer = connect(), connect()
+    fail_fast(customer)
+
+    # the edit is logged: the vendor's transaction holds the head row until it commits
+    with vendor_conn.cursor() as cur:
+        cur.execute("UPDATE menu_items SET price = price + 5 WHERE id = %s;", (second,))
+    message = place_order(customer, vendor, [first])
+    customer.commit()
+    vendor_conn.commit()
+    assert message.startswith("SUCCESS"), message
+
+    # and the other way round: an open order doesn't hold up the edit
+    fail_fast(vendor_conn)
+    assert place_order(customer, vendor, [second]).startswith("SUCCESS")
+    with vendor_conn.cursor() as cur:
+        cur.execute("UPDATE menu_items SET name = 'Masala Samosa' WHERE id = %s;", (first,))
+    vendor_conn.commit()
+    customer.commit()
+
+
+def test_only_sell_outs_from_orders_are_logged(connect, vendor):
+    first, _ = vendor["item_ids"]
+    conn = connect()
+    with conn.cursor() as cur:
+        cur.execute("UPDATE menu_items SET stock = 2 WHERE id = %s;", (first,))
+    conn.commit()
+    # a vendor setting the count is logged
+    assert logged_items(conn, vendor)[-1] == first
+    since = head_version(conn, vendor)
+
+    # 2 -> 1: a stock count, not a menu change
+    assert place_order(conn, vendor, [first]).startswith("SUCCESS")
+    conn.commit()
+    assert logged_items(conn, vendor, since) == []
+
+    # 1 -> 0: the item goes unavailable
+    assert place_order(conn, vendor, [first]).startswith("SUCCESS")
+    conn.commit()
+    assert logged_items(conn, vendor, since) == [first]
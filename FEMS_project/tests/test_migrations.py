@@ -0,0 +1,71 @@
+"""db-migrate on an empty database (needs TEST_DATABASE_URL; creates and drops a scratch database)"""
+
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def empty_database(database_url):
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+
+    url = sqlalchemy.engine.make_url(database_url)
+    name = f"fems_migrate_{uuid.uuid4().hex[:8]}"
+    admin = sqlalchemy.create_engine(url, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.exec_driver_sql(f"CREATE DATABASE {name}")
+
+    engine = sqlalchemy.create_engine(url.set(database=name))
+    yield engine
+
+    engine.dispose()
+    with admin.connect() as conn:
+        conn.exec_driver_sql(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+    admin.dispose()
+
+
+def test_migrate_builds_an_empty_database(empty_database):
+    from backend.migrations import applied_versions, migrate
+    from backend.migrations.versions import MIGRATIONS
+
+    migrate(empty_database, log=lambda line: None)
+
+    with empty_database.connect() as conn:
+        assert applied_versions(conn) == {m.version for m in MIGRATIONS}
+        # tables from the baseline and from later migrations, partitioned orders
+        for table in ("menu_item_stats", "customer_stats", "vendor_load", "menu_change_heads"):
+            assert conn.exec_driver_sql(f"SELECT to_regclass('{table}')").scalar() == table
+        assert conn.exec_driver_sql(
+            "SELECT relkind FROM pg_class WHERE oid = 'orders'::regclass"
+        ).scalar() == "p"
+        # the route functions end at their current signatures, with no older overloads left
+        overloads = dict(conn.exec_driver_sql("""
+            SELECT proname, count(*) FROM pg_proc
+            WHERE proname IN ('place_customer_order', 'cancel_customer_order', 'update_order_status')
+            GROUP BY proname
+        """).all())
+        assert overloads == {"place_customer_order": 1, "cancel_customer_order": 1, "update_order_status": 1}
+
+    # and a second run has nothing left to do
+    assert migrate(empty_database, log=lambda line: None) == []
+
+
+def test_check_needs_the_index_searched_on_index_cond(empty_database):
+    from backend.migrations import ExplainCheck, migrate
+
+    # migration 12's index is on (vendor_id, scheduled_for): with seq scans off the planner
+    # still walks it whole for a release_at filter
+    migrate(empty_database, target=24, log=lambda line: None)
+    query = (
+        "SELECT id, release_at FROM orders WHERE status = 'pending' AND released_at IS NULL "
+        "AND release_at < NOW() + make_interval(secs => :horizon)"
+    )
+
+    with empty_database.connect() as conn:
+        assert ExplainCheck("idx_orders_unreleased", query, {"horizon": 600}).run(conn)[0]
+        assert not ExplainCheck("idx_orders_unreleased", query, {"horizon": 600}, index_cond="release_at").run(conn)[0]
+
+    migrate(empty_database, target=25, log=lambda line: None)
+    with empty_database.connect() as conn:
+        check = ExplainCheck("idx_orders_unreleased_release_at", query, {"horizon": 600}, index_cond="release_at")
+        assert check.run(conn)[0]
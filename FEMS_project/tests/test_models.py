@@ -0,0 +1,19 @@
+"""Model defaults vs. create_all (no database)"""
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from backend.extensions import db
+from backend import models  # noqa: F401  (registers the tables)
+
+
+def test_every_default_is_also_a_server_default():
+    # the SQL functions and triggers insert without the models, so only the server default applies
+    missing = [
+        f"{table.name}.{column.name}"
+        for table in db.metadata.sorted_tables
+        for column in table.columns
+        if column.default is not None and column.server_default is None
+    ]
+    assert missing == []
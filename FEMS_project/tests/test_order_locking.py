@@ -0,0 +1,62 @@
+"""place_customer_order() lock order (needs TEST_DATABASE_URL)"""
+
+import threading
+
+from conftest import place_order, wait_until_blocked
+
+
+def test_order_locks_items_in_id_order(connect, vendor):
+    first, second = vendor["item_ids"]
+    holder, customer, watcher = connect(), connect(), connect(autocommit=True)
+
+    # another transaction holds the lower item
+    with holder.cursor() as cur:
+        cur.execute("SELECT 1 FROM menu_items WHERE id = %s FOR UPDATE;", (first,))
+
+    # items listed highest first: the order must still wait on the lower one before
+    # taking the higher one, or two such orders could deadlock
+    results = []
+    thread = threading.Thread(target=lambda: results.append(place_order(customer, vendor, [second, first])))
+    thread.start()
+    wait_until_blocked(watcher, customer.get_backend_pid())
+
+    with holder.cursor() as cur:
+        cur.execute("SELECT 1 FROM menu_items WHERE id = %s FOR UPDATE NOWAIT;", (second,))
+    holder.rollback()
+
+    thread.join(timeout=10)
+    customer.commit()
+    assert results and results[0].startswith("SUCCESS"), results
+
+
+def test_overlapping_orders_in_opposite_order_all_succeed(connect, vendor):
+    first, second = vendor["item_ids"]
+    rounds = 20
+    errors = []
+
+    # two different customers: one customer's orders already queue on their customer_stats row
+    def customer(item_ids, customer_id):
+        conn = connect()
+        for _ in range(rounds):
+            try:
+                message = place_order(conn, vendor, item_ids, customer_id)
+                conn.commit()
+                if not message.startswith("SUCCESS"):
+                    errors.append(message)
+            except Exception as e:
+                conn.rollback()
+                errors.append(str(e))
+
+    threads = [
+        threading.Thread(target=customer, args=(ids, customer_id))
+        for ids, customer_id in zip(([first, second], [second, first]), vendor["customer_ids"])
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    assert errors == []
+    with connect().cursor() as cur:
+        cur.execute("SELECT stock FROM menu_items WHERE id = ANY(%s) ORDER BY id;", ([first, second],))
+        assert [row[0] for row in cur.fetchall()] == [100 - 2 * rounds] * 2
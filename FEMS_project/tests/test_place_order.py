@@ -0,0 +1,55 @@
+"""POST /api/customer/orders: the order and its ETA commit together (needs TEST_DATABASE_URL)"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def customer_headers(app, vendor):
+    from backend.utils import create_token
+
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_token(vendor['customer_id'], 'customer')}"}
+
+
+def order_body(vendor):
+    return {
+        # a string id, as some clients send it
+        "vendor_id": str(vendor["vendor_id"]),
+        "pickup_time": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
+        "items": [{"menu_item_id": vendor["item_ids"][0], "quantity": 1}],
+    }
+
+
+def stored_orders(connect, vendor):
+    with connect().cursor() as cur:
+        cur.execute("SELECT id, estimated_ready_at FROM orders WHERE vendor_id = %s;", (vendor["vendor_id"],))
+        return cur.fetchall()
+
+
+def test_order_is_stored_with_its_eta(client, customer_headers, vendor, connect):
+    from backend.eta import eta_engine
+
+    response = client.post("/api/customer/orders", json=order_body(vendor), headers=customer_headers)
+
+    assert response.status_code == 201, response.get_json()
+    [(order_id, estimated_ready_at)] = stored_orders(connect, vendor)
+    assert response.get_json()["order"]["order_id"] == order_id
+    assert estimated_ready_at is not None
+    # one queue per vendor, whatever type the client sent the id as
+    assert eta_engine._orders[order_id].vendor_id == vendor["vendor_id"]
+
+
+def test_no_order_without_its_eta(client, customer_headers, vendor, connect, monkeypatch):
+    from backend.eta import eta_engine
+
+    def unavailable(*args, **kwargs):
+        raise RuntimeError("ETA engine unavailable")
+
+    monkeypatch.setattr(eta_engine, "order_placed", unavailable)
+    response = client.post("/api/customer/orders", json=order_body(vendor), headers=customer_headers)
+
+    # a client retrying the 500 can't end up with two orders
+    assert response.status_code == 500
+    assert stored_orders(connect, vendor) == []
@@ -0,0 +1,113 @@
+"""QueryCache bookkeeping: per-table versions, invalidation and bounds (no database)"""
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from backend import query_cache as query_cache_module
+from backend.cache import MISS
+from backend.query_cache import QueryCache
+
+TABLES = ("vendors", "users")
+ROWS = [(1, "Chai Stop"), (2, "Wrap House")]
+
+
+def store(cache, sql, tables=TABLES, rows=ROWS):
+    key = cache.key(sql, {"limit": 20})
+    assert cache.put(key, tables, rows, cache.begin(tables))
+    return key
+
+
+@pytest.fixture
+def cache():
+    return QueryCache()
+
+
+def test_put_then_get(cache):
+    key = store(cache, "SELECT directory")
+
+    assert cache.get(key) is ROWS
+    assert cache.get(cache.key("SELECT directory", {"limit": 50})) is MISS
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_change_to_any_table_drops_the_entry(cache):
+    directory = store(cache, "SELECT directory")
+    slots = store(cache, "SELECT slots", tables=("vendor_slot_settings",))
+
+    cache.table_changed("users")
+
+    assert cache.get(directory) is MISS
+    assert cache.get(slots) is not MISS
+    assert cache.stats()["entries"] == 1
+
+
+def test_result_read_across_a_change_is_not_stored(cache):
+    key = cache.key("SELECT directory", {})
+    token = cache.begin(TABLES)
+    # the notification lands while the query is running
+    cache.table_changed("vendors")
+
+    assert not cache.put(key, TABLES, ROWS, token)
+    assert cache.get(key) is MISS
+    assert cache.stats()["refused"] == 1
+
+
+def test_local_write_invalidates_before_the_notification(cache):
+    key = store(cache, "SELECT slots", tables=("vendor_slot_settings",))
+    token = cache.begin(("vendor_slot_settings",))
+
+    cache.wrote("vendor_slot_settings")
+
+    assert cache.get(key) is MISS
+    assert not cache.put(key, ("vendor_slot_settings",), ROWS, token)
+    # our own notification arriving later only bumps the version again
+    cache.table_changed("vendor_slot_settings")
+    assert store(cache, "SELECT slots", tables=("vendor_slot_settings",)) == key
+
+
+def test_flush_refuses_reads_started_before_it(cache):
+    key = store(cache, "SELECT directory")
+    token = cache.begin(TABLES)
+
+    cache.flush()
+
+    assert cache.get(key) is MISS
+    assert not cache.put(key, TABLES, ROWS, token)
+
+
+def test_least_recently_used_is_evicted_first(cache):
+    cache.max_entries = 2
+    first = store(cache, "SELECT 1")
+    second = store(cache, "SELECT 2")
+    cache.get(first)
+
+    store(cache, "SELECT 3")
+
+    assert cache.get(second) is MISS
+    assert cache.get(first) is not MISS
+    assert cache.stats()["evictions"] == 1
+
+
+def test_size_bound(cache):
+    key = cache.key("SELECT big", {})
+    cache.max_bytes = query_cache_module.result_size(key, ROWS) - 1
+
+    assert not cache.put(key, TABLES, ROWS, cache.begin(TABLES))
+    assert cache.stats()["entries"] == 0
+
+
+def test_max_age(cache, monkeypatch):
+    key = store(cache, "SELECT directory")
+    now = query_cache_module.time.monotonic()
+    monkeypatch.setattr(query_cache_module.time, "monotonic", lambda: now + 10)
+
+    assert cache.get(key, max_age=5) is MISS
+    assert cache.get(key, max_age=30) is ROWS
+
+
+def test_order_tables_are_not_watched(cache):
+    # orders change with every status move: caching them would notify on the order path
+    for table in ("orders", "order_items", "customer_stats"):
+        with pytest.raises(ValueError):
+            cache.usable(("vendors", table))
@@ -0,0 +1,97 @@
+"""Catalog snapshot file format and the reader's fallback to the last good file"""
+
+import os
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from backend import snapshot
+from backend.snapshot import HEADER, CatalogSnapshot, MappedSnapshot, encode_snapshot
+
+WRITTEN_AT = 1_767_614_400.0
+
+VENDOR = {"id": 7, "vendor_name": "Chai Stop", "location": "Block A"}
+MENU = {"id": 3, "title": "Lunch", "is_active": True, "items": [{"id": 11, "name": "Samosa", "price": 50.0}]}
+DIRECTORY = {"name": [VENDOR], "wait": [VENDOR]}
+
+
+def write(path, data):
+    # a new inode every time, like the writer's rename over the old file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "catalog.snapshot")
+
+
+@pytest.fixture
+def reader(path, monkeypatch):
+    # look at the file on every call instead of once a second
+    monkeypatch.setattr(snapshot, "CHECK_SECONDS", 0)
+    reader = CatalogSnapshot()
+    reader.path = path
+    return reader
+
+
+def test_round_trip(path):
+    write(path, encode_snapshot(DIRECTORY, {7: (4, (VENDOR, MENU)), 8: (0, ({"id": 8}, None))}, WRITTEN_AT))
+
+    mapped = MappedSnapshot(path)
+    assert mapped.index["written_at"] == WRITTEN_AT
+    assert mapped.read(mapped.index["directory"]["wait"]) == [VENDOR]
+    entry = mapped.index["menus"]["7"]
+    assert entry[2] == 4
+    assert mapped.read(entry) == {"vendor": VENDOR, "menu": MENU}
+    assert mapped.read(mapped.index["menus"]["8"]) == {"vendor": {"id": 8}, "menu": None}
+
+
+def test_degraded_reads(path, reader):
+    write(path, encode_snapshot(DIRECTORY, {7: (4, (VENDOR, MENU))}, WRITTEN_AT))
+
+    body, status = reader.degraded_menu(7)
+    assert status == 200
+    assert (body["vendor"], body["menu"], body["degraded"]) == (VENDOR, MENU, True)
+    assert reader.degraded_menu(99)[1] == 404
+    body, status = reader.degraded_directory("name")
+    assert (body["vendors"], body["total"], status) == ([VENDOR], 1, 200)
+    assert reader.degraded_directory("rating") is None
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"FEMSCAT1",
+    b"NOTACATALOGSNAPSHOT" * 4,
+    HEADER.pack(snapshot.MAGIC, 500) + b'{"written_at": 1',
+])
+def test_corrupt_file_is_rejected(path, data):
+    write(path, data)
+
+    with pytest.raises(ValueError):
+        MappedSnapshot(path)
+
+
+def test_corrupt_file_keeps_the_last_good_snapshot(path, reader):
+    write(path, encode_snapshot(DIRECTORY, {7: (4, (VENDOR, MENU))}, WRITTEN_AT))
+    good = reader.current()
+    assert good is not None
+
+    write(path, b"FEMSCAT1 cut")
+
+    assert reader.current() is good
+    assert "truncated" in reader.last_error
+    assert reader.degraded_menu(7)[0]["menu"] == MENU
+
+
+def test_no_snapshot_without_a_good_file(path, reader):
+    assert reader.current() is None
+    assert reader.degraded_menu(7) is None
+
+    write(path, b"garbage")
+
+    assert reader.current() is None
+    assert reader.degraded_directory("name") is None